@@ -6,6 +6,8 @@ Elasticsearch 巡检工具 Web 应用
 支持上传 diagnostic 文件并生成报告
 """
 
+import hmac
+import io
 import os
 import sys
 import tempfile
@@ -13,9 +15,11 @@ import shutil
 import zipfile
 import uuid
 import re
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, g, render_template, request, jsonify, send_file
 from werkzeug.utils import secure_filename
 
 # 添加当前目录到路径
@@ -24,9 +28,20 @@ sys.path.insert(0, str(current_dir))
 
 # 导入本地模块
 from src.env_loader import load_env_file
-from src.report_generator import ESReportGenerator
+from src.report_generator import ESReportGenerator, REPORT_GENERATOR_VERSION
+from src.report_cache import ReportCache
+from src.section_cache import SectionCache
+from src.document_cache import DocumentCache
+from src.report_store import create_report_store
+from src.data_source import ZipDataSource, compute_file_hash
+from src.data_loader import ESDataLoader
+from src.bundle_diff import BundleDiff
+from src.fleet_metrics import NODE_METRICS, create_fleet_store
 from src.html_converter import markdown_to_html, create_html_template
-from src.i18n import detect_browser_language, i18n
+from src.i18n import detect_browser_language, i18n, I18n
+from src.job_queue import JobQueue, JobQueueFullError
+from src.metrics import CONTENT_TYPE, MetricsRegistry, StageMetrics, numeric_stats
+from src.profiling import PROFILE_MODES, PROFILE_SUMMARY_FILE
 from src.s3_uploader import S3Uploader
 
 # 加载.env文件
@@ -37,17 +52,94 @@ app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100MB 最大文件大小
 
 # 全局变量存储任务状态
 tasks = {}
-reports = {}
+
+# 已生成的报告，内存超出预算时落盘，过期后连同输出文件一并清理
+# 设置 ESREPORT_STORE_BACKEND=sqlite 后多个worker进程共享报告和任务状态
+report_store = create_report_store()
+
+# 后台分析任务队列，任务状态保存在 tasks 中
+job_queue = JobQueue(tasks, state_store=report_store if report_store.shared else None)
+
+def load_cached_report(reference):
+    """报告缓存内存层只引用 report_store 中的报告，命中时从报告存储读取内容，报告已删除时返回None"""
+    report = report_store.get(reference['report_id'])
+    if report is None:
+        return None
+    return dict(reference, markdown_content=report['markdown_content'], html_content=report['html_content'])
+
+# 按诊断包哈希和语言缓存已生成的报告，内存层只保存报告ID，报告内容只计入 report_store 的内存预算
+report_cache = ReportCache(REPORT_GENERATOR_VERSION, resolver=load_cached_report)
+
+# 按输入文件指纹缓存章节，设置 ESREPORT_SECTION_CACHE_DIR 后启用，
+# 与已分析过的诊断包只有日志等部分文件不同时只重新生成受影响的章节
+SECTION_CACHE_DIR = os.getenv('ESREPORT_SECTION_CACHE_DIR')
+section_cache = SectionCache(SECTION_CACHE_DIR, REPORT_GENERATOR_VERSION) if SECTION_CACHE_DIR else None
+
+# Web页面中报告表格的样式
+REPORT_TABLE_CLASS = 'table table-striped table-bordered'
+
+# 上传接口的返回模式和章节接口支持的格式
+RESPONSE_MODES = ('full', 'slim')
+SECTION_FORMATS = {'md': 'text/markdown', 'html': 'text/html'}
+
+# case文件格式（json / compact / ndjson-gz / none），报告返回后在后台线程中写出
+CASE_FILES_MODE = os.getenv('ESREPORT_CASE_FILES', 'json')
+
+# 渲染后的完整HTML下载文档（含gzip/brotli预压缩版本）
+document_cache = DocumentCache()
+# 报告删除、过期或被淘汰后释放其缓存文档
+report_store.on_delete = document_cache.discard
+
+# 集群群组指标存储，设置 ESREPORT_FLEET_DB 后每次生成报告都写入关键指标
+fleet_store = create_fleet_store()
 
 # 初始化S3上传器
 s3_uploader = S3Uploader()
 
-# 在所有路由前添加调试信息
+def job_state_counts():
+    """本进程内各状态的任务数"""
+    job_states = [job['status'] for job in list(tasks.values())]
+    return {state: job_states.count(state) for state in ('queued', 'running', 'completed', 'failed')}
+
+# Prometheus 指标，由 /esreport/metrics 输出
+# stage 为上传处理的各阶段：save、hash、s3_zip_upload、extract、generate_report、report_html、
+# case_files、html_convert、s3_report_upload；section 为报告各章节
+metrics = MetricsRegistry()
+stage_metrics = StageMetrics(metrics, description='上传处理阶段')
+section_metrics = StageMetrics(metrics, name='section', label='section', description='报告章节生成')
+http_requests = metrics.counter('http_requests_total', 'HTTP 请求数', ('method', 'endpoint', 'status'))
+http_request_seconds = metrics.histogram('http_request_duration_seconds', 'HTTP 请求耗时（秒）', ('endpoint',))
+upload_results = metrics.counter('uploads_total', '诊断包上传结果（cached / queued / rejected）', ('result',))
+metrics.gauge('report_store', '报告存储统计', ('stat',), callback=lambda: numeric_stats(report_store.stats()))
+metrics.gauge('report_cache', '报告缓存统计', ('stat',), callback=lambda: numeric_stats(report_cache.stats()))
+if section_cache is not None:
+    metrics.gauge('section_cache', '章节缓存统计', ('stat',), callback=lambda: numeric_stats(section_cache.stats()))
+metrics.gauge('document_cache', 'HTML文档缓存统计', ('stat',), callback=lambda: numeric_stats(document_cache.stats()))
+metrics.gauge('jobs', '各状态的后台任务数', ('state',),
+              callback=lambda: {(state,): count for state, count in job_state_counts().items()})
+metrics.gauge('job_workers', '后台任务并发数', callback=lambda: job_queue.max_workers)
+
+def is_admin_request():
+    """请求头 X-Admin-Token 与环境变量 ESREPORT_ADMIN_TOKEN 一致（未配置时没有管理员）"""
+    token = os.getenv('ESREPORT_ADMIN_TOKEN')
+    return bool(token) and hmac.compare_digest(token, request.headers.get('X-Admin-Token', ''))
+
+def report_case_dir(report_id):
+    """报告独占的case文件目录，性能剖析文件也写入该目录"""
+    return os.path.join('output', 'cases', report_id)
+
 @app.before_request
-def log_request_info():
-    print(f"Request path: {request.path}")
-    print(f"Request url: {request.url}")
-    print(f"Request base url: {request.base_url}")
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """按路由模板（而不是实际路径）统计请求数和耗时，避免报告ID等参数造成标签膨胀"""
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    elapsed = time.perf_counter() - g.get('request_start', time.perf_counter())
+    http_requests.inc(method=request.method, endpoint=endpoint, status=response.status_code)
+    http_request_seconds.observe(elapsed, endpoint=endpoint)
+    return response
 
 def markdown_to_html(markdown_content):
     """
@@ -145,7 +237,7 @@ def process_table(table_lines):
     # 第二行通常是分隔符，跳过
     data_lines = table_lines[2:] if len(table_lines) > 2 else []
     
-    html = ['<table class="table table-striped table-bordered">']
+    html = [f'<table class="{REPORT_TABLE_CLASS}">']
     
     # 表头
     if header_cells:
@@ -189,7 +281,7 @@ def health():
 
 @app.route('/esreport/api/upload-diagnostic', methods=['POST'])
 def upload_diagnostic():
-    """上传并处理 diagnostic 文件"""
+    """上传 diagnostic 文件并提交后台分析任务"""
     try:
         # 获取语言参数
         language = request.form.get('language', 'zh')  # 默认中文
@@ -199,6 +291,19 @@ def upload_diagnostic():
         # 设置国际化语言
         i18n.set_language(language)
         
+        # slim 模式只返回报告ID、章节索引和摘要，章节内容由前端按需获取
+        response_mode = request.form.get('response_mode', 'full')
+        if response_mode not in RESPONSE_MODES:
+            response_mode = 'full'
+        
+        # 性能剖析（profile=1 / cprofile / sampling）仅限管理员
+        profile = request.args.get('profile') or request.form.get('profile')
+        if profile:
+            if not is_admin_request():
+                return jsonify({'success': False, 'message': 'profile 仅限管理员使用'}), 403
+            if profile not in PROFILE_MODES:
+                profile = PROFILE_MODES[0]
+        
         # 检查文件
         if 'diagnostic_file' not in request.files:
             return jsonify({'success': False, 'message': i18n.t('error_no_file', 'ui')})
@@ -210,208 +315,443 @@ def upload_diagnostic():
         if not file.filename.lower().endswith('.zip'):
             return jsonify({'success': False, 'message': i18n.t('error_file_format', 'ui')})
         
-        # 创建临时目录
+        # 保存上传的文件到临时目录，由后台任务负责清理
         temp_dir = tempfile.mkdtemp()
-        upload_dir = os.path.join(temp_dir, 'diagnostic')
+        filename = secure_filename(file.filename)
+        zip_path = os.path.join(temp_dir, filename)
+        with stage_metrics.track('save') as stage:
+            file.save(zip_path)
+            stage['bytes'] = os.path.getsize(zip_path)
+        
+        # 同一诊断包和语言已生成过报告时直接返回缓存结果（性能剖析时总是重新生成）
+        with stage_metrics.track('hash', stage['bytes']):
+            file_hash = compute_file_hash(zip_path)
+        cached_report = None if profile else report_cache.get(file_hash, language)
+        if cached_report:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            upload_results.inc(result='cached')
+            print(f"⚡ 命中报告缓存: {file_hash[:16]} ({language})")
+            result = store_report(
+                cached_report['markdown_content'],
+                cached_report['html_content'],
+                filename,
+                language,
+                section_index=cached_report.get('section_index'),
+                summary=cached_report.get('summary'),
+                response_mode=response_mode
+            )
+            return jsonify({
+                'success': True,
+                'cached': True,
+                'result': result,
+                'language': language
+            })
         
         try:
-            # 保存上传的文件
-            filename = secure_filename(file.filename)
-            zip_path = os.path.join(temp_dir, filename)
-            file.save(zip_path)
+            job_id = job_queue.submit(run_diagnostic_analysis, zip_path, temp_dir, filename, language,
+                                      file_hash, response_mode, profile)
+        except JobQueueFullError:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            upload_results.inc(result='rejected')
+            return jsonify({'success': False, 'message': i18n.t('error_queue_full', 'ui')}), 503
+        
+        upload_results.inc(result='queued')
+        print(f"📥 已提交分析任务: {job_id} ({filename})")
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status_url': f'/esreport/api/jobs/{job_id}',
+            'language': language
+        }), 202
+    
+    except Exception as e:
+        print(f"❌ 上传处理失败: {e}")
+        return jsonify({'success': False, 'message': f'{i18n.t("error_server", "ui")}: {str(e)}'})
+
+def store_report(markdown_content, html_content, filename, language,
+                 markdown_path=None, html_path=None, s3_upload_result=None,
+                 report_id=None, owned_files=None, section_index=None, summary=None,
+                 response_mode='full', include_content=True):
+    """
+    保存报告数据
+    
+    Args:
+        report_id: 报告ID，未指定时生成新的ID
+        owned_files: 报告过期时需要一并清理的输出文件
+        section_index: 章节索引（key、title 以及在Markdown中的起止位置）
+        summary: 报告摘要信息
+        response_mode: full 返回完整报告内容，slim 只返回章节索引和摘要
+        include_content: 为 False 时 full 模式的结果也不包含报告内容，只标记 content_in_store，
+                         由调用方需要时从 report_store 读取（避免在任务状态中再保存一份报告）
+    
+    Returns:
+        返回给前端的报告结果
+    """
+    # 生成唯一报告ID
+    report_id = report_id or str(uuid.uuid4())
+    
+    # 保存报告数据
+    report_store.put(report_id, {
+        'markdown_content': markdown_content,
+        'html_content': html_content,
+        'markdown_path': markdown_path,
+        'html_path': html_path,
+        'generated_at': datetime.now().isoformat(),
+        'filename': filename,
+        'language': language,  # 保存语言信息
+        's3_upload': s3_upload_result,  # 保存S3上传信息
+        'section_index': section_index or [],
+        'summary': summary or {}
+    }, owned_files)
+    
+    print(f"✅ 报告生成完成: {report_id}")
+    
+    result = {
+        'report_id': report_id,
+        'generated_at': datetime.now().isoformat(),
+        'language': language
+    }
+    
+    if response_mode == 'slim':
+        result['response_mode'] = 'slim'
+        result['sections'] = [
+            {'key': entry['key'], 'title': entry['title'], 'size': entry['end'] - entry['start']}
+            for entry in section_index or []
+        ]
+        result['summary'] = summary or {}
+    elif include_content:
+        result['report_content'] = markdown_content
+        result['html_content'] = html_content
+    else:
+        result['content_in_store'] = True
+    
+    # 如果有S3上传结果，包含在结果中
+    if s3_upload_result:
+        result['s3_upload'] = s3_upload_result
+    
+    return result
+
+def run_diagnostic_analysis(job, zip_path, temp_dir, filename, language, file_hash, response_mode='full',
+                            profile=None):
+    """
+    后台分析任务：S3上传、读取诊断数据、生成报告
+    
+    Args:
+        profile: 性能剖析模式，指定后结果中包含各章节耗时和峰值内存，剖析文件可通过 /api/profile 下载
+    
+    Returns:
+        报告结果，不包含报告内容；full 模式的内容在查询任务时从 report_store 读取，
+        slim 模式下只包含章节索引和摘要
+    """
+    job_i18n = I18n(language)
+    data_source = None
+    cleanup_in_background = False
+    
+    def cleanup():
+        # 清理临时文件（保留报告文件）
+        try:
+            if data_source is not None:
+                data_source.close()
+            shutil.rmtree(temp_dir, ignore_errors=True)
+        except Exception as e:
+            print(f"⚠️ 清理临时文件失败: {e}")
+    
+    # 提前生成报告ID，case文件写入该报告独占的目录，便于报告过期时清理
+    report_id = str(uuid.uuid4())
+    case_dir = report_case_dir(report_id)
+    
+    try:
+        print(f"📁 开始分析诊断文件: {filename}")
+        
+        # **在开始分析时立即上传ZIP文件到S3**
+        s3_upload_result = None
+        folder_name = None
+        if s3_uploader.is_configured():
+            job.set_stage('uploading')
+            print("📤 开始上传ZIP文件到S3...")
+            # 创建基于文件哈希的文件夹
+            folder_name = s3_uploader.create_folder_with_file_hash(zip_path, file_hash)
+            zip_s3_key = f"{folder_name}/{filename}"
+            
+            metadata = {
+                'upload-time': datetime.now().isoformat(),
+                'original-filename': filename,
+                'folder': folder_name,
+                'status': 'analyzing'  # 标记为分析中
+            }
             
-            print(f"📁 开始分析诊断文件: {filename}")
+            with stage_metrics.track('s3_zip_upload', os.path.getsize(zip_path)):
+                zip_uploaded = s3_uploader.upload_file(zip_path, zip_s3_key, metadata)
+            if zip_uploaded:
+                print(f"✅ ZIP文件已上传到S3: s3://{s3_uploader.bucket_name}/{zip_s3_key}")
+            else:
+                print("❌ ZIP文件上传到S3失败")
+        else:
+            print("⚠️ S3未配置，跳过上传")
+        
+        # 直接从ZIP读取诊断数据，无需解压到磁盘
+        job.set_stage('extracting')
+        with stage_metrics.track('extract', os.path.getsize(zip_path)):
+            try:
+                data_source = ZipDataSource(zip_path)
+            except zipfile.BadZipFile:
+                raise ValueError(job_i18n.t('error_invalid_zip', 'ui'))
+            if data_source.root is None:
+                raise ValueError(job_i18n.t('error_invalid_diagnostic', 'ui'))
+        
+        print(f"📊 发现诊断数据目录: {data_source.root or '/'}")
+        
+        # 生成报告
+        print("🚀 开始生成报告...")
+        report_generator = ESReportGenerator(data_source, language=language, case_dir=case_dir,
+                                             fleet_store=fleet_store, profile=profile,
+                                             case_files=CASE_FILES_MODE, section_cache=section_cache)  # 传递语言参数
+        with stage_metrics.track('generate_report'):
+            # 剖析时同步写出case文件，保证下载的剖析ZIP中case文件完整
+            report_result = report_generator.generate_report(generate_html=True, progress_callback=job.report_progress,
+                                                             write_case_files=profile is not None,
+                                                             return_html_content=True,
+                                                             html_table_class=REPORT_TABLE_CLASS)  # 生成HTML版本
+        observe_report_timings(report_generator.timings)
+        
+        # 读取报告内容
+        markdown_path = report_result.get('markdown')
+        if not markdown_path or not os.path.exists(markdown_path):
+            raise ValueError(job_i18n.t('error_report_failed', 'ui'))
+        
+        with open(markdown_path, 'r', encoding='utf-8') as f:
+            markdown_content = f.read()
+        
+        # HTML正文来自生成报告时的流式转换（耗时计入 report_html，表格样式与 markdown_to_html 相同），
+        # HTML生成失败时才重新转换
+        html_content = report_result.get('html_content')
+        if html_content is None:
+            with stage_metrics.track('html_convert', len(markdown_content.encode('utf-8'))):
+                html_content = markdown_to_html(markdown_content)
+        
+        # **报告生成完成后，上传报告文件到S3**
+        html_path = report_result.get('html')
+        if s3_uploader.is_configured():
+            print("📤 开始上传报告文件到S3...")
+            report_upload_start = time.perf_counter()
+            report_upload_bytes = 0
             
-            # **在开始分析时立即上传ZIP文件到S3**
-            s3_upload_result = None
-            folder_name = None
-            if s3_uploader.is_configured():
-                print("📤 开始上传ZIP文件到S3...")
-                # 创建基于文件哈希的文件夹
-                folder_name = s3_uploader.create_folder_with_file_hash(zip_path)
-                zip_s3_key = f"{folder_name}/{filename}"
+            # 如果之前没有创建文件夹，现在创建 
+            if folder_name is None:
+                folder_name = s3_uploader.create_folder_with_file_hash(zip_path, file_hash)
+            
+            # 上传Markdown报告
+            if markdown_path and os.path.exists(markdown_path):
+                md_filename = os.path.basename(markdown_path)
+                md_s3_key = f"{folder_name}/{md_filename}"
                 
                 metadata = {
                     'upload-time': datetime.now().isoformat(),
                     'original-filename': filename,
                     'folder': folder_name,
-                    'status': 'analyzing'  # 标记为分析中
+                    'status': 'completed',
+                    'file-type': 'markdown-report'
                 }
                 
-                zip_uploaded = s3_uploader.upload_file(zip_path, zip_s3_key, metadata)
-                if zip_uploaded:
-                    print(f"✅ ZIP文件已上传到S3: s3://{s3_uploader.bucket_name}/{zip_s3_key}")
+                md_uploaded = s3_uploader.upload_file(markdown_path, md_s3_key, metadata)
+                report_upload_bytes += os.path.getsize(markdown_path)
+                if md_uploaded:
+                    print(f"✅ Markdown报告已上传到S3: s3://{s3_uploader.bucket_name}/{md_s3_key}")
                 else:
-                    print("❌ ZIP文件上传到S3失败")
-            else:
-                print("⚠️ S3未配置，跳过上传")
-            
-            # 解压文件
-            print(f"📁 解压诊断文件: {filename}")
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(upload_dir)
-            
-            # 查找实际的数据目录
-            data_dir = find_diagnostic_data_dir(upload_dir)
-            if not data_dir:
-                return jsonify({'success': False, 'message': i18n.t('error_invalid_diagnostic', 'ui')})
-            
-            print(f"📊 发现诊断数据目录: {data_dir}")
+                    print("❌ Markdown报告上传到S3失败")
             
-            # 生成报告
-            print("🚀 开始生成报告...")
-            report_generator = ESReportGenerator(data_dir, language=language)  # 传递语言参数
-            report_result = report_generator.generate_report(generate_html=True)  # 生成HTML版本
-            
-            # 读取报告内容
-            markdown_path = report_result.get('markdown')
-            if not markdown_path or not os.path.exists(markdown_path):
-                return jsonify({'success': False, 'message': i18n.t('error_report_failed', 'ui')})
-            
-            with open(markdown_path, 'r', encoding='utf-8') as f:
-                markdown_content = f.read()
-            
-            # 转换为HTML
-            html_content = markdown_to_html(markdown_content)
-            
-            # **报告生成完成后，上传报告文件到S3**
-            html_path = report_result.get('html')
-            if s3_uploader.is_configured():
-                print("📤 开始上传报告文件到S3...")
-                
-                # 如果之前没有创建文件夹，现在创建 
-                if folder_name is None:
-                    folder_name = s3_uploader.create_folder_with_file_hash(zip_path)
+            # 上传HTML报告
+            if html_path and os.path.exists(html_path):
+                html_filename = os.path.basename(html_path)
+                html_s3_key = f"{folder_name}/{html_filename}"
                 
-                # 上传Markdown报告
-                if markdown_path and os.path.exists(markdown_path):
-                    md_filename = os.path.basename(markdown_path)
-                    md_s3_key = f"{folder_name}/{md_filename}"
-                    
-                    metadata = {
-                        'upload-time': datetime.now().isoformat(),
-                        'original-filename': filename,
-                        'folder': folder_name,
-                        'status': 'completed',
-                        'file-type': 'markdown-report'
-                    }
-                    
-                    md_uploaded = s3_uploader.upload_file(markdown_path, md_s3_key, metadata)
-                    if md_uploaded:
-                        print(f"✅ Markdown报告已上传到S3: s3://{s3_uploader.bucket_name}/{md_s3_key}")
-                    else:
-                        print("❌ Markdown报告上传到S3失败")
-                
-                # 上传HTML报告
-                if html_path and os.path.exists(html_path):
-                    html_filename = os.path.basename(html_path)
-                    html_s3_key = f"{folder_name}/{html_filename}"
-                    
-                    metadata = {
-                        'upload-time': datetime.now().isoformat(),
-                        'original-filename': filename,
-                        'folder': folder_name,
-                        'status': 'completed',
-                        'file-type': 'html-report'
-                    }
-                    
-                    html_uploaded = s3_uploader.upload_file(html_path, html_s3_key, metadata)
-                    if html_uploaded:
-                        print(f"✅ HTML报告已上传到S3: s3://{s3_uploader.bucket_name}/{html_s3_key}")
-                    else:
-                        print("❌ HTML报告上传到S3失败")
-                
-                # 准备S3上传结果信息
-                s3_upload_result = {
-                    'enabled': True,
-                    'bucket': s3_uploader.bucket_name,
+                metadata = {
+                    'upload-time': datetime.now().isoformat(),
+                    'original-filename': filename,
                     'folder': folder_name,
-                    'upload_time': datetime.now().isoformat()
+                    'status': 'completed',
+                    'file-type': 'html-report'
                 }
+                
+                html_uploaded = s3_uploader.upload_file(html_path, html_s3_key, metadata)
+                report_upload_bytes += os.path.getsize(html_path)
+                if html_uploaded:
+                    print(f"✅ HTML报告已上传到S3: s3://{s3_uploader.bucket_name}/{html_s3_key}")
+                else:
+                    print("❌ HTML报告上传到S3失败")
             
-            # 生成唯一报告ID
-            report_id = str(uuid.uuid4())
+            stage_metrics.observe('s3_report_upload', time.perf_counter() - report_upload_start, report_upload_bytes)
             
-            # 保存报告数据
-            reports[report_id] = {
-                'markdown_content': markdown_content,
-                'html_content': html_content,
-                'markdown_path': markdown_path,
-                'html_path': html_path,
-                'generated_at': datetime.now().isoformat(),
-                'filename': filename,
-                'language': language,  # 保存语言信息
-                's3_upload': s3_upload_result  # 保存S3上传信息
+            # 准备S3上传结果信息
+            s3_upload_result = {
+                'enabled': True,
+                'bucket': s3_uploader.bucket_name,
+                'folder': folder_name,
+                'upload_time': datetime.now().isoformat()
             }
-            
-            print(f"✅ 报告生成完成: {report_id}")
-            
-            response_data = {
-                'success': True,
-                'report_id': report_id,
-                'report_content': markdown_content,
-                'html_content': html_content,
-                'generated_at': datetime.now().isoformat(),
-                'language': language
+        
+        section_index = report_generator.section_index
+        summary = report_generator.get_summary()
+        
+        # 任务结果保留在任务状态中（共享状态存储时还会写入数据库），不包含报告内容，
+        # 查询任务时再从 report_store 读取（见 get_job_status）
+        result = store_report(markdown_content, html_content, filename, language,
+                              markdown_path, html_path, s3_upload_result,
+                              report_id=report_id, owned_files=[markdown_path, html_path, case_dir],
+                              section_index=section_index, summary=summary, response_mode=response_mode,
+                              include_content=False)
+        
+        # 写入报告缓存，之后上传同一诊断包无需重新分析
+        report_cache.put(file_hash, language, {
+            'report_id': report_id,
+            'markdown_content': markdown_content,
+            'html_content': html_content,
+            'section_index': section_index,
+            'summary': summary
+        })
+        
+        if report_generator.profiler is not None:
+            result['profile'] = {
+                'mode': report_generator.profiler.mode,
+                'sections': {
+                    name: {key: entry[key] for key in ('seconds', 'peak_memory_bytes', 'samples')}
+                    for name, entry in report_generator.profiler.results.items()
+                },
+                'download_url': f'/esreport/api/profile/{report_id}'
             }
-            
-            # 如果有S3上传结果，包含在响应中
-            if s3_upload_result:
-                response_data['s3_upload'] = s3_upload_result
-            
-            return jsonify(response_data)
-            
-        except zipfile.BadZipFile:
-            return jsonify({'success': False, 'message': i18n.t('error_invalid_zip', 'ui')})
-        except Exception as e:
-            print(f"❌ 处理文件时发生错误: {e}")
-            return jsonify({'success': False, 'message': f'{i18n.t("error_processing", "ui")}: {str(e)}'})
+        else:
+            # case文件写完后再关闭诊断包
+            write_case_files_in_background(report_generator, cleanup)
+            cleanup_in_background = True
+        return result
+    
+    finally:
+        if not cleanup_in_background:
+            cleanup()
+
+def write_case_files_in_background(report_generator, cleanup=None):
+    """
+    报告返回给用户后在后台线程中写出case文件，写完后调用 cleanup 关闭诊断包并删除临时文件
+    
+    case数据大多已在生成章节时记录；未记录的章节（如记录失败）仍调用 get_case_data() 读取诊断包，
+    因此诊断包不能在报告返回时关闭
+    """
+    def write():
+        try:
+            report_generator.generate_case_files()
+            if 'case_files' in report_generator.timings:
+                stage_metrics.observe('case_files', report_generator.timings['case_files']['seconds'])
         finally:
-            # 清理临时文件（保留报告文件）
-            try:
-                if os.path.exists(zip_path):
-                    os.remove(zip_path)
-                if os.path.exists(upload_dir):
-                    shutil.rmtree(upload_dir)
-            except Exception as e:
-                print(f"⚠️ 清理临时文件失败: {e}")
+            if cleanup is not None:
+                cleanup()
+    
+    threading.Thread(target=write, name='case-files').start()
+
+def observe_report_timings(timings):
+    """记录 ESReportGenerator.timings 中的章节、HTML报告和case文件耗时"""
+    for section_name, timing in timings.get('sections', {}).items():
+        # 使用章节缓存的章节没有实际生成，不计入章节耗时
+        if timing.get('cached'):
+            continue
+        section_metrics.observe(section_name, timing['seconds'], timing.get('bytes', 0))
+    for stage, key in (('report_html', 'html'), ('case_files', 'case_files')):
+        if key in timings:
+            stage_metrics.observe(stage, timings[key]['seconds'], timings[key].get('bytes', 0))
+
+@app.route('/esreport/api/compare', methods=['POST'])
+def compare_diagnostics():
+    """上传同一集群的两个诊断包（diagnostic_file 为本次，baseline_file 为基线）并提交后台对比任务"""
+    try:
+        language = request.form.get('language', 'zh')
+        if language not in ['zh', 'en']:
+            language = 'zh'
+        i18n.set_language(language)
+        
+        files = [request.files.get('diagnostic_file'), request.files.get('baseline_file')]
+        if any(file is None or file.filename == '' for file in files):
+            return jsonify({'success': False, 'message': i18n.t('error_no_file', 'ui')})
+        if any(not file.filename.lower().endswith('.zip') for file in files):
+            return jsonify({'success': False, 'message': i18n.t('error_file_format', 'ui')})
         
+        temp_dir = tempfile.mkdtemp()
+        zip_paths = []
+        for prefix, file in zip(('current', 'baseline'), files):
+            zip_path = os.path.join(temp_dir, f"{prefix}_{secure_filename(file.filename)}")
+            file.save(zip_path)
+            zip_paths.append(zip_path)
+        
+        try:
+            job_id = job_queue.submit(run_bundle_comparison, zip_paths[0], zip_paths[1], temp_dir, language)
+        except JobQueueFullError:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return jsonify({'success': False, 'message': i18n.t('error_queue_full', 'ui')}), 503
+        
+        print(f"📥 已提交对比任务: {job_id}")
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status_url': f'/esreport/api/jobs/{job_id}',
+            'language': language
+        }), 202
+    
     except Exception as e:
-        print(f"❌ 上传处理失败: {e}")
+        print(f"❌ 对比请求处理失败: {e}")
         return jsonify({'success': False, 'message': f'{i18n.t("error_server", "ui")}: {str(e)}'})
 
-def find_diagnostic_data_dir(base_dir):
-    """查找诊断数据目录"""
-    # 常见的诊断数据目录结构
-    possible_paths = [
-        base_dir,
-        os.path.join(base_dir, '*'),  # 第一级子目录
-    ]
-    
-    # 查找包含关键文件的目录
-    key_files = ['cluster_health.json', 'cluster_stats.json', 'nodes_info.json']
-    
-    def check_directory(dir_path):
-        """检查目录是否包含诊断文件"""
-        if not os.path.isdir(dir_path):
-            return False
-        files = os.listdir(dir_path)
-        return any(key_file in files for key_file in key_files)
-    
-    # 直接检查基础目录
-    if check_directory(base_dir):
-        return base_dir
-    
-    # 检查子目录
+def run_bundle_comparison(job, current_zip, baseline_zip, temp_dir, language):
+    """
+    后台对比任务：直接从两个ZIP读取诊断数据并对比
+    
+    Returns:
+        对比结果（comparison）和Markdown对比报告（markdown）
+    """
+    job_i18n = I18n(language)
+    sources = []
     try:
-        for item in os.listdir(base_dir):
-            item_path = os.path.join(base_dir, item)
-            if os.path.isdir(item_path) and check_directory(item_path):
-                return item_path
-    except Exception as e:
-        print(f"⚠️ 搜索诊断目录时出错: {e}")
+        job.set_stage('extracting')
+        for zip_path in (current_zip, baseline_zip):
+            try:
+                source = ZipDataSource(zip_path)
+            except zipfile.BadZipFile:
+                raise ValueError(job_i18n.t('error_invalid_zip', 'ui'))
+            sources.append(source)
+            if source.root is None:
+                raise ValueError(job_i18n.t('error_invalid_diagnostic', 'ui'))
+        
+        job.set_stage('analyzing')
+        diff = BundleDiff(ESDataLoader(sources[0]), ESDataLoader(sources[1]), language=language)
+        comparison = diff.compare()
+        return {
+            'comparison': comparison,
+            'markdown': diff.generate(comparison)
+        }
+    
+    finally:
+        for source in sources:
+            source.close()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+@app.route('/esreport/api/jobs/<job_id>')
+def get_job_status(job_id):
+    """查询分析任务的阶段和章节进度"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': i18n.t('error_job_not_found', 'ui')}), 404
+    
+    # full 模式的报告内容不保存在任务结果中，从报告存储读取
+    result = job.get('result')
+    if result and result.get('content_in_store'):
+        report = report_store.get(result['report_id'])
+        if report is None:
+            return jsonify({'success': False, 'message': i18n.t('error_job_not_found', 'ui')}), 404
+        result = {key: value for key, value in result.items() if key != 'content_in_store'}
+        result['report_content'] = report['markdown_content']
+        result['html_content'] = report['html_content']
+        job = dict(job, result=result)
     
-    return None
+    return jsonify({'success': True, **job})
 
 def generate_download_filename(original_filename: str, report_format: str) -> str:
     """
@@ -433,62 +773,137 @@ def generate_download_filename(original_filename: str, report_format: str) -> st
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     return f"{base_name}_report_{timestamp}.{report_format}"
 
+def send_document(document, mimetype, download_name=None):
+    """
+    返回缓存的文档，按 Accept-Encoding 选择预压缩版本并支持 If-None-Match
+    
+    Args:
+        document: DocumentCache 中的渲染结果
+        mimetype: 响应类型
+        download_name: 作为附件下载时的文件名
+    """
+    encoding = document.select_encoding(
+        {value: quality for value, quality in request.accept_encodings}
+    )
+    etag = document.variant_etag(encoding)
+    
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(document.variants[encoding], mimetype=mimetype)
+        if download_name:
+            response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 @app.route('/esreport/api/download-html/<report_id>')
 def download_html(report_id):
     """下载HTML报告"""
-    if report_id not in reports:
+    # 只读取元数据，SQLite存储中的报告内容只在文档缓存未命中时才读取和解压
+    report_meta = report_store.get_meta(report_id)
+    if report_meta is None:
+        return jsonify({'error': '报告不存在'}), 404
+    
+    try:
+        # 完整HTML文档每个报告只渲染一次，之后直接从内存返回预压缩版本
+        document = document_cache.get(report_id)
+        if document is None:
+            report_data = report_store.get(report_id)
+            markdown_content = report_data.get('markdown_content') if report_data else None
+            if not markdown_content:
+                return jsonify({'error': 'HTML内容不存在'}), 404
+            document = document_cache.get_or_render(
+                report_id,
+                lambda: create_html_template(markdown_to_html(markdown_content), "Elasticsearch 巡检报告")
+            )
+        filename = generate_download_filename(report_meta['filename'], 'html')
+        return send_document(document, 'text/html', filename)
+    except Exception as e:
+        return jsonify({'error': f'HTML下载失败: {str(e)}'}), 500
+
+@app.route('/esreport/api/reports/<report_id>/sections/<section_key>')
+def get_report_section(report_id, section_key):
+    """按章节获取报告内容，format=md 返回Markdown，format=html 返回HTML片段"""
+    report_format = request.args.get('format', 'md')
+    if report_format not in SECTION_FORMATS:
+        return jsonify({'error': f'不支持的格式: {report_format}'}), 400
+    
+    if report_id not in report_store:
+        return jsonify({'error': '报告不存在'}), 404
+    
+    document_key = f"{report_id}/{section_key}.{report_format}"
+    document = document_cache.get(document_key)
+    if document is not None:
+        return send_document(document, SECTION_FORMATS[report_format])
+    
+    report_data = report_store.get(report_id)
+    if report_data is None:
         return jsonify({'error': '报告不存在'}), 404
     
-    report_data = reports[report_id]
+    entry = next((item for item in report_data.get('section_index') or [] if item['key'] == section_key), None)
     markdown_content = report_data.get('markdown_content')
+    if entry is None or not markdown_content:
+        return jsonify({'error': '章节不存在'}), 404
     
-    if not markdown_content:
-        return jsonify({'error': 'HTML内容不存在'}), 404
+    section_markdown = markdown_content[entry['start']:entry['end']]
+    def render():
+        if report_format == 'html':
+            return markdown_to_html(section_markdown)
+        return section_markdown
     
     try:
-        # 生成优化的HTML内容
-        html_content = markdown_to_html(markdown_content)
-        full_html = create_html_template(html_content, "Elasticsearch 巡检报告")
-        
-        # 创建临时HTML文件
-        import tempfile
-        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False, encoding='utf-8')
-        temp_file.write(full_html)
-        temp_file.close()
-        
-        filename = generate_download_filename(report_data['filename'], 'html')
-        
-        def remove_file(response):
-            try:
-                os.unlink(temp_file.name)
-            except Exception:
-                pass
-            return response
-        
-        response = send_file(temp_file.name, as_attachment=True, download_name=filename)
-        response.call_on_close(remove_file)
-        return response
+        document = document_cache.get_or_render(document_key, render)
+        return send_document(document, SECTION_FORMATS[report_format])
     except Exception as e:
-        return jsonify({'error': f'HTML下载失败: {str(e)}'}), 500
+        return jsonify({'error': f'章节获取失败: {str(e)}'}), 500
 
 @app.route('/esreport/api/download-markdown/<report_id>')
 def download_markdown(report_id):
     """下载Markdown报告"""
-    if report_id not in reports:
+    report_data = report_store.get(report_id)
+    if report_data is None:
         return jsonify({'error': '报告不存在'}), 404
     
-    report_data = reports[report_id]
     markdown_path = report_data.get('markdown_path')
     
-    if not markdown_path or not os.path.exists(markdown_path):
-        return jsonify({'error': 'Markdown文件不存在'}), 404
-    
     try:
         filename = generate_download_filename(report_data['filename'], 'md')
-        return send_file(markdown_path, as_attachment=True, download_name=filename)
+        if markdown_path and os.path.exists(markdown_path):
+            return send_file(markdown_path, as_attachment=True, download_name=filename)
+        
+        # 缓存命中的报告没有对应的本地文件，直接使用内存中的内容
+        markdown_content = report_data.get('markdown_content')
+        if not markdown_content:
+            return jsonify({'error': 'Markdown文件不存在'}), 404
+        return send_file(io.BytesIO(markdown_content.encode('utf-8')), mimetype='text/markdown',
+                         as_attachment=True, download_name=filename)
     except Exception as e:
         return jsonify({'error': f'Markdown下载失败: {str(e)}'}), 500
 
+@app.route('/esreport/api/profile/<report_id>')
+def download_profile(report_id):
+    """下载报告的性能剖析文件（ZIP，仅限管理员）"""
+    if not is_admin_request():
+        return jsonify({'error': '仅限管理员使用'}), 403
+    
+    case_dir = report_case_dir(report_id)
+    if report_id not in report_store or not os.path.isfile(os.path.join(case_dir, PROFILE_SUMMARY_FILE)):
+        return jsonify({'error': '性能剖析不存在'}), 404
+    
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name in sorted(os.listdir(case_dir)):
+            if name == PROFILE_SUMMARY_FILE or '_profile.' in name:
+                archive.write(os.path.join(case_dir, name), name)
+    buffer.seek(0)
+    return send_file(buffer, mimetype='application/zip', as_attachment=True,
+                     download_name=f'profile_{report_id}.zip')
+
 # 添加S3测试接口
 @app.route('/esreport/api/s3-test')
 def test_s3_connection():
@@ -500,9 +915,9 @@ def test_s3_connection():
 def list_reports():
     """列出所有报告"""
     report_list = []
-    for report_id, data in reports.items():
+    for data in report_store.list():
         report_list.append({
-            'id': report_id,
+            'id': data['id'],
             'generated_at': data['generated_at'],
             'filename': data['filename']
         })
@@ -512,6 +927,71 @@ def list_reports():
         'reports': sorted(report_list, key=lambda x: x['generated_at'], reverse=True)
     })
 
+@app.route('/esreport/api/stats')
+def get_stats():
+    """报告存储、报告缓存、HTML文档缓存和任务队列的统计信息"""
+    job_states = job_state_counts()
+    return jsonify({
+        'success': True,
+        'report_store': report_store.stats(),
+        'report_cache': report_cache.stats(),
+        'document_cache': document_cache.stats(),
+        'fleet_metrics': fleet_store.stats() if fleet_store is not None else None,
+        'jobs': {
+            'workers': job_queue.max_workers,
+            'max_pending': job_queue.max_pending,
+            **job_states
+        }
+    })
+
+@app.route('/esreport/metrics')
+def prometheus_metrics():
+    """Prometheus 指标（本进程）：各阶段和章节的耗时直方图、处理字节数、请求统计以及存储和任务仪表盘"""
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+def fleet_since():
+    """趋势查询的起始时间（秒级时间戳），参数 since 无效时返回None"""
+    try:
+        return float(request.args['since'])
+    except (KeyError, ValueError):
+        return None
+
+def fleet_response(query):
+    """执行指标查询，未启用指标存储时返回404"""
+    if fleet_store is None:
+        return jsonify({'success': False, 'message': 'ESREPORT_FLEET_DB 未配置'}), 404
+    return jsonify({'success': True, 'items': query()})
+
+@app.route('/esreport/api/fleet/clusters')
+def fleet_clusters():
+    """所有集群最近一次快照"""
+    return fleet_response(lambda: fleet_store.clusters())
+
+@app.route('/esreport/api/fleet/clusters/<cluster_uuid>/trend')
+def fleet_cluster_trend(cluster_uuid):
+    """单个集群的集群级指标趋势"""
+    return fleet_response(lambda: fleet_store.cluster_trend(cluster_uuid, fleet_since()))
+
+@app.route('/esreport/api/fleet/clusters/<cluster_uuid>/nodes')
+def fleet_node_trend(cluster_uuid):
+    """单个集群的节点指标趋势，可用参数 node 指定节点"""
+    return fleet_response(lambda: fleet_store.node_trend(cluster_uuid, request.args.get('node'), fleet_since()))
+
+@app.route('/esreport/api/fleet/clusters/<cluster_uuid>/indices')
+def fleet_index_trend(cluster_uuid):
+    """单个集群的索引指标趋势，参数 index 为索引名或通配符（默认 *）"""
+    return fleet_response(lambda: fleet_store.index_trend(cluster_uuid, request.args.get('index', '*'),
+                                                          fleet_since()))
+
+@app.route('/esreport/api/fleet/top-nodes')
+def fleet_top_nodes():
+    """所有集群中指标最高的节点，参数 metric 和 limit"""
+    metric = request.args.get('metric', 'heap_percent')
+    if metric not in NODE_METRICS:
+        return jsonify({'success': False, 'message': f'metric 可选值: {", ".join(NODE_METRICS)}'}), 400
+    limit = request.args.get('limit', 20, type=int)
+    return fleet_response(lambda: fleet_store.top_nodes(metric, limit))
+
 @app.route('/esreport/api/translations')
 def get_translations():
     """获取翻译文本"""
@@ -575,18 +1055,6 @@ def diagnostic_guide():
     default_language = 'zh' if 'zh' in browser_language else 'en'
     return render_template('diagnostic_guide.html', default_language=default_language)
 
-@app.route('/esreport/api/translate')
-def translate():
-    # ... existing code ...
-
-@app.route('/esreport/upload', methods=['POST'])
-def upload_file():
-    # ... existing code ...
-
-@app.route('/esreport/download/<filename>')
-def download_file(filename):
-    # ... existing code ...
-
 if __name__ == '__main__':
     import argparse
     
@@ -17,6 +17,7 @@ def main():
     if not os.path.exists(data_dir):
         print("❌ 示例数据目录不存在")
         print("💡 请先上传诊断文件或使用Web界面")
+        print(f"💡 也可以生成合成诊断数据: python -m src.synthetic_bundle --output {data_dir}")
         return
     
     print("🚀 开始生成ES巡检报告...")
@@ -114,6 +114,11 @@ def main():
                 print("请运行: pip install gunicorn")
             sys.exit(1)
         
+        # 多个worker进程需要共享报告和任务状态
+        if args.workers > 1 and 'ESREPORT_STORE_BACKEND' not in os.environ:
+            os.environ['ESREPORT_STORE_BACKEND'] = 'sqlite'
+            print("🗄️ 多worker模式，使用SQLite共享报告存储")
+        
         # 使用 uv 运行 gunicorn (如果可用)
         if check_uv_available():
             cmd = ['uv', 'run', 'gunicorn', '-w', str(args.workers), '-b', f'{args.host}:{args.port}', 'app:app']
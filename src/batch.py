@@ -0,0 +1,302 @@
+"""
+批量报告生成
+对一个目录（或通配符）下的多个诊断ZIP / 诊断目录并行生成报告，
+每个诊断包在独立进程中生成，已有最新报告的诊断包按文件大小和修改时间（或内容哈希）跳过，最后写出群组汇总
+"""
+
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, Any, Collection, List, Optional
+
+from .data_source import compute_file_hash
+from .report_generator import ESReportGenerator, REPORT_GENERATOR_VERSION
+from .section_cache import SectionCache
+
+
+# 记录已生成报告的清单文件和群组汇总文件
+BATCH_MANIFEST_FILE = 'batch_manifest.json'
+FLEET_SUMMARY_JSON = 'fleet_summary.json'
+FLEET_SUMMARY_MD = 'fleet_summary.md'
+
+
+def _is_diagnostic_dir(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, 'cluster_health.json')) or \
+        os.path.isfile(os.path.join(path, 'manifest.json'))
+
+
+def find_bundles(pattern: str) -> List[str]:
+    """
+    查找诊断包
+    
+    Args:
+        pattern: 目录（其中的 .zip 文件和诊断子目录）或通配符，例如 ./diagnostics/*.zip
+    
+    Returns:
+        按路径排序的诊断ZIP或诊断目录列表
+    """
+    if os.path.isdir(pattern) and not _is_diagnostic_dir(pattern):
+        candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+    elif any(char in pattern for char in '*?['):
+        candidates = glob.glob(pattern)
+    else:
+        candidates = [pattern]
+    
+    bundles = [
+        path for path in candidates
+        if (os.path.isfile(path) and path.lower().endswith('.zip'))
+        or (os.path.isdir(path) and _is_diagnostic_dir(path))
+    ]
+    return sorted(bundles)
+
+
+def bundle_hash(path: str) -> str:
+    """
+    诊断包哈希：ZIP为文件内容的SHA256，目录为其中各文件相对路径、大小和修改时间的SHA256
+    """
+    if os.path.isfile(path):
+        return compute_file_hash(path)
+    
+    sha256_hash = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            stat = os.stat(file_path)
+            sha256_hash.update(f"{os.path.relpath(file_path, path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode('utf-8'))
+    return sha256_hash.hexdigest()
+
+
+def bundle_signature(path: str) -> str:
+    """
+    诊断包的快速签名，用于跳过未变化的诊断包而不读取其内容：
+    ZIP为文件大小和修改时间，目录为 bundle_hash（本身只基于文件元数据）
+    """
+    if os.path.isfile(path):
+        stat = os.stat(path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+    return bundle_hash(path)
+
+
+def _bundle_name(path: str) -> str:
+    """诊断包在输出目录中的子目录名"""
+    name = os.path.basename(os.path.normpath(path))
+    if name.lower().endswith('.zip'):
+        name = name[:-4]
+    return re.sub(r'[^\w.\-]+', '_', name) or 'bundle'
+
+
+def _generate_bundle(path: str, signature: str, output_dir: str, language: str,
+                     generate_html: bool, fleet_db: Optional[str], case_files: str = 'json',
+                     section_cache_dir: Optional[str] = None,
+                     known_hashes: Collection[str] = ()) -> Dict[str, Any]:
+    """
+    在子进程中计算诊断包哈希并生成报告
+    
+    哈希在各子进程中并行计算；内容与清单中已有最新报告的诊断包相同时（known_hashes 中的
+    "哈希:语言"）返回 {'skipped': True}，由主进程补全清单中的报告信息
+    """
+    start = time.perf_counter()
+    entry = {'bundle': path, 'signature': signature, 'language': language, 'version': REPORT_GENERATOR_VERSION}
+    try:
+        entry['hash'] = bundle_hash(path)
+        if f"{entry['hash']}:{language}" in known_hashes:
+            entry['skipped'] = True
+            return entry
+        
+        fleet_store = None
+        if fleet_db:
+            from .fleet_metrics import FleetMetricsStore
+            fleet_store = FleetMetricsStore(fleet_db)
+        section_cache = SectionCache(section_cache_dir, REPORT_GENERATOR_VERSION) if section_cache_dir else None
+        generator = ESReportGenerator(path, output_dir=output_dir, language=language, fleet_store=fleet_store,
+                                      case_files=case_files, section_cache=section_cache)
+        result = generator.generate_report(generate_html=generate_html)
+        entry.update({
+            'markdown': result.get('markdown'),
+            'html': result.get('html'),
+            'summary': generator.get_summary(),
+            'cached_sections': generator.cached_sections,
+            'generated_at': datetime.now().isoformat()
+        })
+    except Exception as e:
+        entry['error'] = str(e)
+    entry['seconds'] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+class BatchReportRunner:
+    """批量生成多个诊断包的报告"""
+    
+    def __init__(self, output_dir: str = "output", language: str = "zh", workers: Optional[int] = None,
+                 generate_html: bool = False, fleet_db: Optional[str] = None, force: bool = False,
+                 case_files: str = 'json', section_cache_dir: Optional[str] = None):
+        """
+        Args:
+            output_dir: 输出目录，每个诊断包的报告写入其中以诊断包命名的子目录
+            language: 报告语言
+            workers: 并行进程数，默认为CPU核数
+            generate_html: 是否同时生成HTML报告
+            fleet_db: 集群群组指标数据库路径（可选）
+            force: 忽略清单，重新生成所有报告
+            case_files: case文件格式，见 CASE_FILE_MODES
+            section_cache_dir: 章节缓存目录（可选），各诊断包共享，只有日志等部分文件不同的诊断包
+                               只重新生成受影响的章节
+        """
+        self.output_dir = output_dir
+        self.language = language
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.generate_html = generate_html
+        self.fleet_db = fleet_db
+        self.force = force
+        self.case_files = case_files
+        self.section_cache_dir = section_cache_dir
+        self.manifest_path = os.path.join(output_dir, BATCH_MANIFEST_FILE)
+    
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_manifest(self, manifest: Dict[str, Any]):
+        temp_path = f"{self.manifest_path}.part"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.manifest_path)
+    
+    def _is_up_to_date(self, entry: Optional[Dict[str, Any]]) -> bool:
+        """清单中的报告由当前版本以相同语言生成，报告文件（需要HTML时包括HTML）仍然存在"""
+        return bool(entry) and not entry.get('error') \
+            and entry.get('language') == self.language \
+            and entry.get('version') == REPORT_GENERATOR_VERSION \
+            and bool(entry.get('markdown')) and os.path.exists(entry['markdown']) \
+            and (not self.generate_html or (bool(entry.get('html')) and os.path.exists(entry['html'])))
+    
+    def run(self, bundles: List[str]) -> Dict[str, Any]:
+        """
+        并行生成报告并写出群组汇总
+        
+        Returns:
+            {'generated': 数量, 'skipped': 数量, 'failed': 数量, 'seconds': 总耗时, 'bundles': 各诊断包结果}
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = self._load_manifest()
+        started = time.perf_counter()
+        
+        print(f"📦 共 {len(bundles)} 个诊断包，并行进程: {self.workers}")
+        
+        results = {}
+        pending = []
+        # 大小和修改时间未变化的诊断包直接跳过，不在主进程中逐个计算内容哈希
+        up_to_date = {} if self.force else {key: entry for key, entry in manifest.items() if self._is_up_to_date(entry)}
+        by_signature = {(entry['bundle'], entry.get('signature')): entry for entry in up_to_date.values()}
+        for path in bundles:
+            signature = bundle_signature(path)
+            entry = by_signature.get((path, signature))
+            if entry is not None:
+                print(f"  ⏭️ {path} 已有最新报告，跳过")
+                results[path] = {**entry, 'skipped': True}
+            else:
+                pending.append((path, signature))
+        
+        # 同名诊断包写入不同的子目录
+        used_names = set()
+        jobs = []
+        for path, signature in pending:
+            name = _bundle_name(path)
+            if name in used_names:
+                name = f"{name}_{hashlib.sha256(path.encode('utf-8')).hexdigest()[:8]}"
+            used_names.add(name)
+            jobs.append((path, signature, os.path.join(self.output_dir, name)))
+        
+        if jobs:
+            known_hashes = frozenset(up_to_date)
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs)),
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                futures = {
+                    pool.submit(_generate_bundle, path, signature, bundle_dir, self.language,
+                                self.generate_html, self.fleet_db, self.case_files,
+                                self.section_cache_dir, known_hashes): path
+                    for path, signature, bundle_dir in jobs
+                }
+                for future in as_completed(futures):
+                    entry = future.result()
+                    if entry.get('skipped'):
+                        # 内容未变化（例如ZIP只是修改时间变化），沿用已有报告并记录新的签名
+                        key = f"{entry['hash']}:{self.language}"
+                        manifest[key] = {**manifest[key], 'bundle': entry['bundle'], 'signature': entry['signature']}
+                        self._save_manifest(manifest)
+                        results[entry['bundle']] = {**manifest[key], 'skipped': True}
+                        print(f"  ⏭️ {entry['bundle']} 内容未变化，已有最新报告，跳过")
+                        continue
+                    results[entry['bundle']] = entry
+                    if entry.get('error'):
+                        print(f"  ❌ {entry['bundle']} 失败 ({entry['seconds']:.2f}s): {entry['error']}")
+                    else:
+                        manifest[f"{entry['hash']}:{self.language}"] = entry
+                        self._save_manifest(manifest)
+                        print(f"  ✅ {entry['bundle']} 完成 ({entry['seconds']:.2f}s)")
+        
+        ordered = [results[path] for path in bundles]
+        summary = {
+            'generated_at': datetime.now().isoformat(),
+            'language': self.language,
+            'generated': sum(1 for entry in ordered if not entry.get('skipped') and not entry.get('error')),
+            'skipped': sum(1 for entry in ordered if entry.get('skipped')),
+            'failed': sum(1 for entry in ordered if entry.get('error')),
+            'seconds': round(time.perf_counter() - started, 3),
+            'bundles': ordered
+        }
+        self.write_fleet_summary(summary)
+        
+        print(f"📊 批量生成完成: 生成 {summary['generated']}，跳过 {summary['skipped']}，"
+              f"失败 {summary['failed']}，总耗时 {summary['seconds']:.2f}s")
+        return summary
+    
+    def write_fleet_summary(self, summary: Dict[str, Any]):
+        """写出群组汇总（JSON和Markdown）"""
+        with open(os.path.join(self.output_dir, FLEET_SUMMARY_JSON), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        
+        if self.language == 'en':
+            content = f"""# Elasticsearch Fleet Summary
+
+Generated at: {summary['generated_at']}, reports generated: {summary['generated']}, skipped: {summary['skipped']}, failed: {summary['failed']}
+
+| Cluster | Status | Nodes | Indices | Active Shards | Unassigned Shards | Time | Report |
+|---------|--------|-------|---------|---------------|-------------------|------|--------|
+"""
+        else:
+            content = f"""# Elasticsearch 集群群组汇总
+
+生成时间: {summary['generated_at']}，生成报告: {summary['generated']}，跳过: {summary['skipped']}，失败: {summary['failed']}
+
+| 集群 | 状态 | 节点数 | 索引数 | 活动分片 | 未分配分片 | 耗时 | 报告 |
+|------|------|--------|--------|----------|------------|------|------|
+"""
+        
+        def value(item):
+            return item if item is not None else "N/A"
+        
+        for entry in summary['bundles']:
+            if entry.get('error'):
+                content += f"| {entry['bundle']} | ❌ {entry['error']} | | | | | {entry['seconds']:.2f}s | |\n"
+                continue
+            cluster = entry.get('summary') or {}
+            report = os.path.relpath(entry['markdown'], self.output_dir)
+            seconds = "-" if entry.get('skipped') else f"{entry['seconds']:.2f}s"
+            content += (f"| {value(cluster.get('cluster_name'))} | {value(cluster.get('status'))} "
+                        f"| {value(cluster.get('number_of_nodes'))} | {value(cluster.get('indices'))} "
+                        f"| {value(cluster.get('active_shards'))} | {value(cluster.get('unassigned_shards'))} "
+                        f"| {seconds} | {report} |\n")
+        
+        with open(os.path.join(self.output_dir, FLEET_SUMMARY_MD), 'w', encoding='utf-8') as f:
+            f.write(content)
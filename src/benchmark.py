@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分阶段性能基准测试
+在小、中、超大三种规模的合成诊断数据上分别计时数据加载、日志扫描、各章节的 generate() 和
+get_case_data()、markdown_to_html 以及端到端的 generate_report，结果追加到JSON历史文件，
+某个阶段比历史基线慢超过阈值时以非0状态退出
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from .data_loader import ESDataLoader
+from .html_converter import markdown_to_html
+from .report_generator import ESReportGenerator, REPORT_GENERATOR_VERSION, SECTION_GENERATORS
+from .synthetic_bundle import SyntheticBundleGenerator
+
+
+# 各规模合成诊断数据的参数（SyntheticBundleGenerator 的参数）
+BUNDLE_SIZES = {
+    'small': {'nodes': 3, 'indices': 50, 'shards': 0, 'fields': 20, 'log_lines': 2000},
+    'medium': {'nodes': 10, 'indices': 2000, 'shards': 4000, 'fields': 50, 'log_lines': 20000},
+    'huge': {'nodes': 50, 'indices': 50000, 'shards': 100000, 'fields': 50, 'log_lines': 200000, 'unassigned': 20}
+}
+
+DEFAULT_HISTORY_FILE = os.path.join('benchmarks', 'history.json')
+DEFAULT_BUNDLE_DIR = os.path.join('benchmarks', 'bundles')
+# 历史文件最多保留的运行记录数
+MAX_HISTORY_RUNS = 200
+# 默认回归阈值：比基线慢25%以上，且绝对差值超过0.05秒
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA = 0.05
+# 基线为最近几次运行的中位数
+DEFAULT_BASELINE_WINDOW = 5
+# 只有这些字段都相同的历史运行才作为基线（不同机器、Python版本的耗时不可比）
+BASELINE_KEYS = ('language', 'python', 'platform')
+
+
+def _load_all(loader: ESDataLoader):
+    """读取报告使用的全部JSON文件并构建分片表及其聚合结果"""
+    for getter in (loader.get_cluster_health, loader.get_cluster_settings, loader.get_cluster_stats,
+                   loader.get_licenses, loader.get_manifest, loader.get_nodes, loader.get_nodes_stats,
+                   loader.get_indices_stats, loader.get_settings):
+        getter()
+    shard_table = loader.get_shard_table()
+    shard_table.index_stats()
+    shard_table.node_stats()
+
+
+def _best_time(func: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """执行 repeat 次，返回最短耗时（秒）和最后一次的结果"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class BenchmarkSuite:
+    """分阶段性能基准测试"""
+    
+    def __init__(self, bundle_dir: str = DEFAULT_BUNDLE_DIR, language: str = 'zh', repeat: int = 3,
+                 sizes: Optional[Dict[str, Dict[str, Any]]] = None, seed: int = 42):
+        """
+        Args:
+            bundle_dir: 合成诊断数据的缓存目录，相同参数的数据只生成一次
+            language: 报告语言
+            repeat: 每个阶段的重复次数，取最短耗时
+            sizes: 规模名 -> 合成诊断数据参数，默认为 BUNDLE_SIZES
+            seed: 合成诊断数据的随机种子
+        """
+        self.bundle_dir = bundle_dir
+        self.language = language
+        self.repeat = max(1, repeat)
+        self.sizes = sizes or BUNDLE_SIZES
+        self.seed = seed
+    
+    def prepare_bundle(self, size: str) -> str:
+        """生成（或复用缓存的）指定规模的合成诊断数据目录"""
+        params = dict(self.sizes[size], seed=self.seed)
+        digest = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        path = os.path.join(self.bundle_dir, f"{size}-{digest}")
+        if not os.path.isfile(os.path.join(path, 'manifest.json')):
+            print(f"🧪 正在生成 {size} 规模的合成诊断数据: {path}")
+            SyntheticBundleGenerator(**params).generate(path)
+        return path
+    
+    def run_size(self, size: str) -> Dict[str, float]:
+        """
+        计时一个规模的各阶段
+        
+        Returns:
+            阶段名 -> 最短耗时（秒），章节阶段名为 <章节>.generate 和 <章节>.case_data
+        """
+        bundle = self.prepare_bundle(size)
+        stages = {}
+        
+        # 报告模块输出大量进度信息，计时期间不输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            def load() -> ESDataLoader:
+                loader = ESDataLoader(bundle)
+                _load_all(loader)
+                return loader
+            
+            stages['load'], loader = _best_time(load, self.repeat)
+            stages['log_scan'], _ = _best_time(lambda: ESDataLoader(bundle).get_log_scan(), self.repeat)
+            loader.get_log_scan()
+            
+            # 章节在已加载的数据上计时，每次使用新的生成器实例
+            for section_name, generator_cls in SECTION_GENERATORS.items():
+                stages[f"{section_name}.generate"], _ = _best_time(
+                    lambda: generator_cls(loader, self.language).generate(), self.repeat)
+                stages[f"{section_name}.case_data"], _ = _best_time(
+                    lambda: generator_cls(loader, self.language).get_case_data(), self.repeat)
+            
+            with tempfile.TemporaryDirectory() as output_dir:
+                stages['generate_report'], result = _best_time(
+                    lambda: ESReportGenerator(bundle, output_dir=output_dir, language=self.language)
+                    .generate_report(generate_html=True), self.repeat)
+                with open(result['markdown'], 'r', encoding='utf-8') as f:
+                    markdown_content = f.read()
+            stages['markdown_to_html'], _ = _best_time(lambda: markdown_to_html(markdown_content), self.repeat)
+        
+        return {stage: round(seconds, 6) for stage, seconds in stages.items()}
+    
+    def run(self, size_names: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        计时所有（或指定的）规模
+        
+        Returns:
+            一次运行记录，results 为 规模名 -> {'bundle': 合成参数, 'stages': 阶段耗时}
+        """
+        results = {}
+        for size in size_names or list(self.sizes):
+            if size not in self.sizes:
+                raise ValueError(f"未知的基准规模: {size}")
+            print(f"⏱️ 正在运行 {size} 规模的基准测试...")
+            results[size] = {'bundle': self.sizes[size], 'stages': self.run_size(size)}
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'version': REPORT_GENERATOR_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'language': self.language,
+            'repeat': self.repeat,
+            'results': results
+        }
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    """读取历史运行记录，文件不存在时返回空列表"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('runs', [])
+    except (OSError, ValueError):
+        return []
+
+
+def save_history(path: str, runs: List[Dict[str, Any]]):
+    """写入历史运行记录，只保留最近 MAX_HISTORY_RUNS 次"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.part"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'runs': runs[-MAX_HISTORY_RUNS:]}, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+def find_regressions(history: List[Dict[str, Any]], run: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD,
+                     min_delta: float = DEFAULT_MIN_DELTA,
+                     window: int = DEFAULT_BASELINE_WINDOW) -> List[Dict[str, Any]]:
+    """
+    与历史基线比较，找出变慢的阶段
+    
+    基线为同一规模（合成参数相同）、同一阶段、BASELINE_KEYS 相同的最近 window 次历史耗时的中位数；耗时超过 基线*(1+threshold)
+    且比基线多出 min_delta 秒以上时视为回归（避免毫秒级阶段的抖动误报）
+    
+    Returns:
+        [{'size', 'stage', 'baseline', 'seconds', 'ratio'}]，按变慢倍数从大到小排列
+    """
+    regressions = []
+    for size, result in run['results'].items():
+        for stage, seconds in result['stages'].items():
+            # 只与相同合成参数、相同语言和运行环境的历史运行比较
+            previous = [
+                entry['results'][size]['stages'][stage]
+                for entry in history
+                if all(entry.get(key) == run.get(key) for key in BASELINE_KEYS)
+                and entry.get('results', {}).get(size, {}).get('bundle') == result.get('bundle')
+                and stage in entry['results'][size].get('stages', {})
+            ][-window:]
+            if not previous:
+                continue
+            baseline = statistics.median(previous)
+            if seconds > baseline * (1 + threshold) and seconds - baseline > min_delta:
+                regressions.append({
+                    'size': size,
+                    'stage': stage,
+                    'baseline': baseline,
+                    'seconds': seconds,
+                    'ratio': round(seconds / baseline, 2) if baseline else None
+                })
+    regressions.sort(key=lambda item: item['ratio'] or float('inf'), reverse=True)
+    return regressions
+
+
+def format_run(run: Dict[str, Any]) -> str:
+    """各规模各阶段耗时的文本表格"""
+    sizes = list(run['results'])
+    stages = []
+    for size in sizes:
+        for stage in run['results'][size]['stages']:
+            if stage not in stages:
+                stages.append(stage)
+    
+    lines = [f"{'阶段':<36}" + ''.join(f"{size:>12}" for size in sizes)]
+    for stage in stages:
+        cells = []
+        for size in sizes:
+            seconds = run['results'][size]['stages'].get(stage)
+            cells.append(f"{seconds:>11.3f}s" if seconds is not None else f"{'-':>12}")
+        lines.append(f"{stage:<38}" + ''.join(cells))
+    return '\n'.join(lines)
+
+
+def main():
+    """
+    命令行入口
+    
+    示例:
+    python -m src.benchmark --sizes small,medium
+    python -m src.benchmark --sizes huge --repeat 1 --threshold 0.5
+    """
+    parser = argparse.ArgumentParser(description="ES巡检报告分阶段性能基准测试")
+    parser.add_argument('--sizes', default='small,medium,huge',
+                        help=f"逗号分隔的规模 ({', '.join(BUNDLE_SIZES)}，默认全部)")
+    parser.add_argument('--repeat', type=int, default=3, help='每个阶段的重复次数，取最短耗时 (默认: 3)')
+    parser.add_argument('--language', choices=['zh', 'en'], default='zh', help='报告语言 (默认: zh)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY_FILE, help=f'历史记录文件 (默认: {DEFAULT_HISTORY_FILE})')
+    parser.add_argument('--bundle-dir', default=DEFAULT_BUNDLE_DIR,
+                        help=f'合成诊断数据缓存目录 (默认: {DEFAULT_BUNDLE_DIR})')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'回归阈值，相对基线变慢的比例 (默认: {DEFAULT_THRESHOLD})')
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA,
+                        help=f'视为回归的最小绝对差值，秒 (默认: {DEFAULT_MIN_DELTA})')
+    parser.add_argument('--baseline-window', type=int, default=DEFAULT_BASELINE_WINDOW,
+                        help=f'基线取最近几次运行的中位数 (默认: {DEFAULT_BASELINE_WINDOW})')
+    parser.add_argument('--no-save', action='store_true', help='不把本次结果写入历史记录')
+    args = parser.parse_args()
+    
+    suite = BenchmarkSuite(bundle_dir=args.bundle_dir, language=args.language, repeat=args.repeat)
+    try:
+        run = suite.run([size.strip() for size in args.sizes.split(',') if size.strip()])
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+    
+    history = load_history(args.history)
+    regressions = find_regressions(history, run, args.threshold, args.min_delta, args.baseline_window)
+    run['regressions'] = regressions
+    
+    print(format_run(run))
+    if not args.no_save:
+        save_history(args.history, history + [run])
+        print(f"💾 结果已写入: {args.history}")
+    
+    if regressions:
+        print(f"\n❌ 发现 {len(regressions)} 个阶段性能回归:")
+        for item in regressions:
+            print(f"   {item['size']} / {item['stage']}: {item['baseline']:.3f}s → {item['seconds']:.3f}s "
+                  f"(x{item['ratio']})")
+        sys.exit(1)
+    print("\n✅ 未发现性能回归")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+"""
+诊断包对比
+比较同一集群两次收集的诊断数据：索引和索引前缀的增长、分片数变化、
+各节点磁盘使用趋势、两次收集之间的计数器速率以及新出现的错误类型
+"""
+
+import heapq
+import re
+from typing import Dict, Any, List, Optional
+
+from .data_loader import ESDataLoader
+from .node_rates import compute_node_rates
+
+
+# 去掉索引名末尾的滚动序号和日期得到索引前缀，
+# 例如 logs-2024.05.01 -> logs，.ds-logs-app-2024.05.01-000001 -> .ds-logs-app
+ROLLOVER_SUFFIX_PATTERN = re.compile(r'[-_.]\d{6}$')
+DATE_SUFFIX_PATTERN = re.compile(r'[-_.]\d{4}(?:[-_.]?\d{2}){0,2}$')
+
+# 每个列表最多保留的条目数
+DEFAULT_TOP_N = 20
+
+SECONDS_PER_DAY = 86400
+
+
+def index_prefix(name: str) -> str:
+    """索引前缀，没有日期或滚动序号后缀时返回原名"""
+    return DATE_SUFFIX_PATTERN.sub('', ROLLOVER_SUFFIX_PATTERN.sub('', name)) or name
+
+
+class BundleDiff:
+    """两个诊断包的对比"""
+    
+    def __init__(self, current: ESDataLoader, baseline: ESDataLoader,
+                 language: str = "zh", top_n: int = DEFAULT_TOP_N):
+        """
+        Args:
+            current: 本次诊断数据
+            baseline: 作为基线的较早一次诊断数据
+            language: 报告语言
+            top_n: 各列表最多保留的条目数
+        """
+        self.current = current
+        self.baseline = baseline
+        self.language = language
+        self.top_n = top_n
+    
+    def compare(self) -> Dict[str, Any]:
+        """
+        对比两个诊断包
+        
+        Returns:
+            可直接序列化为JSON的对比结果，包含 elapsed_seconds、indices、
+            prefixes、nodes、node_rates 和 errors
+        """
+        current_time = self.current.get_collection_time()
+        baseline_time = self.baseline.get_collection_time()
+        elapsed = None
+        if current_time is not None and baseline_time is not None and current_time > baseline_time:
+            elapsed = current_time - baseline_time
+        
+        return {
+            'elapsed_seconds': elapsed,
+            'indices': self._compare_indices(),
+            'prefixes': self._compare_prefixes(),
+            'nodes': self._compare_nodes(elapsed),
+            'node_rates': self._compare_counters(),
+            'errors': self._compare_errors()
+        }
+    
+    def _compare_indices(self) -> Dict[str, Any]:
+        """
+        按索引对比文档数、主分片大小和分片数
+        
+        两个分片表各自把索引名映射为整数ID，每个索引名只做一次查找，
+        之后的比较都在按ID排列的列上进行
+        """
+        current = self.current.get_shard_table()
+        baseline = self.baseline.get_shard_table()
+        current_docs, current_store, current_shards = current.index_totals()
+        baseline_docs, baseline_store, baseline_shards = baseline.index_totals()
+        
+        growth = []
+        shard_changes = []
+        new_indices = []
+        matched = 0
+        for current_id, name in enumerate(current.index_names):
+            baseline_id = baseline.index_id(name)
+            if baseline_id is None:
+                new_indices.append(name)
+                growth.append((current_store[current_id], current_docs[current_id], current_id, None))
+                continue
+            matched += 1
+            growth.append((current_store[current_id] - baseline_store[baseline_id],
+                           current_docs[current_id] - baseline_docs[baseline_id], current_id, baseline_id))
+            if current_shards[current_id] != baseline_shards[baseline_id]:
+                shard_changes.append((name, baseline_shards[baseline_id], current_shards[current_id]))
+        
+        deleted_indices = [name for name in baseline.index_names if current.index_id(name) is None] \
+            if matched < len(baseline.index_names) else []
+        
+        top_growth = heapq.nlargest(self.top_n, growth, key=lambda item: item[0])
+        top_shard_changes = heapq.nlargest(self.top_n, shard_changes,
+                                           key=lambda item: abs(item[2] - item[1]))
+        
+        return {
+            'baseline_count': len(baseline.index_names),
+            'current_count': len(current.index_names),
+            'baseline_shards': len(baseline),
+            'current_shards': len(current),
+            'new_count': len(new_indices),
+            'new': new_indices[:self.top_n],
+            'deleted_count': len(deleted_indices),
+            'deleted': deleted_indices[:self.top_n],
+            'growth': [
+                {
+                    'index': current.index_names[current_id],
+                    'store_delta': store_delta,
+                    'docs_delta': docs_delta,
+                    'store_bytes': current_store[current_id],
+                    'new': baseline_id is None
+                }
+                for store_delta, docs_delta, current_id, baseline_id in top_growth
+            ],
+            'shard_changes_count': len(shard_changes),
+            'shard_changes': [
+                {'index': name, 'baseline': before, 'current': after, 'delta': after - before}
+                for name, before, after in top_shard_changes
+            ]
+        }
+    
+    @staticmethod
+    def _prefix_totals(loader: ESDataLoader) -> Dict[str, List[int]]:
+        """按索引前缀汇总 [索引数, 文档数, 主分片大小, 分片数]"""
+        table = loader.get_shard_table()
+        docs, store_bytes, shard_count = table.index_totals()
+        totals = {}
+        for index_id, name in enumerate(table.index_names):
+            entry = totals.setdefault(index_prefix(name), [0, 0, 0, 0])
+            entry[0] += 1
+            entry[1] += docs[index_id]
+            entry[2] += store_bytes[index_id]
+            entry[3] += shard_count[index_id]
+        return totals
+    
+    def _compare_prefixes(self) -> List[Dict[str, Any]]:
+        """按索引前缀对比，按主分片大小增量从大到小排列"""
+        current = self._prefix_totals(self.current)
+        baseline = self._prefix_totals(self.baseline)
+        empty = [0, 0, 0, 0]
+        
+        prefixes = []
+        for prefix in current.keys() | baseline.keys():
+            after = current.get(prefix, empty)
+            before = baseline.get(prefix, empty)
+            prefixes.append({
+                'prefix': prefix,
+                'indices_delta': after[0] - before[0],
+                'docs_delta': after[1] - before[1],
+                'store_delta': after[2] - before[2],
+                'shards_delta': after[3] - before[3],
+                'store_bytes': after[2]
+            })
+        
+        return heapq.nlargest(self.top_n, prefixes, key=lambda item: (item['store_delta'], item['prefix']))
+    
+    @staticmethod
+    def _disk_used(loader: ESDataLoader) -> Dict[str, Dict[str, int]]:
+        """按节点名返回磁盘 {used, total}"""
+        nodes_stats = loader.get_nodes_stats() or {}
+        disks = {}
+        for node_id, stats in nodes_stats.get('nodes', {}).items():
+            fs_total = stats.get('fs', {}).get('total', {})
+            total = fs_total.get('total_in_bytes')
+            available = fs_total.get('available_in_bytes')
+            if total is not None and available is not None:
+                disks[stats.get('name', node_id)] = {'used': total - available, 'total': total}
+        return disks
+    
+    def _compare_nodes(self, elapsed: Optional[float]) -> List[Dict[str, Any]]:
+        """各节点磁盘使用量的变化，按节点名排列"""
+        current = self._disk_used(self.current)
+        baseline = self._disk_used(self.baseline)
+        
+        nodes = []
+        for name in sorted(current.keys() | baseline.keys()):
+            after = current.get(name)
+            before = baseline.get(name)
+            delta = after['used'] - before['used'] if after and before else None
+            nodes.append({
+                'node': name,
+                'baseline_used': before['used'] if before else None,
+                'current_used': after['used'] if after else None,
+                'delta': delta,
+                'per_day': delta * SECONDS_PER_DAY / elapsed if delta is not None and elapsed else None,
+                'current_percent': after['used'] / after['total'] * 100 if after and after['total'] else None
+            })
+        return nodes
+    
+    def _compare_counters(self) -> Dict[str, Dict[str, Any]]:
+        """把两次收集之间节点统计计数器的增量换算为速率"""
+        current = self.current.get_nodes_stats()
+        baseline = self.baseline.get_nodes_stats()
+        if not current or not baseline:
+            return {}
+        return compute_node_rates([baseline, current])
+    
+    def _compare_errors(self) -> Dict[str, Any]:
+        """本次日志中出现而基线中没有的错误类型"""
+        current = self.current.get_log_scan()
+        baseline = self.baseline.get_log_scan()
+        
+        new_signatures = [signature for signature in current.error_signatures
+                          if signature not in baseline.error_signatures]
+        new_signatures.sort(key=lambda signature: (-current.error_signatures[signature], signature))
+        resolved = [signature for signature in baseline.error_signatures
+                    if signature not in current.error_signatures]
+        
+        return {
+            'new_count': len(new_signatures),
+            'new': [
+                {
+                    'signature': signature,
+                    'count': current.error_signatures[signature],
+                    'example': current.error_signature_examples.get(signature, '')
+                }
+                for signature in new_signatures[:self.top_n]
+            ],
+            'resolved_count': len(resolved)
+        }
+    
+    def _signed_bytes(self, value: Optional[int]) -> str:
+        if value is None:
+            return "N/A"
+        sign = '+' if value > 0 else '-' if value < 0 else ''
+        return sign + self.current.format_bytes(abs(value))
+    
+    def generate(self, comparison: Optional[Dict[str, Any]] = None) -> str:
+        """
+        生成Markdown格式的对比报告
+        
+        Args:
+            comparison: compare() 的结果，未指定时重新对比
+        """
+        if comparison is None:
+            comparison = self.compare()
+        
+        indices = comparison['indices']
+        elapsed = comparison['elapsed_seconds']
+        elapsed_text = f"{elapsed / SECONDS_PER_DAY:.1f}" if elapsed else "N/A"
+        
+        if self.language == 'en':
+            content = f"""# Elasticsearch Diagnostic Comparison
+
+Time between collections: {elapsed_text} days
+
+## 1. Indices and Shards
+
+| Metric | Baseline | Current | Change |
+|--------|----------|---------|--------|
+| Indices | {indices['baseline_count']} | {indices['current_count']} | {indices['current_count'] - indices['baseline_count']:+d} |
+| Shards | {indices['baseline_shards']} | {indices['current_shards']} | {indices['current_shards'] - indices['baseline_shards']:+d} |
+
+New indices: {indices['new_count']}, deleted indices: {indices['deleted_count']}, indices with changed shard count: {indices['shard_changes_count']}
+
+### 1.1 Fastest Growing Indices
+
+| Index | Primary Size Change | Docs Change | Primary Size |
+|-------|---------------------|-------------|--------------|
+"""
+        else:
+            content = f"""# Elasticsearch 诊断数据对比
+
+两次收集间隔: {elapsed_text} 天
+
+## 1. 索引与分片
+
+| 指标 | 基线 | 本次 | 变化 |
+|------|------|------|------|
+| 索引数 | {indices['baseline_count']} | {indices['current_count']} | {indices['current_count'] - indices['baseline_count']:+d} |
+| 分片数 | {indices['baseline_shards']} | {indices['current_shards']} | {indices['current_shards'] - indices['baseline_shards']:+d} |
+
+新增索引: {indices['new_count']} 个，删除索引: {indices['deleted_count']} 个，分片数变化的索引: {indices['shard_changes_count']} 个
+
+### 1.1 增长最快的索引
+
+| 索引名称 | 主分片大小变化 | 文档数变化 | 主分片大小 |
+|---------|----------------|------------|------------|
+"""
+        new_label = " (new)" if self.language == 'en' else " (新)"
+        for item in indices['growth']:
+            name = item['index'] + (new_label if item['new'] else "")
+            content += (f"| {name} | {self._signed_bytes(item['store_delta'])} | {item['docs_delta']:+,} "
+                        f"| {self.current.format_bytes(item['store_bytes'])} |\n")
+        
+        if self.language == 'en':
+            content += """
+### 1.2 Growth by Index Prefix
+
+| Prefix | Indices Change | Primary Size Change | Docs Change | Shards Change |
+|--------|----------------|---------------------|-------------|---------------|
+"""
+        else:
+            content += """
+### 1.2 按索引前缀的增长
+
+| 索引前缀 | 索引数变化 | 主分片大小变化 | 文档数变化 | 分片数变化 |
+|---------|------------|----------------|------------|------------|
+"""
+        for item in comparison['prefixes']:
+            content += (f"| {item['prefix']} | {item['indices_delta']:+d} | {self._signed_bytes(item['store_delta'])} "
+                        f"| {item['docs_delta']:+,} | {item['shards_delta']:+d} |\n")
+        
+        if indices['shard_changes']:
+            if self.language == 'en':
+                content += """
+### 1.3 Shard Count Changes
+
+| Index | Baseline | Current | Change |
+|-------|----------|---------|--------|
+"""
+            else:
+                content += """
+### 1.3 分片数变化
+
+| 索引名称 | 基线 | 本次 | 变化 |
+|---------|------|------|------|
+"""
+            for item in indices['shard_changes']:
+                content += f"| {item['index']} | {item['baseline']} | {item['current']} | {item['delta']:+d} |\n"
+        
+        if self.language == 'en':
+            content += """
+## 2. Node Disk Usage Trend
+
+| Node Name | Baseline Used | Current Used | Change | Per Day | Current Usage |
+|-----------|---------------|--------------|--------|---------|---------------|
+"""
+        else:
+            content += """
+## 2. 节点磁盘使用趋势
+
+| 节点名称 | 基线已用 | 本次已用 | 变化 | 每天 | 当前使用率 |
+|---------|----------|----------|------|------|------------|
+"""
+        for item in comparison['nodes']:
+            percent = f"{item['current_percent']:.1f}%" if item['current_percent'] is not None else "N/A"
+            per_day = self._signed_bytes(round(item['per_day'])) if item['per_day'] is not None else "N/A"
+            content += (f"| {item['node']} | {self.current.format_bytes(item['baseline_used'])} "
+                        f"| {self.current.format_bytes(item['current_used'])} | {self._signed_bytes(item['delta'])} "
+                        f"| {per_day} | {percent} |\n")
+        
+        if self.language == 'en':
+            content += """
+## 3. Average Rates Between Collections
+
+| Node Name | Indexing Rate | Index Latency | Search Rate | Query Latency | GC Time | Write Rejected | Search Rejected |
+|-----------|---------------|---------------|-------------|---------------|---------|----------------|-----------------|
+"""
+        else:
+            content += """
+## 3. 两次收集之间的平均速率
+
+| 节点名称 | 索引速率 | 索引延迟 | 查询速率 | 查询延迟 | GC耗时占比 | 写入拒绝 | 搜索拒绝 |
+|---------|----------|----------|----------|----------|------------|----------|----------|
+"""
+        
+        def fmt(value, pattern):
+            return pattern.format(value) if value is not None else "N/A"
+        
+        for rates in sorted(comparison['node_rates'].values(), key=lambda r: r['name']):
+            content += (f"| {rates['name']} | {fmt(rates['index_rate'], '{:.1f}/s')} "
+                        f"| {fmt(rates['index_latency_ms'], '{:.2f}ms')} "
+                        f"| {fmt(rates['search_rate'], '{:.1f}/s')} "
+                        f"| {fmt(rates['query_latency_ms'], '{:.2f}ms')} "
+                        f"| {fmt(rates['gc_time_percent'], '{:.2f}%')} "
+                        f"| {fmt(rates['rejected'].get('write'), '{:.0f}')} "
+                        f"| {fmt(rates['rejected'].get('search'), '{:.0f}')} |\n")
+        
+        errors = comparison['errors']
+        if self.language == 'en':
+            content += f"""
+## 4. New Error Types
+
+New error types: {errors['new_count']}, error types no longer seen: {errors['resolved_count']}
+
+"""
+        else:
+            content += f"""
+## 4. 新出现的错误类型
+
+新出现的错误类型: {errors['new_count']} 种，不再出现的错误类型: {errors['resolved_count']} 种
+
+"""
+        if errors['new']:
+            if self.language == 'en':
+                content += "| Error Type | Count | Example |\n|------------|-------|---------|\n"
+            else:
+                content += "| 错误类型 | 次数 | 示例 |\n|---------|------|------|\n"
+            for item in errors['new']:
+                example = item['example'].replace('|', '\\|')
+                content += f"| {item['signature']} | {item['count']} | {example} |\n"
+        
+        return content
@@ -1,21 +1,42 @@
+import fnmatch
 import json
-import os
-from typing import Dict, Any, Optional
+import posixpath
+import threading
+from typing import Dict, Any, Iterable, List, Optional, Union
 from datetime import datetime
+from .data_source import DirectoryDataSource, ZipDataSource, open_data_source
+from .log_scanner import LogScanner, LogScanResult
+from .node_rates import NODES_STATS_SAMPLE_FILE, compute_node_rates
+from .shard_table import ShardTable
+
+# 这些目录下的文件（日志）可能很大，且日志分析已经完整读取一遍，指纹使用文件大小和修改时间，不再读取内容
+STAT_FINGERPRINT_DIRS = ('logs',)
 
 
 class ESDataLoader:
     """Elasticsearch诊断数据加载器"""
     
-    def __init__(self, data_dir: str):
+    def __init__(self, data_dir: Union[str, DirectoryDataSource, ZipDataSource]):
         """
         初始化数据加载器
         
         Args:
-            data_dir: 诊断数据目录路径
+            data_dir: 诊断数据目录路径、诊断ZIP文件路径或已打开的数据源
         """
-        self.data_dir = data_dir
+        if isinstance(data_dir, str):
+            self.source = open_data_source(data_dir)
+        else:
+            self.source = data_dir
+        self.data_dir = self.source.path
         self.data_cache = {}
+        self._log_scan = None
+        # 并发生成章节时保证每个文件只解析一次
+        self._lock = threading.Lock()
+        self._file_locks = {}
+        self._log_scan_lock = threading.Lock()
+        self._shard_table = None
+        self._shard_table_lock = threading.Lock()
+        self._fingerprints = {}
     
     def load_json_file(self, filename: str) -> Optional[Dict[str, Any]]:
         """
@@ -30,14 +51,22 @@ class ESDataLoader:
         if filename in self.data_cache:
             return self.data_cache[filename]
         
-        file_path = os.path.join(self.data_dir, filename)
+        with self._lock:
+            file_lock = self._file_locks.setdefault(filename, threading.Lock())
         
-        if not os.path.exists(file_path):
+        with file_lock:
+            if filename in self.data_cache:
+                return self.data_cache[filename]
+            return self._load_json_file(filename)
+    
+    def _load_json_file(self, filename: str) -> Optional[Dict[str, Any]]:
+        """读取并解析JSON文件（调用方持有该文件的锁）"""
+        if not self.source.isfile(filename):
             print(f"警告: 文件 {filename} 不存在")
             return None
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
+            with self.source.open_text(filename) as f:
                 data = json.load(f)
                 self.data_cache[filename] = data
                 return data
@@ -76,6 +105,25 @@ class ESDataLoader:
         """获取节点统计信息"""
         return self.load_json_file('nodes_stats.json')
     
+    def get_nodes_stats_samples(self) -> List[Dict[str, Any]]:
+        """
+        获取速率采样模式下按顺序收集的多次节点统计
+        
+        采样文件为 nodes_stats_sample_0.json、nodes_stats_sample_1.json ...，
+        没有采样文件时返回空列表
+        """
+        samples = []
+        while self.source.isfile(NODES_STATS_SAMPLE_FILE.format(len(samples))):
+            sample = self.load_json_file(NODES_STATS_SAMPLE_FILE.format(len(samples)))
+            if sample is None:
+                break
+            samples.append(sample)
+        return samples
+    
+    def get_node_rates(self) -> Dict[str, Dict[str, Any]]:
+        """获取采样区间内各节点的吞吐、延迟、GC和拒绝增量，少于两次采样时返回空字典"""
+        return compute_node_rates(self.get_nodes_stats_samples())
+    
     def get_indices_stats(self) -> Optional[Dict[str, Any]]:
         """获取索引统计信息"""
         return self.load_json_file('indices_stats.json')
@@ -88,6 +136,94 @@ class ESDataLoader:
         """获取设置信息"""
         return self.load_json_file('settings.json')
     
+    def get_log_scan(self) -> LogScanResult:
+        """
+        获取日志扫描结果
+        
+        所有日志文件只扫描一次，日志分析和最终建议章节共享同一个结果
+        """
+        with self._log_scan_lock:
+            if self._log_scan is None:
+                self._log_scan = LogScanner(self.source, 'logs').scan()
+            return self._log_scan
+    
+    def get_shard_table(self) -> ShardTable:
+        """
+        获取列式分片表
+        
+        indices.json 只解析一次，索引分析各章节共享同一个分片表及其聚合结果
+        """
+        with self._shard_table_lock:
+            if self._shard_table is None:
+                # 每行一个分片的文件逐行构建，不在内存中保留原始分片列表
+                if 'indices.json' not in self.data_cache and self.source.isfile('indices.json'):
+                    with self.source.open_text('indices.json') as f:
+                        self._shard_table = ShardTable.from_json_lines(f)
+                if self._shard_table is None:
+                    self._shard_table = ShardTable(self.get_indices())
+            return self._shard_table
+    
+    def fingerprint_files(self, patterns: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        获取输入文件的内容指纹，用作章节缓存键
+        
+        Args:
+            patterns: 文件相对路径，文件名部分可以使用通配符（如 logs/*.log）
+        
+        Returns:
+            文件路径 -> 内容指纹；缺少的文件（或通配符所在的目录）为None，因为缺少文件同样会影响章节内容。
+            STAT_FINGERPRINT_DIRS 下的文件使用大小和修改时间作为指纹
+        """
+        fingerprints = {}
+        for pattern in patterns:
+            directory, name_pattern = posixpath.split(pattern)
+            if not any(char in name_pattern for char in '*?['):
+                fingerprints[pattern] = self._fingerprint(pattern) if self.source.isfile(pattern) else None
+                continue
+            
+            if not self.source.isdir(directory):
+                fingerprints[pattern] = None
+                continue
+            for filename in sorted(fnmatch.filter(self.source.listdir(directory), name_pattern)):
+                path = posixpath.join(directory, filename)
+                if self.source.isfile(path):
+                    fingerprints[path] = self._fingerprint(path)
+        return fingerprints
+    
+    def _fingerprint(self, name: str) -> str:
+        # 多个章节读取同一文件时只计算一次
+        if name not in self._fingerprints:
+            if name.split('/', 1)[0] in STAT_FINGERPRINT_DIRS:
+                self._fingerprints[name] = self.source.stat_fingerprint(name)
+            else:
+                self._fingerprints[name] = self.source.fingerprint(name)
+        return self._fingerprints[name]
+    
+    def get_collection_time(self) -> Optional[float]:
+        """
+        获取诊断数据的收集时间（秒级时间戳）
+        
+        依次使用节点统计中最晚的时间戳、集群统计的时间戳和 manifest 中的收集时间，都没有时返回None
+        """
+        nodes_stats = self.get_nodes_stats()
+        if nodes_stats and nodes_stats.get('nodes'):
+            timestamps = [stats.get('timestamp') for stats in nodes_stats['nodes'].values()]
+            timestamps = [t for t in timestamps if isinstance(t, (int, float))]
+            if timestamps:
+                return max(timestamps) / 1000
+        
+        cluster_stats = self.get_cluster_stats()
+        if cluster_stats and isinstance(cluster_stats.get('timestamp'), (int, float)):
+            return cluster_stats['timestamp'] / 1000
+        
+        manifest = self.get_manifest()
+        if manifest and manifest.get('collectionDate'):
+            try:
+                return datetime.fromisoformat(manifest['collectionDate'].replace('Z', '+00:00')).timestamp()
+            except ValueError:
+                return None
+        return None
+    
     def format_bytes(self, bytes_value: int) -> str:
         """
         格式化字节数为人类可读格式
@@ -0,0 +1,216 @@
+"""
+诊断数据源
+统一目录和ZIP压缩包两种诊断数据的读取方式，ZIP成员按需直接从压缩包读取，无需解压到磁盘
+"""
+
+import hashlib
+import io
+import os
+import posixpath
+import time
+import zipfile
+from typing import IO, List, Optional
+
+
+# 用于识别诊断数据根目录的关键文件
+DIAGNOSTIC_KEY_FILES = ['cluster_health.json', 'cluster_stats.json', 'nodes_info.json']
+
+
+def compute_file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    计算文件的SHA256哈希值
+    
+    Args:
+        file_path: 文件路径
+        chunk_size: 分块读取大小
+    
+    Returns:
+        完整的十六进制SHA256哈希值
+    """
+    sha256_hash = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        # 分块读取文件以处理大文件
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256_hash.update(chunk)
+    return sha256_hash.hexdigest()
+
+
+class DirectoryDataSource:
+    """基于本地目录的诊断数据源"""
+    
+    def __init__(self, data_dir: str):
+        """
+        初始化目录数据源
+        
+        Args:
+            data_dir: 诊断数据目录路径
+        """
+        self.path = data_dir
+    
+    def _full_path(self, name: str) -> str:
+        return os.path.join(self.path, name) if name else self.path
+    
+    def exists(self, name: str) -> bool:
+        return os.path.exists(self._full_path(name))
+    
+    def isfile(self, name: str) -> bool:
+        return os.path.isfile(self._full_path(name))
+    
+    def isdir(self, name: str) -> bool:
+        return os.path.isdir(self._full_path(name))
+    
+    def listdir(self, name: str = '') -> List[str]:
+        return os.listdir(self._full_path(name))
+    
+    def getsize(self, name: str) -> int:
+        return os.path.getsize(self._full_path(name))
+    
+    def getmtime(self, name: str) -> float:
+        return os.path.getmtime(self._full_path(name))
+    
+    def open_text(self, name: str, encoding: str = 'utf-8', errors: str = 'strict') -> IO[str]:
+        return open(self._full_path(name), 'r', encoding=encoding, errors=errors)
+    
+    def fingerprint(self, name: str) -> str:
+        """文件内容指纹（SHA256）"""
+        return f"sha256:{compute_file_hash(self._full_path(name))}"
+    
+    def stat_fingerprint(self, name: str) -> str:
+        """文件大小和修改时间（纳秒）组成的指纹，不读取文件内容"""
+        stat = os.stat(self._full_path(name))
+        return f"stat:{stat.st_size}:{stat.st_mtime_ns}"
+    
+    def close(self):
+        pass
+
+
+class ZipDataSource:
+    """
+    基于ZIP压缩包的诊断数据源
+    
+    只读取压缩包的目录索引，成员文件在访问时才解压读取。
+    压缩包内数据位于一级子目录（如 local-diagnostics-xxx/）时会自动定位。
+    """
+    
+    def __init__(self, zip_path: str):
+        """
+        初始化ZIP数据源
+        
+        Args:
+            zip_path: 诊断ZIP文件路径
+        
+        Raises:
+            zipfile.BadZipFile: 文件不是有效的ZIP压缩包
+        """
+        self.path = zip_path
+        self._zip = zipfile.ZipFile(zip_path, 'r')
+        self._files = {}
+        self._dirs = {'': set()}
+        
+        for info in self._zip.infolist():
+            member = info.filename.replace('\\', '/').lstrip('/')
+            while member.startswith('./'):
+                member = member[2:]
+            is_dir = member.endswith('/')
+            member = member.rstrip('/')
+            if not member:
+                continue
+            
+            if is_dir:
+                self._dirs.setdefault(member, set())
+            else:
+                self._files[member] = info
+            
+            # 补全父目录（很多压缩包不包含显式的目录条目）
+            child = member
+            parent = posixpath.dirname(child)
+            while True:
+                self._dirs.setdefault(parent, set()).add(posixpath.basename(child))
+                if not parent:
+                    break
+                child = parent
+                parent = posixpath.dirname(child)
+        
+        self.root = self._find_data_root()
+    
+    def _find_data_root(self) -> Optional[str]:
+        """查找包含诊断关键文件的根目录，未找到返回None"""
+        def has_key_files(dir_name):
+            return any(key_file in self._dirs.get(dir_name, ()) for key_file in DIAGNOSTIC_KEY_FILES)
+        
+        if has_key_files(''):
+            return ''
+        
+        for item in sorted(self._dirs['']):
+            if item in self._dirs and has_key_files(item):
+                return item
+        
+        return None
+    
+    def _member(self, name: str) -> str:
+        name = name.replace('\\', '/').strip('/')
+        root = self.root or ''
+        if root and name:
+            return f"{root}/{name}"
+        return root or name
+    
+    def exists(self, name: str) -> bool:
+        member = self._member(name)
+        return member in self._files or member in self._dirs
+    
+    def isfile(self, name: str) -> bool:
+        return self._member(name) in self._files
+    
+    def isdir(self, name: str) -> bool:
+        return self._member(name) in self._dirs
+    
+    def listdir(self, name: str = '') -> List[str]:
+        member = self._member(name)
+        if member not in self._dirs:
+            raise FileNotFoundError(f"{self.path}: {member}")
+        return list(self._dirs[member])
+    
+    def _info(self, name: str) -> zipfile.ZipInfo:
+        member = self._member(name)
+        if member not in self._files:
+            raise FileNotFoundError(f"{self.path}: {member}")
+        return self._files[member]
+    
+    def getsize(self, name: str) -> int:
+        return self._info(name).file_size
+    
+    def getmtime(self, name: str) -> float:
+        return time.mktime(self._info(name).date_time + (0, 0, -1))
+    
+    def open_text(self, name: str, encoding: str = 'utf-8', errors: str = 'strict') -> IO[str]:
+        return io.TextIOWrapper(self._zip.open(self._info(name)), encoding=encoding, errors=errors)
+    
+    def fingerprint(self, name: str) -> str:
+        """文件内容指纹，直接使用ZIP目录中记录的CRC32和原始大小，无需解压"""
+        info = self._info(name)
+        return f"crc32:{info.CRC:08x}:{info.file_size}"
+    
+    def stat_fingerprint(self, name: str) -> str:
+        """ZIP目录中的CRC32同样无需读取文件内容，与 fingerprint() 相同"""
+        return self.fingerprint(name)
+    
+    def close(self):
+        self._zip.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def open_data_source(path: str):
+    """
+    根据路径创建数据源：.zip 文件使用ZIP数据源，其余按目录处理
+    
+    Args:
+        path: 诊断数据目录或ZIP文件路径
+    """
+    if os.path.isfile(path) and path.lower().endswith('.zip'):
+        return ZipDataSource(path)
+    return DirectoryDataSource(path)
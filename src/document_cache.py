@@ -0,0 +1,141 @@
+"""
+HTML文档缓存
+每个报告的完整HTML下载文档只渲染一次，同时预先生成gzip（以及可用时的brotli）压缩版本，
+下载时直接从内存返回，并提供ETag用于条件请求
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+DEFAULT_DOCUMENT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+class RenderedDocument:
+    """渲染完成的文档及其压缩版本"""
+    
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body, quality=9)
+    
+    @property
+    def size(self) -> int:
+        return sum(len(data) for data in self.variants.values())
+    
+    def variant_etag(self, encoding: str) -> str:
+        """每种编码使用不同的强ETag"""
+        return self.etag if encoding == 'identity' else f"{self.etag}-{encoding}"
+    
+    def select_encoding(self, accept_encodings: Dict[str, float]) -> str:
+        """
+        根据客户端 Accept-Encoding 选择编码
+        
+        Args:
+            accept_encodings: 编码 -> 质量值
+        """
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and accept_encodings.get(encoding, 0) > 0:
+                return encoding
+        return 'identity'
+
+
+class DocumentCache:
+    """
+    按报告ID缓存渲染后的文档，按LRU和总字节数淘汰
+    
+    报告的章节文档使用 "<报告ID>/<章节>.<格式>" 作为键，删除报告时随整份报告一起移除
+    """
+    
+    def __init__(self, max_bytes: Optional[int] = None):
+        """
+        初始化文档缓存
+        
+        Args:
+            max_bytes: 缓存容量，默认读取 ESREPORT_HTML_CACHE_MAX_BYTES
+        """
+        if max_bytes is None:
+            max_bytes = int(os.getenv('ESREPORT_HTML_CACHE_MAX_BYTES', DEFAULT_DOCUMENT_CACHE_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self._documents = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        # 每个报告一把渲染锁，避免并发下载时重复渲染
+        self._render_locks = {}
+        self.hits = 0
+        self.renders = 0
+    
+    def get(self, key: str) -> Optional[RenderedDocument]:
+        """获取缓存文档，不存在返回None（不读取报告内容）"""
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+                self.hits += 1
+            return document
+    
+    def get_or_render(self, key: str, render: Callable[[], str]) -> RenderedDocument:
+        """
+        获取缓存文档，不存在时调用 render 生成
+        
+        Args:
+            key: 报告ID
+            render: 返回完整HTML文本的函数
+        """
+        with self._lock:
+            document = self._documents.get(key)
+            if document is not None:
+                self._documents.move_to_end(key)
+                self.hits += 1
+                return document
+            render_lock = self._render_locks.setdefault(key, threading.Lock())
+        
+        with render_lock:
+            with self._lock:
+                document = self._documents.get(key)
+                if document is not None:
+                    self.hits += 1
+                    return document
+            
+            document = RenderedDocument(render().encode('utf-8'))
+            
+            with self._lock:
+                self.renders += 1
+                self._render_locks.pop(key, None)
+                if document.size <= self.max_bytes:
+                    self._documents[key] = document
+                    self._total_bytes += document.size
+                    while self._total_bytes > self.max_bytes:
+                        _, evicted = self._documents.popitem(last=False)
+                        self._total_bytes -= evicted.size
+            return document
+    
+    def discard(self, report_id: str):
+        """移除报告的完整文档和各章节文档，在报告存储删除报告时调用"""
+        prefix = f"{report_id}/"
+        with self._lock:
+            for key in [key for key in self._documents if key == report_id or key.startswith(prefix)]:
+                self._total_bytes -= self._documents.pop(key).size
+    
+    def stats(self) -> Dict[str, object]:
+        """缓存统计信息"""
+        with self._lock:
+            return {
+                'documents': len(self._documents),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'brotli': brotli is not None,
+                'hits': self.hits,
+                'renders': self.renders
+            }
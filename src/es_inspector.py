@@ -7,15 +7,56 @@ Elasticsearch 集群检查器
 """
 
 import json
+import os
+import time
 import requests
 import urllib3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, Any, Optional, List
-from urllib.parse import urljoin
+from typing import Dict, Any, Callable, Optional, List, Tuple
+from urllib.parse import quote
+
+from .es_transport import ESTransport
+from .node_rates import NODES_STATS_SAMPLE_FILE, NODES_STATS_SAMPLE_METRICS, compute_node_rates
 
 # 禁用SSL警告
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# 诊断目录中 ESDataLoader 读取的文件及其对应的ES接口
+DIAGNOSTIC_ENDPOINTS = [
+    ('cluster_health.json', '/_cluster/health'),
+    ('cluster_settings.json', '/_cluster/settings'),
+    ('cluster_stats.json', '/_cluster/stats'),
+    ('licenses.json', '/_license'),
+    ('master.json', '/_cat/master?format=json'),
+    ('nodes.json', '/_nodes'),
+    ('nodes_stats.json', '/_nodes/stats'),
+    ('nodes_usage.json', '/_nodes/usage'),
+    ('indices.json', '/_cat/shards?format=json&bytes=b'),
+    # 最终建议按主分片大小给出大分片/小分片建议，需要分片级统计（与诊断包一致）
+    ('indices_stats.json', '/_stats?level=shards'),
+    ('settings.json', '/_settings'),
+    ('commercial/ilm_policies.json', '/_ilm/policy'),
+]
+
+# 精简模式下替换的接口：只请求报告模块读取的指标和字段，None 表示不收集（仅用于case文件）
+MINIMAL_ENDPOINTS = {
+    'nodes_stats.json': '/_nodes/stats/jvm,os,fs,indices',
+    'indices_stats.json': '/_stats/docs,store?level=shards&filter_path=indices.*.total.docs.count,'
+                          'indices.*.total.store.size_in_bytes,indices.*.shards.*.routing.primary,'
+                          'indices.*.shards.*.store.size_in_bytes',
+    'settings.json': None,
+}
+
+# 分片表读取的 _cat/shards 列
+SHARD_COLUMNS = 'index,shard,prirep,state,docs,store,node'
+
+# 分页请求 _cat/shards 时每页索引名列表的最大长度（URL编码后）
+SHARD_PAGE_MAX_CHARS = 2000
+
+# 速率采样的默认间隔（秒）
+DEFAULT_RATE_INTERVAL = 10
+
 
 class ElasticsearchInspector:
     """Elasticsearch 集群检查器"""
@@ -32,10 +73,17 @@ class ElasticsearchInspector:
                 - password: 密码(可选)
                 - use_ssl: 是否使用SSL
                 - verify_certs: 是否验证证书
+                - max_concurrency: 并发收集的最大请求数(可选，默认1即依次收集)
+                - timeout、connect_timeout、endpoint_timeouts、max_retries、
+                  retry_backoff、pool_maxsize: 传输层设置，见 ESTransport
+                - shard_page_max_chars: 精简收集时每页索引名列表的最大长度(可选)
+                - rate_samples: 节点统计的采样次数(可选，默认0即不采样，至少2次才能计算速率)
+                - rate_interval: 两次采样之间的间隔秒数(可选，默认10)
         """
         self.config = config
         self.base_url = self._build_base_url()
-        self.session = self._create_session()
+        self.transport = ESTransport(self.base_url, config)
+        self.session = self.transport.session
     
     def _build_base_url(self) -> str:
         """构建ES基础URL"""
@@ -44,31 +92,10 @@ class ElasticsearchInspector:
         port = self.config.get('port', 9200)
         return f"{protocol}://{host}:{port}"
     
-    def _create_session(self) -> requests.Session:
-        """创建HTTP会话"""
-        session = requests.Session()
-        
-        # 设置认证
-        username = self.config.get('username')
-        password = self.config.get('password')
-        if username and password:
-            session.auth = (username, password)
-        
-        # SSL设置
-        if not self.config.get('verify_certs', True):
-            session.verify = False
-        
-        # 设置超时
-        session.timeout = 30
-        
-        return session
-    
     def _make_request(self, endpoint: str, method: str = 'GET', **kwargs) -> Dict[str, Any]:
         """发送HTTP请求到ES"""
-        url = urljoin(self.base_url, endpoint)
-        
         try:
-            response = self.session.request(method, url, **kwargs)
+            response = self.transport.request(method, endpoint, **kwargs)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -128,15 +155,68 @@ class ElasticsearchInspector:
         """获取集群设置"""
         return self._make_request('/_cluster/settings')
     
-    def inspect_cluster(self) -> Dict[str, Any]:
+    def sample_nodes_stats(self, samples: int, interval: float,
+                           output_dir: Optional[str] = None) -> List[Any]:
+        """
+        按固定间隔多次获取节点统计，用于计算采样区间内的真实吞吐
+        
+        Args:
+            samples: 采样次数
+            interval: 相邻两次采样开始时间的间隔（秒）
+            output_dir: 指定时把每次采样流式写入 nodes_stats_sample_<序号>.json
+        
+        Returns:
+            各次采样的响应；写入目录时为各文件的字节数
+        """
+        endpoint = f'/_nodes/stats/{NODES_STATS_SAMPLE_METRICS}'
+        results = []
+        next_at = time.monotonic()
+        for i in range(samples):
+            time.sleep(max(0.0, next_at - time.monotonic()))
+            next_at = time.monotonic() + interval
+            if output_dir:
+                path = os.path.join(output_dir, NODES_STATS_SAMPLE_FILE.format(i))
+                results.append(self._download(endpoint, path))
+            else:
+                results.append(self._make_request(endpoint))
+        return results
+    
+    def _rate_sampling(self) -> Tuple[int, float]:
+        """读取配置中的采样次数和间隔"""
+        return (int(self.config.get('rate_samples') or 0),
+                float(self.config.get('rate_interval', DEFAULT_RATE_INTERVAL)))
+    
+    def _run_check(self, method: Callable[[], Any], description: str) -> Tuple[Any, float, Optional[str]]:
+        """
+        执行单项收集并计时
+        
+        Returns:
+            (收集结果, 耗时秒数, 错误信息)
+        """
+        print(f"  📊 收集{description}...")
+        start = time.perf_counter()
+        try:
+            return method(), time.perf_counter() - start, None
+        except Exception as e:
+            return None, time.perf_counter() - start, f"收集{description}失败: {e}"
+    
+    def inspect_cluster(self, max_concurrency: Optional[int] = None) -> Dict[str, Any]:
         """
         执行完整的集群检查
         
+        Args:
+            max_concurrency: 同时发往集群的最大请求数，默认读取配置 max_concurrency，
+                为1时依次收集
+        
         Returns:
-            包含所有检查结果的字典
+            包含所有检查结果的字典，timings 中记录各接口耗时（秒）
         """
         print("🔍 开始ES集群巡检...")
         
+        if max_concurrency is None:
+            max_concurrency = self.config.get('max_concurrency', 1)
+        max_concurrency = max(1, int(max_concurrency))
+        
         result = {
             'inspection_time': datetime.now().isoformat(),
             'cluster_info': {},
@@ -151,10 +231,12 @@ class ElasticsearchInspector:
             'thread_pool_stats': {},
             'jvm_stats': {},
             'cluster_settings': {},
+            'node_rates': {},
+            'timings': {},
+            'transport_stats': {},
             'errors': []
         }
         
-        # 依次收集各种信息
         checks = [
             ('cluster_info', self.get_cluster_info, "集群基本信息"),
             ('cluster_health', self.get_cluster_health, "集群健康状态"),
@@ -170,16 +252,206 @@ class ElasticsearchInspector:
             ('cluster_settings', self.get_cluster_settings, "集群设置"),
         ]
         
-        for key, method, description in checks:
-            try:
-                print(f"  📊 收集{description}...")
-                result[key] = method()
-            except Exception as e:
-                error_msg = f"收集{description}失败: {e}"
-                print(f"  ❌ {error_msg}")
-                result['errors'].append(error_msg)
+        started = time.perf_counter()
+        if max_concurrency == 1:
+            # 依次收集各种信息
+            outcomes = [self._run_check(method, description) for _, method, description in checks]
+        else:
+            # 并发收集，同时进行的请求数不超过 max_concurrency，避免给master节点造成压力
+            with ThreadPoolExecutor(max_workers=min(max_concurrency, len(checks)),
+                                    thread_name_prefix='es-inspect') as pool:
+                outcomes = list(pool.map(lambda check: self._run_check(check[1], check[2]), checks))
+        total_time = time.perf_counter() - started
+        
+        # 按固定顺序汇总结果，与收集完成的先后无关
+        for (key, _, _), (value, elapsed, error) in zip(checks, outcomes):
+            result['timings'][key] = round(elapsed, 3)
+            if error:
+                print(f"  ❌ {error}")
+                result['errors'].append(error)
+            else:
+                result[key] = value
+        result['timings']['total'] = round(total_time, 3)
+        result['transport_stats'] = self.transport.stats()
+        
+        slowest = sorted(((key, seconds) for key, seconds in result['timings'].items() if key != 'total'),
+                         key=lambda item: item[1], reverse=True)[:3]
+        print(f"⏱️ 收集耗时 {total_time:.2f}s (并发 {max_concurrency})，最慢的接口: "
+              + ", ".join(f"{key} {seconds:.2f}s" for key, seconds in slowest))
+        
+        # 速率采样需要等待采样间隔，单独计时，不计入上面的收集耗时
+        samples, interval = self._rate_sampling()
+        if samples >= 2:
+            print(f"📈 采样节点统计 {samples} 次，间隔 {interval:g}s...")
+            snapshots, elapsed, error = self._run_check(
+                lambda: self.sample_nodes_stats(samples, interval), "节点速率采样")
+            result['timings']['node_rates'] = round(elapsed, 3)
+            if error:
+                print(f"  ❌ {error}")
+                result['errors'].append(error)
+            else:
+                result['node_rates'] = compute_node_rates(snapshots)
+            result['transport_stats'] = self.transport.stats()
+        
+        print(f"✅ 集群巡检完成，共收集 {len([k for k, v in result.items() if v and k not in ('errors', 'timings', 'transport_stats')])} 项信息")
+        
+        return result
+
+
+    def _download(self, endpoint: str, path: str) -> int:
+        """把接口响应流式写入文件，先写临时文件，成功后再替换"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.part"
+        try:
+            with open(temp_path, 'wb') as f:
+                size = self.transport.download(endpoint, f)
+            os.replace(temp_path, path)
+            return size
+        except requests.exceptions.RequestException as e:
+            raise ConnectionError(f"ES请求失败 [{endpoint}]: {e}")
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def _shard_pages(self) -> List[str]:
+        """按索引名分页，每页是逗号分隔的索引列表（URL编码后不超过 shard_page_max_chars）"""
+        page_max_chars = self.config.get('shard_page_max_chars', SHARD_PAGE_MAX_CHARS)
+        indices = self._make_request('/_cat/indices?format=json&h=index&expand_wildcards=all&s=index')
+        pages, current, length = [], [], 0
+        for item in indices:
+            name = quote(item['index'], safe='')
+            if current and length + len(name) + 1 > page_max_chars:
+                pages.append(','.join(current))
+                current, length = [], 0
+            current.append(name)
+            length += len(name) + 1
+        if current:
+            pages.append(','.join(current))
+        return pages
+    
+    def _fetch_shard_page(self, page: str) -> List[Dict[str, Any]]:
+        """获取一页索引的分片，收集期间被删除的索引会导致整页失败，此时逐个索引重试"""
+        params = f"format=json&bytes=b&h={SHARD_COLUMNS}"
+        try:
+            return self._make_request(f'/_cat/shards/{page}?{params}')
+        except ConnectionError:
+            shards = []
+            for name in page.split(','):
+                try:
+                    shards.extend(self._make_request(f'/_cat/shards/{name}?{params}'))
+                except ConnectionError as e:
+                    print(f"  ⚠️ 跳过索引 {name}: {e}")
+            return shards
+    
+    def _collect_shards_paged(self, path: str) -> int:
+        """
+        按索引分页收集 _cat/shards，只请求分片表需要的列
+        
+        每页结果立即写入文件（每行一个分片），内存中只保留当前一页
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.part"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write('[\n')
+                first = True
+                for page in self._shard_pages():
+                    for shard in self._fetch_shard_page(page):
+                        f.write(('' if first else ',\n') + json.dumps(shard, ensure_ascii=False))
+                        first = False
+                f.write('\n]\n')
+                size = f.tell()
+            os.replace(temp_path, path)
+            return size
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+    
+    def collect_diagnostic(self, output_dir: str, max_concurrency: Optional[int] = None,
+                           minimal: bool = False) -> Dict[str, Any]:
+        """
+        从在线集群收集诊断数据，按 ESDataLoader 使用的文件名写入目录
+        
+        各接口的响应以流的方式直接写入文件，不在内存中整体保存，
+        之后可以用 ESReportGenerator 对该目录生成完整的模块化报告。
+        
+        Args:
+            output_dir: 诊断数据目录
+            max_concurrency: 同时发往集群的最大请求数，默认读取配置 max_concurrency
+            minimal: 精简模式，只请求报告用到的字段，_cat/shards 按索引分页收集，
+                收集时间和内存占用与报告实际使用的数据量相关，而不是集群规模
+        
+        配置了 rate_samples（至少2次）时，在其他文件收集完成后按 rate_interval
+        间隔多次采样节点统计，写入 nodes_stats_sample_<序号>.json
+        
+        Returns:
+            收集结果，包含 files（文件名 -> 字节数）、timings 和 errors
+        """
+        print(f"🔍 开始收集诊断数据到: {output_dir}")
+        os.makedirs(output_dir, exist_ok=True)
+        
+        if max_concurrency is None:
+            max_concurrency = self.config.get('max_concurrency', 1)
+        max_concurrency = max(1, int(max_concurrency))
+        
+        # manifest.json 由本地生成，记录收集时间和ES版本
+        cluster_info = self.get_cluster_info()
+        manifest = {
+            'collectionDate': datetime.now().astimezone().isoformat(),
+            'Product Version': cluster_info.get('version', {}).get('number', 'N/A'),
+            'diagnosticSource': 'live'
+        }
+        with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        
+        downloads = []
+        for filename, endpoint in DIAGNOSTIC_ENDPOINTS:
+            path = os.path.join(output_dir, filename)
+            if minimal and filename == 'indices.json':
+                downloads.append((filename, lambda path=path: self._collect_shards_paged(path)))
+                continue
+            if minimal and filename in MINIMAL_ENDPOINTS:
+                endpoint = MINIMAL_ENDPOINTS[filename]
+                if endpoint is None:
+                    continue
+            downloads.append((filename, lambda endpoint=endpoint, path=path: self._download(endpoint, path)))
+        
+        started = time.perf_counter()
+        if max_concurrency == 1:
+            outcomes = [self._run_check(method, filename) for filename, method in downloads]
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_concurrency, len(downloads)),
+                                    thread_name_prefix='es-collect') as pool:
+                outcomes = list(pool.map(lambda item: self._run_check(item[1], item[0]), downloads))
+        
+        result = {'output_dir': output_dir, 'minimal': minimal, 'files': {}, 'timings': {}, 'errors': []}
+        for (filename, _), (size, elapsed, error) in zip(downloads, outcomes):
+            result['timings'][filename] = round(elapsed, 3)
+            if error:
+                print(f"  ❌ {error}")
+                result['errors'].append(error)
+            else:
+                result['files'][filename] = size
+        result['timings']['total'] = round(time.perf_counter() - started, 3)
+        
+        samples, interval = self._rate_sampling()
+        if samples >= 2:
+            print(f"📈 采样节点统计 {samples} 次，间隔 {interval:g}s...")
+            sizes, elapsed, error = self._run_check(
+                lambda: self.sample_nodes_stats(samples, interval, output_dir), "节点速率采样")
+            result['timings']['nodes_stats_samples'] = round(elapsed, 3)
+            if error:
+                print(f"  ❌ {error}")
+                result['errors'].append(error)
+            else:
+                for i, size in enumerate(sizes):
+                    result['files'][NODES_STATS_SAMPLE_FILE.format(i)] = size
+        
+        result['transport_stats'] = self.transport.stats()
         
-        print(f"✅ 集群巡检完成，共收集 {len([k for k, v in result.items() if v and k != 'errors'])} 项信息")
+        total_bytes = sum(result['files'].values())
+        print(f"✅ 诊断数据收集完成: {len(result['files'])} 个文件, "
+              f"{total_bytes / (1024 * 1024):.1f} MB, 耗时 {result['timings']['total']:.2f}s")
         
         return result
 
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Elasticsearch HTTP传输层
+提供连接池、429/503重试（带随机抖动的指数退避）、按接口的连接/读取超时、
+gzip压缩协商，以及按接口统计的调用延迟和传输字节数
+"""
+
+import random
+import threading
+import time
+from typing import Dict, Any, IO, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# 默认 (连接超时, 读取超时)，单位秒
+DEFAULT_TIMEOUT = (5, 30)
+
+# 响应体较大的接口使用更长的读取超时，按路径前缀匹配（最长前缀优先）
+ENDPOINT_TIMEOUTS = {
+    '/_cat/shards': (5, 300),
+    '/_cat/indices': (5, 120),
+    '/_stats': (5, 180),
+    '/_nodes/stats': (5, 120),
+    '/_cluster/stats': (5, 60),
+}
+
+# 需要重试的状态码：请求过多、服务暂不可用
+RETRY_STATUS_CODES = (429, 503)
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF = 0.5
+DEFAULT_POOL_SIZE = 10
+
+
+class ESTransport:
+    """带连接池、重试和调用统计的ES HTTP客户端"""
+    
+    def __init__(self, base_url: str, config: Dict[str, Any]):
+        """
+        初始化传输层
+        
+        Args:
+            base_url: ES基础URL
+            config: ES连接配置，除认证和SSL设置外还支持
+                - timeout: 默认读取超时秒数
+                - connect_timeout: 连接超时秒数
+                - endpoint_timeouts: 路径前缀 -> (连接超时, 读取超时)，覆盖内置值
+                - max_retries: 429/503 和连接失败的最大重试次数
+                - retry_backoff: 重试退避基数（秒）
+                - pool_maxsize: 连接池大小
+        """
+        self.base_url = base_url
+        self.config = config
+        
+        connect_timeout = config.get('connect_timeout', DEFAULT_TIMEOUT[0])
+        self.default_timeout = (connect_timeout, config.get('timeout', DEFAULT_TIMEOUT[1]))
+        self.endpoint_timeouts = dict(ENDPOINT_TIMEOUTS)
+        self.endpoint_timeouts.update(config.get('endpoint_timeouts') or {})
+        
+        self.max_retries = config.get('max_retries', DEFAULT_MAX_RETRIES)
+        self.retry_backoff = config.get('retry_backoff', DEFAULT_RETRY_BACKOFF)
+        
+        self.session = self._create_session()
+        
+        self._lock = threading.Lock()
+        self._stats = {}
+    
+    def _create_session(self) -> requests.Session:
+        """创建带连接池的HTTP会话"""
+        session = requests.Session()
+        
+        # 设置认证
+        username = self.config.get('username')
+        password = self.config.get('password')
+        if username and password:
+            session.auth = (username, password)
+        
+        # SSL设置
+        if not self.config.get('verify_certs', True):
+            session.verify = False
+        
+        # 连接池至少能容纳并发收集的全部请求；重试由 request() 自行处理
+        pool_size = max(self.config.get('pool_maxsize', DEFAULT_POOL_SIZE),
+                        self.config.get('max_concurrency', 1))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        
+        session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip'
+        })
+        
+        return session
+    
+    def timeout_for(self, endpoint: str) -> Tuple[float, float]:
+        """按路径前缀查找接口的 (连接超时, 读取超时)"""
+        path = urlsplit(endpoint).path
+        matches = [prefix for prefix in self.endpoint_timeouts if path.startswith(prefix)]
+        if not matches:
+            return self.default_timeout
+        return tuple(self.endpoint_timeouts[max(matches, key=len)])
+    
+    def _backoff(self, attempt: int, response: Optional[requests.Response] = None) -> float:
+        """计算重试等待时间，优先使用服务端的 Retry-After"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        # 指数退避加随机抖动，避免多个请求同时重试
+        return self.retry_backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+    
+    def _send(self, method: str, endpoint: str, **kwargs) -> Tuple[requests.Response, int, float]:
+        """
+        发送请求，429/503 和连接失败时重试
+        
+        Returns:
+            (最后一次请求的响应, 重试次数, 开始时间)
+        """
+        url = urljoin(self.base_url, endpoint)
+        kwargs.setdefault('timeout', self.timeout_for(endpoint))
+        
+        attempt = 0
+        start = time.perf_counter()
+        while True:
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt >= self.max_retries:
+                    self._record(urlsplit(endpoint).path, start, attempt, error=True)
+                    raise
+                time.sleep(self._backoff(attempt))
+                attempt += 1
+                continue
+            
+            if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                wait = self._backoff(attempt, response)
+                response.close()
+                time.sleep(wait)
+                attempt += 1
+                continue
+            
+            return response, attempt, start
+    
+    def request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """
+        发送请求并读取完整响应体
+        
+        Args:
+            method: HTTP方法
+            endpoint: ES接口路径（可带查询参数）
+            **kwargs: 传给 requests 的其他参数，未指定 timeout 时按接口选择
+        
+        Returns:
+            最后一次请求的响应（可能仍是429/503，由调用方处理）
+        
+        Raises:
+            requests.exceptions.RequestException: 重试后仍无法完成请求
+        """
+        response, retries, start = self._send(method, endpoint, **kwargs)
+        
+        # 读取响应体后统计实际传输（压缩后）的字节数和解压后的大小
+        content = response.content
+        wire_bytes = response.raw.tell() if hasattr(response.raw, 'tell') else len(content)
+        self._record(urlsplit(endpoint).path, start, retries, error=not response.ok,
+                     wire_bytes=wire_bytes, body_bytes=len(content))
+        return response
+    
+    def download(self, endpoint: str, file_obj: IO[bytes], chunk_size: int = 1024 * 1024) -> int:
+        """
+        以流的方式把响应体（已解压）写入文件，响应不会整体读入内存
+        
+        Args:
+            endpoint: ES接口路径
+            file_obj: 以二进制模式打开的目标文件
+            chunk_size: 每次读取的块大小
+        
+        Returns:
+            写入的字节数
+        
+        Raises:
+            requests.exceptions.RequestException: 请求失败或返回错误状态码
+        """
+        response, retries, start = self._send('GET', endpoint, stream=True)
+        key = urlsplit(endpoint).path
+        body_bytes = 0
+        try:
+            if not response.ok:
+                self._record(key, start, retries, error=True)
+                response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                file_obj.write(chunk)
+                body_bytes += len(chunk)
+        except requests.exceptions.RequestException:
+            if response.ok:
+                self._record(key, start, retries, error=True)
+            raise
+        finally:
+            response.close()
+        
+        wire_bytes = response.raw.tell() if hasattr(response.raw, 'tell') else body_bytes
+        self._record(key, start, retries, wire_bytes=wire_bytes, body_bytes=body_bytes)
+        return body_bytes
+    
+    def _record(self, key: str, start: float, retries: int, error: bool = False,
+                wire_bytes: int = 0, body_bytes: int = 0):
+        """累计单个接口的调用统计"""
+        latency = time.perf_counter() - start
+        with self._lock:
+            stats = self._stats.setdefault(key, {
+                'calls': 0,
+                'errors': 0,
+                'retries': 0,
+                'total_latency': 0.0,
+                'max_latency': 0.0,
+                'wire_bytes': 0,
+                'body_bytes': 0
+            })
+            stats['calls'] += 1
+            stats['errors'] += int(error)
+            stats['retries'] += retries
+            stats['total_latency'] += latency
+            stats['max_latency'] = max(stats['max_latency'], latency)
+            stats['wire_bytes'] += wire_bytes
+            stats['body_bytes'] += body_bytes
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """按接口路径返回调用统计"""
+        with self._lock:
+            return {
+                key: {
+                    **value,
+                    'total_latency': round(value['total_latency'], 3),
+                    'max_latency': round(value['max_latency'], 3)
+                }
+                for key, value in self._stats.items()
+            }
@@ -0,0 +1,316 @@
+"""
+集群群组指标存储
+每次生成报告时把集群、节点和索引级别的关键指标写入本地SQLite数据库，
+按集群UUID和诊断数据收集时间区分，之后的多集群趋势查询只读数据库，不再解析诊断包
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Any, List, Optional
+
+from .data_loader import ESDataLoader
+from .report_store import _default_store_dir
+
+
+# 节点排行支持的指标
+NODE_METRICS = ('heap_percent', 'disk_percent', 'cpu_percent', 'docs', 'store_bytes', 'shards')
+
+SNAPSHOT_COLUMNS = ('cluster_uuid', 'cluster_name', 'collected_at', 'status', 'nodes', 'data_nodes',
+                    'indices', 'shards', 'unassigned_shards', 'docs', 'store_bytes',
+                    'error_count', 'warning_count')
+NODE_COLUMNS = ('node_name', 'heap_percent', 'disk_percent', 'cpu_percent', 'docs', 'store_bytes', 'shards')
+INDEX_COLUMNS = ('index_name', 'primary_shards', 'replica_shards', 'docs', 'store_bytes', 'status')
+
+# extract_fleet_metrics 读取的诊断文件，配置章节缓存时用作提取结果的缓存键
+FLEET_INPUT_FILES = (
+    'cluster_health.json',
+    'cluster_stats.json',
+    'nodes_stats.json',
+    'indices.json',
+    'manifest.json',
+    'logs/*.log',
+    'logs/*.log.gz'
+)
+
+
+def _percent(used: Optional[float], total: Optional[float]) -> Optional[float]:
+    if used is None or not total:
+        return None
+    return round(used / total * 100, 2)
+
+
+def extract_fleet_metrics(data_loader: ESDataLoader) -> Dict[str, Any]:
+    """
+    从已加载的诊断数据中提取要保存的指标
+    
+    Returns:
+        {'snapshot': 集群级指标, 'nodes': 节点指标列表, 'indices': 索引指标列表}，
+        字段与 SNAPSHOT_COLUMNS、NODE_COLUMNS、INDEX_COLUMNS 对应；
+        诊断数据中没有收集时间时 collected_at 为None，保存时使用当前时间
+    """
+    health = data_loader.get_cluster_health() or {}
+    cluster_stats = data_loader.get_cluster_stats() or {}
+    stats_indices = cluster_stats.get('indices', {})
+    cluster_name = health.get('cluster_name') or cluster_stats.get('cluster_name') or 'unknown'
+    shard_table = data_loader.get_shard_table()
+    log_scan = data_loader.get_log_scan()
+    
+    snapshot = {
+        'cluster_uuid': cluster_stats.get('cluster_uuid') or cluster_name,
+        'cluster_name': cluster_name,
+        'collected_at': data_loader.get_collection_time(),
+        'status': health.get('status'),
+        'nodes': health.get('number_of_nodes'),
+        'data_nodes': health.get('number_of_data_nodes'),
+        'indices': stats_indices.get('count'),
+        'shards': stats_indices.get('shards', {}).get('total', len(shard_table) or None),
+        'unassigned_shards': health.get('unassigned_shards'),
+        'docs': stats_indices.get('docs', {}).get('count'),
+        'store_bytes': stats_indices.get('store', {}).get('size_in_bytes'),
+        'error_count': log_scan.error_count if log_scan.logs_dir_exists else None,
+        'warning_count': log_scan.warning_count if log_scan.logs_dir_exists else None
+    }
+    
+    shards_by_node = shard_table.node_stats()
+    nodes = []
+    nodes_stats = data_loader.get_nodes_stats() or {}
+    for node_id, stats in nodes_stats.get('nodes', {}).items():
+        name = stats.get('name', node_id)
+        fs_total = stats.get('fs', {}).get('total', {})
+        disk_total = fs_total.get('total_in_bytes')
+        disk_available = fs_total.get('available_in_bytes')
+        node_shards = shards_by_node.get(name)
+        nodes.append({
+            'node_name': name,
+            'heap_percent': stats.get('jvm', {}).get('mem', {}).get('heap_used_percent'),
+            'disk_percent': _percent(disk_total - disk_available, disk_total)
+            if disk_total is not None and disk_available is not None else None,
+            'cpu_percent': stats.get('os', {}).get('cpu', {}).get('percent'),
+            'docs': stats.get('indices', {}).get('docs', {}).get('count'),
+            'store_bytes': stats.get('indices', {}).get('store', {}).get('size_in_bytes'),
+            'shards': node_shards['primary'] + node_shards['replica'] if node_shards else None
+        })
+    
+    indices = [
+        {
+            'index_name': name,
+            'primary_shards': stats['primary_shards'],
+            'replica_shards': stats['replica_shards'],
+            'docs': stats['docs'],
+            'store_bytes': stats['store_bytes'],
+            'status': stats['status']
+        }
+        for name, stats in shard_table.index_stats().items()
+    ]
+    
+    return {'snapshot': snapshot, 'nodes': nodes, 'indices': indices}
+
+
+class FleetMetricsStore:
+    """
+    基于SQLite的集群群组指标存储
+    
+    每次报告对应 snapshots 表中的一行，节点和索引指标分别保存在 node_metrics 和
+    index_metrics 表中；同一集群同一收集时间的诊断数据重复生成报告时覆盖原有记录。
+    """
+    
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Args:
+            db_path: 数据库文件路径，默认读取 ESREPORT_FLEET_DB（未设置时位于 ESREPORT_STORE_DIR 下）
+        """
+        self.db_path = db_path or os.getenv('ESREPORT_FLEET_DB') or os.path.join(_default_store_dir(), 'fleet.db')
+        self._local = threading.local()
+        
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    id INTEGER PRIMARY KEY,
+                    cluster_uuid TEXT NOT NULL,
+                    cluster_name TEXT,
+                    collected_at REAL NOT NULL,
+                    status TEXT,
+                    nodes INTEGER,
+                    data_nodes INTEGER,
+                    indices INTEGER,
+                    shards INTEGER,
+                    unassigned_shards INTEGER,
+                    docs INTEGER,
+                    store_bytes INTEGER,
+                    error_count INTEGER,
+                    warning_count INTEGER,
+                    recorded_at REAL NOT NULL,
+                    UNIQUE (cluster_uuid, collected_at)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS node_metrics (
+                    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+                    node_name TEXT NOT NULL,
+                    heap_percent REAL,
+                    disk_percent REAL,
+                    cpu_percent REAL,
+                    docs INTEGER,
+                    store_bytes INTEGER,
+                    shards INTEGER
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS index_metrics (
+                    snapshot_id INTEGER NOT NULL REFERENCES snapshots (id) ON DELETE CASCADE,
+                    index_name TEXT NOT NULL,
+                    primary_shards INTEGER,
+                    replica_shards INTEGER,
+                    docs INTEGER,
+                    store_bytes INTEGER,
+                    status TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_node_metrics_snapshot ON node_metrics (snapshot_id, node_name)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_index_metrics_snapshot ON index_metrics (snapshot_id, index_name)")
+    
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+    
+    def record(self, metrics: Dict[str, Any]) -> int:
+        """
+        保存一次报告的指标
+        
+        Args:
+            metrics: extract_fleet_metrics 的结果
+        
+        Returns:
+            快照ID
+        """
+        snapshot = dict(metrics['snapshot'])
+        if snapshot['collected_at'] is None:
+            snapshot['collected_at'] = time.time()
+        conn = self._connect()
+        with conn:
+            # 同一诊断数据重新生成报告时替换旧记录，节点和索引指标随之级联删除
+            conn.execute("DELETE FROM snapshots WHERE cluster_uuid = ? AND collected_at = ?",
+                         (snapshot['cluster_uuid'], snapshot['collected_at']))
+            cursor = conn.execute(
+                f"INSERT INTO snapshots ({', '.join(SNAPSHOT_COLUMNS)}, recorded_at) "
+                f"VALUES ({', '.join('?' * len(SNAPSHOT_COLUMNS))}, ?)",
+                [snapshot[column] for column in SNAPSHOT_COLUMNS] + [time.time()]
+            )
+            snapshot_id = cursor.lastrowid
+            conn.executemany(
+                f"INSERT INTO node_metrics (snapshot_id, {', '.join(NODE_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(NODE_COLUMNS))})",
+                ([snapshot_id] + [node[column] for column in NODE_COLUMNS] for node in metrics['nodes'])
+            )
+            conn.executemany(
+                f"INSERT INTO index_metrics (snapshot_id, {', '.join(INDEX_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(INDEX_COLUMNS))})",
+                ([snapshot_id] + [index[column] for column in INDEX_COLUMNS] for index in metrics['indices'])
+            )
+        return snapshot_id
+    
+    def _query(self, sql: str, params: tuple = ()) -> List[Dict[str, Any]]:
+        return [dict(row) for row in self._connect().execute(sql, params)]
+    
+    def clusters(self) -> List[Dict[str, Any]]:
+        """所有集群最近一次快照，按集群名称排列"""
+        return self._query(f"""
+            SELECT s.id AS snapshot_id, {', '.join('s.' + column for column in SNAPSHOT_COLUMNS)},
+                   counts.snapshots
+            FROM snapshots s
+            JOIN (SELECT cluster_uuid, MAX(collected_at) AS latest, COUNT(*) AS snapshots
+                  FROM snapshots GROUP BY cluster_uuid) counts
+              ON s.cluster_uuid = counts.cluster_uuid AND s.collected_at = counts.latest
+            ORDER BY s.cluster_name, s.cluster_uuid
+        """)
+    
+    def cluster_trend(self, cluster_uuid: str, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """单个集群各次快照的集群级指标，按收集时间排列"""
+        return self._query(f"""
+            SELECT id AS snapshot_id, {', '.join(SNAPSHOT_COLUMNS)}
+            FROM snapshots
+            WHERE cluster_uuid = ? AND collected_at >= ?
+            ORDER BY collected_at
+        """, (cluster_uuid, since or 0))
+    
+    def node_trend(self, cluster_uuid: str, node_name: Optional[str] = None,
+                   since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """单个集群（可指定节点）各次快照的节点指标，按收集时间和节点名排列"""
+        sql = f"""
+            SELECT s.collected_at, {', '.join('n.' + column for column in NODE_COLUMNS)}
+            FROM node_metrics n JOIN snapshots s ON n.snapshot_id = s.id
+            WHERE s.cluster_uuid = ? AND s.collected_at >= ?
+        """
+        params = [cluster_uuid, since or 0]
+        if node_name:
+            sql += " AND n.node_name = ?"
+            params.append(node_name)
+        return self._query(sql + " ORDER BY s.collected_at, n.node_name", tuple(params))
+    
+    def index_trend(self, cluster_uuid: str, index_pattern: str,
+                    since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        单个集群中匹配的索引在各次快照中的指标
+        
+        Args:
+            index_pattern: 索引名，可使用 * 通配符，例如 logs-*
+        """
+        return self._query(f"""
+            SELECT s.collected_at, {', '.join('i.' + column for column in INDEX_COLUMNS)}
+            FROM index_metrics i JOIN snapshots s ON i.snapshot_id = s.id
+            WHERE s.cluster_uuid = ? AND s.collected_at >= ? AND i.index_name GLOB ?
+            ORDER BY s.collected_at, i.index_name
+        """, (cluster_uuid, since or 0, index_pattern))
+    
+    def top_nodes(self, metric: str = 'heap_percent', limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        所有集群最近一次快照中指标最高的节点
+        
+        Raises:
+            ValueError: 不支持的指标
+        """
+        if metric not in NODE_METRICS:
+            raise ValueError(f"不支持的节点指标: {metric}")
+        return self._query(f"""
+            SELECT s.cluster_uuid, s.cluster_name, s.collected_at, {', '.join('n.' + column for column in NODE_COLUMNS)}
+            FROM node_metrics n
+            JOIN snapshots s ON n.snapshot_id = s.id
+            JOIN (SELECT cluster_uuid, MAX(collected_at) AS latest FROM snapshots GROUP BY cluster_uuid) latest
+              ON s.cluster_uuid = latest.cluster_uuid AND s.collected_at = latest.latest
+            WHERE n.{metric} IS NOT NULL
+            ORDER BY n.{metric} DESC
+            LIMIT ?
+        """, (limit,))
+    
+    def stats(self) -> Dict[str, Any]:
+        """存储的集群、快照、节点和索引记录数"""
+        conn = self._connect()
+        return {
+            'db_path': self.db_path,
+            'clusters': conn.execute("SELECT COUNT(DISTINCT cluster_uuid) FROM snapshots").fetchone()[0],
+            'snapshots': conn.execute("SELECT COUNT(*) FROM snapshots").fetchone()[0],
+            'node_rows': conn.execute("SELECT COUNT(*) FROM node_metrics").fetchone()[0],
+            'index_rows': conn.execute("SELECT COUNT(*) FROM index_metrics").fetchone()[0]
+        }
+
+
+def create_fleet_store() -> Optional[FleetMetricsStore]:
+    """设置了 ESREPORT_FLEET_DB 时创建指标存储，否则返回None（不记录）"""
+    if not os.getenv('ESREPORT_FLEET_DB'):
+        return None
+    return FleetMetricsStore()
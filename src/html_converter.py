@@ -10,85 +10,164 @@ import os
 import re
 from datetime import datetime
 
-def markdown_to_html(markdown_content):
-    """
-    将Markdown内容转换为HTML
-    优化显示效果和表格处理
-    """
-    html = markdown_content
-    
+# 行内代码是行内转换中唯一可能跨行的规则，分块转换时不能在未配对的反引号之后切分
+_INLINE_CODE = re.compile(r'`([^`]+)`')
+# 可以切分段落的位置：恰好两个换行，前后都不是换行
+_PARAGRAPH_BREAK = re.compile(r'(?<=[^\n])\n\n(?=[^\n])')
+
+def _convert_inline(text):
+    """转义HTML特殊字符，处理标题、粗体、强调和行内代码"""
     # 转义HTML特殊字符
-    html = html.replace('&', '&amp;')
-    html = html.replace('<', '&lt;')
-    html = html.replace('>', '&gt;')
+    text = text.replace('&', '&amp;')
+    text = text.replace('<', '&lt;')
+    text = text.replace('>', '&gt;')
     
     # 标题处理
-    html = re.sub(r'^### (.*?)$', r'<h3>\1</h3>', html, flags=re.MULTILINE)
-    html = re.sub(r'^## (.*?)$', r'<h2>\1</h2>', html, flags=re.MULTILINE)
-    html = re.sub(r'^# (.*?)$', r'<h1>\1</h1>', html, flags=re.MULTILINE)
+    text = re.sub(r'^### (.*?)$', r'<h3>\1</h3>', text, flags=re.MULTILINE)
+    text = re.sub(r'^## (.*?)$', r'<h2>\1</h2>', text, flags=re.MULTILINE)
+    text = re.sub(r'^# (.*?)$', r'<h1>\1</h1>', text, flags=re.MULTILINE)
     
     # 粗体和强调
-    html = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', html)
-    html = re.sub(r'\*(.*?)\*', r'<em>\1</em>', html)
+    text = re.sub(r'\*\*(.*?)\*\*', r'<strong>\1</strong>', text)
+    text = re.sub(r'\*(.*?)\*', r'<em>\1</em>', text)
     
     # 代码块处理
-    html = re.sub(r'`([^`]+)`', r'<code>\1</code>', html)
+    return _INLINE_CODE.sub(r'<code>\1</code>', text)
+
+def _wrap_paragraphs(html):
+    """简单的段落处理"""
+    html = html.replace('\n\n', '</p><p>')
+    html = '<p>' + html + '</p>'
+    html = html.replace('<p><h', '<h').replace('</h1></p>', '</h1>')
+    html = html.replace('</h2></p>', '</h2>').replace('</h3></p>', '</h3>')
+    html = html.replace('<p><table', '<table').replace('</table></p>', '</table>')
+    html = html.replace('<p><ul>', '<ul>').replace('</ul></p>', '</ul>')
+    html = html.replace('<p></p>', '')
+    return html
+
+class MarkdownHtmlConverter:
+    """
+    分块将Markdown转换为HTML，拼接结果与一次性转换完全相同
     
-    # 表格处理
-    lines = html.split('\n')
-    result_lines = []
-    in_table = False
-    table_buffer = []
+    feed() 返回已经确定的HTML，尚未结束的行、表格、段落以及未配对的行内代码留在缓冲区中，
+    close() 返回剩余部分。内存占用与最大的段落（或表格）相当，而不是整份报告。
+    """
+    
+    def __init__(self):
+        self._markdown = ''   # 尚未做行内转换的Markdown
+        self._line = ''       # 尚未结束的行
+        self._table = None    # 正在收集的表格行
+        self._last = None     # 上一个输出行，用于判断列表的开始和结束
+        self._html = ''       # 尚未做段落处理的HTML
+    
+    def feed(self, markdown_content):
+        """追加Markdown内容，返回可以确定的HTML"""
+        self._markdown += markdown_content
+        end = self._split_point()
+        if end:
+            self._feed_lines(_convert_inline(self._markdown[:end]))
+            self._markdown = self._markdown[end:]
+        return self._flush_paragraphs()
+    
+    def close(self):
+        """结束转换，返回剩余的HTML"""
+        self._feed_lines(_convert_inline(self._markdown))
+        self._markdown = ''
+        self._process_line(self._line)
+        self._line = ''
+        
+        # 处理最后的表格和列表
+        if self._table:
+            self._emit(process_table(self._table))
+            self._table = None
+        if self._last.strip().startswith('<li>'):
+            self._emit('</ul>')
+        
+        return self._flush_paragraphs(final=True)
+    
+    def _split_point(self):
+        """可以做行内转换的前缀长度：在最后一个换行之后，且前缀中的反引号都已配对"""
+        end = self._markdown.rfind('\n') + 1
+        if not end:
+            return 0
+        last = 0
+        for match in _INLINE_CODE.finditer(self._markdown, 0, end):
+            last = match.end()
+        tick = self._markdown.find('`', last, end)
+        if tick == -1:
+            return end
+        # 未配对的反引号可能与后续内容中的反引号组成行内代码，在它所在的行之前切分
+        return self._markdown.rfind('\n', last, tick) + 1
+    
+    def _feed_lines(self, text):
+        lines = (self._line + text).split('\n')
+        self._line = lines.pop()
+        for line in lines:
+            self._process_line(line)
     
-    for line in lines:
+    def _emit(self, line):
+        self._html += line if self._last is None else '\n' + line
+        self._last = line
+    
+    def _process_line(self, line):
+        """表格和列表处理"""
         stripped = line.strip()
         
         if stripped.startswith('|') and stripped.endswith('|'):
-            if not in_table:
-                in_table = True
-                table_buffer = []
-            table_buffer.append(line)
+            if self._table is None:
+                self._table = []
+            self._table.append(line)
+            return
+        
+        if self._table is not None:
+            self._emit(process_table(self._table))
+            self._table = None
+        
+        # 处理列表
+        if stripped.startswith('- '):
+            if self._last is not None and not self._last.strip().startswith('<li>'):
+                self._emit('<ul>')
+            
+            list_content = stripped[2:].strip()
+            self._emit(f'<li>{list_content}</li>')
         else:
-            if in_table:
-                html_table = process_table(table_buffer)
-                result_lines.append(html_table)
-                in_table = False
-                table_buffer = []
+            if self._last is not None and self._last.strip().startswith('<li>'):
+                self._emit('</ul>')
             
-            # 处理列表
-            if stripped.startswith('- '):
-                if result_lines and not result_lines[-1].strip().startswith('<li>'):
-                    result_lines.append('<ul>')
-                
-                list_content = stripped[2:].strip()
-                result_lines.append(f'<li>{list_content}</li>')
-            else:
-                if result_lines and result_lines[-1].strip().startswith('<li>'):
-                    result_lines.append('</ul>')
-                
-                result_lines.append(line)
-    
-    # 处理最后的表格和列表
-    if in_table and table_buffer:
-        html_table = process_table(table_buffer)
-        result_lines.append(html_table)
-    
-    if result_lines and result_lines[-1].strip().startswith('<li>'):
-        result_lines.append('</ul>')
+            self._emit(line)
     
-    html = '\n'.join(result_lines)
-    
-    # 简单的段落处理
-    html = html.replace('\n\n', '</p><p>')
-    html = '<p>' + html + '</p>'
-    html = html.replace('<p><h', '<h').replace('</h1></p>', '</h1>')
-    html = html.replace('</h2></p>', '</h2>').replace('</h3></p>', '</h3>')
-    html = html.replace('<p><table', '<table').replace('</table></p>', '</table>')
-    html = html.replace('<p><ul>', '<ul>').replace('</ul></p>', '</ul>')
-    html = html.replace('<p></p>', '')
+    def _flush_paragraphs(self, final=False):
+        """在最后一个段落分隔处切分，返回分隔之前的段落HTML"""
+        if final:
+            html, self._html = self._html, ''
+            return _wrap_paragraphs(html)
+        
+        last = None
+        for last in _PARAGRAPH_BREAK.finditer(self._html):
+            pass
+        if last is None:
+            return ''
+        html, self._html = self._html[:last.start()], self._html[last.end():]
+        return _wrap_paragraphs(html)
+
+def markdown_to_html(markdown_content, table_class=None):
+    """
+    将Markdown内容转换为HTML
+    优化显示效果和表格处理
     
+    Args:
+        table_class: 表格的 class 属性（如Web页面使用的 Bootstrap 样式），默认不设置
+    """
+    converter = MarkdownHtmlConverter()
+    html = converter.feed(markdown_content) + converter.close()
+    if table_class:
+        html = html.replace('<table>', table_open_tag(table_class))
     return html
 
+def table_open_tag(table_class=None):
+    """表格的开始标签"""
+    return f'<table class="{table_class}">' if table_class else '<table>'
+
 def process_table(table_lines):
     """处理表格转换"""
     if len(table_lines) < 2:
@@ -98,7 +177,7 @@ def process_table(table_lines):
     header_cells = [cell.strip() for cell in header_line.split('|')[1:-1]]
     data_lines = table_lines[2:] if len(table_lines) > 2 else []
     
-    html = ['<table>']
+    html = [table_open_tag()]
     
     # 表头
     if header_cells:
@@ -130,7 +209,17 @@ def create_html_template(content, title="Elasticsearch 巡检报告"):
     创建完整的HTML模板
     优化Web显示和打印样式
     """
-    return f"""<!DOCTYPE html>
+    head, tail = html_template_parts(title)
+    return head + content + tail
+
+def html_template_parts(title="Elasticsearch 巡检报告"):
+    """
+    HTML模板在正文之前和之后的部分，用于流式写出HTML报告
+    
+    Returns:
+        (head, tail) 元组
+    """
+    head = f"""<!DOCTYPE html>
 <html lang="zh-CN">
 <head>
     <meta charset="UTF-8">
@@ -315,10 +404,64 @@ def create_html_template(content, title="Elasticsearch 巡检报告"):
 </head>
 <body>
     <div class="container">
-        {content}
+        """
+    tail = """
     </div>
 </body>
 </html>"""
+    return head, tail
+
+class HtmlReportWriter:
+    """
+    流式写出HTML报告：先写入模板头部，Markdown分块转换后直接写入文件，close() 时写入模板尾部
+    
+    用法:
+        writer = HtmlReportWriter(output_path)
+        for chunk in chunks:
+            writer.write(chunk)
+        writer.close()
+    
+    指定 fragments 列表时，转换得到的HTML片段（不含模板）同时追加到该列表中，
+    ''.join(fragments) 与 markdown_to_html(markdown, table_class=fragment_table_class) 的结果相同；
+    fragment_table_class 只影响 fragments，HTML文件中的表格不变
+    """
+    
+    def __init__(self, output_path, title="Elasticsearch 巡检报告", fragments=None, fragment_table_class=None):
+        self.output_path = output_path
+        self.converter = MarkdownHtmlConverter()
+        self.fragments = fragments
+        # Markdown中的 < 都已转义，转换结果中的 <table> 只可能来自 process_table
+        self._fragment_table_tag = table_open_tag(fragment_table_class) if fragment_table_class else None
+        head, self._tail = html_template_parts(title)
+        self._file = open(output_path, 'w', encoding='utf-8')
+        self._file.write(head)
+    
+    def write(self, markdown_chunk):
+        self._write_fragment(self.converter.feed(markdown_chunk))
+    
+    def close(self):
+        """写入剩余内容和模板尾部，返回HTML文件路径"""
+        try:
+            self._write_fragment(self.converter.close())
+            self._file.write(self._tail)
+        finally:
+            self._file.close()
+        return self.output_path
+    
+    def abort(self):
+        """放弃写出，删除未完成的HTML文件"""
+        self._file.close()
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+        if self.fragments is not None:
+            self.fragments.clear()
+    
+    def _write_fragment(self, html):
+        self._file.write(html)
+        if self.fragments is not None:
+            if self._fragment_table_tag:
+                html = html.replace('<table>', self._fragment_table_tag)
+            self.fragments.append(html)
 
 def save_html_report(markdown_content, output_path, title="Elasticsearch 巡检报告"):
     """
@@ -333,15 +476,14 @@ def save_html_report(markdown_content, output_path, title="Elasticsearch 巡检
         生成的HTML文件路径
     """
     try:
-        # 转换为HTML
-        html_content = markdown_to_html(markdown_content)
-        
-        # 创建完整HTML
-        full_html = create_html_template(html_content, title)
-        
-        # 保存文件
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(full_html)
+        # 转换为HTML并保存
+        writer = HtmlReportWriter(output_path, title)
+        try:
+            writer.write(markdown_content)
+        except Exception:
+            writer.abort()
+            raise
+        writer.close()
         
         print(f"✅ HTML报告已保存: {output_path}")
         return output_path
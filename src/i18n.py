@@ -31,6 +31,8 @@ TRANSLATIONS = {
             'english': 'English',
             
             # 状态提示
+            'status_queued': '等待分析...',
+            'status_queued_desc': '任务已提交，正在排队等待处理',
             'status_uploading': '正在上传文件...',
             'status_uploading_desc': '文件上传中，请稍候',
             'status_extracting': '正在解压文件...',
@@ -57,6 +59,10 @@ TRANSLATIONS = {
             'error_invalid_zip': '文件不是有效的ZIP格式',
             'error_processing': '处理文件时发生错误',
             'error_server': '服务器错误',
+            'error_queue_full': '当前分析任务过多，请稍后重试',
+            'error_job_not_found': '分析任务不存在或已过期',
+            'section_loading': '正在加载章节...',
+            'error_section_load': '章节加载失败',
             
             # 进度
             'progress_completed': '% 完成',
@@ -266,6 +272,8 @@ TRANSLATIONS = {
             'english': 'English',
             
             # Status messages
+            'status_queued': 'Waiting for analysis...',
+            'status_queued_desc': 'Job submitted and waiting in queue',
             'status_uploading': 'Uploading file...',
             'status_uploading_desc': 'File upload in progress, please wait',
             'status_extracting': 'Extracting file...',
@@ -292,6 +300,10 @@ TRANSLATIONS = {
             'error_invalid_zip': 'File is not a valid ZIP format',
             'error_processing': 'Error occurred while processing file',
             'error_server': 'Server error',
+            'error_queue_full': 'Too many analysis jobs in progress, please try again later',
+            'error_job_not_found': 'Analysis job not found or expired',
+            'section_loading': 'Loading section...',
+            'error_section_load': 'Failed to load section',
             
             # Progress
             'progress_completed': '% completed',
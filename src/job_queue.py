@@ -0,0 +1,231 @@
+"""
+分析任务队列
+使用有界线程池在后台执行诊断分析，记录任务阶段和章节进度供前端轮询
+"""
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Callable, List, Optional
+
+
+DEFAULT_JOB_WORKERS = 2
+DEFAULT_JOB_QUEUE_SIZE = 16
+# 已结束任务的保留时间（秒）
+JOB_RETENTION_SECONDS = 3600
+
+# 各阶段开始时的总进度百分比，章节生成在 analyzing 和 generating 之间按完成数推进
+STAGE_PROGRESS = {
+    'queued': 0,
+    'uploading': 5,
+    'extracting': 15,
+    'analyzing': 20,
+    'generating': 90,
+    'completed': 100
+}
+
+
+class JobQueueFullError(Exception):
+    """等待和运行中的任务数达到上限"""
+    pass
+
+
+class Job:
+    """单个分析任务的进度句柄，由任务函数调用以上报阶段和章节进度"""
+    
+    def __init__(self, job_id: str, state: Dict[str, Any], lock: threading.Lock,
+                 on_change: Optional[Callable[[], None]] = None):
+        self.job_id = job_id
+        self._state = state
+        self._lock = lock
+        self._on_change = on_change
+    
+    def _changed(self):
+        if self._on_change:
+            self._on_change()
+    
+    def set_stage(self, stage: str):
+        """进入新的处理阶段"""
+        with self._lock:
+            changed = self._state['stage'] != stage
+            self._state['stage'] = stage
+            self._state['progress'] = max(self._state['progress'], STAGE_PROGRESS.get(stage, 0))
+        if changed:
+            self._changed()
+    
+    def set_sections(self, section_names: List[str]):
+        """登记需要生成的章节"""
+        with self._lock:
+            self._state['sections'] = {name: 'pending' for name in section_names}
+        self._changed()
+    
+    def set_section_status(self, section_name: str, status: str):
+        """更新单个章节状态（pending / running / done）"""
+        with self._lock:
+            sections = self._state['sections']
+            sections[section_name] = status
+            done = sum(1 for value in sections.values() if value == 'done')
+            start = STAGE_PROGRESS['analyzing']
+            end = STAGE_PROGRESS['generating']
+            progress = start + (end - start) * done // max(len(sections), 1)
+            self._state['progress'] = max(self._state['progress'], progress)
+        self._changed()
+    
+    def report_progress(self, event: Dict[str, Any]):
+        """
+        处理 ESReportGenerator.generate_report 的进度事件
+        
+        Args:
+            event: 包含 stage，以及可选的 sections 或 section/status 的字典
+        """
+        if 'sections' in event:
+            self.set_sections(event['sections'])
+        if event.get('stage'):
+            self.set_stage(event['stage'])
+        if 'section' in event:
+            self.set_section_status(event['section'], event.get('status', 'done'))
+
+
+class JobQueue:
+    """有界的后台分析任务队列"""
+    
+    def __init__(self, jobs: Optional[Dict[str, Dict[str, Any]]] = None,
+                 max_workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 state_store=None):
+        """
+        初始化任务队列
+        
+        Args:
+            jobs: 保存任务状态的字典（默认新建）
+            max_workers: 并发执行的任务数，默认读取 ESREPORT_JOB_WORKERS
+            max_pending: 等待和运行中的任务上限，默认读取 ESREPORT_JOB_QUEUE_SIZE
+            state_store: 可选的共享状态存储（提供 save_job/load_job），
+                         多worker部署时任意进程都能查询其他进程提交的任务
+        """
+        self.jobs = jobs if jobs is not None else {}
+        self.state_store = state_store
+        self.max_workers = max_workers or int(os.getenv('ESREPORT_JOB_WORKERS', DEFAULT_JOB_WORKERS))
+        self.max_pending = max_pending or int(os.getenv('ESREPORT_JOB_QUEUE_SIZE', DEFAULT_JOB_QUEUE_SIZE))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='esreport-job')
+        self._lock = threading.Lock()
+    
+    def _snapshot(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """任务状态的对外快照（调用方持有锁）"""
+        snapshot = {key: value for key, value in state.items() if not key.startswith('_')}
+        snapshot['sections'] = dict(state['sections'])
+        return snapshot
+    
+    def _persist(self, state: Dict[str, Any]):
+        """将任务状态写入共享存储"""
+        if self.state_store is None:
+            return
+        with self._lock:
+            snapshot = self._snapshot(state)
+        try:
+            self.state_store.save_job(snapshot['job_id'], snapshot)
+        except Exception as e:
+            print(f"⚠️ 保存任务状态失败 {snapshot['job_id']}: {e}")
+    
+    def _active_count(self) -> int:
+        return sum(1 for state in self.jobs.values() if state['status'] in ('queued', 'running'))
+    
+    def _prune_finished(self):
+        """清理超过保留时间的已结束任务"""
+        now = time.time()
+        expired = [
+            job_id for job_id, state in self.jobs.items()
+            if state['status'] in ('completed', 'failed')
+            and now - state['_finished_ts'] > JOB_RETENTION_SECONDS
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
+    
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> str:
+        """
+        提交任务
+        
+        Args:
+            func: 任务函数，第一个参数为 Job 进度句柄，返回值作为任务结果
+        
+        Returns:
+            任务ID
+        
+        Raises:
+            JobQueueFullError: 等待和运行中的任务数达到上限
+        """
+        with self._lock:
+            self._prune_finished()
+            if self._active_count() >= self.max_pending:
+                raise JobQueueFullError(f"job queue is full ({self.max_pending})")
+            
+            job_id = str(uuid.uuid4())
+            state = {
+                'job_id': job_id,
+                'status': 'queued',
+                'stage': 'queued',
+                'progress': 0,
+                'sections': {},
+                'result': None,
+                'error': None,
+                'created_at': datetime.now().isoformat(),
+                'started_at': None,
+                'finished_at': None,
+                '_finished_ts': None
+            }
+            self.jobs[job_id] = state
+        
+        job = Job(job_id, state, self._lock, on_change=lambda: self._persist(state))
+        self._persist(state)
+        self._executor.submit(self._run, job, state, func, args, kwargs)
+        return job_id
+    
+    def _run(self, job: Job, state: Dict[str, Any], func: Callable[..., Any], args, kwargs):
+        with self._lock:
+            state['status'] = 'running'
+            state['started_at'] = datetime.now().isoformat()
+        self._persist(state)
+        
+        try:
+            result = func(job, *args, **kwargs)
+        except Exception as e:
+            print(f"❌ 任务 {job.job_id} 执行失败: {e}")
+            with self._lock:
+                state['status'] = 'failed'
+                state['error'] = str(e)
+                state['finished_at'] = datetime.now().isoformat()
+                state['_finished_ts'] = time.time()
+            self._persist(state)
+            return
+        
+        with self._lock:
+            state['status'] = 'completed'
+            state['stage'] = 'completed'
+            state['progress'] = 100
+            state['result'] = result
+            state['finished_at'] = datetime.now().isoformat()
+            state['_finished_ts'] = time.time()
+        self._persist(state)
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取任务状态快照
+        
+        Returns:
+            任务状态字典，任务不存在返回None
+        """
+        with self._lock:
+            state = self.jobs.get(job_id)
+            if state is not None:
+                return self._snapshot(state)
+        
+        # 任务可能由其他worker进程提交
+        if self.state_store is not None:
+            return self.state_store.load_job(job_id)
+        return None
+    
+    def shutdown(self, wait: bool = True):
+        """关闭工作线程池"""
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,284 @@
+"""
+日志扫描引擎
+对诊断包中的每个日志文件只做一次流式扫描，同时产出日志分析所需的全部聚合结果
+"""
+
+import posixpath
+import re
+from collections import Counter
+from datetime import datetime
+
+
+# 日志格式 [timestamp][LEVEL][component] message
+LOG_LINE_PATTERN = re.compile(r'\[([^\]]+)\]\[([^\]]+)\]\[([^\]]+)\]\s*(.+)')
+LOG_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S,%f'
+
+ERROR_LEVELS = ('ERROR', 'FATAL')
+WARNING_LEVELS = ('WARN',)
+
+# 重要事件关键字
+IMPORTANT_KEYWORDS = [
+    'ClusterApplierService', 'removed', 'added', 'master', 'node',
+    'shard', 'allocation', 'recovery', 'timeout', 'exception'
+]
+
+EVENT_CATEGORIES = ['cluster_changes', 'node_events', 'shard_events', 'performance_issues', 'other']
+
+# 每种类型保留的示例条数，以及case文件中保留的原始条目数
+ERROR_EXAMPLES_PER_TYPE = 3
+WARNING_EXAMPLES_PER_TYPE = 2
+RECENT_EVENTS_PER_CATEGORY = 3
+CASE_ERRORS_LIMIT = 50
+CASE_WARNINGS_LIMIT = 50
+CASE_EVENTS_LIMIT = 30
+
+# 错误消息中的异常类名，例如 org.elasticsearch.transport.NodeDisconnectedException
+EXCEPTION_CLASS_PATTERN = re.compile(r'\b(?:[a-z_]\w*\.)*([A-Z]\w*(?:Exception|Error))\b')
+ERROR_SIGNATURE_EXAMPLE_LENGTH = 200
+
+
+def classify_error(message: str) -> str:
+    """错误类型分类，返回与语言无关的类型键"""
+    message_lower = message.lower()
+    if 'Exception' in message:
+        return 'exception'
+    elif 'timeout' in message_lower:
+        return 'timeout'
+    elif 'connection' in message_lower:
+        return 'connection'
+    elif 'allocation' in message_lower:
+        return 'allocation'
+    elif 'shard' in message_lower:
+        return 'shard'
+    else:
+        return 'other'
+
+
+def error_signature(component: str, message: str) -> str:
+    """错误签名：组件名加异常类名，比 classify_error 的分类更细，用于比较两个诊断包的错误种类"""
+    match = EXCEPTION_CLASS_PATTERN.search(message)
+    component = component.strip()
+    return f"{component} {match.group(1)}" if match else component
+
+
+def classify_warning(message: str) -> str:
+    """警告类型分类，返回与语言无关的类型键"""
+    message_lower = message.lower()
+    if 'heap' in message_lower:
+        return 'heap'
+    elif 'disk' in message_lower:
+        return 'disk'
+    elif 'slow' in message_lower:
+        return 'slow'
+    elif 'connection' in message_lower:
+        return 'connection'
+    elif 'timeout' in message_lower:
+        return 'timeout'
+    else:
+        return 'other'
+
+
+def categorize_event(message: str) -> str:
+    """重要事件分类"""
+    message_lower = message.lower()
+    
+    if any(keyword in message_lower for keyword in ['added', 'removed', 'master', 'cluster']):
+        return 'cluster_changes'
+    elif 'node' in message_lower:
+        return 'node_events'
+    elif 'shard' in message_lower:
+        return 'shard_events'
+    elif any(keyword in message_lower for keyword in ['slow', 'timeout', 'performance']):
+        return 'performance_issues'
+    else:
+        return 'other'
+
+
+class LogScanResult:
+    """一次日志扫描的聚合结果"""
+    
+    def __init__(self, logs_dir: str):
+        self.logs_dir = logs_dir
+        self.logs_dir_exists = False
+        self.error = None
+        
+        # 文件统计
+        self.log_files = []
+        self.total_size = 0
+        self.current_log_size = 0
+        self.compressed_count = 0
+        
+        # 按级别统计（所有能解析出日志头的行）
+        self.level_counts = Counter()
+        
+        # 错误 / 警告按类型统计
+        self.error_types = Counter()
+        self.error_examples = {}
+        self.error_signatures = Counter()
+        self.error_signature_examples = {}
+        self.warning_types = Counter()
+        self.warning_examples = {}
+        
+        # 重要事件按类别统计
+        self.event_counts = Counter()
+        self.recent_events = {category: [] for category in EVENT_CATEGORIES}
+        
+        # case文件使用的原始条目（按扫描顺序截取）
+        self.errors = []
+        self.warnings = []
+        self.important_events = []
+    
+    @property
+    def error_count(self) -> int:
+        """ERROR/FATAL条目数"""
+        return sum(self.error_types.values())
+    
+    @property
+    def warning_count(self) -> int:
+        """WARN条目数"""
+        return sum(self.warning_types.values())
+    
+    @property
+    def has_errors(self) -> bool:
+        return self.error_count > 0
+    
+    @property
+    def has_warnings(self) -> bool:
+        return self.warning_count > 0
+
+
+class LogScanner:
+    """日志扫描器：每个文件只读取一遍"""
+    
+    def __init__(self, source, logs_dir: str = 'logs'):
+        """
+        初始化日志扫描器
+        
+        Args:
+            source: 诊断数据源（目录或ZIP）
+            logs_dir: 日志目录在数据源中的相对路径
+        """
+        self.source = source
+        self.logs_dir = logs_dir
+    
+    def scan(self) -> LogScanResult:
+        """
+        扫描日志目录
+        
+        Returns:
+            包含所有聚合结果的LogScanResult
+        """
+        result = LogScanResult(self.logs_dir)
+        
+        if not self.source.isdir(self.logs_dir):
+            return result
+        result.logs_dir_exists = True
+        
+        try:
+            filenames = sorted(self.source.listdir(self.logs_dir))
+        except Exception as e:
+            result.error = str(e)
+            return result
+        
+        for filename in filenames:
+            if not (filename.endswith('.log') or filename.endswith('.log.gz')):
+                continue
+            file_path = posixpath.join(self.logs_dir, filename)
+            if not self.source.isfile(file_path):
+                continue
+            
+            try:
+                file_size = self.source.getsize(file_path)
+                mod_time = datetime.fromtimestamp(self.source.getmtime(file_path))
+            except OSError:
+                continue
+            
+            compressed = filename.endswith('.gz')
+            result.log_files.append({
+                'name': filename,
+                'size': file_size,
+                'modified': mod_time,
+                'compressed': compressed
+            })
+            result.total_size += file_size
+            if compressed:
+                result.compressed_count += 1
+            else:
+                result.current_log_size += file_size
+                # 只分析未压缩的日志内容
+                self._scan_file(file_path, filename, result)
+        
+        return result
+    
+    def _scan_file(self, file_path: str, filename: str, result: LogScanResult):
+        """流式扫描单个日志文件，一次产出所有聚合"""
+        try:
+            with self.source.open_text(file_path, errors='ignore') as f:
+                for line in f:
+                    self._scan_line(line, filename, result)
+        except Exception as e:
+            print(f"解析日志文件 {file_path} 失败: {e}")
+    
+    def _scan_line(self, line: str, filename: str, result: LogScanResult):
+        """处理单行日志"""
+        line = line.strip()
+        if not line:
+            return
+        
+        match = LOG_LINE_PATTERN.match(line)
+        if not match:
+            return
+        
+        timestamp_str, level, component, message = match.groups()
+        result.level_counts[level] += 1
+        
+        is_error = level in ERROR_LEVELS
+        is_warning = level in WARNING_LEVELS
+        is_important = any(keyword in line for keyword in IMPORTANT_KEYWORDS)
+        if not (is_error or is_warning or is_important):
+            return
+        
+        try:
+            timestamp = datetime.strptime(timestamp_str, LOG_TIMESTAMP_FORMAT)
+        except ValueError:
+            # 时间戳解析失败，跳过这条日志
+            return
+        
+        entry = {
+            'timestamp': timestamp,
+            'level': level,
+            'component': component,
+            'message': message,
+            'file': filename
+        }
+        
+        if is_error:
+            error_type = classify_error(message)
+            result.error_types[error_type] += 1
+            examples = result.error_examples.setdefault(error_type, [])
+            if len(examples) < ERROR_EXAMPLES_PER_TYPE:
+                examples.append(entry)
+            signature = error_signature(component, message)
+            result.error_signatures[signature] += 1
+            result.error_signature_examples.setdefault(signature, message[:ERROR_SIGNATURE_EXAMPLE_LENGTH])
+            if len(result.errors) < CASE_ERRORS_LIMIT:
+                result.errors.append(entry)
+        elif is_warning:
+            warning_type = classify_warning(message)
+            result.warning_types[warning_type] += 1
+            examples = result.warning_examples.setdefault(warning_type, [])
+            if len(examples) < WARNING_EXAMPLES_PER_TYPE:
+                examples.append(entry)
+            if len(result.warnings) < CASE_WARNINGS_LIMIT:
+                result.warnings.append(entry)
+        
+        if is_important:
+            category = categorize_event(message)
+            result.event_counts[category] += 1
+            recent = result.recent_events[category]
+            recent.append(entry)
+            if len(recent) > RECENT_EVENTS_PER_CATEGORY:
+                recent.sort(key=lambda x: x['timestamp'], reverse=True)
+                del recent[RECENT_EVENTS_PER_CATEGORY:]
+            if len(result.important_events) < CASE_EVENTS_LIMIT:
+                result.important_events.append(entry)
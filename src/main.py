@@ -10,9 +10,16 @@ import os
 import sys
 import argparse
 from datetime import datetime
+from urllib.parse import urlsplit
 
-from es_inspector import ElasticsearchInspector
-from report_generator import ESReportGenerator
+from .batch import BatchReportRunner, find_bundles
+from .bundle_diff import BundleDiff
+from .data_loader import ESDataLoader
+from .es_inspector import ElasticsearchInspector
+from .fleet_metrics import FleetMetricsStore
+from .profiling import PROFILE_MODES
+from .report_generator import ESReportGenerator, CASE_FILE_MODES, REPORT_GENERATOR_VERSION
+from .section_cache import SectionCache
 
 def main():
     """
@@ -24,6 +31,18 @@ def main():
     
     # 同时生成HTML报告
     python -m src.main --data-dir ./diagnostic-data --format both
+    
+    # 使用4个线程并发生成章节
+    python -m src.main --data-dir ./diagnostic-data --workers 4
+    
+    # 直接从在线集群收集诊断数据并生成报告
+    python -m src.main --es-url https://es.example.com:9200 --es-user elastic
+    
+    # 并行生成目录下所有诊断包的报告
+    python -m src.main --batch ./monthly-diagnostics
+    
+    # 生成报告的同时与上周的诊断数据对比
+    python -m src.main --data-dir ./diagnostic-this-week --baseline-dir ./diagnostic-last-week
     """
     
     parser = argparse.ArgumentParser(
@@ -34,12 +53,63 @@ def main():
   %(prog)s --data-dir ./local-diagnostics-20250528-142459
   %(prog)s --data-dir ./diagnostic-data --format html
   %(prog)s --data-dir ./diagnostic-data --output-dir ./reports
+  %(prog)s --data-dir ./diagnostic-data --workers 4 --process-workers 2
+  %(prog)s --data-dir ./diagnostic-data --baseline-dir ./diagnostic-last-week
+  %(prog)s --data-dir ./diagnostic-data --profile
+  %(prog)s --batch './monthly-diagnostics/*.zip' --batch-workers 8
+  %(prog)s --es-url http://localhost:9200 --es-concurrency 4
+  %(prog)s --es-url http://localhost:9200 --es-minimal
+  %(prog)s --es-url http://localhost:9200 --es-rate-samples 3 --es-rate-interval 30
         """
     )
     
-    parser.add_argument('--data-dir', 
-                       required=True,
-                       help='诊断数据目录路径')
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument('--data-dir',
+                              help='诊断数据目录路径')
+    source_group.add_argument('--es-url',
+                              help='在线集群地址，收集诊断数据后生成报告，例如 http://localhost:9200 (未指定端口时使用9200)')
+    source_group.add_argument('--batch',
+                              help='批量模式: 包含诊断ZIP或诊断目录的目录，或通配符，例如 "./diagnostics/*.zip"')
+    
+    parser.add_argument('--es-user',
+                       help='在线集群用户名')
+    
+    parser.add_argument('--es-password',
+                       default=os.getenv('ES_PASSWORD'),
+                       help='在线集群密码 (默认读取环境变量 ES_PASSWORD)')
+    
+    parser.add_argument('--insecure',
+                       action='store_true',
+                       help='不验证在线集群的SSL证书')
+    
+    parser.add_argument('--es-concurrency',
+                       type=int,
+                       default=1,
+                       help='收集诊断数据时同时发往集群的最大请求数 (默认: 1)')
+    
+    parser.add_argument('--es-minimal',
+                       action='store_true',
+                       help='精简收集: 只请求报告用到的字段，分片信息按索引分页获取，适用于超大集群')
+    
+    parser.add_argument('--es-rate-samples',
+                       type=int,
+                       default=0,
+                       help='采样节点统计的次数，至少2次时在报告中输出采样区间内的吞吐、延迟和GC (默认: 0，不采样)')
+    
+    parser.add_argument('--es-rate-interval',
+                       type=float,
+                       default=10,
+                       help='两次节点统计采样之间的间隔秒数 (默认: 10)')
+    
+    parser.add_argument('--collect-dir',
+                       help='在线收集的诊断数据保存目录 (默认: <output-dir>/diagnostic-<时间戳>)')
+    
+    parser.add_argument('--baseline-dir',
+                       help='作为基线的较早一次诊断数据（目录或ZIP），指定后额外生成两次诊断的对比报告')
+    
+    parser.add_argument('--fleet-db',
+                       default=os.getenv('ESREPORT_FLEET_DB'),
+                       help='集群群组指标数据库，指定后把本次报告的集群、节点和索引指标写入该SQLite文件 (默认读取环境变量 ESREPORT_FLEET_DB)')
     
     parser.add_argument('--output-dir', 
                        default='output',
@@ -50,6 +120,45 @@ def main():
                        default='markdown',
                        help='报告格式 (默认: markdown)')
     
+    parser.add_argument('--workers',
+                       type=int,
+                       default=1,
+                       help='并发生成章节的线程数 (默认: 1，按顺序生成)')
+    
+    parser.add_argument('--process-workers',
+                       type=int,
+                       default=0,
+                       help='在子进程中生成索引分析、节点信息等CPU密集章节的进程数 (默认: 0，不使用进程池)')
+    
+    parser.add_argument('--batch-workers',
+                       type=int,
+                       help='批量模式的并行进程数 (默认: CPU核数)')
+    
+    parser.add_argument('--force',
+                       action='store_true',
+                       help='批量模式下忽略已生成的报告，全部重新生成')
+    
+    parser.add_argument('--profile',
+                       nargs='?',
+                       const='cprofile',
+                       choices=PROFILE_MODES,
+                       help='性能剖析：逐章节写出折叠调用栈、峰值内存以及 pstats/callgrind（cprofile，默认）到case目录，'
+                            'sampling 只做调用栈采样，开销更小')
+    
+    parser.add_argument('--case-files',
+                       choices=CASE_FILE_MODES,
+                       default='json',
+                       help='case文件格式：json（默认）、compact（压缩JSON）、ndjson-gz（gzip压缩的NDJSON）、none（不生成）')
+    
+    parser.add_argument('--section-cache',
+                       default=os.getenv('ESREPORT_SECTION_CACHE_DIR'),
+                       help='章节缓存目录，输入文件未变化的章节直接使用缓存，批量模式下各诊断包共享 (默认读取环境变量 ESREPORT_SECTION_CACHE_DIR)')
+    
+    parser.add_argument('--language',
+                       choices=['zh', 'en'],
+                       default='zh',
+                       help='报告语言 (默认: zh)')
+    
     parser.add_argument('--verbose', '-v',
                        action='store_true',
                        help='显示详细输出')
@@ -57,23 +166,40 @@ def main():
     args = parser.parse_args()
     
     # 检查数据目录
-    if not os.path.exists(args.data_dir):
+    if args.data_dir and not os.path.exists(args.data_dir):
         print(f"❌ 错误: 数据目录不存在: {args.data_dir}")
         sys.exit(1)
     
+    if args.baseline_dir and not os.path.exists(args.baseline_dir):
+        print(f"❌ 错误: 基线数据不存在: {args.baseline_dir}")
+        sys.exit(1)
+    
     # 确保输出目录存在
     os.makedirs(args.output_dir, exist_ok=True)
     
+    if args.batch:
+        run_batch(args)
+        return
+    
+    if args.es_url:
+        args.data_dir = collect_from_cluster(args)
+    
     print("🔍 Elasticsearch 巡检工具")
     print("="*60)
     print(f"📁 数据目录: {args.data_dir}")
     print(f"📄 输出目录: {args.output_dir}")
     print(f"📋 生成格式: {args.format}")
+    print(f"⚙️ 并发线程: {args.workers}, 进程: {args.process_workers}")
     print("="*60)
     
     try:
         # 创建报告生成器
-        generator = ESReportGenerator(args.data_dir, args.output_dir)
+        fleet_store = FleetMetricsStore(args.fleet_db) if args.fleet_db else None
+        section_cache = SectionCache(args.section_cache, REPORT_GENERATOR_VERSION) if args.section_cache else None
+        generator = ESReportGenerator(args.data_dir, args.output_dir, language=args.language,
+                                      workers=args.workers, process_workers=args.process_workers,
+                                      fleet_store=fleet_store, profile=args.profile,
+                                      case_files=args.case_files, section_cache=section_cache)
         
         # 确定是否生成HTML
         generate_html = args.format in ['html', 'both']
@@ -87,6 +213,18 @@ def main():
         if 'html' in result:
             print(f"🌐 HTML: {result['html']}")
         
+        if generator.cached_sections:
+            print(f"⚡ 使用章节缓存: {', '.join(generator.cached_sections)}")
+        
+        if generator.profiler is not None:
+            print(f"🔬 性能剖析: {result['profile']}")
+            print(generator.profiler.format_summary())
+        
+        if args.baseline_dir:
+            comparison_path = compare_with_baseline(generator.data_loader, args.baseline_dir, args.output_dir,
+                                                    language=args.language)
+            print(f"🔀 对比报告: {comparison_path}")
+        
         print(f"\n💡 报告已保存到: {args.output_dir}")
         
     except KeyboardInterrupt:
@@ -99,5 +237,86 @@ def main():
             traceback.print_exc()
         sys.exit(1)
 
+def run_batch(args):
+    """批量生成报告，有诊断包失败时以非零状态退出"""
+    bundles = find_bundles(args.batch)
+    if not bundles:
+        print(f"❌ 错误: 未找到诊断包: {args.batch}")
+        sys.exit(1)
+    
+    runner = BatchReportRunner(args.output_dir, language=args.language, workers=args.batch_workers,
+                               generate_html=args.format in ['html', 'both'],
+                               fleet_db=args.fleet_db, force=args.force, case_files=args.case_files,
+                               section_cache_dir=args.section_cache)
+    summary = runner.run(bundles)
+    print(f"💡 群组汇总已保存到: {args.output_dir}")
+    if summary['failed']:
+        sys.exit(1)
+
+def compare_with_baseline(data_loader: ESDataLoader, baseline_dir: str, output_dir: str,
+                          language: str = 'zh') -> str:
+    """
+    与基线诊断数据对比并写入Markdown对比报告
+    
+    Args:
+        data_loader: 本次诊断数据
+        baseline_dir: 基线诊断数据目录或ZIP
+        output_dir: 输出目录
+        language: 报告语言
+    
+    Returns:
+        对比报告路径
+    """
+    print(f"🔀 与基线对比: {baseline_dir}")
+    baseline = ESDataLoader(baseline_dir)
+    try:
+        content = BundleDiff(data_loader, baseline, language=language).generate()
+    finally:
+        baseline.source.close()
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    comparison_path = os.path.join(output_dir, f"ES_Comparison_{timestamp}.md")
+    with open(comparison_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return comparison_path
+
+def collect_from_cluster(args) -> str:
+    """
+    从在线集群收集诊断数据
+    
+    Returns:
+        诊断数据目录
+    """
+    url = urlsplit(args.es_url)
+    use_ssl = url.scheme == 'https'
+    config = {
+        'host': url.hostname or 'localhost',
+        'port': url.port or 9200,
+        'username': args.es_user,
+        'password': args.es_password,
+        'use_ssl': use_ssl,
+        'verify_certs': not args.insecure,
+        'max_concurrency': args.es_concurrency,
+        'rate_samples': args.es_rate_samples,
+        'rate_interval': args.es_rate_interval
+    }
+    
+    collect_dir = args.collect_dir or os.path.join(
+        args.output_dir, f"diagnostic-{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    )
+    
+    try:
+        inspector = ElasticsearchInspector(config)
+        result = inspector.collect_diagnostic(collect_dir, minimal=args.es_minimal)
+    except Exception as e:
+        print(f"❌ 诊断数据收集失败: {e}")
+        sys.exit(1)
+    
+    if 'cluster_health.json' not in result['files']:
+        print("❌ 未能获取集群健康信息，无法生成报告")
+        sys.exit(1)
+    
+    return collect_dir
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
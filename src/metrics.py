@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prometheus 指标
+进程内的计数器、直方图和仪表盘，按 Prometheus 文本格式 (0.0.4) 输出，不依赖 prometheus_client。
+多worker部署时每个进程各自统计，由 Prometheus 按实例分别抓取
+"""
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+
+
+# 默认直方图分桶（秒），覆盖毫秒级接口到数分钟的报告生成
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """指标基类：名称、说明、标签名以及按标签值保存的数据"""
+    
+    kind = 'untyped'
+    
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"指标 {self.name} 的标签应为 {self.label_names}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+    
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+    
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    
+    kind = 'counter'
+    
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("计数器只能增加")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """
+    仪表盘：可直接设置，或提供 callback 在输出时取值
+    
+    callback 返回 {标签值元组: 数值}（无标签时也可直接返回数值）
+    """
+    
+    kind = 'gauge'
+    
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 callback: Optional[Callable[[], Any]] = None):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+    
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+    
+    def _samples(self) -> List[str]:
+        if self.callback is not None:
+            try:
+                values = self.callback()
+            except Exception as e:
+                print(f"⚠️ 读取指标 {self.name} 失败: {e}")
+                return []
+            if not isinstance(values, dict):
+                values = {(): values}
+            items = sorted((tuple(str(v) for v in key), value) for key, value in values.items() if value is not None)
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图，同时记录总和与次数"""
+    
+    kind = 'histogram'
+    
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+    
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['buckets'][i] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+    
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry['count'] if entry else 0
+    
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, dict(entry, buckets=list(entry['buckets']))) for key, entry in self._values.items())
+        lines = []
+        for key, entry in items:
+            for bound, count in zip(self.buckets, entry['buckets']):
+                labels = _format_labels(self.label_names, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {entry['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(entry['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {entry['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，指标名统一加上命名空间前缀"""
+    
+    def __init__(self, namespace: str = 'esreport'):
+        self.namespace = namespace
+        self._metrics = {}
+        self._lock = threading.Lock()
+    
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"指标 {metric.name} 已注册")
+            self._metrics[metric.name] = metric
+        return metric
+    
+    def _full_name(self, name: str) -> str:
+        return f"{self.namespace}_{name}" if self.namespace else name
+    
+    def counter(self, name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(self._full_name(name), documentation, labels))
+    
+    def gauge(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+              callback: Optional[Callable[[], Any]] = None) -> Gauge:
+        return self._register(Gauge(self._full_name(name), documentation, labels, callback))
+    
+    def histogram(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self._full_name(name), documentation, labels, buckets))
+    
+    def render(self) -> str:
+        """Prometheus 文本格式"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(metric.render() for metric in metrics) + '\n'
+
+
+class StageMetrics:
+    """
+    处理阶段的耗时直方图、处理字节数计数器和失败计数器
+    
+    用法:
+        with stage_metrics.track('save') as stage:
+            ...
+            stage['bytes'] = os.path.getsize(path)
+    """
+    
+    def __init__(self, registry: MetricsRegistry, name: str = 'stage', label: str = 'stage',
+                 description: str = '处理阶段'):
+        self.label = label
+        self.seconds = registry.histogram(f'{name}_duration_seconds', f'{description}耗时（秒）', (label,))
+        self.bytes = registry.counter(f'{name}_bytes_total', f'{description}处理的字节数', (label,))
+        self.errors = registry.counter(f'{name}_errors_total', f'{description}失败次数', (label,))
+    
+    def observe(self, stage: str, seconds: float, bytes_processed: int = 0):
+        self.seconds.observe(seconds, **{self.label: stage})
+        if bytes_processed:
+            self.bytes.inc(bytes_processed, **{self.label: stage})
+    
+    @contextmanager
+    def track(self, stage: str, bytes_processed: int = 0) -> Iterator[Dict[str, int]]:
+        """计时代码块；块内可设置 bytes，抛出异常时计入失败次数后继续抛出"""
+        record = {'bytes': bytes_processed}
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            self.errors.inc(**{self.label: stage})
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - start, record['bytes'])
+
+
+def numeric_stats(stats: Dict[str, Any], prefix: str = '') -> Dict[Tuple[str], float]:
+    """把（嵌套的）统计字典展开为 {(键,): 数值}，用作仪表盘 callback 的返回值"""
+    values = {}
+    for key, value in (stats or {}).items():
+        if isinstance(value, dict):
+            values.update(numeric_stats(value, f"{prefix}{key}_"))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            values[(f"{prefix}{key}",)] = value
+    return values
@@ -1,4 +1,4 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterator
 from datetime import datetime
 from ..data_loader import ESDataLoader
 from ..i18n import I18n
@@ -7,6 +7,15 @@ from ..i18n import I18n
 class ClusterBasicInfoGenerator:
     """集群基础信息生成器"""
     
+    # 章节内容用到的诊断文件（支持通配符），用作章节缓存键
+    INPUT_FILES = (
+        'cluster_stats.json',
+        'cluster_health.json',
+        'master.json',
+        'nodes.json',
+        'cluster_settings.json'
+    )
+    
     def __init__(self, data_loader: ESDataLoader, language: str = "zh"):
         self.data_loader = data_loader
         self.language = language
@@ -14,36 +23,36 @@ class ClusterBasicInfoGenerator:
     
     def generate(self) -> str:
         """生成集群基础信息内容"""
+        return ''.join(self.generate_chunks())
+    
+    def generate_chunks(self) -> Iterator[str]:
+        """逐个小节生成集群基础信息内容，供报告流式写出"""
         cluster_stats = self.data_loader.get_cluster_stats()
         cluster_health = self.data_loader.get_cluster_health()
         master_info = self.data_loader.load_json_file('master.json')
         nodes_info = self.data_loader.get_nodes()
         cluster_settings = self.data_loader.load_json_file('cluster_settings.json')
         
-        content = ""
-        
         # 3.1 集群标识信息
-        content += self._generate_cluster_identity(cluster_stats, cluster_health)
+        yield self._generate_cluster_identity(cluster_stats, cluster_health)
         
         # 3.2 主节点信息
-        content += self._generate_master_info(master_info, nodes_info)
+        yield self._generate_master_info(master_info, nodes_info)
         
         # 3.3 集群拓扑结构
-        content += self._generate_topology_info(cluster_stats, nodes_info)
+        yield self._generate_topology_info(cluster_stats, nodes_info)
         
         # 3.4 集群设置概览
-        content += self._generate_settings_overview(cluster_settings, nodes_info)
+        yield self._generate_settings_overview(cluster_settings, nodes_info)
         
         # 3.5 集群状态统计
-        content += self._generate_status_statistics(cluster_stats, cluster_health)
+        yield self._generate_status_statistics(cluster_stats, cluster_health)
         
         # 3.6 存储架构
-        content += self._generate_storage_architecture(cluster_stats)
+        yield self._generate_storage_architecture(cluster_stats)
         
         # 3.7 分片分布策略
-        content += self._generate_shard_strategy(cluster_settings, cluster_stats)
-        
-        return content
+        yield self._generate_shard_strategy(cluster_settings, cluster_stats)
     
     def _generate_cluster_identity(self, cluster_stats: Dict, cluster_health: Dict) -> str:
         """生成集群标识信息"""
@@ -1,7 +1,8 @@
-from typing import Dict, Any, List, Tuple, Set
+from typing import Dict, Any, List, Tuple, Set, Iterator
 from datetime import datetime, timedelta
 from collections import defaultdict
 from ..data_loader import ESDataLoader
+from ..log_scanner import ERROR_LEVELS, WARNING_LEVELS
 import json
 import os
 from ..i18n import I18n
@@ -10,6 +11,19 @@ from ..i18n import I18n
 class FinalRecommendationsGenerator:
     """最终建议生成器"""
     
+    # 章节内容用到的诊断文件（支持通配符），用作章节缓存键
+    INPUT_FILES = (
+        'cluster_health.json',
+        'cluster_settings.json',
+        'cluster_stats.json',
+        'indices_stats.json',
+        'nodes_stats.json',
+        'settings.json',
+        'commercial/ilm_policies.json',
+        'logs/*.log',
+        'logs/*.log.gz'
+    )
+    
     def __init__(self, data_loader: ESDataLoader, language: str = "zh"):
         self.data_loader = data_loader
         self.language = language
@@ -17,18 +31,18 @@ class FinalRecommendationsGenerator:
     
     def generate(self) -> str:
         """生成最终建议内容"""
-        content = ""
-        
+        return ''.join(self.generate_chunks())
+    
+    def generate_chunks(self) -> Iterator[str]:
+        """逐个小节生成最终建议内容，供报告流式写出"""
         # 7.1 集群健康状况评估
-        content += self._generate_health_assessment()
+        yield self._generate_health_assessment()
         
         # 7.2 需要业务确认的配置项
-        content += self._generate_business_confirmation_items()
+        yield self._generate_business_confirmation_items()
         
         # 7.3 优化建议
-        content += self._generate_optimization_recommendations()
-        
-        return content
+        yield self._generate_optimization_recommendations()
     
     def _generate_health_assessment(self) -> str:
         """生成集群健康状况评估"""
@@ -440,9 +454,9 @@ The following optimization recommendations are based on current cluster conditio
     
     def _assess_log_health(self) -> Dict[str, Any]:
         """评估日志健康状况"""
-        logs_dir = os.path.join(self.data_loader.data_dir, 'logs')
+        scan = self.data_loader.get_log_scan()
         
-        if not os.path.exists(logs_dir):
+        if not scan.logs_dir_exists:
             if self.language == 'en':
                 return {
                     'status': '⚠️',
@@ -457,33 +471,16 @@ The following optimization recommendations are based on current cluster conditio
                 }
         
         try:
-            # 统计日志文件信息
-            log_files = []
-            total_size = 0
-            current_log_size = 0
-            compressed_count = 0
+            if scan.error:
+                raise OSError(scan.error)
             
-            for filename in os.listdir(logs_dir):
-                if filename.endswith('.log') or filename.endswith('.log.gz'):
-                    file_path = os.path.join(logs_dir, filename)
-                    if os.path.isfile(file_path):
-                        file_size = os.path.getsize(file_path)
-                        total_size += file_size
-                        
-                        if filename.endswith('.gz'):
-                            compressed_count += 1
-                        else:
-                            current_log_size += file_size
-                        
-                        log_files.append({
-                            'name': filename,
-                            'size': file_size,
-                            'compressed': filename.endswith('.gz')
-                        })
+            # 日志文件信息和错误/警告统计均来自共享的日志扫描结果
+            log_files = scan.log_files
+            total_size = scan.total_size
+            compressed_count = scan.compressed_count
             
-            # 检查错误和警告
-            has_errors = self._check_log_errors(logs_dir)
-            has_warnings = self._check_log_warnings(logs_dir)
+            has_errors = any(scan.level_counts[level] for level in ERROR_LEVELS)
+            has_warnings = any(scan.level_counts[level] for level in WARNING_LEVELS)
             
             # 评估健康状况
             status = "✅"
@@ -590,34 +587,6 @@ The following optimization recommendations are based on current cluster conditio
                     'details': []
                 }
     
-    def _check_log_errors(self, logs_dir: str) -> bool:
-        """检查是否存在错误日志"""
-        try:
-            for filename in os.listdir(logs_dir):
-                if filename.endswith('.log'):  # 只检查未压缩的日志
-                    file_path = os.path.join(logs_dir, filename)
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        for line in f:
-                            if '[ERROR]' in line or '[FATAL]' in line:
-                                return True
-        except Exception:
-            pass
-        return False
-    
-    def _check_log_warnings(self, logs_dir: str) -> bool:
-        """检查是否存在警告日志"""
-        try:
-            for filename in os.listdir(logs_dir):
-                if filename.endswith('.log'):  # 只检查未压缩的日志
-                    file_path = os.path.join(logs_dir, filename)
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        for line in f:
-                            if '[WARN]' in line:
-                                return True
-        except Exception:
-            pass
-        return False
-    
     def _format_log_size(self, size_bytes: int) -> str:
         """格式化日志文件大小"""
         if size_bytes < 1024:
@@ -7,6 +7,12 @@ from ..i18n import I18n
 class ExecutiveSummaryGenerator:
     """执行摘要生成器"""
     
+    # 章节内容用到的诊断文件（支持通配符），用作章节缓存键
+    INPUT_FILES = (
+        'cluster_health.json',
+        'cluster_stats.json'
+    )
+    
     def __init__(self, data_loader: ESDataLoader, language: str = "zh"):
         self.data_loader = data_loader
         self.language = language
@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Iterator
 from datetime import datetime, timedelta
 from ..data_loader import ESDataLoader
 from ..i18n import I18n
@@ -8,6 +8,14 @@ import re
 class IndexAnalysisGenerator:
     """索引分析生成器"""
     
+    # 章节内容用到的诊断文件（支持通配符），用作章节缓存键
+    INPUT_FILES = (
+        'cluster_stats.json',
+        'cluster_health.json',
+        'nodes_stats.json',
+        'indices.json'
+    )
+    
     def __init__(self, data_loader: ESDataLoader, language: str = "zh"):
         self.data_loader = data_loader
         self.language = language
@@ -15,30 +23,30 @@ class IndexAnalysisGenerator:
     
     def generate(self) -> str:
         """生成索引分析内容"""
-        content = ""
-        
+        return ''.join(self.generate_chunks())
+    
+    def generate_chunks(self) -> Iterator[str]:
+        """逐个小节生成索引分析内容，供报告流式写出"""
         # 5.1 索引概览统计
-        content += self._generate_index_overview()
+        yield self._generate_index_overview()
         
         # 5.2 索引详细信息表
-        content += self._generate_index_details_table()
+        yield self._generate_index_details_table()
         
         # 5.3 索引健康状态分析
-        content += self._generate_index_health_analysis()
+        yield self._generate_index_health_analysis()
         
         # 5.4 索引模式与分布
-        content += self._generate_index_patterns_distribution()
+        yield self._generate_index_patterns_distribution()
         
         # 5.5 分片分布分析
-        content += self._generate_shard_distribution_analysis()
+        yield self._generate_shard_distribution_analysis()
         
         # 5.6 索引性能指标
-        content += self._generate_index_performance_metrics()
+        yield self._generate_index_performance_metrics()
         
         # 5.7 索引优化建议
-        content += self._generate_index_optimization_recommendations()
-        
-        return content
+        yield self._generate_index_optimization_recommendations()
     
     def _generate_index_overview(self) -> str:
         """生成索引概览统计"""
@@ -206,40 +214,13 @@ class IndexAnalysisGenerator:
 |----------|------|----------|--------|----------|----------|----------|
 """
         
-        # 从分片数据中解析索引信息
-        indices_data = self.data_loader.load_json_file('indices.json')
-        if not indices_data:
+        # 从分片表中获取按索引聚合的信息
+        shard_table = self.data_loader.get_shard_table()
+        if not shard_table:
             content += "| N/A | N/A | N/A | N/A | N/A | N/A | N/A |\n\n"
             return content
         
-        # 解析索引信息
-        index_info = {}
-        for shard in indices_data:
-            index_name = shard.get('index', 'unknown')
-            if index_name not in index_info:
-                index_info[index_name] = {
-                    'primary_shards': 0,
-                    'replica_shards': 0,
-                    'docs': 0,
-                    'store_bytes': 0,
-                    'status': 'UNKNOWN'
-                }
-            
-            if shard.get('prirep') == 'p':  # primary
-                index_info[index_name]['primary_shards'] += 1
-            else:  # replica
-                index_info[index_name]['replica_shards'] += 1
-            
-            # 累计文档数和存储大小（只计算主分片，避免重复）
-            if shard.get('prirep') == 'p':
-                docs = shard.get('docs')
-                store = shard.get('store')
-                if docs and docs.isdigit():
-                    index_info[index_name]['docs'] += int(docs)
-                if store and store.isdigit():
-                    index_info[index_name]['store_bytes'] += int(store)
-            
-            index_info[index_name]['status'] = shard.get('state', 'UNKNOWN')
+        index_info = shard_table.index_stats()
         
         # 选择典型索引
         typical_indices = self._select_typical_indices(index_info)
@@ -388,9 +369,9 @@ class IndexAnalysisGenerator:
 """
         
         cluster_health = self.data_loader.get_cluster_health()
-        indices_data = self.data_loader.load_json_file('indices.json')
+        shard_table = self.data_loader.get_shard_table()
         
-        if not indices_data:
+        if not shard_table:
             if self.language == 'en':
                 content += "❌ **Unable to retrieve index status information**\n\n"
             else:
@@ -398,28 +379,8 @@ class IndexAnalysisGenerator:
             return content
         
         # 统计不同状态的索引
-        index_status = {}
-        problem_indices = []
-        
-        for shard in indices_data:
-            index_name = shard.get('index', 'unknown')
-            shard_state = shard.get('state', 'UNKNOWN')
-            
-            if index_name not in index_status:
-                index_status[index_name] = {'states': set(), 'shard_count': 0}
-            
-            index_status[index_name]['states'].add(shard_state)
-            index_status[index_name]['shard_count'] += 1
-            
-            # 检查问题分片
-            if shard_state not in ['STARTED']:
-                problem_indices.append({
-                    'index': index_name,
-                    'shard': shard.get('shard', 'N/A'),
-                    'type': shard.get('prirep', 'N/A'),
-                    'state': shard_state,
-                    'node': shard.get('node', 'N/A')
-                })
+        index_status = shard_table.index_stats()
+        problem_indices = shard_table.problem_shards()
         
         # 计算健康状态统计
         green_indices = 0
@@ -518,18 +479,16 @@ class IndexAnalysisGenerator:
 
 """
         
-        indices_data = self.data_loader.load_json_file('indices.json')
-        if not indices_data:
+        shard_table = self.data_loader.get_shard_table()
+        if not shard_table:
             if self.language == 'en':
                 content += "❌ **Unable to retrieve index information**\n\n"
             else:
                 content += "❌ **无法获取索引信息**\n\n"
             return content
         
-        # 提取所有唯一索引名
-        index_names = set()
-        for shard in indices_data:
-            index_names.add(shard.get('index', 'unknown'))
+        # 所有唯一索引名
+        index_names = shard_table.index_names
         
         # 分析命名模式
         patterns = {
@@ -585,30 +544,16 @@ class IndexAnalysisGenerator:
 
 """
         
-        indices_data = self.data_loader.load_json_file('indices.json')
-        if not indices_data:
+        shard_table = self.data_loader.get_shard_table()
+        if not shard_table:
             if self.language == 'en':
                 content += "❌ **Unable to retrieve shard information**\n\n"
             else:
                 content += "❌ **无法获取分片信息**\n\n"
             return content
         
-        # 统计各节点分片分布
-        node_shard_stats = {}
-        for shard in indices_data:
-            node = shard.get('node', 'unknown')
-            if node not in node_shard_stats:
-                node_shard_stats[node] = {'primary': 0, 'replica': 0, 'total_size': 0}
-            
-            if shard.get('prirep') == 'p':
-                node_shard_stats[node]['primary'] += 1
-            else:
-                node_shard_stats[node]['replica'] += 1
-            
-            # 累计存储大小
-            store = shard.get('store')
-            if store and store.isdigit():
-                node_shard_stats[node]['total_size'] += int(store)
+        # 各节点分片分布
+        node_shard_stats = shard_table.node_stats()
         
         # 按节点名排序
         sorted_nodes = sorted(node_shard_stats.items())
@@ -631,14 +576,9 @@ class IndexAnalysisGenerator:
         else:
             content += "\n#### 5.5.2 分片大小分布\n\n"
         
-        shard_sizes = []
-        for shard in indices_data:
-            store = shard.get('store')
-            if store and store.isdigit():
-                shard_sizes.append(int(store))
+        shard_sizes = shard_table.shard_sizes()
         
         if shard_sizes:
-            shard_sizes.sort()
             total_shards = len(shard_sizes)
             
             size_ranges = [
@@ -801,7 +741,7 @@ class IndexAnalysisGenerator:
 """
         
         cluster_stats = self.data_loader.get_cluster_stats()
-        indices_data = self.data_loader.load_json_file('indices.json')
+        shard_table = self.data_loader.get_shard_table()
         nodes_stats = self.data_loader.get_nodes_stats()
         
         issues = []
@@ -814,7 +754,7 @@ class IndexAnalysisGenerator:
                 if 'roles' in stats and 'data' in stats['roles']:
                     data_node_count += 1
         
-        if indices_data:
+        if shard_table:
             # 分析索引配置问题
             oversized_indices = []
             undersized_shards = []
@@ -822,37 +762,17 @@ class IndexAnalysisGenerator:
             high_doc_count_indices = []
             inefficient_shard_distribution = []
             
-            # 过滤应用索引
-            app_indices = {}
-            for shard in indices_data:
-                index_name = shard.get('index', 'unknown')
-                if index_name.startswith('.'):
-                    continue  # 跳过系统索引
-                
-                if index_name not in app_indices:
-                    app_indices[index_name] = {
-                        'primary_shards': 0,
-                        'docs': 0,
-                        'total_size': 0,
-                        'max_shard_size': 0
-                    }
-                
-                if shard.get('prirep') == 'p':  # 只统计主分片
-                    app_indices[index_name]['primary_shards'] += 1
-                    
-                    docs = shard.get('docs')
-                    store = shard.get('store')
-                    
-                    if docs and docs.isdigit():
-                        app_indices[index_name]['docs'] += int(docs)
-                    
-                    if store and store.isdigit():
-                        shard_size = int(store)
-                        app_indices[index_name]['total_size'] += shard_size
-                        app_indices[index_name]['max_shard_size'] = max(
-                            app_indices[index_name]['max_shard_size'], 
-                            shard_size
-                        )
+            # 过滤应用索引（文档数和大小只统计主分片）
+            app_indices = {
+                index_name: {
+                    'primary_shards': info['primary_shards'],
+                    'docs': info['docs'],
+                    'total_size': info['store_bytes'],
+                    'max_shard_size': info['max_shard_size']
+                }
+                for index_name, info in shard_table.index_stats().items()
+                if not index_name.startswith('.')  # 跳过系统索引
+            }
             
             # 检查各类问题
             for index_name, info in app_indices.items():
@@ -978,9 +898,20 @@ class IndexAnalysisGenerator:
         return content
     
     def get_case_data(self) -> Dict[str, Any]:
-        """获取用于检查的原始数据"""
+        """
+        获取用于检查的数据
+        
+        索引和分片信息取自生成章节时已经构建的分片表（按索引聚合的统计和问题分片），
+        不再重新解析并原样输出体积很大的 indices.json
+        """
+        shard_table = self.data_loader.get_shard_table()
+        index_stats = {
+            index_name: dict(info, states=sorted(info['states']))
+            for index_name, info in shard_table.index_stats().items()
+        }
         return {
             "cluster_stats": self.data_loader.get_cluster_stats(),
             "cluster_health": self.data_loader.get_cluster_health(),
-            "indices_data": self.data_loader.load_json_file('indices.json')
+            "index_stats": index_stats,
+            "problem_shards": shard_table.problem_shards()
         } 
\ No newline at end of file
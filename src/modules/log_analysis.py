@@ -1,17 +1,17 @@
 import os
-import gzip
-import re
-from typing import Dict, Any, List, Tuple
-from datetime import datetime, timedelta
-from collections import defaultdict, Counter
+from typing import Dict, Any, List, Tuple, Iterator
+from datetime import datetime
+from collections import Counter
 from ..data_loader import ESDataLoader
+from ..log_scanner import EVENT_CATEGORIES
 from ..i18n import I18n
-import time
 
 
 class LogAnalysisGenerator:
     """日志分析生成器"""
     
+    # 不声明 INPUT_FILES：日志文件的修改时间和距今天数会写入报告，章节内容不只取决于文件内容，不缓存
+    
     def __init__(self, data_loader: ESDataLoader, language: str = "zh"):
         self.data_loader = data_loader
         self.language = language
@@ -20,24 +20,24 @@ class LogAnalysisGenerator:
     
     def generate(self) -> str:
         """生成日志分析内容"""
-        content = ""
-        
+        return ''.join(self.generate_chunks())
+    
+    def generate_chunks(self) -> Iterator[str]:
+        """逐个小节生成日志分析内容，供报告流式写出"""
         # 6.1 日志文件概览
-        content += self._generate_log_overview()
+        yield self._generate_log_overview()
         
         # 6.2 错误日志分析
-        content += self._generate_error_analysis()
+        yield self._generate_error_analysis()
         
         # 6.3 警告信息分析
-        content += self._generate_warning_analysis()
+        yield self._generate_warning_analysis()
         
         # 6.4 日志累积情况分析
-        content += self._generate_log_accumulation_analysis()
+        yield self._generate_log_accumulation_analysis()
         
         # 6.5 重要事件分析
-        content += self._generate_important_events_analysis()
-        
-        return content
+        yield self._generate_important_events_analysis()
     
     def _generate_log_overview(self) -> str:
         """生成日志文件概览"""
@@ -50,40 +50,25 @@ class LogAnalysisGenerator:
 
 """
         
-        if not os.path.exists(self.logs_dir):
+        scan = self.data_loader.get_log_scan()
+        
+        if not scan.logs_dir_exists:
             if self.language == 'en':
                 content += "❌ **Log directory does not exist**, unable to perform log analysis\n\n"
             else:
                 content += "❌ **日志目录不存在**，无法进行日志分析\n\n"
             return content
         
-        log_files = []
-        total_size = 0
-        
-        try:
-            for filename in os.listdir(self.logs_dir):
-                if filename.endswith('.log') or filename.endswith('.log.gz'):
-                    file_path = os.path.join(self.logs_dir, filename)
-                    if os.path.isfile(file_path):
-                        file_size = os.path.getsize(file_path)
-                        total_size += file_size
-                        
-                        # 获取文件修改时间
-                        mod_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                        
-                        log_files.append({
-                            'name': filename,
-                            'size': file_size,
-                            'modified': mod_time,
-                            'compressed': filename.endswith('.gz')
-                        })
-        except Exception as e:
+        if scan.error:
             if self.language == 'en':
-                content += f"❌ **Failed to read log directory**: {e}\n\n"
+                content += f"❌ **Failed to read log directory**: {scan.error}\n\n"
             else:
-                content += f"❌ **读取日志目录失败**: {e}\n\n"
+                content += f"❌ **读取日志目录失败**: {scan.error}\n\n"
             return content
         
+        log_files = list(scan.log_files)
+        total_size = scan.total_size
+        
         if not log_files:
             if self.language == 'en':
                 content += "⚠️ **No log files found**\n\n"
@@ -171,9 +156,9 @@ class LogAnalysisGenerator:
 
 """
         
-        errors = self._extract_log_entries(['ERROR', 'FATAL'])
+        scan = self.data_loader.get_log_scan()
         
-        if not errors:
+        if not scan.has_errors:
             if self.language == 'en':
                 content += "✅ **No ERROR or FATAL level error logs found**\n\n"
             else:
@@ -181,14 +166,8 @@ class LogAnalysisGenerator:
             return content
         
         # 按错误类型统计
-        error_types = Counter()
-        error_examples = defaultdict(list)
-        
-        for error in errors:
-            error_type = self._extract_error_type(error['message'])
-            error_types[error_type] += 1
-            if len(error_examples[error_type]) < 3:  # 保存前3个例子
-                error_examples[error_type].append(error)
+        error_types = scan.error_types
+        error_examples = scan.error_examples
         
         if self.language == 'en':
             content += f"""#### 6.2.1 Error Statistics
@@ -205,7 +184,7 @@ class LogAnalysisGenerator:
         
         for error_type, count in error_types.most_common(10):
             latest_error = max(error_examples[error_type], key=lambda x: x['timestamp'])
-            content += f"| {error_type} | {count} | {latest_error['timestamp'].strftime('%Y-%m-%d %H:%M:%S')} |\n"
+            content += f"| {self._error_type_name(error_type)} | {count} | {latest_error['timestamp'].strftime('%Y-%m-%d %H:%M:%S')} |\n"
         
         # 详细错误信息
         if error_types:
@@ -213,7 +192,7 @@ class LogAnalysisGenerator:
                 content += "\n#### 6.2.2 Important Error Details\n\n"
                 
                 for error_type, count in list(error_types.most_common(3)):
-                    content += f"**{error_type}** (Total {count} occurrences):\n"
+                    content += f"**{self._error_type_name(error_type)}** (Total {count} occurrences):\n"
                     for example in error_examples[error_type][:2]:
                         content += f"- {example['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}: {example['message'][:200]}...\n"
                     content += "\n"
@@ -221,7 +200,7 @@ class LogAnalysisGenerator:
                 content += "\n#### 6.2.2 重要错误详情\n\n"
                 
                 for error_type, count in list(error_types.most_common(3)):
-                    content += f"**{error_type}** (共{count}次):\n"
+                    content += f"**{self._error_type_name(error_type)}** (共{count}次):\n"
                     for example in error_examples[error_type][:2]:
                         content += f"- {example['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}: {example['message'][:200]}...\n"
                     content += "\n"
@@ -240,24 +219,22 @@ class LogAnalysisGenerator:
 
 """
         
-        warnings = self._extract_log_entries(['WARN'])
+        scan = self.data_loader.get_log_scan()
         
-        if not warnings:
+        if not scan.has_warnings:
             if self.language == 'en':
                 content += "✅ **No WARN level warning logs found**\n\n"
             else:
                 content += "✅ **未发现WARN级别的警告日志**\n\n"
             return content
         
-        # 按警告类型统计
+        # 按警告类型统计（类型键转换为当前语言的名称）
         warning_types = Counter()
-        warning_examples = defaultdict(list)
-        
-        for warning in warnings:
-            warning_type = self._extract_warning_type(warning['message'])
-            warning_types[warning_type] += 1
-            if len(warning_examples[warning_type]) < 2:
-                warning_examples[warning_type].append(warning)
+        warning_examples = {}
+        for warning_key, count in scan.warning_types.items():
+            warning_type = self._warning_type_name(warning_key)
+            warning_types[warning_type] += count
+            warning_examples[warning_type] = scan.warning_examples[warning_key]
         
         if self.language == 'en':
             content += f"""#### 6.3.1 Warning Statistics
@@ -309,44 +286,28 @@ class LogAnalysisGenerator:
 
 """
         
-        if not os.path.exists(self.logs_dir):
+        scan = self.data_loader.get_log_scan()
+        
+        if not scan.logs_dir_exists:
             if self.language == 'en':
                 content += "❌ **Log directory does not exist**\n\n"
             else:
                 content += "❌ **日志目录不存在**\n\n"
             return content
         
-        # 分析日志文件数量和大小
-        log_files = []
-        total_size = 0
-        current_log_size = 0
-        compressed_count = 0
-        
-        try:
-            for filename in os.listdir(self.logs_dir):
-                if filename.endswith('.log') or filename.endswith('.log.gz'):
-                    file_path = os.path.join(self.logs_dir, filename)
-                    if os.path.isfile(file_path):
-                        file_size = os.path.getsize(file_path)
-                        total_size += file_size
-                        
-                        if filename.endswith('.gz'):
-                            compressed_count += 1
-                        else:
-                            current_log_size += file_size
-                        
-                        log_files.append({
-                            'name': filename,
-                            'size': file_size,
-                            'compressed': filename.endswith('.gz')
-                        })
-        except Exception as e:
+        if scan.error:
             if self.language == 'en':
-                content += f"❌ **Failed to analyze log accumulation**: {e}\n\n"
+                content += f"❌ **Failed to analyze log accumulation**: {scan.error}\n\n"
             else:
-                content += f"❌ **分析日志累积失败**: {e}\n\n"
+                content += f"❌ **分析日志累积失败**: {scan.error}\n\n"
             return content
         
+        # 日志文件数量和大小（来自共享的扫描结果）
+        log_files = scan.log_files
+        total_size = scan.total_size
+        current_log_size = scan.current_log_size
+        compressed_count = scan.compressed_count
+        
         # 累积情况评估
         if self.language == 'en':
             accumulation_status = "Normal"
@@ -447,36 +408,23 @@ class LogAnalysisGenerator:
 
 """
         
-        # 提取重要事件
-        important_events = self._extract_important_events()
+        scan = self.data_loader.get_log_scan()
         
-        if not important_events:
+        if not sum(scan.event_counts.values()):
             if self.language == 'en':
                 content += "✅ **No important events requiring special attention found**\n\n"
             else:
                 content += "✅ **未发现需要特别关注的重要事件**\n\n"
             return content
         
-        # 按事件类型分类
-        event_categories = {
-            'cluster_changes': [],
-            'node_events': [],
-            'shard_events': [],
-            'performance_issues': [],
-            'other': []
-        }
-        
-        for event in important_events:
-            category = self._categorize_event(event['message'])
-            event_categories[category].append(event)
-        
         if self.language == 'en':
             content += "#### 6.5.1 Important Events Overview\n\n"
         else:
             content += "#### 6.5.1 重要事件概览\n\n"
         
-        for category, events in event_categories.items():
-            if events:
+        for category in EVENT_CATEGORIES:
+            event_count = scan.event_counts[category]
+            if event_count:
                 if self.language == 'en':
                     category_name = {
                         'cluster_changes': 'Cluster State Changes',
@@ -495,167 +443,58 @@ class LogAnalysisGenerator:
                     }.get(category, category)
                 
                 if self.language == 'en':
-                    content += f"**{category_name}** ({len(events)} events):\n"
+                    content += f"**{category_name}** ({event_count} events):\n"
                 else:
-                    content += f"**{category_name}** ({len(events)}个事件):\n"
+                    content += f"**{category_name}** ({event_count}个事件):\n"
                 
                 # 显示最近的几个事件
-                for event in sorted(events, key=lambda x: x['timestamp'], reverse=True)[:3]:
+                for event in sorted(scan.recent_events[category], key=lambda x: x['timestamp'], reverse=True)[:3]:
                     content += f"- {event['timestamp'].strftime('%Y-%m-%d %H:%M:%S')}: {event['message'][:150]}...\n"
                 content += "\n"
         
         return content
     
-    def _extract_log_entries(self, levels: List[str]) -> List[Dict]:
-        """提取指定级别的日志条目"""
-        entries = []
-        
-        if not os.path.exists(self.logs_dir):
-            return entries
-        
-        try:
-            for filename in os.listdir(self.logs_dir):
-                if filename.endswith('.log'):  # 只分析未压缩的日志
-                    file_path = os.path.join(self.logs_dir, filename)
-                    entries.extend(self._parse_log_file(file_path, levels))
-        except Exception as e:
-            if self.language == 'en':
-                print(f"Failed to extract log entries: {e}")
-            else:
-                print(f"提取日志条目失败: {e}")
-        
-        return entries
-    
-    def _parse_log_file(self, file_path: str, levels: List[str]) -> List[Dict]:
-        """解析单个日志文件"""
-        entries = []
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # 解析日志格式 [timestamp][LEVEL][component] message
-                    match = re.match(r'\[([^\]]+)\]\[([^\]]+)\]\[([^\]]+)\]\s*(.+)', line)
-                    if match:
-                        timestamp_str, level, component, message = match.groups()
-                        
-                        if level in levels:
-                            try:
-                                # 解析时间戳
-                                timestamp = datetime.strptime(timestamp_str, '%Y-%m-%dT%H:%M:%S,%f')
-                                entries.append({
-                                    'timestamp': timestamp,
-                                    'level': level,
-                                    'component': component,
-                                    'message': message,
-                                    'file': os.path.basename(file_path)
-                                })
-                            except ValueError:
-                                # 时间戳解析失败，跳过这条日志
-                                continue
-        except Exception as e:
-            if self.language == 'en':
-                print(f"Failed to parse log file {file_path}: {e}")
-            else:
-                print(f"解析日志文件 {file_path} 失败: {e}")
-        
-        return entries
-    
-    def _extract_important_events(self) -> List[Dict]:
-        """提取重要事件"""
-        # 定义重要事件的关键字
-        important_keywords = [
-            'ClusterApplierService', 'removed', 'added', 'master', 'node',
-            'shard', 'allocation', 'recovery', 'timeout', 'exception'
-        ]
-        
-        events = []
-        
-        if not os.path.exists(self.logs_dir):
-            return events
-        
-        try:
-            for filename in os.listdir(self.logs_dir):
-                if filename.endswith('.log'):
-                    file_path = os.path.join(self.logs_dir, filename)
-                    events.extend(self._parse_important_events(file_path, important_keywords))
-        except Exception as e:
-            if self.language == 'en':
-                print(f"Failed to extract important events: {e}")
-            else:
-                print(f"提取重要事件失败: {e}")
-        
-        return events
-    
-    def _parse_important_events(self, file_path: str, keywords: List[str]) -> List[Dict]:
-        """解析重要事件"""
-        events = []
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    # 检查是否包含重要关键字
-                    if any(keyword in line for keyword in keywords):
-                        match = re.match(r'\[([^\]]+)\]\[([^\]]+)\]\[([^\]]+)\]\s*(.+)', line)
-                        if match:
-                            timestamp_str, level, component, message = match.groups()
-                            
-                            try:
-                                timestamp = datetime.strptime(timestamp_str, '%Y-%m-%dT%H:%M:%S,%f')
-                                events.append({
-                                    'timestamp': timestamp,
-                                    'level': level,
-                                    'component': component,
-                                    'message': message,
-                                    'file': os.path.basename(file_path)
-                                })
-                            except ValueError:
-                                continue
-        except Exception as e:
-            if self.language == 'en':
-                print(f"Failed to parse important events file {file_path}: {e}")
-            else:
-                print(f"解析重要事件文件 {file_path} 失败: {e}")
-        
-        return events
-    
-    def _extract_error_type(self, message: str) -> str:
-        """提取错误类型"""
-        # 简化的错误类型提取
-        if 'Exception' in message:
-            return 'System Exception' if self.language == 'en' else '系统异常'
-        elif 'timeout' in message.lower():
-            return 'Timeout Error' if self.language == 'en' else '超时错误'
-        elif 'connection' in message.lower():
-            return 'Connection Error' if self.language == 'en' else '连接错误'
-        elif 'allocation' in message.lower():
-            return 'Allocation Error' if self.language == 'en' else '分配错误'
-        elif 'shard' in message.lower():
-            return 'Shard Error' if self.language == 'en' else '分片错误'
+    def _error_type_name(self, error_type: str) -> str:
+        """错误类型名称"""
+        if self.language == 'en':
+            names = {
+                'exception': 'System Exception',
+                'timeout': 'Timeout Error',
+                'connection': 'Connection Error',
+                'allocation': 'Allocation Error',
+                'shard': 'Shard Error'
+            }
+            return names.get(error_type, 'Other Error')
         else:
-            return 'Other Error' if self.language == 'en' else '其他错误'
+            names = {
+                'exception': '系统异常',
+                'timeout': '超时错误',
+                'connection': '连接错误',
+                'allocation': '分配错误',
+                'shard': '分片错误'
+            }
+            return names.get(error_type, '其他错误')
     
-    def _extract_warning_type(self, message: str) -> str:
-        """提取警告类型"""
-        if 'heap' in message.lower():
-            return 'Memory Usage Warning' if self.language == 'en' else '内存使用警告'
-        elif 'disk' in message.lower():
-            return 'Disk Space Warning' if self.language == 'en' else '磁盘空间警告'
-        elif 'slow' in message.lower():
-            return 'Performance Warning' if self.language == 'en' else '性能警告'
-        elif 'connection' in message.lower():
-            return 'Connection Warning' if self.language == 'en' else '连接警告'
-        elif 'timeout' in message.lower():
-            return 'Timeout Warning' if self.language == 'en' else '超时警告'
+    def _warning_type_name(self, warning_type: str) -> str:
+        """警告类型名称"""
+        if self.language == 'en':
+            names = {
+                'heap': 'Memory Usage Warning',
+                'disk': 'Disk Space Warning',
+                'slow': 'Performance Warning',
+                'connection': 'Connection Warning',
+                'timeout': 'Timeout Warning'
+            }
+            return names.get(warning_type, 'Other Warning')
         else:
-            return 'Other Warning' if self.language == 'en' else '其他警告'
+            names = {
+                'heap': '内存使用警告',
+                'disk': '磁盘空间警告',
+                'slow': '性能警告',
+                'connection': '连接警告',
+                'timeout': '超时警告'
+            }
+            return names.get(warning_type, '其他警告')
     
     def _assess_warning_severity(self, warning_type: str, count: int) -> str:
         """评估警告严重程度"""
@@ -687,21 +526,6 @@ class LogAnalysisGenerator:
             }
             return suggestions.get(warning_type, '根据具体情况进行分析和处理')
     
-    def _categorize_event(self, message: str) -> str:
-        """事件分类"""
-        message_lower = message.lower()
-        
-        if any(keyword in message_lower for keyword in ['added', 'removed', 'master', 'cluster']):
-            return 'cluster_changes'
-        elif 'node' in message_lower:
-            return 'node_events'
-        elif 'shard' in message_lower:
-            return 'shard_events'
-        elif any(keyword in message_lower for keyword in ['slow', 'timeout', 'performance']):
-            return 'performance_issues'
-        else:
-            return 'other'
-    
     def _format_size(self, size_bytes: int) -> str:
         """格式化文件大小"""
         if size_bytes < 1024:
@@ -715,33 +539,16 @@ class LogAnalysisGenerator:
     
     def get_case_data(self) -> Dict[str, Any]:
         """获取用于检查的原始数据"""
-        log_files = []
-        errors = []
-        warnings = []
-        
-        if os.path.exists(self.logs_dir):
-            try:
-                for filename in os.listdir(self.logs_dir):
-                    if filename.endswith('.log') or filename.endswith('.log.gz'):
-                        file_path = os.path.join(self.logs_dir, filename)
-                        if os.path.isfile(file_path):
-                            log_files.append({
-                                'name': filename,
-                                'size': os.path.getsize(file_path),
-                                'compressed': filename.endswith('.gz')
-                            })
-                
-                errors = self._extract_log_entries(['ERROR', 'FATAL'])
-                warnings = self._extract_log_entries(['WARN'])
-            except Exception as e:
-                if self.language == 'en':
-                    print(f"Failed to get log case data: {e}")
-                else:
-                    print(f"获取日志case数据失败: {e}")
+        scan = self.data_loader.get_log_scan()
+        log_files = [
+            {'name': f['name'], 'size': f['size'], 'compressed': f['compressed']}
+            for f in scan.log_files
+        ]
         
         return {
             "log_files": log_files,
-            "errors": [{'timestamp': e['timestamp'].isoformat(), 'level': e['level'], 'message': e['message']} for e in errors[:50]],
-            "warnings": [{'timestamp': w['timestamp'].isoformat(), 'level': w['level'], 'message': w['message']} for w in warnings[:50]],
-            "important_events": [{'timestamp': ie['timestamp'].isoformat(), 'level': ie['level'], 'message': ie['message']} for ie in self._extract_important_events()[:30]]
+            "level_counts": dict(scan.level_counts),
+            "errors": [{'timestamp': e['timestamp'].isoformat(), 'level': e['level'], 'message': e['message']} for e in scan.errors],
+            "warnings": [{'timestamp': w['timestamp'].isoformat(), 'level': w['level'], 'message': w['message']} for w in scan.warnings],
+            "important_events": [{'timestamp': ie['timestamp'].isoformat(), 'level': ie['level'], 'message': ie['message']} for ie in scan.important_events]
         } 
\ No newline at end of file
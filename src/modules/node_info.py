@@ -1,4 +1,4 @@
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Iterator
 from datetime import datetime
 from ..data_loader import ESDataLoader
 from ..i18n import I18n
@@ -7,6 +7,14 @@ from ..i18n import I18n
 class NodeInfoGenerator:
     """节点信息生成器"""
     
+    # 章节内容用到的诊断文件（支持通配符），用作章节缓存键
+    INPUT_FILES = (
+        'nodes.json',
+        'nodes_stats.json',
+        'nodes_usage.json',
+        'nodes_stats_sample_*.json'
+    )
+    
     def __init__(self, data_loader: ESDataLoader, language: str = "zh"):
         self.data_loader = data_loader
         self.language = language
@@ -14,34 +22,35 @@ class NodeInfoGenerator:
     
     def generate(self) -> str:
         """生成节点信息内容"""
+        return ''.join(self.generate_chunks())
+    
+    def generate_chunks(self) -> Iterator[str]:
+        """逐个小节生成节点信息内容，供报告流式写出"""
         nodes_info = self.data_loader.get_nodes()
         nodes_stats = self.data_loader.get_nodes_stats()
         nodes_usage = self.data_loader.load_json_file('nodes_usage.json')
         
-        content = ""
-        
         # 4.1 节点概览总表
-        content += self._generate_nodes_overview(nodes_info, nodes_stats)
+        yield self._generate_nodes_overview(nodes_info, nodes_stats)
         
         # 4.2 硬件资源信息
-        content += self._generate_hardware_resources(nodes_stats)
+        yield self._generate_hardware_resources(nodes_stats)
         
         # 4.3 JVM运行环境
-        content += self._generate_jvm_environment(nodes_info, nodes_stats)
+        yield self._generate_jvm_environment(nodes_info, nodes_stats)
         
         # 4.4 节点角色与配置
-        content += self._generate_node_roles_config(nodes_info)
+        yield self._generate_node_roles_config(nodes_info)
         
         # 4.5 节点性能指标
-        content += self._generate_performance_metrics(nodes_stats, nodes_usage)
+        yield self._generate_performance_metrics(nodes_stats, nodes_usage)
+        yield self._generate_throughput(self.data_loader.get_node_rates())
         
         # 4.6 存储与分片分布
-        content += self._generate_storage_shard_distribution(nodes_stats)
+        yield self._generate_storage_shard_distribution(nodes_stats)
         
         # 4.7 异常与告警
-        content += self._generate_alerts_recommendations(nodes_stats)
-        
-        return content
+        yield self._generate_alerts_recommendations(nodes_stats)
     
     def _generate_nodes_overview(self, nodes_info: Dict, nodes_stats: Dict) -> str:
         """生成节点概览总表"""
@@ -444,6 +453,47 @@ class NodeInfoGenerator:
         content += "\n"
         return content
     
+    def _generate_throughput(self, node_rates: Dict[str, Dict[str, Any]]) -> str:
+        """生成采样区间内的吞吐表，没有速率采样数据时不输出"""
+        if not node_rates:
+            return ""
+        
+        interval = max(rates['interval_seconds'] for rates in node_rates.values())
+        if self.language == 'en':
+            content = f"""#### 4.5.2 Sampled Throughput
+
+Rates over a {interval:.0f}s sampling window, computed from successive node stats samples.
+
+| Node Name | Indexing Rate | Index Latency | Search Rate | Query Latency | GC Time (young/old) | Write Rejected | Search Rejected |
+|-----------|---------------|---------------|-------------|---------------|---------------------|----------------|-----------------|
+"""
+        else:
+            content = f"""#### 4.5.2 采样区间吞吐
+
+根据多次节点统计采样计算，采样区间 {interval:.0f}s。
+
+| 节点名称 | 索引速率 | 索引延迟 | 查询速率 | 查询延迟 | GC耗时 (young/old) | 写入拒绝 | 搜索拒绝 |
+|---------|----------|----------|----------|----------|--------------------|----------|----------|
+"""
+        
+        def fmt(value, pattern):
+            return pattern.format(value) if value is not None else "N/A"
+        
+        for rates in sorted(node_rates.values(), key=lambda r: r['name']):
+            gc_time = f"{fmt(rates['gc_young_ms'], '{:.0f}')}/{fmt(rates['gc_old_ms'], '{:.0f}')}ms"
+            if rates['gc_time_percent'] is not None:
+                gc_time += f" ({rates['gc_time_percent']:.1f}%)"
+            rejected = rates['rejected']
+            content += (f"| {rates['name']} | {fmt(rates['index_rate'], '{:.1f}/s')} "
+                        f"| {fmt(rates['index_latency_ms'], '{:.2f}ms')} "
+                        f"| {fmt(rates['search_rate'], '{:.1f}/s')} "
+                        f"| {fmt(rates['query_latency_ms'], '{:.2f}ms')} "
+                        f"| {gc_time} | {fmt(rejected.get('write'), '{:.0f}')} "
+                        f"| {fmt(rejected.get('search'), '{:.0f}')} |\n")
+        
+        content += "\n"
+        return content
+    
     def _generate_storage_shard_distribution(self, nodes_stats: Dict) -> str:
         """生成存储与分片分布信息"""
         if self.language == 'en':
@@ -7,6 +7,13 @@ from ..i18n import I18n
 class ReportOverviewGenerator:
     """Report overview generator / 报告概述生成器"""
     
+    # 章节内容用到的诊断文件（支持通配符），用作章节缓存键
+    INPUT_FILES = (
+        'licenses.json',
+        'cluster_health.json',
+        'manifest.json'
+    )
+    
     def __init__(self, data_loader: ESDataLoader, language: str = "zh"):
         self.data_loader = data_loader
         self.language = language
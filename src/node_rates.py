@@ -0,0 +1,99 @@
+"""
+节点速率计算
+根据多次采样的 _nodes/stats 计算各节点在采样区间内的索引/查询吞吐、
+单次操作延迟、GC耗时和线程池拒绝次数的增量
+"""
+
+from typing import Dict, Any, List, Optional
+
+
+# 采样文件名，序号从0开始
+NODES_STATS_SAMPLE_FILE = 'nodes_stats_sample_{}.json'
+
+# 采样时请求的指标
+NODES_STATS_SAMPLE_METRICS = 'indices,jvm,thread_pool'
+
+# 统计拒绝次数的线程池
+REJECTION_THREAD_POOLS = ('write', 'search')
+
+
+def _get(data: Dict[str, Any], *path: str) -> Optional[float]:
+    """按路径读取数值，缺失时返回None"""
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data if isinstance(data, (int, float)) else None
+
+
+def _delta(first: Dict[str, Any], last: Dict[str, Any], *path: str) -> Optional[float]:
+    """计数器增量，缺失或计数器被重置（节点重启）时返回None"""
+    start = _get(first, *path)
+    end = _get(last, *path)
+    if start is None or end is None or end < start:
+        return None
+    return end - start
+
+
+def _gc_delta(first: Dict[str, Any], last: Dict[str, Any], generation: str) -> Optional[float]:
+    return _delta(first, last, 'jvm', 'gc', 'collectors', generation, 'collection_time_in_millis')
+
+
+def compute_node_rates(samples: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    计算第一次和最后一次采样之间各节点的速率
+    
+    Args:
+        samples: 按时间顺序排列的 _nodes/stats 响应
+    
+    Returns:
+        节点ID -> {name, interval_seconds, index_rate, index_latency_ms,
+                   search_rate, query_latency_ms, gc_young_ms, gc_old_ms,
+                   gc_time_percent, rejected: {线程池: 增量}}
+        只包含在首尾两次采样中都出现的节点；无法计算的值为None
+    """
+    if len(samples) < 2:
+        return {}
+    
+    first_nodes = (samples[0] or {}).get('nodes', {})
+    last_nodes = (samples[-1] or {}).get('nodes', {})
+    rates = {}
+    
+    for node_id, last in last_nodes.items():
+        first = first_nodes.get(node_id)
+        if first is None:
+            continue
+        
+        elapsed_ms = _delta(first, last, 'timestamp')
+        if not elapsed_ms:
+            continue
+        interval = elapsed_ms / 1000
+        
+        index_ops = _delta(first, last, 'indices', 'indexing', 'index_total')
+        index_time = _delta(first, last, 'indices', 'indexing', 'index_time_in_millis')
+        query_ops = _delta(first, last, 'indices', 'search', 'query_total')
+        query_time = _delta(first, last, 'indices', 'search', 'query_time_in_millis')
+        gc_young = _gc_delta(first, last, 'young')
+        gc_old = _gc_delta(first, last, 'old')
+        
+        gc_total = None
+        if gc_young is not None or gc_old is not None:
+            gc_total = (gc_young or 0) + (gc_old or 0)
+        
+        rates[node_id] = {
+            'name': last.get('name', node_id),
+            'interval_seconds': interval,
+            'index_rate': index_ops / interval if index_ops is not None else None,
+            'index_latency_ms': index_time / index_ops if index_ops and index_time is not None else None,
+            'search_rate': query_ops / interval if query_ops is not None else None,
+            'query_latency_ms': query_time / query_ops if query_ops and query_time is not None else None,
+            'gc_young_ms': gc_young,
+            'gc_old_ms': gc_old,
+            'gc_time_percent': gc_total / elapsed_ms * 100 if gc_total is not None else None,
+            'rejected': {
+                pool: _delta(first, last, 'thread_pool', pool, 'rejected')
+                for pool in REJECTION_THREAD_POOLS
+            }
+        }
+    
+    return rates
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+报告生成性能剖析
+逐章节记录采样得到的折叠调用栈（可直接生成火焰图）、tracemalloc 峰值内存，
+cprofile 模式下另外写出 pstats 和 callgrind 文件，均写入 case 文件目录，便于随工单附上
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator
+
+
+# cprofile：确定性剖析（pstats/callgrind）+ 调用栈采样；sampling：只做调用栈采样，开销小
+PROFILE_MODES = ('cprofile', 'sampling')
+PROFILE_SUMMARY_FILE = 'profile_summary.json'
+# 调用栈采样间隔（秒）
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+
+class StackSampler:
+    """
+    在后台线程中定时采样指定线程的调用栈，输出折叠栈格式（根;...;叶 次数）
+    
+    Python 3.12 起 cProfile 会记录所有线程的调用，采样循环中只调用内置函数，
+    使采样线程在 pstats 中只表现为少量内置函数调用
+    """
+    
+    def __init__(self, thread_id: int, interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._running = False
+        self._thread = None
+    
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+        self._thread.start()
+    
+    def stop(self) -> Counter:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+    
+    def _run(self):
+        stacks = self.stacks
+        basename = os.path.basename
+        while self._running:
+            time.sleep(self.interval)
+            if not self._running:
+                break
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                stacks[';'.join(stack)] += 1
+
+
+def write_collapsed(stacks: Counter, path: str):
+    """写出折叠栈文件（flamegraph.pl、speedscope 等工具可直接读取）"""
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+
+def write_callgrind(stats: pstats.Stats, path: str):
+    """
+    把 pstats 转换为 callgrind 格式（KCachegrind / QCachegrind 可直接打开），时间单位为微秒
+    """
+    def name(func) -> str:
+        filename, line, function = func
+        return f"{function}:{line}"
+    
+    # pstats 记录的是调用者，callgrind 需要按被调用者输出
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, calls, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((func, calls, cumulative))
+    
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("# callgrind format\nversion: 1\ncreator: esreport\nevents: Microseconds\n\n")
+        for func, (_, _, total_time, _, _) in stats.stats.items():
+            f.write(f"fl={func[0]}\nfn={name(func)}\n{func[1]} {int(total_time * 1e6)}\n")
+            for callee, calls, cumulative in callees.get(func, []):
+                f.write(f"cfl={callee[0]}\ncfn={name(callee)}\ncalls={calls} {callee[1]}\n"
+                        f"{func[1]} {int(cumulative * 1e6)}\n")
+            f.write("\n")
+
+
+class SectionProfiler:
+    """逐章节性能剖析"""
+    
+    def __init__(self, output_dir: str, mode: str = 'cprofile', interval: float = DEFAULT_SAMPLE_INTERVAL):
+        """
+        Args:
+            output_dir: 剖析文件输出目录（case文件目录）
+            mode: cprofile 或 sampling
+            interval: 调用栈采样间隔（秒）
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"未知的剖析模式: {mode}，可选: {', '.join(PROFILE_MODES)}")
+        self.output_dir = output_dir
+        self.mode = mode
+        self.interval = interval
+        self.results = {}
+    
+    def _path(self, name: str, suffix: str) -> str:
+        return os.path.join(self.output_dir, f"{name.lower()}_profile.{suffix}")
+    
+    @contextmanager
+    def profile(self, name: str) -> Iterator[None]:
+        """剖析代码块，结束后写出该章节的剖析文件"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        elif hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+        base_memory = tracemalloc.get_traced_memory()[0]
+        
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        profiler = cProfile.Profile() if self.mode == 'cprofile' else None
+        sampler.start()
+        if profiler is not None:
+            profiler.enable()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            if profiler is not None:
+                profiler.disable()
+            stacks = sampler.stop()
+            peak_memory = max(0, tracemalloc.get_traced_memory()[1] - base_memory)
+            if not was_tracing:
+                tracemalloc.stop()
+            
+            result = {
+                'seconds': round(elapsed, 6),
+                'peak_memory_bytes': peak_memory,
+                'samples': sum(stacks.values()),
+                'collapsed': self._path(name, 'collapsed')
+            }
+            write_collapsed(stacks, result['collapsed'])
+            if profiler is not None:
+                stats = pstats.Stats(profiler)
+                result['pstats'] = self._path(name, 'pstats')
+                result['callgrind'] = self._path(name, 'callgrind')
+                stats.dump_stats(result['pstats'])
+                write_callgrind(stats, result['callgrind'])
+            self.results[name] = result
+    
+    def summary(self) -> Dict[str, Any]:
+        return {'mode': self.mode, 'interval': self.interval, 'sections': self.results}
+    
+    def write_summary(self) -> str:
+        """写出各章节耗时、峰值内存和剖析文件路径的汇总，返回汇总文件路径"""
+        path = os.path.join(self.output_dir, PROFILE_SUMMARY_FILE)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+        return path
+    
+    def format_summary(self) -> str:
+        """各章节耗时和峰值内存的文本表格，按耗时从高到低排列"""
+        lines = [f"{'章节':<24}{'耗时':>12}{'峰值内存':>14}{'采样数':>10}"]
+        for name, result in sorted(self.results.items(), key=lambda item: item[1]['seconds'], reverse=True):
+            lines.append(f"{name:<26}{result['seconds']:>13.3f}s"
+                         f"{result['peak_memory_bytes'] / (1024 * 1024):>13.1f}MB{result['samples']:>12}")
+        return '\n'.join(lines)
+
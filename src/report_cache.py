@@ -0,0 +1,223 @@
+"""
+报告缓存
+按 (诊断包SHA256, 报告语言, 生成器版本) 缓存已生成的报告内容，重复上传同一诊断包时直接返回
+"""
+
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Optional
+
+from .report_store import CONTENT_FIELDS
+
+
+DEFAULT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_CACHE_DISK_MAX_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def _entry_size(entry: Dict[str, Any]) -> int:
+    """估算缓存条目占用的字节数"""
+    return sum(len(value.encode('utf-8')) for value in entry.values() if isinstance(value, str))
+
+
+class ReportCache:
+    """
+    内容寻址的报告缓存
+    
+    内存层按最近使用顺序淘汰，总大小不超过 max_bytes；
+    配置 cache_dir 后启用磁盘层，条目以 gzip JSON 保存，总大小不超过 disk_max_bytes。
+    指定 resolver 时内存层只保存不含报告内容的引用条目（如报告ID），命中时由 resolver 从报告存储取回内容，
+    同一份报告不会在内存中保存两次。
+    """
+    
+    def __init__(self, version: str, max_bytes: Optional[int] = None,
+                 cache_dir: Optional[str] = None, disk_max_bytes: Optional[int] = None,
+                 resolver: Optional[Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]] = None):
+        """
+        初始化报告缓存
+        
+        Args:
+            version: 报告生成器版本，版本变化后旧缓存自动失效
+            max_bytes: 内存层容量，默认读取 ESREPORT_CACHE_MAX_BYTES，0 表示关闭内存层
+            cache_dir: 磁盘层目录，默认读取 ESREPORT_CACHE_DIR，未配置则不启用
+            disk_max_bytes: 磁盘层容量，默认读取 ESREPORT_CACHE_DISK_MAX_BYTES
+            resolver: 由内存层的引用条目取回完整条目，引用的报告已不存在时返回None（按未命中处理，再查询磁盘层）
+        """
+        self.version = version
+        if max_bytes is None:
+            max_bytes = int(os.getenv('ESREPORT_CACHE_MAX_BYTES', DEFAULT_CACHE_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir if cache_dir is not None else os.getenv('ESREPORT_CACHE_DIR') or None
+        if disk_max_bytes is None:
+            disk_max_bytes = int(os.getenv('ESREPORT_CACHE_DISK_MAX_BYTES', DEFAULT_CACHE_DISK_MAX_BYTES))
+        self.disk_max_bytes = disk_max_bytes
+        self.resolver = resolver
+        
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+    
+    def make_key(self, file_hash: str, language: str) -> str:
+        """生成缓存键"""
+        return f"{file_hash}_{language}_{self.version}"
+    
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json.gz")
+    
+    def get(self, file_hash: str, language: str) -> Optional[Dict[str, Any]]:
+        """
+        查询缓存
+        
+        Returns:
+            缓存的报告条目，未命中返回None
+        """
+        key = self.make_key(file_hash, language)
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        
+        if entry is not None and self.resolver is not None:
+            entry = self._resolve(key, entry)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return dict(entry)
+        
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # 磁盘条目中的报告ID可能已经失效，指定 resolver 时不写入内存层
+            if self.resolver is None:
+                self._store_memory(key, entry)
+        return dict(entry)
+    
+    def _resolve(self, key: str, reference: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """取回引用条目的完整内容，引用失效时从内存层删除"""
+        try:
+            entry = self.resolver(reference)
+        except Exception as e:
+            print(f"⚠️ 读取报告缓存引用失败: {e}")
+            entry = None
+        if entry is None:
+            with self._lock:
+                if self._entries.get(key) is reference:
+                    del self._entries[key]
+                    self._total_bytes -= self._sizes.pop(key)
+        return entry
+    
+    def put(self, file_hash: str, language: str, entry: Dict[str, Any]):
+        """
+        写入缓存
+        
+        Args:
+            file_hash: 诊断包完整SHA256
+            language: 报告语言
+            entry: 报告内容（markdown_content、html_content 等可JSON序列化的字段），
+                   指定 resolver 时还应包含 resolver 取回内容所需的字段（如 report_id）
+        """
+        key = self.make_key(file_hash, language)
+        if self.resolver is not None:
+            memory_entry = {field: value for field, value in entry.items() if field not in CONTENT_FIELDS}
+        else:
+            memory_entry = dict(entry)
+        with self._lock:
+            self._store_memory(key, memory_entry)
+        self._write_disk(key, entry)
+    
+    def _store_memory(self, key: str, entry: Dict[str, Any]):
+        """写入内存层并按LRU淘汰（调用方持有锁）"""
+        if key in self._entries:
+            self._total_bytes -= self._sizes.pop(key)
+            del self._entries[key]
+        
+        size = _entry_size(entry)
+        if self.max_bytes <= 0 or size > self.max_bytes:
+            return
+        
+        self._entries[key] = entry
+        self._sizes[key] = size
+        self._total_bytes += size
+        
+        while self._total_bytes > self.max_bytes:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(evicted_key)
+    
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+            # 更新访问时间，磁盘淘汰时优先删除最久未使用的条目
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ 读取报告缓存失败 {path}: {e}")
+            return None
+    
+    def _write_disk(self, key: str, entry: Dict[str, Any]):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except Exception as e:
+            print(f"⚠️ 写入报告缓存失败 {path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self._evict_disk()
+    
+    def _evict_disk(self):
+        """磁盘层超出容量时删除最久未使用的条目"""
+        files = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.json.gz'):
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+    
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'disk_enabled': bool(self.cache_dir),
+                'hits': self.hits,
+                'misses': self.misses
+            }
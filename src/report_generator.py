@@ -1,46 +1,157 @@
 import os
+import gzip
 import json
+import multiprocessing
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Collection, Iterator, List, Optional, Tuple
 from .data_loader import ESDataLoader
+from .fleet_metrics import FLEET_INPUT_FILES, extract_fleet_metrics
 from .modules import ReportOverviewGenerator, ExecutiveSummaryGenerator, ClusterBasicInfoGenerator, NodeInfoGenerator
 from .modules.index_analysis import IndexAnalysisGenerator
 from .modules.data_governance import FinalRecommendationsGenerator
 from .modules.log_analysis import LogAnalysisGenerator
 from .i18n import I18n
+from .profiling import SectionProfiler
+from .section_cache import SectionCache, section_digest
+
+
+# 报告生成器版本，报告内容或格式变化时递增，用于使报告缓存失效
+REPORT_GENERATOR_VERSION = "2.1.0"
+
+# 剖析模式下单独转换HTML时每次读取的Markdown字符数
+HTML_READ_BLOCK_SIZE = 1024 * 1024
+
+# case文件格式：json（缩进，默认）、compact（压缩的单行JSON）、ndjson-gz（gzip压缩的NDJSON，
+# 每行一个顶层字段 {"key": ..., "data": ...}）、none（不生成case文件）
+CASE_FILE_MODES = ('json', 'compact', 'ndjson-gz', 'none')
+
+# 以CPU计算为主的章节，配置进程池时在子进程中生成
+CPU_BOUND_SECTIONS = ('INDEX_ANALYSIS', 'NODE_INFO')
+
+# 报告章节及其生成器，按在报告中的顺序排列
+SECTION_GENERATORS = {
+    'REPORT_OVERVIEW': ReportOverviewGenerator,
+    'EXECUTIVE_SUMMARY': ExecutiveSummaryGenerator,
+    'CLUSTER_BASIC_INFO': ClusterBasicInfoGenerator,
+    'NODE_INFO': NodeInfoGenerator,
+    'INDEX_ANALYSIS': IndexAnalysisGenerator,
+    'FINAL_RECOMMENDATIONS': FinalRecommendationsGenerator,
+    'LOG_ANALYSIS': LogAnalysisGenerator
+}
+
+
+def _generate_section_in_process(data_path: str, generator_cls: type, language: str,
+                                 with_case_data: bool = False) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """在子进程中重新加载诊断数据并生成章节内容，同时返回基于已加载数据的case数据"""
+    generator = generator_cls(ESDataLoader(data_path), language)
+    content = generator.generate()
+    return content, generator.get_case_data() if with_case_data else None
+
+
+class _ReportStream:
+    """
+    报告输出：片段依次写入Markdown文件，指定 html_writer 时同时转换写出HTML
+    
+    HTML转换失败时删除未完成的HTML文件，Markdown照常写完
+    """
+    
+    def __init__(self, markdown_path: Optional[str], html_writer=None):
+        self.markdown_file = open(markdown_path, 'w', encoding='utf-8') if markdown_path else None
+        self.html_writer = html_writer
+        self.html_path = None  # HTML写出成功后为文件路径
+        self.html_seconds = 0.0
+        self.bytes = 0
+    
+    def write(self, text: str):
+        if self.markdown_file is not None:
+            self.markdown_file.write(text)
+        self.bytes += len(text.encode('utf-8'))
+        if self.html_writer is not None:
+            self._convert(self.html_writer.write, text)
+    
+    def close(self):
+        if self.markdown_file is not None:
+            self.markdown_file.close()
+        if self.html_writer is not None:
+            self._convert(self.html_writer.close)
+        if self.html_writer is not None:
+            self.html_path = self.html_writer.output_path
+    
+    def _convert(self, func: Callable, *args):
+        start = time.perf_counter()
+        try:
+            func(*args)
+        except Exception as e:
+            print(f"⚠️ HTML生成失败: {e}")
+            self.html_writer.abort()
+            self.html_writer = None
+        self.html_seconds += time.perf_counter() - start
 
 
 class ESReportGenerator:
     """Elasticsearch报告生成器"""
     
-    def __init__(self, data_dir: str, output_dir: str = "output", language: str = "zh"):
+    def __init__(self, data_dir: str, output_dir: str = "output", language: str = "zh",
+                 case_dir: Optional[str] = None, workers: int = 1, process_workers: int = 0,
+                 fleet_store=None, profile: Optional[str] = None, case_files: str = 'json',
+                 section_cache: Optional[SectionCache] = None):
         """
         初始化报告生成器
         
         Args:
-            data_dir: 诊断数据目录路径
+            data_dir: 诊断数据目录路径、诊断ZIP文件路径或数据源
             output_dir: 输出目录路径
             language: 报告语言 ('zh' 或 'en')
+            case_dir: case文件输出目录（默认为 output_dir/cases）
+            workers: 并发生成章节的线程数，1 表示按顺序生成
+            process_workers: 生成CPU密集章节的进程数，0 表示不使用进程池
+            fleet_store: 集群群组指标存储（FleetMetricsStore），指定后每次生成报告都保存关键指标
+            profile: 性能剖析模式（cprofile 或 sampling），指定后各章节按顺序在本进程中生成，
+                     剖析文件和 profile_summary.json 写入 case 文件目录
+            case_files: case文件格式，见 CASE_FILE_MODES，none 表示不生成case文件
+            section_cache: 章节缓存（SectionCache），指定后声明了 INPUT_FILES 的章节在输入文件未变化时
+                           直接使用缓存的内容和case数据；剖析时不使用
         """
+        if case_files not in CASE_FILE_MODES:
+            raise ValueError(f"未知的case文件格式: {case_files}，可选: {', '.join(CASE_FILE_MODES)}")
         self.data_dir = data_dir
         self.output_dir = output_dir
+        self.case_dir = case_dir or os.path.join(output_dir, "cases")
         self.language = language
+        self.workers = max(1, workers)
+        self.process_workers = max(0, process_workers)
+        self.fleet_store = fleet_store
+        self.profiler = SectionProfiler(self.case_dir, profile) if profile else None
+        self.case_files = case_files
+        self.section_cache = section_cache
         self.i18n = I18n(language)  # 初始化国际化
         self.data_loader = ESDataLoader(data_dir)
         
         # 创建输出目录
         os.makedirs(output_dir, exist_ok=True)
-        os.makedirs(os.path.join(output_dir, "cases"), exist_ok=True)
+        os.makedirs(self.case_dir, exist_ok=True)
+        
+        # 章节在报告中的位置，generate_report 后可用
+        self.section_index = []
+        
+        # 各阶段耗时（秒）和产出字节数，generate_report 后可用：
+        # {'sections': {章节: {'seconds', 'bytes', 'cached'（使用章节缓存时）}}, 'html': {...}, 'case_files': {...}}
+        self.timings = {'sections': {}}
+        
+        # 生成章节时记录的case数据，写出case文件后清空
+        self.case_data = {}
+        
+        # 使用章节缓存的章节，generate_report 后可用
+        self.cached_sections = []
         
         # 初始化生成器，传递语言参数
         self.generators = {
-            'REPORT_OVERVIEW': ReportOverviewGenerator(self.data_loader, language),
-            'EXECUTIVE_SUMMARY': ExecutiveSummaryGenerator(self.data_loader, language),
-            'CLUSTER_BASIC_INFO': ClusterBasicInfoGenerator(self.data_loader, language),
-            'NODE_INFO': NodeInfoGenerator(self.data_loader, language),
-            'INDEX_ANALYSIS': IndexAnalysisGenerator(self.data_loader, language),
-            'FINAL_RECOMMENDATIONS': FinalRecommendationsGenerator(self.data_loader, language),
-            'LOG_ANALYSIS': LogAnalysisGenerator(self.data_loader, language)
+            section_name: generator_cls(self.data_loader, language)
+            for section_name, generator_cls in SECTION_GENERATORS.items()
         }
     
     def load_template(self) -> str:
@@ -121,81 +232,380 @@ class ESReportGenerator:
 
 {{FINAL_RECOMMENDATIONS}}"""
     
-    def generate_section_content(self, section_name: str) -> str:
+    def generate_section_content(self, section_name: str,
+                                 process_pool: Optional[ProcessPoolExecutor] = None) -> str:
         """
         生成特定章节的内容
         
         Args:
             section_name: 章节名称
+            process_pool: 进程池，指定时CPU密集章节在子进程中生成
             
         Returns:
             生成的内容
         """
-        if section_name in self.generators:
-            try:
-                return self.generators[section_name].generate()
-            except Exception as e:
-                if self.language == 'en':
-                    error_msg = f"Error generating {section_name} section: {e}"
-                    return f"**Generation Error**: {error_msg}"
-                else:
-                    error_msg = f"生成 {section_name} 章节时发生错误: {e}"
-                    return f"**生成错误**: {error_msg}"
-        else:
+        return ''.join(self.generate_section_chunks(section_name, process_pool))
+    
+    def generate_section_chunks(self, section_name: str,
+                                process_pool: Optional[ProcessPoolExecutor] = None) -> List[str]:
+        """
+        按小节分块生成特定章节的内容
+        
+        生成器提供 generate_chunks() 时逐个小节生成，避免把各小节拼接成一个大字符串；
+        生成case文件时同时记录该章节的case数据（见 generate_case_files）。
+        配置章节缓存时，输入文件未变化的章节直接返回缓存的内容块和case数据；需要case数据而缓存中没有
+        （例如缓存由 --case-files none 的运行写入）时重新生成该章节。
+        
+        Args:
+            section_name: 章节名称
+            process_pool: 进程池，指定时CPU密集章节在子进程中生成
+        
+        Returns:
+            章节内容块，依次拼接即为完整章节
+        """
+        if section_name not in self.generators:
             if self.language == 'en':
-                return f"**To Be Implemented**: {section_name} section not yet implemented"
+                return [f"**To Be Implemented**: {section_name} section not yet implemented"]
+            else:
+                return [f"**待实现**: {section_name} 章节暂未实现"]
+        
+        generator = self.generators[section_name]
+        with_case_data = self.case_files != 'none'
+        cache_digest = self._section_cache_digest(section_name, generator)
+        if cache_digest is not None:
+            entry = self.section_cache.get(cache_digest, self.language)
+            if entry is not None and (not with_case_data or entry.get('case_data') is not None):
+                print(f"⚡ 章节缓存命中: {section_name}")
+                self.cached_sections.append(section_name)
+                if with_case_data:
+                    self.case_data[section_name] = entry['case_data']
+                return entry['chunks']
+        
+        failed = False
+        try:
+            if process_pool is not None and section_name in CPU_BOUND_SECTIONS:
+                content, case_data = process_pool.submit(
+                    _generate_section_in_process,
+                    self.data_loader.data_dir,
+                    type(generator),
+                    self.language,
+                    with_case_data
+                ).result()
+                if case_data is not None:
+                    self.case_data[section_name] = case_data
+                chunks = [content]
+            elif hasattr(generator, 'generate_chunks'):
+                chunks = list(generator.generate_chunks())
             else:
-                return f"**待实现**: {section_name} 章节暂未实现"
+                chunks = [generator.generate()]
+        except Exception as e:
+            failed = True
+            if self.language == 'en':
+                error_msg = f"Error generating {section_name} section: {e}"
+                chunks = [f"**Generation Error**: {error_msg}"]
+            else:
+                error_msg = f"生成 {section_name} 章节时发生错误: {e}"
+                chunks = [f"**生成错误**: {error_msg}"]
+        
+        # 章节刚生成完，case数据所需的文件和中间结果都已在数据加载器中缓存
+        if with_case_data and section_name not in self.case_data:
+            try:
+                self.case_data[section_name] = generator.get_case_data()
+            except Exception as e:
+                print(f"⚠️ 记录 {section_name} case数据失败: {e}")
+        
+        # 生成出错的章节不缓存，下次重新生成
+        if cache_digest is not None and not failed:
+            try:
+                self.section_cache.put(cache_digest, self.language, chunks, self.case_data.get(section_name))
+            except Exception as e:
+                print(f"⚠️ 写入 {section_name} 章节缓存失败: {e}")
+        return chunks
+    
+    def _section_cache_digest(self, section_name: str, generator: Any) -> Optional[str]:
+        """
+        章节缓存键，基于生成器声明的 INPUT_FILES 的内容指纹
+        
+        未配置章节缓存、生成器没有声明输入文件（内容还取决于当前时间等）或正在剖析时返回None
+        """
+        input_files = getattr(generator, 'INPUT_FILES', None)
+        if self.section_cache is None or not input_files or self.profiler is not None:
+            return None
+        try:
+            fingerprints = self.data_loader.fingerprint_files(input_files)
+        except Exception as e:
+            print(f"⚠️ 计算 {section_name} 输入文件指纹失败: {e}")
+            return None
+        return section_digest(section_name, type(generator).__name__, fingerprints)
     
     def generate_case_files(self):
-        """生成检查用的case文件"""
+        """
+        生成检查用的case文件
+        
+        优先使用生成章节时记录的case数据，未记录的章节（如模板中没有该章节）再调用 get_case_data()。
+        case数据只在内存中引用，可以在报告返回给用户后再在后台线程中调用本方法写出。
+        耗时记录在 self.timings['case_files'] 中。
+        """
+        if self.case_files == 'none':
+            self.case_data = {}
+            return
+        
+        start = time.perf_counter()
         for section_name, generator in self.generators.items():
             try:
-                case_data = generator.get_case_data()
-                case_file_path = os.path.join(self.output_dir, "cases", f"{section_name.lower()}_case.json")
-                
-                with open(case_file_path, 'w', encoding='utf-8') as f:
-                    json.dump(case_data, f, ensure_ascii=False, indent=2)
-                
+                case_data = self.case_data.pop(section_name, None)
+                if case_data is None:
+                    case_data = generator.get_case_data()
+                case_file_path = self._write_case_file(section_name, case_data)
                 print(f"✅ 已生成 {section_name} case文件: {case_file_path}")
             except Exception as e:
                 print(f"❌ 生成 {section_name} case文件失败: {e}")
+        self.timings['case_files'] = {'seconds': round(time.perf_counter() - start, 6)}
+    
+    def _write_case_file(self, section_name: str, case_data: Any) -> str:
+        """按 self.case_files 的格式写出一个章节的case文件，返回文件路径"""
+        if self.case_files == 'ndjson-gz':
+            case_file_path = os.path.join(self.case_dir, f"{section_name.lower()}_case.ndjson.gz")
+            records = case_data.items() if isinstance(case_data, dict) else [(None, case_data)]
+            with gzip.open(case_file_path, 'wt', encoding='utf-8') as f:
+                for key, value in records:
+                    f.write(json.dumps({'key': key, 'data': value}, ensure_ascii=False, separators=(',', ':')))
+                    f.write('\n')
+            return case_file_path
+        
+        case_file_path = os.path.join(self.case_dir, f"{section_name.lower()}_case.json")
+        with open(case_file_path, 'w', encoding='utf-8') as f:
+            if self.case_files == 'compact':
+                json.dump(case_data, f, ensure_ascii=False, separators=(',', ':'))
+            else:
+                json.dump(case_data, f, ensure_ascii=False, indent=2)
+        return case_file_path
+    
+    @contextmanager
+    def _generate_sections(self, section_names: List[str],
+                           notify: Callable[[Dict[str, Any]], None]) -> Iterator[Callable[[str], List[str]]]:
+        """
+        生成各章节内容
+        
+        返回按章节名取内容块的函数。按顺序生成时章节在取用时才生成，写出后即可释放，
+        内存中只保留一个章节；workers 大于1时章节在线程池中并发生成，配置 process_workers 后
+        CPU_BOUND_SECTIONS 中的章节交给进程池，取用时等待该章节完成。
+        
+        Args:
+            section_names: 需要生成的章节
+            notify: 进度回调
+        
+        Returns:
+            章节名 -> 该章节的Markdown内容块
+        """
+        def generate(section_name: str, process_pool: Optional[ProcessPoolExecutor] = None) -> List[str]:
+            print(f"📝 正在生成 {section_name} 章节...")
+            notify({'stage': 'analyzing', 'section': section_name, 'status': 'running'})
+            start = time.perf_counter()
+            with self.profiler.profile(section_name) if self.profiler else nullcontext():
+                chunks = self.generate_section_chunks(section_name, process_pool)
+            self.timings['sections'][section_name] = {
+                'seconds': round(time.perf_counter() - start, 6),
+                'bytes': sum(len(chunk.encode('utf-8')) for chunk in chunks)
+            }
+            if section_name in self.cached_sections:
+                self.timings['sections'][section_name]['cached'] = True
+            notify({'stage': 'analyzing', 'section': section_name, 'status': 'done'})
+            return chunks
+        
+        # 剖析时按顺序生成，保证调用栈采样和内存统计只包含当前章节
+        if (self.workers <= 1 and self.process_workers <= 0) or self.profiler is not None:
+            yield generate
+            return
+        
+        process_pool = None
+        if self.process_workers > 0:
+            # 使用spawn启动子进程，避免在多线程的Web进程中fork
+            process_pool = ProcessPoolExecutor(max_workers=self.process_workers,
+                                               mp_context=multiprocessing.get_context('spawn'))
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='section') as thread_pool:
+                futures = {
+                    section_name: thread_pool.submit(generate, section_name, process_pool)
+                    for section_name in section_names
+                }
+                yield lambda section_name: futures[section_name].result()
+        finally:
+            if process_pool is not None:
+                process_pool.shutdown()
+    
+    def _write_report(self, template_content: str, section_names: Collection[str],
+                      section_chunks: Callable[[str], List[str]], write: Callable[[str], Any]):
+        """
+        按模板顺序逐段写出报告，同时记录每个章节在报告中的位置
+        
+        章节范围从模板中该占位符前的最近标题开始，到章节内容结束，
+        结果保存在 self.section_index 中，供按章节读取报告使用。
+        
+        Args:
+            template_content: 报告模板
+            section_names: 已生成的章节，其余占位符填入"待实现"提示
+            section_chunks: 章节名 -> 该章节的Markdown内容块
+            write: 接收报告片段的函数，依次拼接即为完整报告
+        """
+        offset = 0
+        preceding = ''
+        self.section_index = []
+        
+        # re.split 的结果中奇数位置是占位符名称，偶数位置是模板原文
+        for i, piece in enumerate(re.split(r'\{\{([^}]+)\}\}', template_content)):
+            if i % 2 == 0:
+                write(piece)
+                offset += len(piece)
+                preceding = piece
+                continue
+            
+            if piece not in section_names:
+                if self.language == 'en':
+                    content = f"**To Be Implemented**: {piece} section not yet implemented"
+                else:
+                    content = f"**待实现**: {piece} 章节暂未实现"
+                write(content)
+                offset += len(content)
+                continue
+            
+            headings = list(re.finditer(r'^#+[ \t]*(.*)$', preceding, re.M))
+            if headings:
+                start = offset - len(preceding) + headings[-1].start()
+                title = headings[-1].group(1).strip()
+            else:
+                start = offset
+                title = piece
+            
+            for chunk in section_chunks(piece):
+                write(chunk)
+                offset += len(chunk)
+            
+            self.section_index.append({
+                'key': piece,
+                'title': title,
+                'start': start,
+                'end': offset
+            })
+    
+    def _assemble_report(self, template_content: str, section_contents: Dict[str, str]) -> str:
+        """
+        将章节内容填入模板，章节位置保存在 self.section_index 中
+        
+        Args:
+            template_content: 报告模板
+            section_contents: 章节名 -> 已生成的Markdown内容
+        
+        Returns:
+            完整的Markdown报告
+        """
+        parts = []
+        self._write_report(template_content, section_contents,
+                           lambda section_name: [section_contents[section_name]], parts.append)
+        return ''.join(parts)
+    
+    def get_summary(self) -> Dict[str, Any]:
+        """
+        报告摘要信息（集群名称、健康状态、节点和分片数量）
+        
+        Returns:
+            摘要字典，缺失的数据为None
+        """
+        health = self.data_loader.get_cluster_health() or {}
+        stats = self.data_loader.get_cluster_stats() or {}
+        indices = stats.get('indices', {})
+        return {
+            'cluster_name': health.get('cluster_name') or stats.get('cluster_name'),
+            'status': health.get('status'),
+            'number_of_nodes': health.get('number_of_nodes'),
+            'number_of_data_nodes': health.get('number_of_data_nodes'),
+            'indices': indices.get('count'),
+            'active_shards': health.get('active_shards'),
+            'unassigned_shards': health.get('unassigned_shards')
+        }
+    
+    def _fleet_metrics(self) -> Dict[str, Any]:
+        """
+        提取要保存的集群群组指标
+        
+        配置章节缓存时提取结果按 FLEET_INPUT_FILES 的内容指纹缓存，输入文件未变化时
+        不再为保存指标构建分片表和解析节点统计
+        """
+        digest = None
+        if self.section_cache is not None and self.profiler is None:
+            try:
+                fingerprints = self.data_loader.fingerprint_files(FLEET_INPUT_FILES)
+                digest = section_digest('FLEET_METRICS', extract_fleet_metrics.__name__, fingerprints)
+                metrics = self.section_cache.get_metrics(digest)
+                if metrics is not None:
+                    print("⚡ 集群指标缓存命中")
+                    return metrics
+            except Exception as e:
+                print(f"⚠️ 读取集群指标缓存失败: {e}")
+        
+        metrics = extract_fleet_metrics(self.data_loader)
+        if digest is not None:
+            try:
+                self.section_cache.put_metrics(digest, metrics)
+            except Exception as e:
+                print(f"⚠️ 写入集群指标缓存失败: {e}")
+        return metrics
+    
+    def _open_html_writer(self, html_path: str, fragments: Optional[List[str]] = None,
+                          fragment_table_class: Optional[str] = None):
+        """创建HTML报告写出器，失败时返回None并跳过HTML生成"""
+        try:
+            print("📄 正在生成HTML版本...")
+            from .html_converter import HtmlReportWriter
+            return HtmlReportWriter(html_path, fragments=fragments, fragment_table_class=fragment_table_class)
+        except ImportError:
+            print("⚠️ HTML转换依赖包未安装，跳过HTML生成")
+        except Exception as e:
+            print(f"⚠️ HTML生成失败: {e}")
+        return None
     
     def generate_report(self, 
-                       generate_html: bool = True) -> Dict[str, str]:
+                       generate_html: bool = True,
+                       progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                       write_case_files: bool = True,
+                       return_html_content: bool = False,
+                       html_table_class: Optional[str] = None) -> Dict[str, str]:
         """
         生成完整的ES巡检报告
         
         Args:
             generate_html: 是否同时生成HTML版本
+            progress_callback: 进度回调，接收包含 stage 以及 sections 或 section/status 的事件字典
+            write_case_files: 是否写出case文件；为 False 时记录的case数据保留在 self.case_data 中，
+                              之后可调用 generate_case_files() 写出（例如报告返回后在后台线程中写出）
+            return_html_content: 是否在结果的 html_content 中同时返回HTML正文（不含模板），
+                                 内容来自流式转换，无需再次转换Markdown；HTML生成失败时没有该字段
+            html_table_class: html_content 中表格的 class 属性，不影响HTML文件
             
         Returns:
             包含markdown和html文件路径的字典
         """
         print("🚀 开始生成ES巡检报告...")
         
+        def notify(event: Dict[str, Any]):
+            if progress_callback:
+                try:
+                    progress_callback(event)
+                except Exception as e:
+                    print(f"⚠️ 进度回调失败: {e}")
+        
+        self.timings = {'sections': {}}
+        self.case_data = {}
+        self.cached_sections = []
+        
         # 加载模板
         template_content = self.load_template()
         
-        # 替换模板中的占位符
-        report_content = template_content
-        
-        for section_name in self.generators.keys():
-            placeholder = f"{{{{{section_name}}}}}"
-            if placeholder in report_content:
-                print(f"📝 正在生成 {section_name} 章节...")
-                section_content = self.generate_section_content(section_name)
-                report_content = report_content.replace(placeholder, section_content)
-        
-        # 替换其他未实现的占位符
-        import re
-        remaining_placeholders = re.findall(r'\{\{([^}]+)\}\}', report_content)
-        for placeholder in remaining_placeholders:
-            full_placeholder = f"{{{{{placeholder}}}}}"
-            if self.language == 'en':
-                report_content = report_content.replace(full_placeholder, f"**To Be Implemented**: {placeholder} section not yet implemented")
-            else:
-                report_content = report_content.replace(full_placeholder, f"**待实现**: {placeholder} 章节暂未实现")
+        # 按模板中的顺序生成章节，生成一个章节即可写出一个章节
+        section_names = list(dict.fromkeys(
+            name for name in re.findall(r'\{\{([^}]+)\}\}', template_content) if name in self.generators
+        ))
+        notify({'stage': 'analyzing', 'sections': section_names})
         
         # 生成报告文件名
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -207,34 +617,53 @@ class ESReportGenerator:
         
         report_filename = f"ES_Report_{cluster_name}_{timestamp}.md"
         report_path = os.path.join(self.output_dir, report_filename)
-        
-        # 保存Markdown报告
-        with open(report_path, 'w', encoding='utf-8') as f:
-            f.write(report_content)
+        html_path = os.path.join(self.output_dir, report_filename.replace('.md', '.html'))
+        
+        # 章节内容直接写入Markdown文件并同时转换为HTML，不在内存中拼接整份报告；
+        # 剖析时HTML在Markdown写完后单独转换，使 HTML_REPORT 的剖析结果只包含HTML转换
+        html_fragments = [] if return_html_content else None
+        html_writer = None
+        if generate_html and self.profiler is None:
+            html_writer = self._open_html_writer(html_path, html_fragments, html_table_class)
+        stream = html_stream = _ReportStream(report_path, html_writer)
+        try:
+            with self._generate_sections(section_names, notify) as section_chunks:
+                self._write_report(template_content, section_names, section_chunks, stream.write)
+        finally:
+            stream.close()
         
         result = {"markdown": report_path}
+        notify({'stage': 'generating'})
         
-        # 生成HTML版本
-        if generate_html:
-            try:
-                print("📄 正在生成HTML版本...")
-                from .html_converter import save_html_report
-                html_filename = os.path.basename(report_path).replace('.md', '.html')
-                html_path = os.path.join(self.output_dir, html_filename)
-                
+        if generate_html and self.profiler is not None:
+            with self.profiler.profile('HTML_REPORT'):
+                html_stream = _ReportStream(None, self._open_html_writer(html_path, html_fragments, html_table_class))
                 with open(report_path, 'r', encoding='utf-8') as f:
-                    markdown_content = f.read()
-                
-                save_html_report(markdown_content, html_path)
-                result["html"] = html_path
-            except ImportError:
-                print("⚠️ HTML转换依赖包未安装，跳过HTML生成")
-            except Exception as e:
-                print(f"⚠️ HTML生成失败: {e}")
+                    for block in iter(lambda: f.read(HTML_READ_BLOCK_SIZE), ''):
+                        html_stream.write(block)
+                html_stream.close()
+        
+        if html_stream.html_path:
+            self.timings['html'] = {'seconds': round(html_stream.html_seconds, 6), 'bytes': html_stream.bytes}
+            result["html"] = html_stream.html_path
+            if html_fragments is not None:
+                result['html_content'] = ''.join(html_fragments)
         
         # 生成case文件
-        print("📊 正在生成case文件...")
-        self.generate_case_files()
+        if write_case_files and self.case_files != 'none':
+            print("📊 正在生成case文件...")
+            self.generate_case_files()
+        
+        if self.profiler is not None:
+            result['profile'] = self.profiler.write_summary()
+            print(f"🔬 性能剖析已保存: {result['profile']}")
+        
+        # 保存集群、节点和索引指标，供多集群趋势查询
+        if self.fleet_store is not None:
+            try:
+                self.fleet_store.record(self._fleet_metrics())
+            except Exception as e:
+                print(f"⚠️ 保存集群指标失败: {e}")
         
         print(f"✅ 报告生成完成:")
         print(f"   📄 Markdown: {report_path}")
@@ -0,0 +1,519 @@
+"""
+报告存储
+替代进程内无上限的 reports 字典：内存层按LRU和字节预算保存，超出预算时压缩落盘，
+过期或超出数量上限的报告连同其生成的输出文件一并清理；
+多worker部署时可使用SQLite共享存储
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+DEFAULT_STORE_MAX_BYTES = 128 * 1024 * 1024
+DEFAULT_STORE_MAX_REPORTS = 1000
+DEFAULT_STORE_TTL_SECONDS = 24 * 3600
+# 共享存储中任务状态的保留时间（秒）
+DEFAULT_JOB_STATE_RETENTION_SECONDS = 3600
+
+# 报告内容字段，其余字段作为元数据常驻内存
+CONTENT_FIELDS = ('markdown_content', 'html_content')
+
+
+def _content_size(record: Dict[str, Any]) -> int:
+    """报告内容占用的字节数"""
+    return sum(len((record.get(field) or '').encode('utf-8')) for field in CONTENT_FIELDS)
+
+
+def _remove_path(path: Optional[str]):
+    """删除报告拥有的文件或目录"""
+    if not path:
+        return
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+    except OSError as e:
+        print(f"⚠️ 清理报告文件失败 {path}: {e}")
+
+
+def _notify_delete(callback: Optional[Callable[[str], None]], report_id: str):
+    """调用报告删除回调，回调失败不影响删除"""
+    if callback is None:
+        return
+    try:
+        callback(report_id)
+    except Exception as e:
+        print(f"⚠️ 报告删除回调失败 {report_id}: {e}")
+
+
+def process_memory_stats() -> Dict[str, Any]:
+    """当前进程的内存占用（字节）"""
+    stats = {'rss_bytes': None, 'max_rss_bytes': None}
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            stats['rss_bytes'] = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 单位为KB，macOS 为字节
+        stats['max_rss_bytes'] = max_rss if os.uname().sysname == 'Darwin' else max_rss * 1024
+    return stats
+
+
+def _default_store_dir() -> str:
+    return os.getenv('ESREPORT_STORE_DIR') or os.path.join(tempfile.gettempdir(), 'esreport-store')
+
+
+class ReportStore:
+    """
+    有界的报告存储（单进程）
+    
+    - 元数据（文件名、生成时间、语言、输出文件路径等）常驻内存
+    - 报告内容在内存中按LRU保存，总量超过 max_bytes 时最久未访问的内容以 gzip 写入 spill_dir
+    - 超过 ttl_seconds 或数量超过 max_reports 的报告被删除，同时清理 owned_files 中的输出文件
+    """
+    
+    def __init__(self, max_bytes: Optional[int] = None, max_reports: Optional[int] = None,
+                 ttl_seconds: Optional[int] = None, spill_dir: Optional[str] = None):
+        """
+        初始化报告存储
+        
+        Args:
+            max_bytes: 内存中报告内容的字节预算，默认读取 ESREPORT_STORE_MAX_BYTES
+            max_reports: 保留的报告数量上限，默认读取 ESREPORT_STORE_MAX_REPORTS
+            ttl_seconds: 报告保留时间，默认读取 ESREPORT_STORE_TTL_SECONDS，0 表示不过期
+            spill_dir: 内容落盘目录，默认读取 ESREPORT_STORE_DIR
+        """
+        if max_bytes is None:
+            max_bytes = int(os.getenv('ESREPORT_STORE_MAX_BYTES', DEFAULT_STORE_MAX_BYTES))
+        if max_reports is None:
+            max_reports = int(os.getenv('ESREPORT_STORE_MAX_REPORTS', DEFAULT_STORE_MAX_REPORTS))
+        if ttl_seconds is None:
+            ttl_seconds = int(os.getenv('ESREPORT_STORE_TTL_SECONDS', DEFAULT_STORE_TTL_SECONDS))
+        self.max_bytes = max_bytes
+        self.max_reports = max_reports
+        self.ttl_seconds = ttl_seconds
+        self.spill_dir = spill_dir or _default_store_dir()
+        os.makedirs(self.spill_dir, exist_ok=True)
+        
+        # report_id -> 元数据，按创建顺序排列
+        self._meta = OrderedDict()
+        # report_id -> 报告内容，按访问顺序排列
+        self._contents = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.RLock()
+        
+        self.spills = 0
+        self.loads = 0
+        self.evictions = 0
+        self.expirations = 0
+        
+        # 报告被删除（包括过期和淘汰）时以报告ID调用，用于清理依赖报告内容的缓存
+        self.on_delete = None
+    
+    # 进程内存储，不能在多个worker进程之间共享
+    shared = False
+    
+    def _spill_path(self, report_id: str) -> str:
+        return os.path.join(self.spill_dir, f"{report_id}.json.gz")
+    
+    def put(self, report_id: str, record: Dict[str, Any], owned_files: Optional[List[str]] = None):
+        """
+        保存报告
+        
+        Args:
+            report_id: 报告ID
+            record: 报告数据（markdown_content、html_content 以及其他元数据字段）
+            owned_files: 报告删除时需要一并清理的输出文件或目录
+        """
+        content = {field: record.get(field) for field in CONTENT_FIELDS}
+        meta = {key: value for key, value in record.items() if key not in CONTENT_FIELDS}
+        meta['_created_ts'] = time.time()
+        meta['_owned_files'] = [path for path in (owned_files or []) if path]
+        meta['_size'] = _content_size(content)
+        meta['_spilled'] = False
+        
+        with self._lock:
+            if report_id in self._meta:
+                self._delete_locked(report_id)
+            self._meta[report_id] = meta
+            self._contents[report_id] = content
+            self._memory_bytes += meta['_size']
+            self._expire_locked()
+            self._enforce_limits_locked()
+    
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取报告（已落盘的内容会重新加载到内存）
+        
+        Returns:
+            报告数据，不存在或已过期返回None
+        """
+        with self._lock:
+            self._expire_locked()
+            meta = self._meta.get(report_id)
+            if meta is None:
+                return None
+            
+            content = self._contents.get(report_id)
+            if content is not None:
+                self._contents.move_to_end(report_id)
+            else:
+                content = self._load_spilled(report_id)
+                if content is None:
+                    return None
+                self._contents[report_id] = content
+                self._memory_bytes += meta['_size']
+                self._enforce_limits_locked(keep=report_id)
+            
+            record = {key: value for key, value in meta.items() if not key.startswith('_')}
+            record.update(content)
+            return record
+    
+    def get_meta(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取报告元数据（不含报告内容，已落盘的内容不会重新加载）
+        
+        Returns:
+            元数据，不存在或已过期返回None
+        """
+        with self._lock:
+            self._expire_locked()
+            meta = self._meta.get(report_id)
+            if meta is None:
+                return None
+            return {key: value for key, value in meta.items() if not key.startswith('_')}
+    
+    def __contains__(self, report_id: str) -> bool:
+        with self._lock:
+            self._expire_locked()
+            return report_id in self._meta
+    
+    def list(self) -> List[Dict[str, Any]]:
+        """所有报告的元数据（不含报告内容）"""
+        with self._lock:
+            self._expire_locked()
+            return [
+                dict({key: value for key, value in meta.items() if not key.startswith('_')}, id=report_id)
+                for report_id, meta in self._meta.items()
+            ]
+    
+    def delete(self, report_id: str):
+        """删除报告及其输出文件"""
+        with self._lock:
+            self._delete_locked(report_id)
+    
+    def _delete_locked(self, report_id: str):
+        meta = self._meta.pop(report_id, None)
+        if meta is None:
+            return
+        if self._contents.pop(report_id, None) is not None:
+            self._memory_bytes -= meta['_size']
+        if meta['_spilled']:
+            _remove_path(self._spill_path(report_id))
+        for path in meta['_owned_files']:
+            _remove_path(path)
+        _notify_delete(self.on_delete, report_id)
+    
+    def _expire_locked(self):
+        """删除超过保留时间的报告"""
+        if not self.ttl_seconds:
+            return
+        deadline = time.time() - self.ttl_seconds
+        expired = [report_id for report_id, meta in self._meta.items() if meta['_created_ts'] < deadline]
+        for report_id in expired:
+            self._delete_locked(report_id)
+            self.expirations += 1
+    
+    def _enforce_limits_locked(self, keep: Optional[str] = None):
+        """执行数量上限和内存预算"""
+        while len(self._meta) > self.max_reports:
+            oldest_id = next(iter(self._meta))
+            self._delete_locked(oldest_id)
+            self.evictions += 1
+        
+        while self._memory_bytes > self.max_bytes:
+            candidates = [report_id for report_id in self._contents if report_id != keep]
+            if not candidates:
+                break
+            self._spill(candidates[0])
+    
+    def _spill(self, report_id: str):
+        """将报告内容压缩写入磁盘并从内存移除"""
+        meta = self._meta[report_id]
+        content = self._contents.pop(report_id)
+        self._memory_bytes -= meta['_size']
+        
+        if meta['_spilled']:
+            # 之前已落盘且内容不可变，无需重复写入
+            return
+        
+        path = self._spill_path(report_id)
+        try:
+            with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+                json.dump(content, f, ensure_ascii=False)
+            meta['_spilled'] = True
+            self.spills += 1
+        except Exception as e:
+            print(f"⚠️ 报告内容落盘失败 {report_id}: {e}")
+            _remove_path(path)
+            # 无法落盘时只能丢弃该报告
+            self._meta.pop(report_id, None)
+            for owned in meta['_owned_files']:
+                _remove_path(owned)
+            _notify_delete(self.on_delete, report_id)
+            self.evictions += 1
+    
+    def _load_spilled(self, report_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with gzip.open(self._spill_path(report_id), 'rt', encoding='utf-8') as f:
+                content = json.load(f)
+            self.loads += 1
+            return content
+        except Exception as e:
+            print(f"⚠️ 读取落盘报告失败 {report_id}: {e}")
+            return None
+    
+    def stats(self) -> Dict[str, Any]:
+        """存储和进程内存统计，用于评估容器内存规格"""
+        with self._lock:
+            self._expire_locked()
+            spilled = [report_id for report_id, meta in self._meta.items() if meta['_spilled']]
+            spilled_bytes = 0
+            for report_id in spilled:
+                try:
+                    spilled_bytes += os.path.getsize(self._spill_path(report_id))
+                except OSError:
+                    pass
+            
+            stats = {
+                'reports': len(self._meta),
+                'memory_reports': len(self._contents),
+                'memory_bytes': self._memory_bytes,
+                'max_memory_bytes': self.max_bytes,
+                'max_reports': self.max_reports,
+                'ttl_seconds': self.ttl_seconds,
+                'spilled_reports': len(spilled),
+                'spilled_bytes': spilled_bytes,
+                'spills': self.spills,
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+        stats['backend'] = 'memory'
+        stats['process'] = process_memory_stats()
+        return stats
+
+
+class SQLiteReportStore:
+    """
+    基于SQLite（WAL模式）的共享报告存储
+    
+    多个gunicorn worker进程打开同一个数据库文件即可共享报告，任意worker都能直接提供下载，
+    无需重新生成。报告内容以zlib压缩保存；分析任务状态也保存在同一数据库中，便于任意worker查询进度。
+    """
+    
+    shared = True
+    
+    def __init__(self, db_path: Optional[str] = None, max_reports: Optional[int] = None,
+                 ttl_seconds: Optional[int] = None):
+        """
+        初始化SQLite报告存储
+        
+        Args:
+            db_path: 数据库文件路径，默认读取 ESREPORT_STORE_DB（未设置时位于 ESREPORT_STORE_DIR 下）
+            max_reports: 保留的报告数量上限，默认读取 ESREPORT_STORE_MAX_REPORTS
+            ttl_seconds: 报告保留时间，默认读取 ESREPORT_STORE_TTL_SECONDS，0 表示不过期
+        """
+        if max_reports is None:
+            max_reports = int(os.getenv('ESREPORT_STORE_MAX_REPORTS', DEFAULT_STORE_MAX_REPORTS))
+        if ttl_seconds is None:
+            ttl_seconds = int(os.getenv('ESREPORT_STORE_TTL_SECONDS', DEFAULT_STORE_TTL_SECONDS))
+        self.db_path = db_path or os.getenv('ESREPORT_STORE_DB') or os.path.join(_default_store_dir(), 'reports.db')
+        self.max_reports = max_reports
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        
+        # 本进程删除报告（包括过期和淘汰）时以报告ID调用；其他进程删除的报告由调用方按是否存在判断
+        self.on_delete = None
+        
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        
+        conn = self._connect()
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS reports (
+                    id TEXT PRIMARY KEY,
+                    created_ts REAL NOT NULL,
+                    meta TEXT NOT NULL,
+                    owned_files TEXT NOT NULL,
+                    markdown BLOB,
+                    html BLOB
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_reports_created ON reports (created_ts)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    updated_ts REAL NOT NULL,
+                    state TEXT NOT NULL
+                )
+            """)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """每个线程使用独立连接"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+    
+    @staticmethod
+    def _compress(text: Optional[str]) -> Optional[bytes]:
+        return zlib.compress(text.encode('utf-8'), 6) if text is not None else None
+    
+    @staticmethod
+    def _decompress(data: Optional[bytes]) -> Optional[str]:
+        return zlib.decompress(data).decode('utf-8') if data is not None else None
+    
+    def put(self, report_id: str, record: Dict[str, Any], owned_files: Optional[List[str]] = None):
+        """保存报告，参数同 ReportStore.put"""
+        meta = {key: value for key, value in record.items() if key not in CONTENT_FIELDS}
+        owned = [path for path in (owned_files or []) if path]
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO reports (id, created_ts, meta, owned_files, markdown, html) VALUES (?, ?, ?, ?, ?, ?)",
+                (report_id, time.time(), json.dumps(meta, ensure_ascii=False), json.dumps(owned),
+                 self._compress(record.get('markdown_content')), self._compress(record.get('html_content')))
+            )
+        self._cleanup()
+    
+    def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """获取报告，不存在或已过期返回None"""
+        row = self._connect().execute(
+            "SELECT created_ts, meta, markdown, html FROM reports WHERE id = ?", (report_id,)
+        ).fetchone()
+        if row is None or self._is_expired(row[0]):
+            return None
+        record = json.loads(row[1])
+        record['markdown_content'] = self._decompress(row[2])
+        record['html_content'] = self._decompress(row[3])
+        return record
+    
+    def get_meta(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """获取报告元数据（不读取、不解压报告内容），不存在或已过期返回None"""
+        row = self._connect().execute(
+            "SELECT created_ts, meta FROM reports WHERE id = ?", (report_id,)
+        ).fetchone()
+        if row is None or self._is_expired(row[0]):
+            return None
+        return json.loads(row[1])
+    
+    def __contains__(self, report_id: str) -> bool:
+        row = self._connect().execute("SELECT created_ts FROM reports WHERE id = ?", (report_id,)).fetchone()
+        return row is not None and not self._is_expired(row[0])
+    
+    def list(self) -> List[Dict[str, Any]]:
+        """所有报告的元数据（不含报告内容）"""
+        rows = self._connect().execute("SELECT id, created_ts, meta FROM reports ORDER BY created_ts").fetchall()
+        return [dict(json.loads(meta), id=report_id) for report_id, created_ts, meta in rows if not self._is_expired(created_ts)]
+    
+    def delete(self, report_id: str):
+        """删除报告及其输出文件"""
+        self._delete_where("id = ?", (report_id,))
+    
+    def _is_expired(self, created_ts: float) -> bool:
+        return bool(self.ttl_seconds) and created_ts < time.time() - self.ttl_seconds
+    
+    def _delete_where(self, condition: str, params: tuple = ()) -> int:
+        conn = self._connect()
+        with conn:
+            rows = conn.execute(f"SELECT id, owned_files FROM reports WHERE {condition}", params).fetchall()
+            conn.executemany("DELETE FROM reports WHERE id = ?", [(row[0],) for row in rows])
+        for report_id, owned_files in rows:
+            for path in json.loads(owned_files):
+                _remove_path(path)
+            _notify_delete(self.on_delete, report_id)
+        return len(rows)
+    
+    def _cleanup(self):
+        """删除过期和超出数量上限的报告"""
+        if self.ttl_seconds:
+            self._delete_where("created_ts < ?", (time.time() - self.ttl_seconds,))
+        self._delete_where(
+            "id NOT IN (SELECT id FROM reports ORDER BY created_ts DESC LIMIT ?)", (self.max_reports,)
+        )
+    
+    def save_job(self, job_id: str, state: Dict[str, Any]):
+        """保存任务状态快照"""
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, updated_ts, state) VALUES (?, ?, ?)",
+                (job_id, now, json.dumps(state, ensure_ascii=False, default=str))
+            )
+            conn.execute("DELETE FROM jobs WHERE updated_ts < ?", (now - DEFAULT_JOB_STATE_RETENTION_SECONDS,))
+    
+    def load_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """读取任务状态快照"""
+        row = self._connect().execute("SELECT state FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def stats(self) -> Dict[str, Any]:
+        """存储和进程内存统计"""
+        conn = self._connect()
+        count, content_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(markdown) + COALESCE(LENGTH(html), 0)), 0) FROM reports"
+        ).fetchone()
+        db_bytes = 0
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                db_bytes += os.path.getsize(self.db_path + suffix)
+            except OSError:
+                pass
+        return {
+            'backend': 'sqlite',
+            'reports': count,
+            'compressed_content_bytes': content_bytes,
+            'db_bytes': db_bytes,
+            'max_reports': self.max_reports,
+            'ttl_seconds': self.ttl_seconds,
+            'process': process_memory_stats()
+        }
+
+
+def create_report_store():
+    """
+    根据 ESREPORT_STORE_BACKEND 创建报告存储
+    
+    - memory（默认）: 进程内有界存储，适合单进程部署
+    - sqlite: SQLite共享存储，适合多个gunicorn worker
+    """
+    backend = os.getenv('ESREPORT_STORE_BACKEND', 'memory').lower()
+    if backend == 'sqlite':
+        return SQLiteReportStore()
+    if backend != 'memory':
+        print(f"⚠️ 未知的报告存储类型 {backend}，使用内存存储")
+    return ReportStore()
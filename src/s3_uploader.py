@@ -1,12 +1,13 @@
 import os
 import time
-import hashlib
 from datetime import datetime
 from typing import Dict, Any, Optional
 import logging
 from minio import Minio
 from minio.error import S3Error
 
+from .data_source import compute_file_hash
+
 logger = logging.getLogger(__name__)
 
 class S3Uploader:
@@ -61,28 +62,26 @@ class S3Uploader:
                 and self.bucket_name is not None 
                 and self.bucket_name.strip() != "")
     
-    def create_folder_with_file_hash(self, file_path: str) -> str:
+    def create_folder_with_file_hash(self, file_path: str, file_hash: Optional[str] = None) -> str:
         """
         创建基于文件哈希的文件夹名
         
         Args:
             file_path: 文件路径
+            file_hash: 已计算好的文件SHA256（传入时不再重复读取文件）
             
         Returns:
             文件的SHA256哈希值前16位
         """
+        if file_hash:
+            return file_hash[:16]
+        
         if not os.path.exists(file_path):
             # 如果文件不存在，使用时间戳作为备选
             return str(int(time.time()))
         
-        sha256_hash = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            # 分块读取文件以处理大文件
-            for chunk in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(chunk)
-        
         # 返回哈希值的前16位（足够唯一且不会太长）
-        return sha256_hash.hexdigest()[:16]
+        return compute_file_hash(file_path)[:16]
     
     def upload_file(self, local_file_path: str, s3_key: str, 
                    metadata: Optional[Dict[str, str]] = None) -> bool:
@@ -0,0 +1,93 @@
+"""
+章节缓存
+按 (章节输入文件的内容指纹, 报告语言, 生成器版本) 缓存已生成的章节内容和case数据，
+重新生成同一批诊断包、或诊断包只有日志不同时，只重新生成输入文件变化的章节
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Any, List, Optional
+
+from .report_cache import ReportCache
+
+
+DEFAULT_SECTION_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# 集群群组指标条目在缓存键中代替报告语言
+FLEET_METRICS_KEY = 'fleet'
+
+
+def section_digest(section_name: str, generator_name: str, fingerprints: Dict[str, Optional[str]]) -> str:
+    """
+    章节缓存键：章节名、生成器类名和各输入文件指纹的SHA256
+    
+    Args:
+        section_name: 章节名称
+        generator_name: 章节生成器类名
+        fingerprints: 输入文件路径 -> 内容指纹，缺少的文件为None
+    """
+    payload = json.dumps([section_name, generator_name, sorted(fingerprints.items())],
+                         ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SectionCache:
+    """
+    磁盘章节缓存
+    
+    条目以 gzip JSON 保存在 cache_dir 中，超出 max_bytes 时删除最久未使用的条目；
+    不保留内存层，同一进程中重复生成同一诊断包由报告缓存负责。
+    """
+    
+    def __init__(self, cache_dir: str, version: str, max_bytes: Optional[int] = None):
+        """
+        初始化章节缓存
+        
+        Args:
+            cache_dir: 缓存目录，可在多个进程间共享（例如批量生成）
+            version: 报告生成器版本，版本变化后旧缓存自动失效
+            max_bytes: 缓存容量，默认读取 ESREPORT_SECTION_CACHE_MAX_BYTES
+        """
+        if max_bytes is None:
+            max_bytes = int(os.getenv('ESREPORT_SECTION_CACHE_MAX_BYTES', DEFAULT_SECTION_CACHE_MAX_BYTES))
+        self.cache_dir = cache_dir
+        self._store = ReportCache(version, max_bytes=0, cache_dir=cache_dir, disk_max_bytes=max_bytes)
+    
+    def get(self, digest: str, language: str) -> Optional[Dict[str, Any]]:
+        """
+        查询缓存
+        
+        Returns:
+            {'chunks': 章节内容块, 'case_data': case数据}，未命中返回None
+        """
+        entry = self._store.get(digest, language)
+        if entry is None or not isinstance(entry.get('chunks'), list):
+            return None
+        return entry
+    
+    def put(self, digest: str, language: str, chunks: List[str], case_data: Any = None):
+        """
+        写入缓存
+        
+        Args:
+            digest: section_digest() 生成的缓存键
+            language: 报告语言
+            chunks: 章节内容块
+            case_data: 章节的case数据（未记录时为None）
+        """
+        self._store.put(digest, language, {'chunks': chunks, 'case_data': case_data})
+    
+    def get_metrics(self, digest: str) -> Optional[Dict[str, Any]]:
+        """查询缓存的集群群组指标（extract_fleet_metrics 的结果，与报告语言无关），未命中返回None"""
+        entry = self._store.get(digest, FLEET_METRICS_KEY)
+        return entry.get('metrics') if entry else None
+    
+    def put_metrics(self, digest: str, metrics: Dict[str, Any]):
+        """写入集群群组指标"""
+        self._store.put(digest, FLEET_METRICS_KEY, {'metrics': metrics})
+    
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计信息"""
+        stats = self._store.stats()
+        return {'cache_dir': self.cache_dir, 'hits': stats['hits'], 'misses': stats['misses']}
@@ -0,0 +1,243 @@
+"""
+列式分片表
+将 indices.json（cat shards）解析为按列存储的紧凑结构，只解析一次，
+并提供按索引、按节点的聚合结果供索引分析各章节共用
+"""
+
+import json
+from array import array
+from typing import Dict, Any, IO, List, Optional, Tuple
+
+
+# 缺失或无法解析的数值列
+MISSING = -1
+
+
+def _parse_count(value: Any) -> int:
+    """解析cat接口中以字符串表示的文档数或字节数，无效值返回 MISSING"""
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return MISSING
+
+
+class ShardTable:
+    """
+    按列存储的分片表
+    
+    索引名、节点名和分片状态以整数ID保存（每个不同的值只保存一份），
+    文档数和大小保存在 array 中。聚合结果在首次访问时计算一次并缓存。
+    """
+    
+    def __init__(self, shards: Optional[List[Dict[str, Any]]]):
+        """
+        构建分片表
+        
+        Args:
+            shards: indices.json 中的分片记录列表
+        """
+        self.index_names: List[str] = []
+        self.node_names: List[Optional[str]] = []
+        self.state_names: List[str] = []
+        
+        self.index_ids = array('i')
+        self.node_ids = array('i')
+        self.state_ids = array('i')
+        self.primary = array('b')
+        self.shard_numbers = array('i')
+        self.docs = array('q')
+        self.store = array('q')
+        
+        self._index_stats = None
+        self._node_stats = None
+        
+        self._index_lookup = {}
+        self._node_lookup = {}
+        self._state_lookup = {}
+        
+        for shard in shards or []:
+            self.append(shard)
+    
+    @classmethod
+    def from_json_lines(cls, file_obj: IO[str]) -> Optional['ShardTable']:
+        """
+        逐行读取每行一个分片的JSON数组（在线精简收集写出的格式），
+        不需要把整个分片列表读入内存
+        
+        Returns:
+            分片表，文件不是逐行格式时返回None（由调用方整体解析）
+        """
+        if file_obj.readline().strip() != '[':
+            return None
+        
+        table = cls(None)
+        try:
+            for line in file_obj:
+                line = line.strip()
+                if line == ']':
+                    return table
+                if line:
+                    table.append(json.loads(line.rstrip(',')))
+        except ValueError:
+            return None
+        return None
+    
+    @staticmethod
+    def _intern(value, lookup: Dict, names: List) -> int:
+        value_id = lookup.get(value)
+        if value_id is None:
+            value_id = lookup[value] = len(names)
+            names.append(value)
+        return value_id
+    
+    def append(self, shard: Dict[str, Any]):
+        """追加一条分片记录"""
+        self.index_ids.append(self._intern(shard.get('index', 'unknown'), self._index_lookup, self.index_names))
+        self.node_ids.append(self._intern(shard.get('node'), self._node_lookup, self.node_names))
+        self.state_ids.append(self._intern(shard.get('state', 'UNKNOWN'), self._state_lookup, self.state_names))
+        self.primary.append(1 if shard.get('prirep') == 'p' else 0)
+        self.shard_numbers.append(_parse_count(shard.get('shard')))
+        self.docs.append(_parse_count(shard.get('docs')))
+        self.store.append(_parse_count(shard.get('store')))
+        self._index_stats = None
+        self._node_stats = None
+    
+    def __len__(self) -> int:
+        return len(self.index_ids)
+    
+    def index_id(self, name: str) -> Optional[int]:
+        """索引名对应的ID（index_names 中的位置），不存在时返回None"""
+        return self._index_lookup.get(name)
+    
+    def index_totals(self) -> Tuple[array, array, array]:
+        """
+        按索引ID聚合的列，下标与 index_names 对应，不创建按索引的字典
+        
+        Returns:
+            (主分片文档数, 主分片大小, 分片总数)
+        """
+        count = len(self.index_names)
+        docs = array('q', [0]) * count
+        store_bytes = array('q', [0]) * count
+        shard_count = array('i', [0]) * count
+        
+        for index_id, is_primary, shard_docs, shard_store in zip(
+                self.index_ids, self.primary, self.docs, self.store):
+            shard_count[index_id] += 1
+            if is_primary:
+                if shard_docs != MISSING:
+                    docs[index_id] += shard_docs
+                if shard_store != MISSING:
+                    store_bytes[index_id] += shard_store
+        
+        return docs, store_bytes, shard_count
+    
+    def index_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        按索引聚合，按索引首次出现的顺序排列
+        
+        Returns:
+            索引名 -> {primary_shards, replica_shards, shard_count,
+                       docs, store_bytes, max_shard_size（均只统计主分片）,
+                       states, status（该索引最后一个分片的状态）}
+        """
+        if self._index_stats is not None:
+            return self._index_stats
+        
+        count = len(self.index_names)
+        primary_shards = [0] * count
+        shard_count = [0] * count
+        docs = [0] * count
+        store_bytes = [0] * count
+        max_shard_size = [0] * count
+        states = [set() for _ in range(count)]
+        status = [None] * count
+        
+        for index_id, state_id, is_primary, shard_docs, shard_store in zip(
+                self.index_ids, self.state_ids, self.primary, self.docs, self.store):
+            shard_count[index_id] += 1
+            states[index_id].add(state_id)
+            status[index_id] = state_id
+            if is_primary:
+                primary_shards[index_id] += 1
+                if shard_docs != MISSING:
+                    docs[index_id] += shard_docs
+                if shard_store != MISSING:
+                    store_bytes[index_id] += shard_store
+                    if shard_store > max_shard_size[index_id]:
+                        max_shard_size[index_id] = shard_store
+        
+        self._index_stats = {
+            name: {
+                'primary_shards': primary_shards[i],
+                'replica_shards': shard_count[i] - primary_shards[i],
+                'shard_count': shard_count[i],
+                'docs': docs[i],
+                'store_bytes': store_bytes[i],
+                'max_shard_size': max_shard_size[i],
+                'states': {self.state_names[state_id] for state_id in states[i]},
+                'status': self.state_names[status[i]]
+            }
+            for i, name in enumerate(self.index_names)
+        }
+        return self._index_stats
+    
+    def node_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        按节点聚合，未分配的分片归入 'unknown'
+        
+        Returns:
+            节点名 -> {primary, replica, total_size（主分片和副本的总大小）}
+        """
+        if self._node_stats is not None:
+            return self._node_stats
+        
+        count = len(self.node_names)
+        primary = [0] * count
+        total = [0] * count
+        total_size = [0] * count
+        
+        for node_id, is_primary, shard_store in zip(self.node_ids, self.primary, self.store):
+            total[node_id] += 1
+            primary[node_id] += is_primary
+            if shard_store != MISSING:
+                total_size[node_id] += shard_store
+        
+        stats = {}
+        for i, name in enumerate(self.node_names):
+            node_stats = stats.setdefault(name if name is not None else 'unknown',
+                                          {'primary': 0, 'replica': 0, 'total_size': 0})
+            node_stats['primary'] += primary[i]
+            node_stats['replica'] += total[i] - primary[i]
+            node_stats['total_size'] += total_size[i]
+        
+        self._node_stats = stats
+        return self._node_stats
+    
+    def shard_sizes(self) -> List[int]:
+        """所有可解析的分片大小（升序）"""
+        return sorted(size for size in self.store if size != MISSING)
+    
+    def problem_shards(self, healthy_state: str = 'STARTED') -> List[Dict[str, Any]]:
+        """
+        状态不是 healthy_state 的分片，按原始顺序排列
+        
+        Returns:
+            分片列表，每项包含 index、shard、type、state、node
+        """
+        healthy_id = self.state_names.index(healthy_state) if healthy_state in self.state_names else None
+        problems = []
+        for i, state_id in enumerate(self.state_ids):
+            if state_id == healthy_id:
+                continue
+            shard_number = self.shard_numbers[i]
+            node = self.node_names[self.node_ids[i]]
+            problems.append({
+                'index': self.index_names[self.index_ids[i]],
+                'shard': shard_number if shard_number != MISSING else 'N/A',
+                'type': 'p' if self.primary[i] else 'r',
+                'state': self.state_names[state_id],
+                'node': node if node is not None else 'N/A'
+            })
+        return problems
@@ -0,0 +1,626 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+合成诊断数据生成器
+按指定的节点数、索引数、分片数、mapping字段数和日志量生成结构与真实诊断包一致的目录或ZIP，
+包含 ESDataLoader 和各报告模块读取的全部文件以及 .log.gz 轮转日志，
+相同参数和随机种子下输出完全一致，用于离线、可复现的性能测试
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import shutil
+import tempfile
+import zipfile
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, IO, Iterable, List, Tuple
+
+
+# 固定的收集时间，保证输出与运行时间无关
+COLLECTION_TIME = datetime(2025, 5, 28, 14, 24, 59, tzinfo=timezone.utc)
+COLLECTION_MS = int(COLLECTION_TIME.timestamp() * 1000)
+ZIP_DATE_TIME = (2025, 5, 28, 14, 24, 58)
+
+ES_VERSION = '8.11.0'
+GB = 1024 ** 3
+
+# 索引命名：时间序列、应用、监控和系统索引按比例生成
+TIME_SERIES_PREFIXES = ('logs-app', 'logs-nginx', 'metrics-system', 'filebeat', 'traces-apm')
+APPLICATION_NAMES = ('orders', 'customers', 'products', 'inventory', 'payments', 'sessions')
+FIELD_TYPES = ('keyword', 'text', 'long', 'date', 'double', 'boolean', 'ip', 'integer')
+
+# 日志消息模板：(级别, 组件, 消息)，覆盖日志分析的各种分类
+LOG_TEMPLATES = (
+    ('INFO', 'o.e.c.m.MetadataCreateIndexService', 'creating index [{index}], cause [auto(bulk api)], shards [1]/[1]'),
+    ('INFO', 'o.e.c.r.a.AllocationService', 'current.health="GREEN" reason="shards started [[{index}][0]]"'),
+    ('INFO', 'o.e.c.s.ClusterApplierService', 'added {{{node}}}, term: 12, version: 4821, reason: Publication{{term=12}}'),
+    ('INFO', 'o.e.i.r.RecoverySourceHandler', 'recovery of shard [{index}][0] to {node} completed'),
+    ('WARN', 'o.e.m.j.JvmGcMonitorService', '[gc][{n}] overhead, spent [1.2s] collecting in the last [1.5s], heap usage high'),
+    ('WARN', 'o.e.c.r.a.DiskThresholdMonitor', 'high disk watermark [90%] exceeded on [{node}]'),
+    ('WARN', 'o.e.i.s.IndexingSlowLog', 'slow indexing took [2.1s] on [{index}]'),
+    ('WARN', 'o.e.t.TransportService', 'connection to {node} timeout after [30s]'),
+    ('ERROR', 'o.e.t.TcpTransport', 'connection reset by peer while talking to {node}'),
+    ('ERROR', 'o.e.a.s.TransportSearchAction', 'org.elasticsearch.search.query.QueryPhaseExecutionException: Query Failed [{index}]'),
+    ('ERROR', 'o.e.c.r.a.AllocationService', 'failed to allocate shard [{index}][0], allocation decider said no'),
+    ('ERROR', 'o.e.i.e.Engine', 'shard [{index}][0] failed: timeout waiting for refresh'),
+)
+# 各模板的相对权重（INFO为主）
+LOG_WEIGHTS = (30, 20, 5, 10, 6, 3, 4, 3, 2, 2, 1, 1)
+
+
+def _human_size(size_bytes: int) -> str:
+    """与诊断工具 ?human 输出一致的大小格式，例如 15.5gb"""
+    for unit in ('b', 'kb', 'mb', 'gb'):
+        if size_bytes < 1024 or unit == 'gb':
+            return f"{size_bytes:.1f}{unit}" if unit != 'b' else f"{size_bytes}b"
+        size_bytes /= 1024
+
+
+class SyntheticBundleGenerator:
+    """合成诊断数据生成器"""
+    
+    def __init__(self, nodes: int = 3, indices: int = 50, shards: int = 0, replicas: int = 1,
+                 fields: int = 50, log_lines: int = 10000, log_rotations: int = 2,
+                 unassigned: int = 0, seed: int = 42, cluster_name: str = 'synthetic-cluster'):
+        """
+        Args:
+            nodes: 节点数
+            indices: 索引数
+            shards: 主分片总数（至少每个索引一个），0 表示每个索引一个主分片
+            replicas: 每个主分片的副本数（不超过节点数-1）
+            fields: 每个索引mapping中的字段数
+            log_lines: 当前日志文件的行数，每个轮转的 .log.gz 文件行数相同
+            log_rotations: 轮转（压缩）日志文件数
+            unassigned: 未分配的副本分片数
+            seed: 随机种子
+            cluster_name: 集群名称
+        """
+        self.nodes = max(1, nodes)
+        self.indices = max(1, indices)
+        self.shards = max(self.indices, shards)
+        self.replicas = max(0, min(replicas, self.nodes - 1))
+        self.fields = max(1, fields)
+        self.log_lines = max(0, log_lines)
+        self.log_rotations = max(0, log_rotations)
+        self.unassigned = max(0, unassigned)
+        self.seed = seed
+        self.cluster_name = cluster_name
+    
+    def generate(self, output: str) -> str:
+        """
+        生成诊断数据
+        
+        Args:
+            output: 输出目录；以 .zip 结尾时生成ZIP（数据位于与ZIP同名的一级目录中）
+        
+        Returns:
+            输出路径
+        """
+        if output.lower().endswith('.zip'):
+            temp_dir = tempfile.mkdtemp()
+            try:
+                data_dir = os.path.join(temp_dir, os.path.basename(output)[:-4])
+                self._write_directory(data_dir)
+                self._write_zip(temp_dir, output)
+            finally:
+                shutil.rmtree(temp_dir, ignore_errors=True)
+        else:
+            self._write_directory(output)
+        return output
+    
+    def _write_directory(self, data_dir: str):
+        rng = random.Random(self.seed)
+        os.makedirs(os.path.join(data_dir, 'commercial'), exist_ok=True)
+        os.makedirs(os.path.join(data_dir, 'logs'), exist_ok=True)
+        
+        self.node_list = self._make_nodes(rng)
+        self.index_list = self._make_indices(rng)
+        shards = self._make_shards(rng)
+        self._assign_node_totals(shards)
+        
+        unassigned = sum(1 for shard in shards if shard['state'] == 'UNASSIGNED')
+        self.status = 'yellow' if unassigned else 'green'
+        
+        def write(filename: str, data: Any):
+            with open(os.path.join(data_dir, filename), 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+        
+        write('manifest.json', {
+            'collectionDate': COLLECTION_TIME.isoformat().replace('+00:00', 'Z'),
+            'Product Version': ES_VERSION,
+            'diagVersion': '9.1.1',
+            'diagnosticSource': 'synthetic'
+        })
+        write('cluster_health.json', self._cluster_health(shards, unassigned))
+        write('cluster_settings.json', {
+            'persistent': {'cluster': {'routing': {'allocation': {'enable': 'all'}}}},
+            'transient': {}
+        })
+        write('cluster_stats.json', self._cluster_stats(shards))
+        write('licenses.json', {'license': {
+            'status': 'active', 'uid': self._uuid(rng), 'type': 'basic',
+            'issue_date': '2024-01-01T00:00:00.000Z', 'issue_date_in_millis': 1704067200000,
+            'max_nodes': 1000, 'issued_to': self.cluster_name, 'issuer': 'elasticsearch',
+            'expiry_date': '2099-12-31T23:59:59.999Z', 'expiry_date_in_millis': 4102444799999,
+            'start_date_in_millis': -1
+        }})
+        master = self.node_list[0]
+        write('master.json', [{'id': master['id'], 'host': master['ip'], 'ip': master['ip'], 'node': master['name']}])
+        write('nodes.json', self._nodes_info())
+        write('nodes_stats.json', self._nodes_stats(rng))
+        write('nodes_usage.json', self._nodes_usage(rng))
+        write('commercial/ilm_policies.json', self._ilm_policies())
+        
+        # 索引数量可能很大，以下文件逐条写出，不在内存中构建完整结构
+        with open(os.path.join(data_dir, 'indices.json'), 'w', encoding='utf-8') as f:
+            f.write('[\n')
+            f.write(',\n'.join(json.dumps(shard, ensure_ascii=False) for shard in shards))
+            f.write('\n]\n')
+        self._write_object(os.path.join(data_dir, 'indices_stats.json'), self._indices_stats_items(rng, shards),
+                           head={'_shards': {'total': len(shards), 'successful': len(shards) - unassigned,
+                                             'failed': 0}}, key='indices')
+        self._write_object(os.path.join(data_dir, 'settings.json'), self._settings_items())
+        self._write_object(os.path.join(data_dir, 'mapping.json'), self._mapping_items(rng))
+        
+        self._write_logs(rng, os.path.join(data_dir, 'logs'))
+    
+    @staticmethod
+    def _write_object(path: str, items: Iterable[Tuple[str, Any]], head: Dict[str, Any] = None, key: str = None):
+        """逐项写出JSON对象，key 不为空时写在 head 的 key 字段下"""
+        with open(path, 'w', encoding='utf-8') as f:
+            if key:
+                f.write(json.dumps(head or {}, ensure_ascii=False)[:-1])
+                f.write(f'{", " if head else ""}{json.dumps(key)}: {{\n')
+            else:
+                f.write('{\n')
+            first = True
+            for name, value in items:
+                f.write(('' if first else ',\n') + f'{json.dumps(name, ensure_ascii=False)}: '
+                        + json.dumps(value, ensure_ascii=False))
+                first = False
+            f.write('\n}}\n' if key else '\n}\n')
+    
+    @staticmethod
+    def _write_zip(source_dir: str, output: str):
+        """以固定时间戳和固定顺序打包，保证ZIP字节一致"""
+        output_dir = os.path.dirname(output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for root, dirs, files in os.walk(source_dir):
+                dirs.sort()
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    info = zipfile.ZipInfo(os.path.relpath(path, source_dir).replace(os.sep, '/'), ZIP_DATE_TIME)
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    with open(path, 'rb') as f:
+                        archive.writestr(info, f.read())
+    
+    @staticmethod
+    def _uuid(rng: random.Random) -> str:
+        return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-') for _ in range(22))
+    
+    def _make_nodes(self, rng: random.Random) -> List[Dict[str, Any]]:
+        """节点列表：第一个节点兼任master，节点数多于3时前3个为专用master"""
+        nodes = []
+        dedicated_masters = 3 if self.nodes > 5 else 0
+        for i in range(self.nodes):
+            if i < dedicated_masters:
+                roles = ['master']
+            elif dedicated_masters:
+                roles = ['data_content', 'data_hot', 'ingest']
+            else:
+                roles = ['data', 'data_content', 'data_hot', 'ingest', 'master']
+            heap_max = rng.choice((4, 8, 16, 31)) * GB
+            nodes.append({
+                'id': self._uuid(rng),
+                'name': f'{self.cluster_name}-node-{i + 1}',
+                'ip': f'10.0.{i // 250}.{i % 250 + 1}',
+                'roles': roles,
+                'heap_max': heap_max,
+                'disk_total': rng.choice((500, 1000, 2000)) * GB,
+                'processors': rng.choice((4, 8, 16)),
+                'zone': f'zone-{i % 3 + 1}'
+            })
+        return nodes
+    
+    def _data_nodes(self) -> List[Dict[str, Any]]:
+        return [node for node in self.node_list if node['roles'] != ['master']] or self.node_list
+    
+    def _make_indices(self, rng: random.Random) -> List[Dict[str, Any]]:
+        """索引列表，主分片总数按 shards 分配到各索引"""
+        indices = []
+        for i in range(self.indices):
+            kind = rng.random()
+            if kind < 0.6:
+                day = COLLECTION_TIME - timedelta(days=i // len(TIME_SERIES_PREFIXES) % 90)
+                name = f"{TIME_SERIES_PREFIXES[i % len(TIME_SERIES_PREFIXES)]}-{i // (len(TIME_SERIES_PREFIXES) * 90)}" \
+                       f"-{day.strftime('%Y.%m.%d')}"
+            elif kind < 0.8:
+                name = f"{APPLICATION_NAMES[i % len(APPLICATION_NAMES)]}-v{i}"
+            elif kind < 0.9:
+                name = f".monitoring-es-7-{i}"
+            else:
+                name = f".internal-{i}"
+            indices.append({'name': name, 'uuid': self._uuid(rng), 'primaries': 1,
+                            'created': COLLECTION_MS - rng.randint(1, 90) * 86400000})
+        
+        for _ in range(self.shards - self.indices):
+            indices[rng.randrange(len(indices))]['primaries'] += 1
+        return indices
+    
+    def _make_shards(self, rng: random.Random) -> List[Dict[str, Any]]:
+        """cat shards 记录，主分片和副本分布在不同节点"""
+        data_nodes = self._data_nodes()
+        shards = []
+        unassigned_left = self.unassigned
+        for index in self.index_list:
+            docs_total = 0
+            store_total = 0
+            for shard_number in range(index['primaries']):
+                docs = int(rng.lognormvariate(13, 1.5))
+                store = docs * rng.randint(200, 1200)
+                docs_total += docs
+                store_total += store
+                start = rng.randrange(len(data_nodes))
+                for copy in range(self.replicas + 1):
+                    node = data_nodes[(start + copy) % len(data_nodes)]
+                    unassigned = copy > 0 and unassigned_left > 0
+                    if unassigned:
+                        unassigned_left -= 1
+                    shards.append({
+                        'index': index['name'],
+                        'shard': str(shard_number),
+                        'prirep': 'p' if copy == 0 else 'r',
+                        'state': 'UNASSIGNED' if unassigned else 'STARTED',
+                        'docs': None if unassigned else str(docs),
+                        'store': None if unassigned else str(store),
+                        'ip': None if unassigned else node['ip'],
+                        'node': None if unassigned else node['name']
+                    })
+            index['docs'] = docs_total
+            index['store'] = store_total
+        return shards
+    
+    def _assign_node_totals(self, shards: List[Dict[str, Any]]):
+        """按分片汇总各节点的文档数、大小和分片数，供节点统计使用"""
+        totals = {node['name']: [0, 0, 0] for node in self.node_list}
+        for shard in shards:
+            if shard['node'] is not None:
+                entry = totals[shard['node']]
+                entry[0] += int(shard['docs'])
+                entry[1] += int(shard['store'])
+                entry[2] += 1
+        for node in self.node_list:
+            node['docs'], node['store'], node['shards'] = totals[node['name']]
+    
+    def _cluster_health(self, shards: List[Dict[str, Any]], unassigned: int) -> Dict[str, Any]:
+        active = len(shards) - unassigned
+        return {
+            'cluster_name': self.cluster_name,
+            'status': self.status,
+            'timed_out': False,
+            'number_of_nodes': self.nodes,
+            'number_of_data_nodes': len(self._data_nodes()),
+            'active_primary_shards': sum(index['primaries'] for index in self.index_list),
+            'active_shards': active,
+            'relocating_shards': 0,
+            'initializing_shards': 0,
+            'unassigned_shards': unassigned,
+            'delayed_unassigned_shards': 0,
+            'number_of_pending_tasks': 0,
+            'number_of_in_flight_fetch': 0,
+            'task_max_waiting_in_queue_millis': 0,
+            'active_shards_percent_as_number': round(active / len(shards) * 100, 1) if shards else 100.0
+        }
+    
+    def _cluster_stats(self, shards: List[Dict[str, Any]]) -> Dict[str, Any]:
+        primaries = [index['primaries'] for index in self.index_list]
+        copies = [index['primaries'] * (self.replicas + 1) for index in self.index_list]
+        store_bytes = sum(node['store'] for node in self.node_list)
+        role_counts = {}
+        for node in self.node_list:
+            for role in node['roles']:
+                role_counts[role] = role_counts.get(role, 0) + 1
+        disk_total = sum(node['disk_total'] for node in self.node_list)
+        return {
+            '_nodes': {'total': self.nodes, 'successful': self.nodes, 'failed': 0},
+            'cluster_name': self.cluster_name,
+            'cluster_uuid': random.Random(self.seed + 1).getrandbits(64).to_bytes(8, 'big').hex(),
+            'timestamp': COLLECTION_MS,
+            'status': self.status,
+            'indices': {
+                'count': self.indices,
+                'shards': {
+                    'total': len(shards),
+                    'primaries': sum(primaries),
+                    'replication': float(self.replicas),
+                    'index': {
+                        'shards': {'min': min(copies), 'max': max(copies), 'avg': sum(copies) / len(copies)},
+                        'primaries': {'min': min(primaries), 'max': max(primaries),
+                                      'avg': sum(primaries) / len(primaries)},
+                        'replication': {'min': float(self.replicas), 'max': float(self.replicas),
+                                        'avg': float(self.replicas)}
+                    }
+                },
+                'docs': {'count': sum(index['docs'] for index in self.index_list), 'deleted': 0},
+                'store': {'size_in_bytes': store_bytes, 'size': f"{store_bytes / GB:.1f}gb"},
+                'fielddata': {'memory_size_in_bytes': 0, 'evictions': 0},
+                'query_cache': {'memory_size_in_bytes': 0, 'hit_count': 0, 'miss_count': 0, 'evictions': 0},
+                'segments': {'count': len(shards) * 10}
+            },
+            'nodes': {
+                'count': {'total': self.nodes, **role_counts},
+                'versions': [ES_VERSION],
+                'os': {'available_processors': sum(node['processors'] for node in self.node_list)},
+                'jvm': {
+                    'max_uptime_in_millis': 30 * 86400000,
+                    'versions': [{'version': '21.0.1', 'vm_name': 'OpenJDK 64-Bit Server VM',
+                                  'vm_version': '21.0.1+12-29', 'vm_vendor': 'Oracle Corporation',
+                                  'count': self.nodes}],
+                    'mem': {'heap_used_in_bytes': sum(node['heap_max'] for node in self.node_list) // 2,
+                            'heap_max_in_bytes': sum(node['heap_max'] for node in self.node_list)},
+                    'threads': self.nodes * 120
+                },
+                'fs': {'total_in_bytes': disk_total, 'free_in_bytes': disk_total - store_bytes,
+                       'available_in_bytes': disk_total - store_bytes}
+            }
+        }
+    
+    def _nodes_info(self) -> Dict[str, Any]:
+        nodes = {}
+        for node in self.node_list:
+            heap_gb = node['heap_max'] // GB
+            nodes[node['id']] = {
+                'name': node['name'],
+                'transport_address': f"{node['ip']}:9300",
+                'host': node['ip'],
+                'ip': node['ip'],
+                'version': ES_VERSION,
+                'roles': node['roles'],
+                'attributes': {'zone': node['zone'], 'xpack.installed': 'true'},
+                'settings': {'cluster': {'name': self.cluster_name}, 'node': {'name': node['name']},
+                             'network': {'host': '0.0.0.0'}, 'http': {'port': '9200'},
+                             'transport': {'port': '9300'},
+                             'discovery': {'seed_hosts': [master['ip'] for master in self.node_list[:3]]}},
+                'os': {'name': 'Linux', 'arch': 'amd64', 'available_processors': node['processors'],
+                       'allocated_processors': node['processors']},
+                'jvm': {
+                    'version': '21.0.1',
+                    'vm_name': 'OpenJDK 64-Bit Server VM',
+                    'vm_version': '21.0.1+12-29',
+                    'vm_vendor': 'Oracle Corporation',
+                    'start_time_in_millis': COLLECTION_MS - 30 * 86400000,
+                    'mem': {'heap_init_in_bytes': node['heap_max'], 'heap_init': f'{heap_gb}gb',
+                            'heap_max_in_bytes': node['heap_max'], 'heap_max': f'{heap_gb}gb'},
+                    'gc_collectors': ['G1 Young Generation', 'G1 Concurrent GC', 'G1 Old Generation'],
+                    'using_compressed_ordinary_object_pointers': 'true'
+                }
+            }
+        return {'_nodes': {'total': self.nodes, 'successful': self.nodes, 'failed': 0},
+                'cluster_name': self.cluster_name, 'nodes': nodes}
+    
+    def _nodes_stats(self, rng: random.Random) -> Dict[str, Any]:
+        nodes = {}
+        for node in self.node_list:
+            heap_percent = rng.randint(30, 85)
+            available = node['disk_total'] - node['store'] - rng.randint(1, 20) * GB
+            available = max(available, node['disk_total'] // 20)
+            index_total = node['docs'] + rng.randint(0, 10 ** 6)
+            query_total = rng.randint(10 ** 4, 10 ** 8)
+            nodes[node['id']] = {
+                'timestamp': COLLECTION_MS,
+                'name': node['name'],
+                'transport_address': f"{node['ip']}:9300",
+                'host': node['ip'],
+                'ip': f"{node['ip']}:9300",
+                'roles': node['roles'],
+                'attributes': {'zone': node['zone']},
+                'indices': {
+                    'docs': {'count': node['docs'], 'deleted': 0},
+                    'shard_stats': {'total_count': node['shards']},
+                    'store': {'size_in_bytes': node['store']},
+                    'indexing': {'index_total': index_total,
+                                 'index_time_in_millis': index_total // rng.randint(500, 5000),
+                                 'delete_total': rng.randint(0, 10 ** 5)},
+                    'search': {'query_total': query_total,
+                               'query_time_in_millis': query_total * rng.randint(1, 30),
+                               'fetch_total': query_total // 2,
+                               'fetch_time_in_millis': query_total // rng.randint(2, 20)},
+                    'query_cache': {'memory_size_in_bytes': rng.randint(0, 512) * 1024 ** 2,
+                                    'hit_count': rng.randint(0, 10 ** 6), 'miss_count': rng.randint(0, 10 ** 6),
+                                    'evictions': rng.randint(0, 10 ** 4)},
+                    'segments': {'count': node['shards'] * 10, 'memory_in_bytes': 0}
+                },
+                'os': {
+                    'timestamp': COLLECTION_MS,
+                    'cpu': {'percent': rng.randint(5, 95),
+                            'load_average': {'1m': round(rng.uniform(0, 8), 2), '5m': round(rng.uniform(0, 8), 2),
+                                             '15m': round(rng.uniform(0, 8), 2)}},
+                    'available_processors': node['processors'],
+                    'allocated_processors': node['processors'],
+                    'mem': {'total': _human_size(node['heap_max'] * 2),
+                            'total_in_bytes': node['heap_max'] * 2, 'free_in_bytes': node['heap_max'] // 4,
+                            'used_in_bytes': node['heap_max'] * 2 - node['heap_max'] // 4, 'used_percent': 88}
+                },
+                'jvm': {
+                    'timestamp': COLLECTION_MS,
+                    'start_time_in_millis': COLLECTION_MS - 30 * 86400000,
+                    'uptime_in_millis': 30 * 86400000,
+                    'mem': {'heap_used': _human_size(node['heap_max'] * heap_percent // 100),
+                            'heap_used_in_bytes': node['heap_max'] * heap_percent // 100,
+                            'heap_used_percent': heap_percent,
+                            'heap_committed_in_bytes': node['heap_max'],
+                            'heap_max': _human_size(node['heap_max']),
+                            'heap_max_in_bytes': node['heap_max']},
+                    'gc': {'collectors': {
+                        'young': {'collection_count': rng.randint(10 ** 3, 10 ** 6),
+                                  'collection_time_in_millis': rng.randint(10 ** 4, 10 ** 7)},
+                        'old': {'collection_count': rng.randint(0, 100),
+                                'collection_time_in_millis': rng.randint(0, 10 ** 5)}
+                    }}
+                },
+                'thread_pool': {
+                    pool: {'threads': node['processors'], 'queue': rng.randint(0, 50), 'active': rng.randint(0, 4),
+                           'rejected': rng.choice((0, 0, 0, rng.randint(1, 500))), 'largest': node['processors'],
+                           'completed': rng.randint(10 ** 4, 10 ** 8)}
+                    for pool in ('write', 'search', 'get', 'management')
+                },
+                'fs': {
+                    'timestamp': COLLECTION_MS,
+                    'total': {'total_in_bytes': node['disk_total'], 'free_in_bytes': available,
+                              'available_in_bytes': available}
+                }
+            }
+        return {'_nodes': {'total': self.nodes, 'successful': self.nodes, 'failed': 0},
+                'cluster_name': self.cluster_name, 'nodes': nodes}
+    
+    def _nodes_usage(self, rng: random.Random) -> Dict[str, Any]:
+        actions = ('search_action', 'bulk_action', 'get_action', 'nodes_stats_action', 'cluster_health_action')
+        return {
+            '_nodes': {'total': self.nodes, 'successful': self.nodes, 'failed': 0},
+            'cluster_name': self.cluster_name,
+            'nodes': {
+                node['id']: {'timestamp': COLLECTION_MS, 'since': COLLECTION_MS - 30 * 86400000,
+                             'rest_actions': {action: rng.randint(0, 10 ** 6) for action in actions}}
+                for node in self.node_list
+            }
+        }
+    
+    @staticmethod
+    def _ilm_policies() -> Dict[str, Any]:
+        return {
+            name: {
+                'version': 1,
+                'modified_date': '2024-01-01T00:00:00.000Z',
+                'policy': {'phases': {
+                    'hot': {'min_age': '0ms', 'actions': {'rollover': {'max_primary_shard_size': '50gb',
+                                                                       'max_age': '30d'}}},
+                    'delete': {'min_age': delete_after, 'actions': {'delete': {}}}
+                }}
+            }
+            for name, delete_after in (('logs', '90d'), ('metrics', '30d'), ('traces', '7d'))
+        }
+    
+    def _indices_stats_items(self, rng: random.Random, shards: List[Dict[str, Any]]) -> Iterable[Tuple[str, Any]]:
+        """_stats?level=shards 的索引统计，未分配的分片副本不出现在 shards 中"""
+        node_ids = {node['name']: node['id'] for node in self.node_list}
+        shard_stats = {}
+        for shard in shards:
+            if shard['state'] != 'STARTED':
+                continue
+            shard_stats.setdefault(shard['index'], {}).setdefault(shard['shard'], []).append({
+                'routing': {'state': 'STARTED', 'primary': shard['prirep'] == 'p',
+                            'node': node_ids[shard['node']], 'relocating_node': None},
+                'docs': {'count': int(shard['docs']), 'deleted': 0},
+                'store': {'size_in_bytes': int(shard['store'])}
+            })
+        
+        for index in self.index_list:
+            index_total = index['docs'] + rng.randint(0, 1000)
+            query_total = rng.randint(0, 10 ** 6)
+            primaries = {'docs': {'count': index['docs'], 'deleted': 0},
+                         'store': {'size_in_bytes': index['store']}}
+            yield index['name'], {
+                'uuid': index['uuid'],
+                'health': 'green',
+                'status': 'open',
+                'primaries': primaries,
+                'total': {
+                    'docs': {'count': index['docs'] * (self.replicas + 1), 'deleted': 0},
+                    'store': {'size_in_bytes': index['store'] * (self.replicas + 1)},
+                    'indexing': {'index_total': index_total, 'index_time_in_millis': index_total // 1000,
+                                 'delete_total': 0},
+                    'search': {'query_total': query_total, 'query_time_in_millis': query_total * 3,
+                               'fetch_total': query_total, 'fetch_time_in_millis': query_total}
+                },
+                'shards': shard_stats.pop(index['name'], {})
+            }
+    
+    def _settings_items(self) -> Iterable[Tuple[str, Any]]:
+        for index in self.index_list:
+            yield index['name'], {'settings': {'index': {
+                'number_of_shards': str(index['primaries']),
+                'number_of_replicas': str(self.replicas),
+                'creation_date': str(index['created']),
+                'uuid': index['uuid'],
+                'provided_name': index['name'],
+                'version': {'created': '8500003'}
+            }}}
+    
+    def _mapping_items(self, rng: random.Random) -> Iterable[Tuple[str, Any]]:
+        for index in self.index_list:
+            properties = {'@timestamp': {'type': 'date'}}
+            for i in range(self.fields - 1):
+                properties[f'field_{i}'] = {'type': FIELD_TYPES[rng.randrange(len(FIELD_TYPES))]}
+            yield index['name'], {'mappings': {'properties': properties}}
+    
+    def _log_lines(self, rng: random.Random, count: int, end: datetime) -> Iterable[str]:
+        """按时间顺序生成日志行，最后一行的时间为 end"""
+        step = timedelta(seconds=86400 / max(count, 1))
+        start = end - step * count
+        names = [index['name'] for index in self.index_list]
+        node_names = [node['name'] for node in self.node_list]
+        templates = rng.choices(range(len(LOG_TEMPLATES)), weights=LOG_WEIGHTS, k=count)
+        for n, template in enumerate(templates):
+            level, component, message = LOG_TEMPLATES[template]
+            timestamp = (start + step * (n + 1)).strftime('%Y-%m-%dT%H:%M:%S,%f')[:-3]
+            node = node_names[n % len(node_names)]
+            text = message.format(index=names[n % len(names)], node=node_names[(n + 1) % len(node_names)], n=n)
+            yield f"[{timestamp}][{level}][{component}] [{node}] {text}\n"
+    
+    def _write_logs(self, rng: random.Random, logs_dir: str):
+        """
+        写入当前日志和按天轮转的 .log.gz 日志（gzip头不含时间戳，保证输出一致）
+        
+        日志级别不做对齐填充（与日志扫描测试数据一致），以便错误和警告都进入统计
+        """
+        with open(os.path.join(logs_dir, f'{self.cluster_name}.log'), 'w', encoding='utf-8') as f:
+            f.writelines(self._log_lines(rng, self.log_lines, COLLECTION_TIME))
+        
+        for rotation in range(1, self.log_rotations + 1):
+            day = COLLECTION_TIME - timedelta(days=rotation)
+            path = os.path.join(logs_dir, f"{self.cluster_name}-{day.strftime('%Y-%m-%d')}-1.log.gz")
+            with open(path, 'wb') as raw:
+                with gzip.GzipFile(filename='', mode='wb', fileobj=raw, mtime=0) as gz:
+                    for line in self._log_lines(rng, self.log_lines, day):
+                        gz.write(line.encode('utf-8'))
+
+
+def main():
+    """
+    命令行入口
+    
+    示例:
+    python -m src.synthetic_bundle --output ./synthetic-diagnostics --nodes 10 --indices 1000
+    python -m src.synthetic_bundle --output ./synthetic.zip --indices 100000 --shards 150000 --seed 7
+    """
+    parser = argparse.ArgumentParser(description="生成用于性能测试的合成Elasticsearch诊断数据")
+    parser.add_argument('--output', required=True, help='输出目录，以 .zip 结尾时生成ZIP')
+    parser.add_argument('--nodes', type=int, default=3, help='节点数 (默认: 3)')
+    parser.add_argument('--indices', type=int, default=50, help='索引数 (默认: 50)')
+    parser.add_argument('--shards', type=int, default=0, help='主分片总数 (默认: 每个索引1个)')
+    parser.add_argument('--replicas', type=int, default=1, help='副本数 (默认: 1)')
+    parser.add_argument('--fields', type=int, default=50, help='每个索引的mapping字段数 (默认: 50)')
+    parser.add_argument('--log-lines', type=int, default=10000, help='每个日志文件的行数 (默认: 10000)')
+    parser.add_argument('--log-rotations', type=int, default=2, help='轮转的 .log.gz 文件数 (默认: 2)')
+    parser.add_argument('--unassigned', type=int, default=0, help='未分配的副本分片数 (默认: 0)')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子 (默认: 42)')
+    parser.add_argument('--cluster-name', default='synthetic-cluster', help='集群名称')
+    args = parser.parse_args()
+    
+    generator = SyntheticBundleGenerator(
+        nodes=args.nodes, indices=args.indices, shards=args.shards, replicas=args.replicas,
+        fields=args.fields, log_lines=args.log_lines, log_rotations=args.log_rotations,
+        unassigned=args.unassigned, seed=args.seed, cluster_name=args.cluster_name
+    )
+    output = generator.generate(args.output)
+    print(f"✅ 合成诊断数据已生成: {output}")
+
+
+if __name__ == "__main__":
+    main()
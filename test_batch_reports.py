@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+批量报告生成测试
+验证多进程批量生成、按哈希跳过已生成的诊断包以及群组汇总文件
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+import src.batch
+from src.batch import BatchReportRunner, find_bundles, bundle_signature, BATCH_MANIFEST_FILE, FLEET_SUMMARY_JSON, FLEET_SUMMARY_MD
+
+def make_bundles() -> str:
+    """两个诊断目录和一个诊断ZIP"""
+    root = tempfile.mkdtemp()
+    for name, status in (('alpha', 'green'), ('beta', 'yellow'), ('gamma', 'red')):
+        data_dir = os.path.join(root, name)
+        os.makedirs(data_dir)
+        with open(os.path.join(data_dir, 'cluster_health.json'), 'w', encoding='utf-8') as f:
+            json.dump({'cluster_name': name, 'status': status, 'number_of_nodes': 1}, f)
+    shutil.make_archive(os.path.join(root, 'gamma'), 'zip', root, 'gamma')
+    shutil.rmtree(os.path.join(root, 'gamma'))
+    os.makedirs(os.path.join(root, 'not-a-bundle'))
+    return root
+
+def test_batch_reports():
+    """测试批量生成、跳过和汇总"""
+    root = make_bundles()
+    bundles = find_bundles(root)
+    assert [os.path.basename(path) for path in bundles] == ['alpha', 'beta', 'gamma.zip']
+    assert find_bundles(os.path.join(root, '*.zip')) == [os.path.join(root, 'gamma.zip')]
+    
+    output_dir = tempfile.mkdtemp()
+    summary = BatchReportRunner(output_dir, workers=2).run(bundles)
+    assert (summary['generated'], summary['skipped'], summary['failed']) == (3, 0, 0)
+    assert [entry['summary']['cluster_name'] for entry in summary['bundles']] == ['alpha', 'beta', 'gamma']
+    assert all(entry['seconds'] > 0 for entry in summary['bundles'])
+    assert os.path.dirname(summary['bundles'][2]['markdown']) == os.path.join(output_dir, 'gamma')
+    
+    # 再次运行时已生成的诊断包按大小和修改时间跳过，主进程不计算ZIP的内容哈希
+    compute_file_hash = src.batch.compute_file_hash
+    src.batch.compute_file_hash = None
+    try:
+        summary = BatchReportRunner(output_dir, workers=2).run(bundles)
+    finally:
+        src.batch.compute_file_hash = compute_file_hash
+    assert (summary['generated'], summary['skipped']) == (0, 3)
+    
+    # 只有修改时间变化的ZIP在子进程中按内容哈希跳过，并记录新的签名
+    zip_path = bundles[2]
+    os.utime(zip_path, ns=(0, os.stat(zip_path).st_mtime_ns + 10 ** 9))
+    summary = BatchReportRunner(output_dir, workers=2).run(bundles)
+    assert (summary['generated'], summary['skipped']) == (0, 3)
+    with open(os.path.join(output_dir, BATCH_MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        assert bundle_signature(zip_path) in [entry.get('signature') for entry in json.load(f).values()]
+    
+    # 之前只生成了Markdown时，需要HTML的运行重新生成
+    summary = BatchReportRunner(output_dir, workers=2, generate_html=True).run(bundles)
+    assert (summary['generated'], summary['skipped']) == (3, 0)
+    assert all(os.path.exists(entry['html']) for entry in summary['bundles'])
+    summary = BatchReportRunner(output_dir, workers=2, generate_html=True).run(bundles)
+    assert (summary['generated'], summary['skipped']) == (0, 3)
+    
+    # 诊断数据变化后只重新生成该诊断包
+    with open(os.path.join(root, 'beta', 'cluster_health.json'), 'w', encoding='utf-8') as f:
+        json.dump({'cluster_name': 'beta', 'status': 'green', 'number_of_nodes': 3}, f)
+    summary = BatchReportRunner(output_dir, workers=2).run(bundles)
+    assert (summary['generated'], summary['skipped']) == (1, 2)
+    
+    with open(os.path.join(output_dir, FLEET_SUMMARY_JSON), 'r', encoding='utf-8') as f:
+        assert len(json.load(f)['bundles']) == 3
+    with open(os.path.join(output_dir, FLEET_SUMMARY_MD), 'r', encoding='utf-8') as f:
+        content = f.read()
+    assert '| beta | green | 3 |' in content and '| gamma | red | 1 |' in content
+    print("✅ 批量生成、跳过和汇总正确")
+
+def test_cli_without_s3_sdk():
+    """测试命令行入口不依赖S3 SDK"""
+    code = "import sys, src.main; assert 'minio' not in sys.modules and 'src.s3_uploader' not in sys.modules"
+    subprocess.run([sys.executable, '-c', code], cwd=str(Path(__file__).parent), check=True)
+    print("✅ 命令行入口不导入S3 SDK")
+
+if __name__ == "__main__":
+    test_batch_reports()
+    test_cli_without_s3_sdk()
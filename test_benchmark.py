@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+性能基准测试套件测试
+验证各阶段计时、历史记录读写以及基于历史基线的回归判断
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.benchmark import BenchmarkSuite, find_regressions, load_history, save_history
+from src.report_generator import SECTION_GENERATORS
+
+TINY = {'nodes': 2, 'indices': 10, 'shards': 0, 'fields': 5, 'log_lines': 50, 'log_rotations': 1}
+
+def make_run(seconds, bundle=None, platform='Linux-x86_64'):
+    return {'language': 'zh', 'python': '3.12.0', 'platform': platform, 'results': {'tiny': {'bundle': bundle or TINY, 'stages': {
+        'load': seconds, 'INDEX_ANALYSIS.generate': seconds * 2}}}}
+
+def test_benchmark_stages():
+    """测试各阶段都被计时，且合成诊断数据只生成一次"""
+    bundle_dir = tempfile.mkdtemp()
+    suite = BenchmarkSuite(bundle_dir=bundle_dir, repeat=1, sizes={'tiny': TINY})
+    run = suite.run()
+    stages = run['results']['tiny']['stages']
+    for section_name in SECTION_GENERATORS:
+        assert f"{section_name}.generate" in stages and f"{section_name}.case_data" in stages
+    for stage in ('load', 'log_scan', 'generate_report', 'markdown_to_html'):
+        assert stages[stage] > 0
+    assert len(os.listdir(bundle_dir)) == 1
+    # 报告输出目录使用后删除
+    temp_entries = set(os.listdir(tempfile.gettempdir()))
+    suite.run()
+    assert set(os.listdir(tempfile.gettempdir())) <= temp_entries
+    assert len(os.listdir(bundle_dir)) == 1
+    print("✅ 各阶段计时正确")
+
+def test_benchmark_regressions():
+    """测试回归判断和历史记录"""
+    history = [make_run(1.0), make_run(1.1), make_run(0.9)]
+    # 基线中位数为1.0秒（INDEX_ANALYSIS为2.0秒）
+    assert find_regressions(history, make_run(1.2)) == []
+    regressions = find_regressions(history, make_run(1.5))
+    assert [(item['stage'], item['baseline'], item['ratio']) for item in regressions] == [
+        ('load', 1.0, 1.5), ('INDEX_ANALYSIS.generate', 2.0, 1.5)]
+    # 绝对差值过小的阶段不算回归
+    assert find_regressions([make_run(0.001)], make_run(0.01)) == []
+    # 只与相同合成参数的历史运行比较
+    assert find_regressions(history, make_run(1.5, bundle=dict(TINY, nodes=3))) == []
+    # 只与相同运行环境的历史运行比较
+    assert find_regressions(history, make_run(1.5, platform='macOS-arm64')) == []
+    # 基线只取最近的运行
+    assert find_regressions(history + [make_run(1.5)] * 3, make_run(1.5)) == []
+    
+    path = os.path.join(tempfile.mkdtemp(), 'benchmarks', 'history.json')
+    assert load_history(path) == []
+    save_history(path, history)
+    assert load_history(path) == history
+    print("✅ 回归判断和历史记录正确")
+
+if __name__ == "__main__":
+    test_benchmark_stages()
+    test_benchmark_regressions()
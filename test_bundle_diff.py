@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+诊断包对比测试
+构造同一集群相隔一天的两个诊断目录，验证索引增长、分片变化、磁盘趋势、
+计数器速率和新错误类型的对比结果
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.bundle_diff import BundleDiff, index_prefix
+from src.data_loader import ESDataLoader
+from src.main import compare_with_baseline
+
+DAY_MS = 86400 * 1000
+
+def shard(index, prirep, docs, store, number='0'):
+    return {'index': index, 'shard': number, 'prirep': prirep, 'state': 'STARTED',
+            'docs': str(docs), 'store': str(store), 'node': 'es-node-1'}
+
+def write_bundle(shards, timestamp, used, index_total, log_lines):
+    """写入一个最小诊断目录"""
+    data_dir = tempfile.mkdtemp()
+    files = {
+        'indices.json': shards,
+        'nodes_stats.json': {'nodes': {'n1': {
+            'name': 'es-node-1',
+            'timestamp': timestamp,
+            'fs': {'total': {'total_in_bytes': 1000000, 'available_in_bytes': 1000000 - used}},
+            'indices': {'indexing': {'index_total': index_total, 'index_time_in_millis': index_total}}
+        }}}
+    }
+    for filename, data in files.items():
+        with open(os.path.join(data_dir, filename), 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    os.makedirs(os.path.join(data_dir, 'logs'))
+    with open(os.path.join(data_dir, 'logs', 'cluster.log'), 'w', encoding='utf-8') as f:
+        f.write('\n'.join(log_lines) + '\n')
+    return data_dir
+
+BASELINE_LOG = [
+    '[2024-05-01T10:00:00,000][ERROR][o.e.t.TransportService] failed: org.elasticsearch.transport.NodeDisconnectedException',
+]
+CURRENT_LOG = BASELINE_LOG + [
+    '[2024-05-02T10:00:00,000][ERROR][o.e.i.e.Engine] merge failed java.lang.OutOfMemoryError: Java heap space',
+    '[2024-05-02T10:00:01,000][ERROR][o.e.i.e.Engine] merge failed java.lang.OutOfMemoryError: Java heap space',
+]
+
+def make_diff(language='zh'):
+    baseline = write_bundle([
+        shard('logs-2024.05.01', 'p', 100, 1000),
+        shard('logs-2024.05.01', 'r', 100, 1000),
+        shard('metrics', 'p', 50, 500),
+        shard('old-index', 'p', 10, 100),
+    ], 1_000_000, 200000, 1000, BASELINE_LOG)
+    current = write_bundle([
+        shard('logs-2024.05.01', 'p', 100, 1000),
+        shard('logs-2024.05.01', 'r', 100, 1000),
+        shard('logs-2024.05.02', 'p', 300, 4000),
+        shard('metrics', 'p', 80, 900),
+        shard('metrics', 'p', 20, 100, number='1'),
+    ], 1_000_000 + DAY_MS, 260000, 87400, CURRENT_LOG)
+    return BundleDiff(ESDataLoader(current), ESDataLoader(baseline), language=language)
+
+def test_index_prefix():
+    """测试索引前缀提取"""
+    assert index_prefix('logs-2024.05.01') == 'logs'
+    assert index_prefix('.ds-logs-app-2024.05.01-000001') == '.ds-logs-app'
+    assert index_prefix('app-5-2024.01.02') == 'app-5'
+    assert index_prefix('logs-000003') == 'logs'
+    assert index_prefix('metrics') == 'metrics'
+    assert index_prefix('2024') == '2024'
+    print("✅ 索引前缀提取正确")
+
+def test_compare():
+    """测试对比结果"""
+    comparison = make_diff().compare()
+    
+    assert comparison['elapsed_seconds'] == 86400
+    
+    indices = comparison['indices']
+    assert indices['new'] == ['logs-2024.05.02'] and indices['deleted'] == ['old-index']
+    assert indices['current_shards'] - indices['baseline_shards'] == 1
+    assert indices['growth'][0] == {'index': 'logs-2024.05.02', 'store_delta': 4000, 'docs_delta': 300,
+                                    'store_bytes': 4000, 'new': True}
+    assert indices['growth'][1]['index'] == 'metrics' and indices['growth'][1]['store_delta'] == 500
+    assert indices['shard_changes'] == [{'index': 'metrics', 'baseline': 1, 'current': 2, 'delta': 1}]
+    
+    prefixes = {item['prefix']: item for item in comparison['prefixes']}
+    assert prefixes['logs']['indices_delta'] == 1 and prefixes['logs']['store_delta'] == 4000
+    assert prefixes['old-index']['store_delta'] == -100
+    
+    assert comparison['nodes'] == [{'node': 'es-node-1', 'baseline_used': 200000, 'current_used': 260000,
+                                    'delta': 60000, 'per_day': 60000, 'current_percent': 26.0}]
+    assert comparison['node_rates']['n1']['index_rate'] == 1
+    
+    errors = comparison['errors']
+    assert errors['new_count'] == 1 and errors['resolved_count'] == 0
+    assert errors['new'][0]['signature'] == 'o.e.i.e.Engine OutOfMemoryError'
+    assert errors['new'][0]['count'] == 2
+    
+    json.dumps(comparison)
+    print("✅ 诊断包对比结果正确")
+
+def test_generate():
+    """测试中英文对比报告"""
+    content = make_diff().generate()
+    assert '# Elasticsearch 诊断数据对比' in content
+    assert '| logs-2024.05.02 (新) | +3.91 KB | +300 | 3.91 KB |' in content
+    assert '| metrics | 1 | 2 | +1 |' in content
+    assert 'o.e.i.e.Engine OutOfMemoryError' in content
+    
+    content = make_diff('en').generate()
+    assert '## 2. Node Disk Usage Trend' in content
+    assert '| es-node-1 | 1.0/s |' in content
+    print("✅ 对比报告生成正确")
+
+def test_compare_with_baseline():
+    """测试命令行对比报告使用指定的语言"""
+    diff = make_diff()
+    comparison_path = compare_with_baseline(diff.current, diff.baseline.data_dir, tempfile.mkdtemp(), language='en')
+    with open(comparison_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    assert '## 2. Node Disk Usage Trend' in content and '诊断数据对比' not in content
+    print("✅ 对比报告使用指定的语言")
+
+if __name__ == "__main__":
+    test_index_prefix()
+    test_compare()
+    test_generate()
+    test_compare_with_baseline()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+case文件测试
+验证生成章节时记录的case数据、各case文件格式以及报告返回后再写出case文件
+"""
+
+import gzip
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.report_generator import ESReportGenerator, SECTION_GENERATORS
+from src.synthetic_bundle import SyntheticBundleGenerator
+
+def make_bundle():
+    bundle_dir = os.path.join(tempfile.mkdtemp(), 'bundle')
+    SyntheticBundleGenerator(nodes=3, indices=20, fields=10, log_lines=200, unassigned=2).generate(bundle_dir)
+    return bundle_dir
+
+def generate(bundle_dir, case_files, **kwargs):
+    output_dir = tempfile.mkdtemp()
+    generator = ESReportGenerator(bundle_dir, output_dir=output_dir, case_files=case_files)
+    generator.generate_report(generate_html=False, **kwargs)
+    return generator, os.path.join(output_dir, 'cases')
+
+def test_captured_case_data():
+    """测试case数据在生成章节时记录，报告返回后再写出"""
+    generator, case_dir = generate(make_bundle(), 'json', write_case_files=False)
+    assert set(generator.case_data) == set(SECTION_GENERATORS)
+    assert os.listdir(case_dir) == [] and 'case_files' not in generator.timings
+    
+    index_case = generator.case_data['INDEX_ANALYSIS']
+    assert 'indices_data' not in index_case and len(index_case['index_stats']) == 20
+    assert len(index_case['problem_shards']) == 2
+    
+    # 写出时使用记录的数据，不再调用 get_case_data()
+    for section_generator in generator.generators.values():
+        section_generator.get_case_data = None
+    generator.generate_case_files()
+    assert generator.case_data == {} and 'case_files' in generator.timings
+    assert sorted(os.listdir(case_dir)) == sorted(f"{name.lower()}_case.json" for name in SECTION_GENERATORS)
+    print("✅ case数据在生成章节时记录")
+
+def test_case_file_modes():
+    """测试 compact、ndjson-gz 和 none 格式"""
+    bundle_dir = make_bundle()
+    _, json_dir = generate(bundle_dir, 'json')
+    _, compact_dir = generate(bundle_dir, 'compact')
+    _, ndjson_dir = generate(bundle_dir, 'ndjson-gz')
+    _, none_dir = generate(bundle_dir, 'none')
+    
+    assert os.listdir(none_dir) == []
+    for section_name in SECTION_GENERATORS:
+        with open(os.path.join(json_dir, f"{section_name.lower()}_case.json"), 'r', encoding='utf-8') as f:
+            expected = json.load(f)
+        
+        compact_path = os.path.join(compact_dir, f"{section_name.lower()}_case.json")
+        with open(compact_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        assert '\n' not in content and json.loads(content) == expected
+        
+        with gzip.open(os.path.join(ndjson_dir, f"{section_name.lower()}_case.ndjson.gz"), 'rt', encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        assert {record['key']: record['data'] for record in records} == expected
+    
+    try:
+        ESReportGenerator(bundle_dir, output_dir=tempfile.mkdtemp(), case_files='yaml')
+        assert False, "未知的case文件格式应抛出异常"
+    except ValueError:
+        pass
+    print("✅ case文件格式正确")
+
+if __name__ == "__main__":
+    test_captured_case_data()
+    test_case_file_modes()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+诊断数据源测试
+验证ZIP数据源可以直接读取压缩包内的诊断数据
+"""
+
+import os
+import sys
+import json
+import tempfile
+import zipfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.data_source import ZipDataSource, open_data_source
+from src.data_loader import ESDataLoader
+
+def create_test_zip(prefix: str = "local-diagnostics-20250101/") -> str:
+    """创建测试诊断ZIP文件（数据位于一级子目录中）"""
+    temp_dir = tempfile.mkdtemp()
+    zip_path = os.path.join(temp_dir, "diagnostic.zip")
+    
+    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(prefix + "cluster_health.json", json.dumps({'cluster_name': 'test', 'status': 'green'}))
+        zf.writestr(prefix + "logs/es.log", "[2024-01-01T10:00:00,000][WARN][o.e.d] disk watermark exceeded\n")
+    
+    return zip_path
+
+def test_nested_zip_source():
+    """测试嵌套目录的ZIP数据源"""
+    zip_path = create_test_zip()
+    
+    with ZipDataSource(zip_path) as source:
+        assert source.root == "local-diagnostics-20250101"
+        assert source.isfile('cluster_health.json')
+        assert source.isdir('logs')
+        assert source.listdir('logs') == ['es.log']
+        assert not source.exists('nodes.json')
+    print("✅ 嵌套目录识别正确")
+
+def test_loader_reads_zip():
+    """测试数据加载器直接读取ZIP"""
+    zip_path = create_test_zip(prefix="")
+    
+    loader = ESDataLoader(zip_path)
+    assert loader.get_cluster_health()['cluster_name'] == 'test'
+    assert loader.get_nodes() is None
+    
+    scan = loader.get_log_scan()
+    assert scan.warning_types['disk'] == 1
+    loader.source.close()
+    print("✅ 数据加载器可直接读取ZIP")
+
+def test_invalid_zip_root():
+    """测试不包含诊断数据的ZIP"""
+    temp_dir = tempfile.mkdtemp()
+    zip_path = os.path.join(temp_dir, "other.zip")
+    with zipfile.ZipFile(zip_path, 'w') as zf:
+        zf.writestr("readme.txt", "hello")
+    
+    source = open_data_source(zip_path)
+    assert source.root is None
+    source.close()
+    print("✅ 非诊断ZIP返回空根目录")
+
+if __name__ == "__main__":
+    test_nested_zip_source()
+    test_loader_reads_zip()
+    test_invalid_zip_root()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+HTML文档缓存测试
+验证只渲染一次、压缩版本和按大小淘汰
+"""
+
+import gzip
+import sys
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.document_cache import DocumentCache
+
+def test_render_once():
+    """测试同一报告只渲染一次且压缩版本内容一致"""
+    cache = DocumentCache(max_bytes=1024 * 1024)
+    calls = []
+    
+    def render():
+        calls.append(1)
+        return '<html>' + '巡检报告' * 100 + '</html>'
+    
+    first = cache.get_or_render('r1', render)
+    second = cache.get_or_render('r1', render)
+    
+    assert first is second
+    assert len(calls) == 1
+    assert gzip.decompress(first.variants['gzip']) == first.body
+    assert first.select_encoding({'gzip': 1.0}) == 'gzip'
+    assert first.select_encoding({}) == 'identity'
+    assert first.variant_etag('gzip') != first.variant_etag('identity')
+    print("✅ HTML文档只渲染一次")
+
+def test_eviction():
+    """测试超出容量后淘汰最久未使用的文档"""
+    cache = DocumentCache(max_bytes=1500)
+    cache.get_or_render('r1', lambda: 'a' * 1000)
+    cache.get_or_render('r2', lambda: 'b' * 1000)
+    
+    stats = cache.stats()
+    assert stats['documents'] == 1
+    assert stats['bytes'] <= 1500
+    print("✅ HTML文档缓存淘汰正确")
+
+def test_discard_report():
+    """测试删除报告时移除完整文档和章节文档"""
+    cache = DocumentCache(max_bytes=1024 * 1024)
+    cache.get_or_render('r1', lambda: '<html>r1</html>')
+    cache.get_or_render('r1/NODE_INFO.html', lambda: '<p>r1</p>')
+    cache.get_or_render('r10', lambda: '<html>r10</html>')
+    assert cache.get('r1/NODE_INFO.html') is not None
+    
+    cache.discard('r1')
+    assert cache.get('r1') is None and cache.get('r1/NODE_INFO.html') is None
+    assert cache.get('r10') is not None
+    assert cache.stats()['documents'] == 1
+    print("✅ 删除报告时移除缓存文档")
+
+if __name__ == "__main__":
+    test_render_once()
+    test_eviction()
+    test_discard_report()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ES检查器并发收集测试
+使用本地替身接口验证并发上限、结果顺序和接口耗时
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.es_inspector import ElasticsearchInspector
+
+class FakeInspector(ElasticsearchInspector):
+    """不访问网络，按接口返回固定数据"""
+    
+    def __init__(self, config):
+        super().__init__(config)
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+    
+    def _make_request(self, endpoint, method='GET', **kwargs):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        if endpoint == '/_cluster/settings':
+            raise ConnectionError("ES请求失败 [/_cluster/settings]: timeout")
+        return {'endpoint': endpoint}
+
+def test_concurrent_collection():
+    """测试并发收集不超过上限，且结果与依次收集一致"""
+    inspector = FakeInspector({'host': 'localhost', 'max_concurrency': 3})
+    result = inspector.inspect_cluster()
+    
+    assert inspector.peak == 3
+    assert result['nodes_stats'] == {'endpoint': '/_nodes/stats'}
+    assert result['cluster_settings'] == {}
+    assert len(result['errors']) == 1
+    assert result['timings']['shards_info'] >= 0.05
+    assert result['timings']['total'] < 12 * 0.05
+    
+    sequential = FakeInspector({'host': 'localhost'}).inspect_cluster()
+    assert {k: v for k, v in sequential.items() if k not in ('inspection_time', 'timings')} == \
+        {k: v for k, v in result.items() if k not in ('inspection_time', 'timings')}
+    print("✅ 并发收集结果和耗时正确")
+
+if __name__ == "__main__":
+    test_concurrent_collection()
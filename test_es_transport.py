@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ES传输层测试
+使用本地HTTP服务验证503重试、gzip协商、按接口超时和调用统计
+"""
+
+import gzip
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.es_transport import ESTransport
+
+class FakeESHandler(BaseHTTPRequestHandler):
+    """第一次请求返回503，之后返回gzip压缩的JSON"""
+    
+    calls = 0
+    
+    def do_GET(self):
+        FakeESHandler.calls += 1
+        if FakeESHandler.calls == 1:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        
+        body = json.dumps([{'index': f'logs-{i}', 'shard': '0'} for i in range(500)]).encode('utf-8')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header('Content-Encoding', 'gzip')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def test_retry_gzip_and_stats():
+    """测试503后重试成功，并统计压缩前后的字节数"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeESHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        transport = ESTransport(f"http://127.0.0.1:{server.server_port}", {'retry_backoff': 0.01})
+        response = transport.request('GET', '/_cat/shards?format=json')
+        
+        assert response.status_code == 200
+        assert len(response.json()) == 500
+        
+        stats = transport.stats()['/_cat/shards']
+        assert stats['calls'] == 1
+        assert stats['retries'] == 1
+        assert 0 < stats['wire_bytes'] < stats['body_bytes']
+        
+        assert transport.timeout_for('/_cat/shards?v') == (5, 300)
+        assert transport.timeout_for('/_nodes/stats/jvm') == (5, 120)
+        assert transport.timeout_for('/') == (5, 30)
+        print("✅ 重试、gzip和调用统计正确")
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    test_retry_gzip_and_stats()
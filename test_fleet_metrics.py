@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+集群群组指标存储测试
+验证每次生成报告写入的集群、节点和索引指标，以及基于数据库的趋势查询
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.fleet_metrics import FleetMetricsStore
+from src.report_generator import ESReportGenerator
+
+DAY_MS = 86400 * 1000
+
+def make_data_dir(cluster_uuid, cluster_name, timestamp, heap_percent, docs):
+    """写入一个最小诊断目录"""
+    data_dir = tempfile.mkdtemp()
+    files = {
+        'cluster_health.json': {'cluster_name': cluster_name, 'status': 'green', 'number_of_nodes': 1,
+                                'number_of_data_nodes': 1, 'unassigned_shards': 0},
+        'cluster_stats.json': {'cluster_uuid': cluster_uuid, 'timestamp': timestamp,
+                               'indices': {'count': 1, 'shards': {'total': 1}, 'docs': {'count': docs},
+                                           'store': {'size_in_bytes': docs * 10}}},
+        'nodes_stats.json': {'nodes': {'n1': {
+            'name': f'{cluster_name}-node-1',
+            'jvm': {'mem': {'heap_used_percent': heap_percent}},
+            'fs': {'total': {'total_in_bytes': 1000, 'available_in_bytes': 400}}
+        }}},
+        'indices.json': [{'index': 'logs-2024.05.01', 'shard': '0', 'prirep': 'p', 'state': 'STARTED',
+                          'docs': str(docs), 'store': str(docs * 10), 'node': f'{cluster_name}-node-1'}]
+    }
+    for filename, data in files.items():
+        with open(os.path.join(data_dir, filename), 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    return data_dir
+
+def record(store, *args):
+    generator = ESReportGenerator(make_data_dir(*args), output_dir=tempfile.mkdtemp(), fleet_store=store)
+    generator.generate_report(generate_html=False)
+
+def test_fleet_metrics():
+    """测试报告生成时写入指标，以及趋势和排行查询"""
+    store = FleetMetricsStore(os.path.join(tempfile.mkdtemp(), 'fleet.db'))
+    record(store, 'uuid-a', 'alpha', 1_000_000, 40, 100)
+    record(store, 'uuid-a', 'alpha', 1_000_000 + DAY_MS, 55, 250)
+    record(store, 'uuid-b', 'beta', 1_000_000, 90, 10)
+    # 同一诊断数据重复生成报告时覆盖原有快照
+    record(store, 'uuid-b', 'beta', 1_000_000, 91, 10)
+    
+    assert store.stats()['snapshots'] == 3 and store.stats()['node_rows'] == 3
+    
+    clusters = store.clusters()
+    assert [c['cluster_name'] for c in clusters] == ['alpha', 'beta']
+    assert clusters[0]['docs'] == 250 and clusters[0]['snapshots'] == 2
+    
+    trend = store.cluster_trend('uuid-a')
+    assert [row['docs'] for row in trend] == [100, 250]
+    assert trend[1]['collected_at'] - trend[0]['collected_at'] == 86400
+    
+    nodes = store.node_trend('uuid-a', 'alpha-node-1')
+    assert [row['heap_percent'] for row in nodes] == [40, 55]
+    assert nodes[0]['disk_percent'] == 60 and nodes[0]['shards'] == 1
+    
+    indices = store.index_trend('uuid-a', 'logs-*', since=1_000_000 / 1000 + 1)
+    assert len(indices) == 1 and indices[0]['store_bytes'] == 2500
+    
+    top = store.top_nodes('heap_percent', limit=1)
+    assert top[0]['cluster_name'] == 'beta' and top[0]['heap_percent'] == 91
+    print("✅ 集群群组指标写入和查询正确")
+
+if __name__ == "__main__":
+    test_fleet_metrics()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+分析任务队列测试
+验证任务状态、章节进度和队列上限
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.job_queue import JobQueue, JobQueueFullError
+
+def wait_for(queue: JobQueue, job_id: str, timeout: float = 5.0) -> dict:
+    """等待任务结束"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise TimeoutError(job_id)
+
+def test_job_progress():
+    """测试任务阶段和章节进度"""
+    queue = JobQueue(max_workers=1, max_pending=4)
+    
+    def task(job, value):
+        job.set_stage('extracting')
+        job.report_progress({'stage': 'analyzing', 'sections': ['A', 'B']})
+        job.report_progress({'stage': 'analyzing', 'section': 'A', 'status': 'done'})
+        return value * 2
+    
+    job_id = queue.submit(task, 21)
+    job = wait_for(queue, job_id)
+    
+    assert job['status'] == 'completed'
+    assert job['progress'] == 100
+    assert job['result'] == 42
+    assert job['sections'] == {'A': 'done', 'B': 'pending'}
+    queue.shutdown()
+    print("✅ 任务进度记录正确")
+
+def test_job_failure():
+    """测试任务失败状态"""
+    queue = JobQueue(max_workers=1, max_pending=4)
+    
+    def task(job):
+        raise ValueError("bad bundle")
+    
+    job = wait_for(queue, queue.submit(task))
+    assert job['status'] == 'failed'
+    assert job['error'] == "bad bundle"
+    queue.shutdown()
+    print("✅ 任务失败信息正确")
+
+def test_queue_full():
+    """测试队列上限"""
+    queue = JobQueue(max_workers=1, max_pending=1)
+    release = threading.Event()
+    
+    job_id = queue.submit(lambda job: release.wait(5))
+    try:
+        queue.submit(lambda job: None)
+        assert False, "队列已满时应拒绝新任务"
+    except JobQueueFullError:
+        pass
+    finally:
+        release.set()
+    
+    wait_for(queue, job_id)
+    queue.shutdown()
+    print("✅ 队列已满时拒绝新任务")
+
+if __name__ == "__main__":
+    test_job_progress()
+    test_job_failure()
+    test_queue_full()
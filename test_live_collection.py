@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+在线收集测试
+使用本地HTTP服务模拟ES，验证诊断数据按 ESDataLoader 的文件名写入目录
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+from fnmatch import fnmatch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.data_loader import ESDataLoader
+from src.es_inspector import ElasticsearchInspector
+from src.modules.data_governance import FinalRecommendationsGenerator
+
+RESPONSES = {
+    '/': {'cluster_name': 'live', 'version': {'number': '8.11.0'}},
+    '/_cluster/health': {'cluster_name': 'live', 'status': 'yellow', 'number_of_nodes': 2},
+    '/_cat/shards': [
+        {'index': 'logs', 'shard': '0', 'prirep': 'p', 'state': 'STARTED', 'docs': '10', 'store': '2048', 'node': 'n1'}
+    ],
+    '/_cat/indices': [{'index': 'logs'}, {'index': 'metrics'}, {'index': 'deleted'}, {'index': 'traces'}],
+}
+
+# 精简收集时按索引分页返回的分片，deleted 模拟收集期间被删除的索引
+SHARDS_BY_INDEX = {
+    name: [{'index': name, 'shard': '0', 'prirep': 'p', 'state': 'STARTED', 'docs': '1', 'store': '100', 'node': 'n1'}]
+    for name in ('logs', 'metrics', 'traces')
+}
+
+# 收到的请求（含查询参数）
+REQUESTS = []
+
+def shard_stats(index, size_bytes):
+    """单个主分片加一个副本的分片级统计，包含精简模式不请求的指标"""
+    return [
+        {'routing': {'primary': primary, 'node': node}, 'docs': {'count': 1000},
+         'store': {'size_in_bytes': size_bytes}, 'indexing': {'index_total': 5000}}
+        for primary, node in ((True, 'n1'), (False, 'n2'))
+    ]
+
+# 分片级索引统计：12个小于1GB的索引和1个超过50GB的索引
+INDICES_STATS = {
+    '_shards': {'total': 26, 'successful': 26},
+    'indices': {
+        name: {
+            'total': {'docs': {'count': 2000, 'deleted': 0}, 'store': {'size_in_bytes': size * 2},
+                      'indexing': {'index_total': 10000}},
+            'shards': {'0': shard_stats(name, size)}
+        }
+        for name, size in [(f"logs-{i}", 10 * 1024 * 1024) for i in range(12)] + [('huge', 60 * 1024 ** 3)]
+    }
+}
+
+# 最终建议读取的接口，完整和精简模式分别请求不同的路径
+STATS_RESPONSES = {
+    '/_stats': INDICES_STATS,
+    '/_stats/docs,store': INDICES_STATS,
+    '/_cluster/stats': {'cluster_name': 'live', 'indices': {'count': 13, 'docs': {'count': 26000}}},
+    '/_nodes/stats': {'nodes': {'n1': {'name': 'n1', 'jvm': {'mem': {'heap_used_percent': 40}}}}},
+    '/_nodes/stats/jvm,os,fs,indices': {'nodes': {'n1': {'name': 'n1', 'jvm': {'mem': {'heap_used_percent': 40}}}}},
+}
+
+def apply_filter_path(data, patterns):
+    """按 filter_path 过滤响应：路径以 . 分隔，* 匹配任意键，数组元素逐个过滤"""
+    if isinstance(data, list):
+        return [item for item in (apply_filter_path(value, patterns) for value in data) if item is not None]
+    if not isinstance(data, dict):
+        return None
+    result = {}
+    for key, value in data.items():
+        remaining = [pattern[1:] for pattern in patterns if fnmatch(key, pattern[0])]
+        if any(not pattern for pattern in remaining):
+            result[key] = value
+        elif remaining:
+            filtered = apply_filter_path(value, remaining)
+            if filtered:
+                result[key] = filtered
+    return result or None
+
+class FakeESHandler(BaseHTTPRequestHandler):
+    """按路径返回固定响应，未知接口返回404"""
+    
+    def do_GET(self):
+        REQUESTS.append(self.path)
+        path = self.path.split('?')[0]
+        if path.startswith('/_cat/shards/'):
+            names = path[len('/_cat/shards/'):].split(',')
+            if any(name not in SHARDS_BY_INDEX for name in names):
+                path = None
+            else:
+                RESPONSES[path] = [shard for name in names for shard in SHARDS_BY_INDEX[name]]
+        if path not in RESPONSES:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        response = RESPONSES[path]
+        filter_path = parse_qs(urlsplit(self.path).query).get('filter_path')
+        if filter_path:
+            response = apply_filter_path(response, [pattern.split('.') for pattern in filter_path[0].split(',')])
+        body = json.dumps(response).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def test_collect_diagnostic():
+    """测试收集的文件可被 ESDataLoader 直接读取"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeESHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        inspector = ElasticsearchInspector({'host': '127.0.0.1', 'port': server.server_port,
+                                            'max_retries': 0, 'max_concurrency': 4})
+        output_dir = os.path.join(tempfile.mkdtemp(), 'diagnostic')
+        result = inspector.collect_diagnostic(output_dir)
+        
+        assert set(result['files']) == {'cluster_health.json', 'indices.json'}
+        assert len(result['errors']) == 10
+        assert '/_stats?level=shards' in REQUESTS
+        assert not [name for name in os.listdir(output_dir) if name.endswith('.part')]
+        
+        loader = ESDataLoader(output_dir)
+        assert loader.get_cluster_health()['status'] == 'yellow'
+        assert loader.get_manifest()['Product Version'] == '8.11.0'
+        assert loader.get_shard_table().index_stats()['logs']['store_bytes'] == 2048
+        print("✅ 在线收集的诊断数据可直接生成报告")
+    finally:
+        server.shutdown()
+
+def test_collect_minimal():
+    """测试精简模式分页收集分片，结果可逐行构建分片表"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeESHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        inspector = ElasticsearchInspector({'host': '127.0.0.1', 'port': server.server_port,
+                                            'max_retries': 0, 'shard_page_max_chars': 16})
+        output_dir = os.path.join(tempfile.mkdtemp(), 'diagnostic')
+        result = inspector.collect_diagnostic(output_dir, minimal=True)
+        
+        assert 'indices.json' in result['files']
+        assert 'settings.json' not in result['timings']
+        assert inspector.transport.stats()['/_cat/shards/logs,metrics']['calls'] == 1
+        
+        loader = ESDataLoader(output_dir)
+        table = loader.get_shard_table()
+        assert list(table.index_stats()) == ['logs', 'metrics', 'traces']
+        assert 'indices.json' not in loader.data_cache
+        print("✅ 精简模式分页收集分片正确")
+    finally:
+        server.shutdown()
+
+def test_minimal_recommendations():
+    """测试精简模式与完整收集生成的最终建议一致（包括分片大小建议）"""
+    RESPONSES.update(STATS_RESPONSES)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeESHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        inspector = ElasticsearchInspector({'host': '127.0.0.1', 'port': server.server_port, 'max_retries': 0})
+        recommendations = {}
+        for minimal in (False, True):
+            output_dir = os.path.join(tempfile.mkdtemp(), 'diagnostic')
+            inspector.collect_diagnostic(output_dir, minimal=minimal)
+            loader = ESDataLoader(output_dir)
+            recommendations[minimal] = FinalRecommendationsGenerator(loader, 'zh').generate()
+            if minimal:
+                shard = loader.get_indices_stats()['indices']['huge']['shards']['0'][0]
+                assert shard == {'routing': {'primary': True}, 'store': {'size_in_bytes': 60 * 1024 ** 3}}
+        
+        assert recommendations[True] == recommendations[False]
+        assert '大分片优化建议' in recommendations[True] and '小分片整合建议' in recommendations[True]
+        print("✅ 精简模式的最终建议与完整收集一致")
+    finally:
+        server.shutdown()
+        for path in STATS_RESPONSES:
+            RESPONSES.pop(path, None)
+
+if __name__ == "__main__":
+    test_collect_diagnostic()
+    test_collect_minimal()
+    test_minimal_recommendations()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+日志扫描引擎测试
+验证单次扫描产出的聚合结果
+"""
+
+import os
+import sys
+import gzip
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.data_source import DirectoryDataSource
+from src.log_scanner import LogScanner
+
+def create_test_logs():
+    """创建测试日志目录"""
+    data_dir = tempfile.mkdtemp()
+    logs_dir = os.path.join(data_dir, 'logs')
+    os.makedirs(logs_dir)
+    
+    lines = [
+        "[2024-01-01T10:00:00,000][INFO ][o.e.n.Node] starting",
+        "[2024-01-01T10:00:01,000][WARN][o.e.m.j.JvmGcMonitorService] heap usage is high",
+        "[2024-01-01T10:00:02,000][ERROR][o.e.a.s.TransportSearchAction] NullPointerException while searching",
+        "[2024-01-01T10:00:03,000][ERROR][o.e.t.TcpTransport] connection reset by peer",
+        "[2024-01-01T10:00:04,000][INFO][o.e.c.s.ClusterApplierService] added {node-2}",
+        "[bad-timestamp][ERROR][o.e.x] unparseable",
+        "not a log line",
+    ]
+    with open(os.path.join(logs_dir, 'es.log'), 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    with gzip.open(os.path.join(logs_dir, 'es-2023-12-31.log.gz'), 'wt') as f:
+        f.write(lines[2] + "\n")
+    
+    return data_dir
+
+def test_log_scanner():
+    """测试日志扫描聚合结果"""
+    data_dir = create_test_logs()
+    result = LogScanner(DirectoryDataSource(data_dir)).scan()
+    
+    assert result.logs_dir_exists
+    assert result.error is None
+    assert len(result.log_files) == 2
+    assert result.compressed_count == 1
+    assert result.current_log_size == os.path.getsize(os.path.join(data_dir, 'logs', 'es.log'))
+    
+    # 压缩日志只统计文件信息，不解析内容
+    assert result.level_counts['ERROR'] == 3
+    assert result.error_count == 2
+    assert result.error_types['exception'] == 1
+    assert result.error_types['connection'] == 1
+    assert result.warning_types['heap'] == 1
+    assert len(result.errors) == 2
+    
+    assert result.event_counts['cluster_changes'] == 1
+    assert result.recent_events['cluster_changes'][0]['component'] == 'o.e.c.s.ClusterApplierService'
+    print("✅ 日志扫描聚合结果正确")
+
+def test_missing_logs_dir():
+    """测试日志目录不存在的情况"""
+    result = LogScanner(DirectoryDataSource(tempfile.mkdtemp())).scan()
+    
+    assert not result.logs_dir_exists
+    assert not result.has_errors
+    assert not result.has_warnings
+    print("✅ 日志目录不存在时返回空结果")
+
+if __name__ == "__main__":
+    test_log_scanner()
+    test_missing_logs_dir()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prometheus 指标测试
+验证计数器、直方图、仪表盘的文本格式输出、阶段计时，以及报告生成器记录的章节耗时
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.metrics import MetricsRegistry, StageMetrics, numeric_stats
+from src.report_generator import ESReportGenerator, SECTION_GENERATORS
+
+def test_metrics_render():
+    """测试Prometheus文本格式"""
+    registry = MetricsRegistry()
+    requests = registry.counter('http_requests_total', 'HTTP 请求数', ('endpoint', 'status'))
+    latency = registry.histogram('latency_seconds', '耗时', buckets=(0.1, 1.0))
+    registry.gauge('store', '存储统计', ('stat',),
+                   callback=lambda: numeric_stats({'reports': 3, 'backend': 'memory', 'process': {'rss_bytes': 10}}))
+    registry.gauge('workers', '并发数', callback=lambda: 4)
+    
+    requests.inc(endpoint='/esreport/api/jobs/<job_id>', status=200)
+    requests.inc(2, endpoint='/a"b', status=404)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+    
+    lines = registry.render().splitlines()
+    assert '# TYPE esreport_http_requests_total counter' in lines
+    assert 'esreport_http_requests_total{endpoint="/esreport/api/jobs/<job_id>",status="200"} 1' in lines
+    assert 'esreport_http_requests_total{endpoint="/a\\"b",status="404"} 2' in lines
+    assert 'esreport_latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'esreport_latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'esreport_latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert 'esreport_latency_seconds_sum 5.55' in lines and 'esreport_latency_seconds_count 3' in lines
+    assert 'esreport_store{stat="process_rss_bytes"} 10' in lines and 'esreport_store{stat="reports"} 3' in lines
+    assert not any('backend' in line for line in lines)
+    assert 'esreport_workers 4' in lines
+    
+    try:
+        requests.inc(endpoint='/x')
+        assert False, "缺少标签时应抛出异常"
+    except ValueError:
+        pass
+    print("✅ 指标文本格式正确")
+
+def test_stage_metrics():
+    """测试阶段计时、字节数和失败次数"""
+    stages = StageMetrics(MetricsRegistry(), description='上传处理阶段')
+    with stages.track('save') as stage:
+        stage['bytes'] = 100
+    with stages.track('hash', 100):
+        pass
+    try:
+        with stages.track('extract', 50):
+            raise ValueError('bad zip')
+    except ValueError:
+        pass
+    
+    assert stages.seconds.count(stage='save') == 1 and stages.seconds.count(stage='extract') == 1
+    assert stages.bytes.value(stage='save') == 100 and stages.bytes.value(stage='hash') == 100
+    assert stages.errors.value(stage='extract') == 1 and stages.errors.value(stage='save') == 0
+    print("✅ 阶段计时正确")
+
+def test_report_timings():
+    """测试报告生成器记录各章节、HTML和case文件的耗时"""
+    data_dir = tempfile.mkdtemp()
+    with open(os.path.join(data_dir, 'cluster_health.json'), 'w', encoding='utf-8') as f:
+        json.dump({'cluster_name': 'metrics', 'status': 'green', 'number_of_nodes': 1}, f)
+    generator = ESReportGenerator(data_dir, output_dir=tempfile.mkdtemp())
+    generator.generate_report(generate_html=True)
+    
+    assert set(generator.timings['sections']) == set(SECTION_GENERATORS)
+    assert all(timing['bytes'] > 0 for timing in generator.timings['sections'].values())
+    assert generator.timings['html']['bytes'] > 0 and 'case_files' in generator.timings
+    print("✅ 报告生成耗时记录正确")
+
+if __name__ == "__main__":
+    test_metrics_render()
+    test_stage_metrics()
+    test_report_timings()
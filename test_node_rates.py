@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+节点速率采样测试
+验证多次节点统计采样的增量计算、诊断目录中采样文件的读取和吞吐表输出
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.data_loader import ESDataLoader
+from src.es_inspector import ElasticsearchInspector
+from src.modules.node_info import NodeInfoGenerator
+from src.node_rates import compute_node_rates
+
+def make_sample(timestamp, index_total, query_total, young_gc, write_rejected, restarted=False):
+    """构造单节点的 _nodes/stats 采样"""
+    return {
+        'nodes': {
+            'n1': {
+                'name': 'es-node-1',
+                'timestamp': timestamp,
+                'indices': {
+                    'indexing': {'index_total': index_total, 'index_time_in_millis': index_total // 2},
+                    'search': {'query_total': query_total, 'query_time_in_millis': query_total * 3}
+                },
+                'jvm': {'gc': {'collectors': {
+                    'young': {'collection_time_in_millis': young_gc},
+                    'old': {'collection_time_in_millis': 0}
+                }}},
+                'thread_pool': {
+                    'write': {'rejected': 0 if restarted else write_rejected},
+                    'search': {'rejected': 7}
+                }
+            }
+        }
+    }
+
+SAMPLES = [
+    make_sample(1_000_000, 1000, 500, 100, 2),
+    make_sample(1_005_000, 3000, 900, 150, 4),
+    make_sample(1_010_000, 6000, 1500, 300, 5),
+]
+
+def test_compute_node_rates():
+    """测试首尾两次采样之间的速率和增量"""
+    rates = compute_node_rates(SAMPLES)['n1']
+    
+    assert rates['name'] == 'es-node-1'
+    assert rates['interval_seconds'] == 10
+    assert rates['index_rate'] == 500
+    assert rates['index_latency_ms'] == 0.5
+    assert rates['search_rate'] == 100
+    assert rates['query_latency_ms'] == 3
+    assert rates['gc_young_ms'] == 200 and rates['gc_old_ms'] == 0
+    assert rates['gc_time_percent'] == 2
+    assert rates['rejected'] == {'write': 3, 'search': 0}
+    
+    assert compute_node_rates(SAMPLES[:1]) == {}
+    
+    # 节点重启后计数器清零，无法计算的增量为None
+    restarted = compute_node_rates([SAMPLES[0], make_sample(1_010_000, 6000, 1500, 300, 5, restarted=True)])
+    assert restarted['n1']['rejected']['write'] is None
+    print("✅ 节点速率计算正确")
+
+def test_throughput_section():
+    """测试诊断目录中的采样文件生成吞吐表，没有采样文件时不输出"""
+    data_dir = tempfile.mkdtemp()
+    with open(os.path.join(data_dir, 'nodes_stats.json'), 'w', encoding='utf-8') as f:
+        json.dump(SAMPLES[-1], f)
+    
+    content = NodeInfoGenerator(ESDataLoader(data_dir)).generate()
+    assert '4.5.2' not in content
+    
+    for i, sample in enumerate(SAMPLES):
+        with open(os.path.join(data_dir, f'nodes_stats_sample_{i}.json'), 'w', encoding='utf-8') as f:
+            json.dump(sample, f)
+    
+    loader = ESDataLoader(data_dir)
+    assert len(loader.get_nodes_stats_samples()) == 3
+    
+    content = NodeInfoGenerator(loader).generate()
+    assert '#### 4.5.2 采样区间吞吐' in content
+    assert '| es-node-1 | 500.0/s | 0.50ms | 100.0/s | 3.00ms | 200/0ms (2.0%) | 3 | 0 |' in content
+    
+    content = NodeInfoGenerator(loader, 'en').generate()
+    assert '#### 4.5.2 Sampled Throughput' in content
+    print("✅ 吞吐表输出正确")
+
+class SamplingInspector(ElasticsearchInspector):
+    """不访问网络，依次返回预先构造的采样"""
+    
+    def __init__(self, config):
+        super().__init__(config)
+        self.requests = []
+    
+    def _make_request(self, endpoint, method='GET', **kwargs):
+        self.requests.append(endpoint)
+        if endpoint.startswith('/_nodes/stats/'):
+            return SAMPLES[len([e for e in self.requests if e == endpoint]) - 1]
+        return {}
+
+def test_inspector_sampling():
+    """测试在线检查按配置采样并计算速率"""
+    inspector = SamplingInspector({'host': 'localhost', 'rate_samples': 3, 'rate_interval': 0.01})
+    result = inspector.inspect_cluster()
+    
+    assert inspector.requests.count('/_nodes/stats/indices,jvm,thread_pool') == 3
+    assert result['node_rates']['n1']['index_rate'] == 500
+    assert 'node_rates' in result['timings']
+    
+    result = SamplingInspector({'host': 'localhost'}).inspect_cluster()
+    assert result['node_rates'] == {}
+    print("✅ 在线采样正确")
+
+if __name__ == "__main__":
+    test_compute_node_rates()
+    test_throughput_section()
+    test_inspector_sampling()
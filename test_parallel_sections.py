@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+并发章节生成测试
+验证并发生成的报告与按顺序生成的报告一致
+"""
+
+import json
+import os
+import re
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.report_generator import ESReportGenerator
+
+def make_data_dir() -> str:
+    data_dir = tempfile.mkdtemp()
+    with open(os.path.join(data_dir, 'cluster_health.json'), 'w') as f:
+        json.dump({'cluster_name': 'test', 'status': 'green', 'number_of_nodes': 1}, f)
+    return data_dir
+
+def generate(data_dir: str, workers: int) -> str:
+    generator = ESReportGenerator(data_dir, output_dir=tempfile.mkdtemp(), workers=workers)
+    result = generator.generate_report(generate_html=False)
+    with open(result['markdown'], 'r', encoding='utf-8') as f:
+        content = f.read()
+    # 忽略报告中的生成时间
+    return re.sub(r'\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}(:\d{2})?', '', content)
+
+def test_parallel_matches_sequential():
+    """测试多线程生成的报告内容和章节顺序不变"""
+    data_dir = make_data_dir()
+    sequential = generate(data_dir, workers=1)
+    parallel = generate(data_dir, workers=4)
+    
+    assert parallel == sequential
+    print("✅ 并发生成的报告与顺序生成一致")
+
+if __name__ == "__main__":
+    test_parallel_matches_sequential()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+性能剖析测试
+验证逐章节写出的折叠调用栈、pstats/callgrind 文件、峰值内存以及剖析汇总
+"""
+
+import json
+import os
+import pstats
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.profiling import SectionProfiler, PROFILE_SUMMARY_FILE
+from src.report_generator import ESReportGenerator, SECTION_GENERATORS
+
+def busy_section():
+    """持续约0.1秒并分配约4MB内存"""
+    data = [bytes(1024) for _ in range(4096)]
+    deadline = time.perf_counter() + 0.1
+    while time.perf_counter() < deadline:
+        sum(range(1000))
+    return len(data)
+
+def test_section_profiler():
+    """测试单个章节的剖析文件"""
+    output_dir = tempfile.mkdtemp()
+    profiler = SectionProfiler(output_dir, interval=0.002)
+    with profiler.profile('BUSY'):
+        busy_section()
+    
+    result = profiler.results['BUSY']
+    assert result['seconds'] >= 0.1 and result['samples'] > 5
+    assert result['peak_memory_bytes'] > 4 * 1024 * 1024
+    with open(result['collapsed'], 'r', encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert any('test_profiling.py:busy_section' in line for line in lines)
+    assert not any('profiling.py:_run' in line for line in lines)
+    
+    functions = {func[2] for func in pstats.Stats(result['pstats']).stats}
+    assert 'busy_section' in functions
+    with open(result['callgrind'], 'r', encoding='utf-8') as f:
+        callgrind = f.read()
+    assert callgrind.startswith('# callgrind format') and 'fn=busy_section:' in callgrind
+    print("✅ 章节剖析文件正确")
+
+def test_sampling_mode():
+    """测试 sampling 模式只写出折叠调用栈"""
+    profiler = SectionProfiler(tempfile.mkdtemp(), mode='sampling', interval=0.002)
+    with profiler.profile('BUSY'):
+        busy_section()
+    assert 'pstats' not in profiler.results['BUSY'] and profiler.results['BUSY']['samples'] > 5
+    try:
+        SectionProfiler(tempfile.mkdtemp(), mode='perf')
+        assert False, "未知的剖析模式应抛出异常"
+    except ValueError:
+        pass
+    print("✅ sampling 模式正确")
+
+def test_report_profile():
+    """测试报告生成时剖析文件写入case目录"""
+    data_dir = tempfile.mkdtemp()
+    with open(os.path.join(data_dir, 'cluster_health.json'), 'w', encoding='utf-8') as f:
+        json.dump({'cluster_name': 'profile', 'status': 'green', 'number_of_nodes': 1}, f)
+    output_dir = tempfile.mkdtemp()
+    generator = ESReportGenerator(data_dir, output_dir=output_dir, workers=4, profile='cprofile')
+    result = generator.generate_report(generate_html=True)
+    
+    case_dir = os.path.join(output_dir, 'cases')
+    assert result['profile'] == os.path.join(case_dir, PROFILE_SUMMARY_FILE)
+    with open(result['profile'], 'r', encoding='utf-8') as f:
+        summary = json.load(f)
+    assert summary['mode'] == 'cprofile'
+    assert set(summary['sections']) == set(SECTION_GENERATORS) | {'HTML_REPORT'}
+    files = os.listdir(case_dir)
+    for section_name in SECTION_GENERATORS:
+        for suffix in ('_case.json', '_profile.collapsed', '_profile.pstats', '_profile.callgrind'):
+            assert f"{section_name.lower()}{suffix}" in files
+    print("✅ 报告剖析文件正确")
+
+if __name__ == "__main__":
+    test_section_profiler()
+    test_sampling_mode()
+    test_report_profile()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+报告缓存测试
+验证按大小淘汰、磁盘层和版本隔离
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.report_cache import ReportCache
+from src.report_store import ReportStore
+
+def make_entry(size: int) -> dict:
+    return {'markdown_content': 'm' * size, 'html_content': ''}
+
+def test_memory_eviction():
+    """测试内存层按LRU和总大小淘汰"""
+    cache = ReportCache("1.0", max_bytes=250, cache_dir="")
+    
+    cache.put("a" * 64, "zh", make_entry(100))
+    cache.put("b" * 64, "zh", make_entry(100))
+    assert cache.get("a" * 64, "zh") is not None  # a 变为最近使用
+    cache.put("c" * 64, "zh", make_entry(100))
+    
+    assert cache.get("b" * 64, "zh") is None
+    assert cache.get("a" * 64, "zh") is not None
+    assert cache.get("c" * 64, "zh") is not None
+    assert cache.get("a" * 64, "en") is None
+    assert cache.stats()['bytes'] <= 250
+    print("✅ 内存层淘汰正确")
+
+def test_disk_tier():
+    """测试磁盘层在内存未命中时生效"""
+    cache_dir = tempfile.mkdtemp()
+    cache = ReportCache("1.0", max_bytes=1024, cache_dir=cache_dir)
+    cache.put("d" * 64, "en", {'markdown_content': '# 报告', 'html_content': '<h1>报告</h1>'})
+    
+    # 新实例只有磁盘层数据
+    restored = ReportCache("1.0", max_bytes=1024, cache_dir=cache_dir)
+    assert restored.get("d" * 64, "en")['markdown_content'] == '# 报告'
+    
+    # 生成器版本变化后缓存失效
+    upgraded = ReportCache("1.1", max_bytes=1024, cache_dir=cache_dir)
+    assert upgraded.get("d" * 64, "en") is None
+    print("✅ 磁盘层和版本隔离正确")
+
+def test_resolver():
+    """测试内存层只引用报告存储中的报告，报告删除后回退到磁盘层"""
+    store = ReportStore(max_bytes=1024 * 1024, spill_dir=tempfile.mkdtemp())
+    store.put('report-1', {'markdown_content': '# 报告', 'html_content': '<h1>报告</h1>', 'filename': 'a.zip'})
+    resolved = []
+    def resolver(reference):
+        resolved.append(reference['report_id'])
+        report = store.get(reference['report_id'])
+        if report is None:
+            return None
+        return dict(reference, markdown_content=report['markdown_content'], html_content=report['html_content'])
+    
+    cache_dir = tempfile.mkdtemp()
+    cache = ReportCache("1.0", max_bytes=1024, cache_dir=cache_dir, resolver=resolver)
+    entry = {'report_id': 'report-1', 'markdown_content': '# 报告', 'html_content': '<h1>报告</h1>', 'summary': {}}
+    cache.put("e" * 64, "zh", entry)
+    assert cache.stats()['bytes'] == len('report-1')  # 内存层只有报告ID
+    assert cache.get("e" * 64, "zh") == entry and resolved == ['report-1']
+    
+    # 报告删除后内存层的引用失效，从磁盘层读取
+    store.delete('report-1')
+    assert cache.get("e" * 64, "zh") == entry
+    assert cache.stats()['entries'] == 0
+    
+    # 没有磁盘层时按未命中处理
+    memory_only = ReportCache("1.0", max_bytes=1024, cache_dir="", resolver=resolver)
+    memory_only.put("e" * 64, "zh", entry)
+    assert memory_only.get("e" * 64, "zh") is None
+    print("✅ 内存层引用报告存储正确")
+
+if __name__ == "__main__":
+    test_memory_eviction()
+    test_disk_tier()
+    test_resolver()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+报告存储测试
+验证内存预算落盘、数量上限和过期清理
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.report_store import ReportStore, SQLiteReportStore
+
+def make_record(size: int) -> dict:
+    return {
+        'markdown_content': 'm' * size,
+        'html_content': '',
+        'filename': 'diagnostic.zip',
+        'generated_at': '2025-01-01T00:00:00'
+    }
+
+def test_spill_and_reload():
+    """测试超出内存预算后落盘并可重新加载"""
+    store = ReportStore(max_bytes=150, max_reports=10, ttl_seconds=0, spill_dir=tempfile.mkdtemp())
+    
+    store.put('r1', make_record(100))
+    store.put('r2', make_record(100))
+    
+    stats = store.stats()
+    assert stats['memory_bytes'] <= 150
+    assert stats['spilled_reports'] == 1
+    
+    # 读取元数据不重新加载落盘的内容
+    assert store.get_meta('r1') == {'filename': 'diagnostic.zip', 'generated_at': '2025-01-01T00:00:00'}
+    assert store.stats()['loads'] == 0
+    
+    record = store.get('r1')
+    assert record['markdown_content'] == 'm' * 100
+    assert record['filename'] == 'diagnostic.zip'
+    assert store.stats()['memory_bytes'] <= 150
+    print("✅ 报告内容落盘和重新加载正确")
+
+def test_eviction_removes_owned_files():
+    """测试超出数量上限时清理报告输出文件"""
+    output_dir = tempfile.mkdtemp()
+    owned = os.path.join(output_dir, 'report.md')
+    with open(owned, 'w') as f:
+        f.write('# report')
+    
+    store = ReportStore(max_bytes=1024, max_reports=1, ttl_seconds=0, spill_dir=tempfile.mkdtemp())
+    deleted = []
+    store.on_delete = deleted.append
+    store.put('r1', make_record(10), owned_files=[owned])
+    store.put('r2', make_record(10))
+    
+    assert 'r1' not in store
+    assert deleted == ['r1']
+    assert not os.path.exists(owned)
+    assert [item['id'] for item in store.list()] == ['r2']
+    print("✅ 淘汰报告时清理输出文件")
+
+def test_ttl_expiry():
+    """测试过期报告被删除"""
+    store = ReportStore(max_bytes=1024, max_reports=10, ttl_seconds=60, spill_dir=tempfile.mkdtemp())
+    store.put('r1', make_record(10))
+    store._meta['r1']['_created_ts'] -= 120
+    
+    assert store.get('r1') is None
+    assert store.stats()['expirations'] == 1
+    print("✅ 过期报告被删除")
+
+def test_sqlite_store_shared():
+    """测试SQLite存储可被多个实例（worker）共享"""
+    db_path = os.path.join(tempfile.mkdtemp(), 'reports.db')
+    worker_a = SQLiteReportStore(db_path, max_reports=1, ttl_seconds=0)
+    worker_b = SQLiteReportStore(db_path, max_reports=1, ttl_seconds=0)
+    
+    owned = os.path.join(tempfile.mkdtemp(), 'report.md')
+    with open(owned, 'w') as f:
+        f.write('# report')
+    
+    worker_a.put('r1', make_record(10), owned_files=[owned])
+    record = worker_b.get('r1')
+    assert record['markdown_content'] == 'm' * 10
+    assert record['filename'] == 'diagnostic.zip'
+    
+    deleted = []
+    worker_b.on_delete = deleted.append
+    worker_b.put('r2', make_record(10))
+    assert 'r1' not in worker_a
+    assert deleted == ['r1']
+    assert worker_a.get_meta('r1') is None
+    assert worker_a.get_meta('r2')['filename'] == 'diagnostic.zip'
+    assert not os.path.exists(owned)
+    assert [item['id'] for item in worker_a.list()] == ['r2']
+    
+    worker_a.save_job('job-1', {'job_id': 'job-1', 'status': 'running', 'progress': 40})
+    assert worker_b.load_job('job-1')['progress'] == 40
+    print("✅ SQLite存储在多个实例间共享")
+
+if __name__ == "__main__":
+    test_spill_and_reload()
+    test_eviction_removes_owned_files()
+    test_ttl_expiry()
+    test_sqlite_store_shared()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+流式报告写出测试
+验证分块HTML转换与一次性转换结果一致，以及报告按章节直接写入文件
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.html_converter import MarkdownHtmlConverter, HtmlReportWriter, markdown_to_html, create_html_template
+from src.report_generator import ESReportGenerator
+
+SAMPLE_MARKDOWN = """# 报告
+
+## 1. 概述
+
+- **集群**: `es-prod`
+- 状态 <green> & 正常
+
+| 指标 | 数值 |
+|------|------|
+| 节点 | 3 |
+| *分片* | 12 |
+
+
+### 1.1 说明
+跨行的 `行内
+代码` 和单独的 ` 反引号
+
+- 列表项
+正文"""
+
+def convert_in_chunks(markdown_content, size):
+    converter = MarkdownHtmlConverter()
+    parts = [converter.feed(markdown_content[i:i + size]) for i in range(0, len(markdown_content), size)]
+    parts.append(converter.close())
+    return ''.join(parts)
+
+def test_chunked_conversion():
+    """测试任意切分的分块转换与一次性转换结果一致"""
+    expected = markdown_to_html(SAMPLE_MARKDOWN)
+    assert '<table>' in expected and '<ul>' in expected and '<code>行内\n代码</code>' in expected
+    for size in range(1, len(SAMPLE_MARKDOWN) + 1):
+        assert convert_in_chunks(SAMPLE_MARKDOWN, size) == expected, f"块大小 {size} 的转换结果不一致"
+    
+    output_path = os.path.join(tempfile.mkdtemp(), 'report.html')
+    fragments = []
+    writer = HtmlReportWriter(output_path, "测试报告", fragments=fragments, fragment_table_class='table-striped')
+    for line in SAMPLE_MARKDOWN.splitlines(keepends=True):
+        writer.write(line)
+    writer.close()
+    with open(output_path, 'r', encoding='utf-8') as f:
+        assert f.read() == create_html_template(expected, "测试报告")
+    # 表格样式只影响 fragments
+    assert ''.join(fragments) == markdown_to_html(SAMPLE_MARKDOWN, table_class='table-striped')
+    assert ''.join(fragments) == expected.replace('<table>', '<table class="table-striped">')
+    print("✅ 分块HTML转换结果一致")
+
+def test_streamed_report():
+    """测试报告按模板顺序写出，章节位置和HTML与文件内容一致"""
+    data_dir = tempfile.mkdtemp()
+    with open(os.path.join(data_dir, 'cluster_health.json'), 'w', encoding='utf-8') as f:
+        json.dump({'cluster_name': 'stream', 'status': 'green', 'number_of_nodes': 1}, f)
+    generator = ESReportGenerator(data_dir, output_dir=tempfile.mkdtemp())
+    events = []
+    result = generator.generate_report(generate_html=True, progress_callback=events.append,
+                                       return_html_content=True)
+    
+    with open(result['markdown'], 'r', encoding='utf-8') as f:
+        report = f.read()
+    with open(result['html'], 'r', encoding='utf-8') as f:
+        assert f.read() == create_html_template(markdown_to_html(report))
+    # 返回的HTML正文来自流式转换，与重新转换的结果一致
+    assert result['html_content'] == markdown_to_html(report)
+    assert generator.timings['html']['bytes'] == len(report.encode('utf-8'))
+    
+    keys = [entry['key'] for entry in generator.section_index]
+    assert events[0]['sections'] == keys
+    for entry in generator.section_index:
+        assert report[entry['start']:].startswith('## ')
+        section = generator.generate_section_content(entry['key'])
+        assert report[entry['start']:entry['end']].endswith(section)
+    print("✅ 报告按章节流式写出")
+
+def test_generate_chunks():
+    """测试按小节分块生成的内容与完整生成一致"""
+    generator = ESReportGenerator(tempfile.mkdtemp(), output_dir=tempfile.mkdtemp())
+    for section_name, section_generator in generator.generators.items():
+        if hasattr(section_generator, 'generate_chunks'):
+            chunks = generator.generate_section_chunks(section_name)
+            assert len(chunks) > 1 and ''.join(chunks) == section_generator.generate()
+    print("✅ 章节分块生成正确")
+
+if __name__ == "__main__":
+    test_chunked_conversion()
+    test_streamed_report()
+    test_generate_chunks()
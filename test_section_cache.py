@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+章节缓存测试
+验证输入文件指纹、缓存命中后的章节内容和case数据，以及只有日志不同时只重新生成受影响的章节
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+import src.data_source
+from src.data_loader import ESDataLoader
+from src.fleet_metrics import FleetMetricsStore
+from src.report_generator import ESReportGenerator, REPORT_GENERATOR_VERSION, SECTION_GENERATORS
+from src.section_cache import SectionCache
+from src.synthetic_bundle import SyntheticBundleGenerator
+
+# 声明了 INPUT_FILES 的章节
+CACHEABLE_SECTIONS = [name for name, cls in SECTION_GENERATORS.items() if getattr(cls, 'INPUT_FILES', None)]
+
+def make_bundle(output='bundle'):
+    bundle_path = os.path.join(tempfile.mkdtemp(), output)
+    SyntheticBundleGenerator(nodes=3, indices=20, fields=10, log_lines=200, unassigned=2).generate(bundle_path)
+    return bundle_path
+
+def generate(bundle_path, cache_dir, language='zh', workers=1, fleet_store=None, case_files='json'):
+    output_dir = tempfile.mkdtemp()
+    generator = ESReportGenerator(bundle_path, output_dir=output_dir, language=language, workers=workers,
+                                  section_cache=SectionCache(cache_dir, REPORT_GENERATOR_VERSION),
+                                  fleet_store=fleet_store, case_files=case_files)
+    result = generator.generate_report(generate_html=False)
+    with open(result['markdown'], 'r', encoding='utf-8') as f:
+        report = f.read()
+    sections = {entry['key']: report[entry['start']:entry['end']] for entry in generator.section_index}
+    return generator, sections, os.path.join(output_dir, 'cases')
+
+def read_case_files(case_dir):
+    case_files = {}
+    for filename in os.listdir(case_dir):
+        with open(os.path.join(case_dir, filename), 'r', encoding='utf-8') as f:
+            case_files[filename] = json.load(f)
+    return case_files
+
+def test_fingerprint_files():
+    """测试目录和ZIP诊断包的输入文件指纹"""
+    for bundle_path in (make_bundle(), make_bundle('bundle.zip')):
+        loader = ESDataLoader(bundle_path)
+        fingerprints = loader.fingerprint_files(['cluster_health.json', 'missing.json', 'logs/*.log', 'nodes_stats_sample_*.json'])
+        assert fingerprints['missing.json'] is None
+        assert fingerprints['cluster_health.json'] is not None
+        assert 'logs/synthetic-cluster.log' in fingerprints
+        assert not any(path.startswith('nodes_stats_sample_') for path in fingerprints)
+        assert loader.fingerprint_files(['no_such_dir/*.log']) == {'no_such_dir/*.log': None}
+        if os.path.isdir(bundle_path):
+            # 日志文件使用大小和修改时间作为指纹
+            assert fingerprints['logs/synthetic-cluster.log'].startswith('stat:')
+            assert fingerprints['cluster_health.json'].startswith('sha256:')
+    print("✅ 输入文件指纹正确")
+
+def test_cached_sections():
+    """测试第二次生成时可缓存的章节全部命中，内容和case文件与第一次一致"""
+    bundle_path = make_bundle()
+    cache_dir = tempfile.mkdtemp()
+    first, first_sections, first_cases = generate(bundle_path, cache_dir)
+    assert first.cached_sections == []
+    
+    second, second_sections, second_cases = generate(bundle_path, cache_dir, workers=4)
+    assert sorted(second.cached_sections) == sorted(CACHEABLE_SECTIONS)
+    assert 'LOG_ANALYSIS' not in second.cached_sections
+    assert all(second.timings['sections'][name].get('cached') for name in CACHEABLE_SECTIONS)
+    assert second_sections == first_sections
+    assert read_case_files(second_cases) == read_case_files(first_cases)
+    
+    # 不同语言不共享缓存
+    english, _, _ = generate(bundle_path, cache_dir, language='en')
+    assert english.cached_sections == []
+    print("✅ 章节缓存命中后内容一致")
+
+def test_cache_without_case_data():
+    """测试缓存中没有case数据时，需要case文件的运行重新生成章节"""
+    bundle_path = make_bundle()
+    cache_dir = tempfile.mkdtemp()
+    generate(bundle_path, cache_dir, case_files='none')
+    
+    generator, _, case_dir = generate(bundle_path, cache_dir)
+    assert generator.cached_sections == []
+    assert len(read_case_files(case_dir)) == len(SECTION_GENERATORS)
+    
+    # 重新生成的章节连同case数据一起写入缓存
+    generator, _, _ = generate(bundle_path, cache_dir)
+    assert sorted(generator.cached_sections) == sorted(CACHEABLE_SECTIONS)
+    print("✅ 缓存缺少case数据时重新生成")
+
+def test_changed_logs():
+    """测试诊断包只有日志不同时只重新生成用到日志的章节"""
+    bundle_path = make_bundle()
+    cache_dir = tempfile.mkdtemp()
+    generate(bundle_path, cache_dir)
+    
+    changed_path = os.path.join(tempfile.mkdtemp(), 'changed')
+    shutil.copytree(bundle_path, changed_path)
+    with open(os.path.join(changed_path, 'logs', 'synthetic-cluster.log'), 'a', encoding='utf-8') as f:
+        f.write("[2025-05-28T10:00:00,000][ERROR][o.e.b.BootstrapChecks] [node-0] bootstrap checks failed\n")
+    
+    generator, sections, _ = generate(changed_path, cache_dir)
+    assert sorted(generator.cached_sections) == sorted(set(CACHEABLE_SECTIONS) - {'FINAL_RECOMMENDATIONS'})
+    
+    # 与不使用缓存生成的章节一致
+    uncached = ESReportGenerator(changed_path, output_dir=tempfile.mkdtemp())
+    for section_name in CACHEABLE_SECTIONS:
+        assert sections[section_name].endswith(uncached.generate_section_content(section_name))
+    print("✅ 只重新生成受影响的章节")
+
+def test_log_reads():
+    """测试使用章节缓存时日志文件只被日志分析读取一次，计算指纹不读取日志内容"""
+    bundle_path = make_bundle()
+    cache_dir = tempfile.mkdtemp()
+    generate(bundle_path, cache_dir)
+    
+    opened = []
+    def counting_open(path, *args, **kwargs):
+        opened.append(os.path.relpath(path, bundle_path))
+        return open(path, *args, **kwargs)
+    
+    src.data_source.open = counting_open
+    try:
+        generator, _, _ = generate(bundle_path, cache_dir)
+    finally:
+        del src.data_source.open
+    assert sorted(generator.cached_sections) == sorted(CACHEABLE_SECTIONS)
+    log_reads = sorted(path for path in opened if path.startswith('logs'))
+    # 只读取未压缩的当前日志，且只读取一次
+    assert log_reads == [os.path.join('logs', 'synthetic-cluster.log')]
+    print("✅ 日志文件只读取一次")
+
+def test_cached_fleet_metrics():
+    """测试章节全部命中时，保存集群群组指标不再构建分片表和解析节点统计"""
+    bundle_path = make_bundle()
+    cache_dir = tempfile.mkdtemp()
+    fleet_store = FleetMetricsStore(os.path.join(tempfile.mkdtemp(), 'fleet.db'))
+    generate(bundle_path, cache_dir, fleet_store=fleet_store)
+    first = fleet_store.clusters()
+    
+    generator, _, _ = generate(bundle_path, cache_dir, fleet_store=fleet_store)
+    assert generator.data_loader._shard_table is None
+    assert 'nodes_stats.json' not in generator.data_loader.data_cache
+    
+    # 同一诊断数据的快照被替换，指标不变
+    assert fleet_store.clusters() == first and first[0]['snapshots'] == 1
+    print("✅ 集群群组指标使用章节缓存")
+
+if __name__ == "__main__":
+    test_fingerprint_files()
+    test_cached_sections()
+    test_cache_without_case_data()
+    test_changed_logs()
+    test_log_reads()
+    test_cached_fleet_metrics()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+章节索引测试
+验证组装报告时记录的章节位置
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.report_generator import ESReportGenerator
+
+def test_section_offsets():
+    """测试章节范围从标题开始到章节内容结束"""
+    generator = ESReportGenerator(tempfile.mkdtemp(), output_dir=tempfile.mkdtemp())
+    template = "# 报告\n\n## 1. 概述\n\n{{REPORT_OVERVIEW}}\n\n## 2. 日志\n\n{{LOG_ANALYSIS}}\n\n{{UNKNOWN}}"
+    
+    report = generator._assemble_report(template, {
+        'REPORT_OVERVIEW': '概述内容',
+        'LOG_ANALYSIS': '日志内容 {{不是占位符}}'
+    })
+    
+    index = {entry['key']: entry for entry in generator.section_index}
+    assert list(index) == ['REPORT_OVERVIEW', 'LOG_ANALYSIS']
+    assert index['REPORT_OVERVIEW']['title'] == '1. 概述'
+    
+    overview = report[index['REPORT_OVERVIEW']['start']:index['REPORT_OVERVIEW']['end']]
+    logs = report[index['LOG_ANALYSIS']['start']:index['LOG_ANALYSIS']['end']]
+    assert overview == "## 1. 概述\n\n概述内容"
+    assert logs == "## 2. 日志\n\n日志内容 {{不是占位符}}"
+    assert report.endswith("**待实现**: UNKNOWN 章节暂未实现")
+    print("✅ 章节索引位置正确")
+
+if __name__ == "__main__":
+    test_section_offsets()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+列式分片表测试
+验证按索引、按节点的聚合结果
+"""
+
+import sys
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.shard_table import ShardTable
+
+SHARDS = [
+    {'index': 'logs-1', 'shard': '0', 'prirep': 'p', 'state': 'STARTED', 'docs': '10', 'store': '100', 'node': 'node-1'},
+    {'index': 'logs-1', 'shard': '0', 'prirep': 'r', 'state': 'STARTED', 'docs': '10', 'store': '100', 'node': 'node-2'},
+    {'index': 'logs-1', 'shard': '1', 'prirep': 'p', 'state': 'STARTED', 'docs': '5', 'store': '300', 'node': 'node-2'},
+    {'index': '.kibana', 'shard': '0', 'prirep': 'p', 'state': 'STARTED', 'docs': '1', 'store': '50', 'node': 'node-1'},
+    {'index': '.kibana', 'shard': '0', 'prirep': 'r', 'state': 'UNASSIGNED', 'docs': None, 'store': None, 'node': None},
+]
+
+def test_index_stats():
+    """测试按索引聚合（文档数和大小只统计主分片）"""
+    table = ShardTable(SHARDS)
+    stats = table.index_stats()
+    
+    assert list(stats) == ['logs-1', '.kibana']
+    assert stats['logs-1']['primary_shards'] == 2
+    assert stats['logs-1']['replica_shards'] == 1
+    assert stats['logs-1']['docs'] == 15
+    assert stats['logs-1']['store_bytes'] == 400
+    assert stats['logs-1']['max_shard_size'] == 300
+    assert stats['.kibana']['states'] == {'STARTED', 'UNASSIGNED'}
+    assert stats['.kibana']['status'] == 'UNASSIGNED'
+    print("✅ 按索引聚合正确")
+
+def test_node_stats_and_problems():
+    """测试按节点聚合、分片大小和问题分片"""
+    table = ShardTable(SHARDS)
+    nodes = table.node_stats()
+    
+    assert nodes['node-2'] == {'primary': 1, 'replica': 1, 'total_size': 400}
+    assert nodes['unknown'] == {'primary': 0, 'replica': 1, 'total_size': 0}
+    assert table.shard_sizes() == [50, 100, 100, 300]
+    
+    problems = table.problem_shards()
+    assert problems == [{'index': '.kibana', 'shard': 0, 'type': 'r', 'state': 'UNASSIGNED', 'node': 'N/A'}]
+    assert not ShardTable(None)
+    print("✅ 按节点聚合和问题分片正确")
+
+if __name__ == "__main__":
+    test_index_stats()
+    test_node_stats_and_problems()
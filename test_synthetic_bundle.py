@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+合成诊断数据生成测试
+验证生成的目录/ZIP包含各模块读取的文件、相同种子输出一致，且可以完整生成报告
+"""
+
+import filecmp
+import gzip
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+from src.data_loader import ESDataLoader
+from src.report_generator import ESReportGenerator
+from src.synthetic_bundle import SyntheticBundleGenerator
+
+REQUIRED_FILES = ['manifest.json', 'cluster_health.json', 'cluster_settings.json', 'cluster_stats.json',
+                  'licenses.json', 'master.json', 'nodes.json', 'nodes_stats.json', 'nodes_usage.json',
+                  'indices.json', 'indices_stats.json', 'settings.json', 'mapping.json',
+                  'commercial/ilm_policies.json']
+
+def make_generator(seed=7):
+    return SyntheticBundleGenerator(nodes=6, indices=40, shards=70, fields=20, log_lines=300,
+                                    log_rotations=2, unassigned=2, seed=seed)
+
+def test_synthetic_directory():
+    """测试目录内容和数据一致性"""
+    data_dir = make_generator().generate(os.path.join(tempfile.mkdtemp(), 'synthetic'))
+    for filename in REQUIRED_FILES:
+        assert os.path.isfile(os.path.join(data_dir, filename)), filename
+    logs = sorted(os.listdir(os.path.join(data_dir, 'logs')))
+    assert len(logs) == 3 and sum(name.endswith('.log.gz') for name in logs) == 2
+    with gzip.open(os.path.join(data_dir, 'logs', logs[0]), 'rt', encoding='utf-8') as f:
+        assert len(f.readlines()) == 300
+    
+    loader = ESDataLoader(data_dir)
+    shard_table = loader.get_shard_table()
+    assert len(shard_table) == 70 * 2
+    assert len(shard_table.problem_shards()) == 2 and len(shard_table.index_stats()) == 40
+    assert loader.get_cluster_health()['unassigned_shards'] == 2
+    assert len(loader.get_nodes_stats()['nodes']) == 6
+    indices_stats = loader.get_indices_stats()['indices']
+    assert len(indices_stats) == 40
+    
+    # 与 _stats?level=shards 一致：每个分片副本一条记录，未分配的副本不出现
+    shard_copies = [copy for stats in indices_stats.values() for copies in stats['shards'].values() for copy in copies]
+    assert len(shard_copies) == 70 * 2 - 2
+    assert sum(copy['routing']['primary'] for copy in shard_copies) == 70
+    for stats in indices_stats.values():
+        assert sum(copy['store']['size_in_bytes'] for copies in stats['shards'].values() for copy in copies
+                   if copy['routing']['primary']) == stats['primaries']['store']['size_in_bytes']
+    with open(os.path.join(data_dir, 'mapping.json'), 'r', encoding='utf-8') as f:
+        mapping = json.load(f)
+    assert all(len(index['mappings']['properties']) == 20 for index in mapping.values())
+    print("✅ 合成诊断目录内容正确")
+
+def test_synthetic_deterministic():
+    """测试相同种子生成完全一致的ZIP，不同种子生成不同数据"""
+    first = make_generator().generate(os.path.join(tempfile.mkdtemp(), 'bundle.zip'))
+    second = make_generator().generate(os.path.join(tempfile.mkdtemp(), 'bundle.zip'))
+    other = make_generator(seed=8).generate(os.path.join(tempfile.mkdtemp(), 'bundle.zip'))
+    assert filecmp.cmp(first, second, shallow=False)
+    assert not filecmp.cmp(first, other, shallow=False)
+    print("✅ 相同种子输出一致")
+
+def test_synthetic_report():
+    """测试合成ZIP可以完整生成报告"""
+    bundle = make_generator().generate(os.path.join(tempfile.mkdtemp(), 'bundle.zip'))
+    generator = ESReportGenerator(bundle, output_dir=tempfile.mkdtemp())
+    result = generator.generate_report(generate_html=False)
+    with open(result['markdown'], 'r', encoding='utf-8') as f:
+        content = f.read()
+    assert 'synthetic-cluster-node-6' in content
+    assert '## 6. ' in content
+    assert '小分片整合建议' in content  # 依赖 indices_stats.json 中的分片级统计
+    summary = generator.get_summary()
+    assert summary['status'] == 'yellow' and summary['number_of_nodes'] == 6
+    print("✅ 合成诊断数据报告生成正确")
+
+if __name__ == "__main__":
+    test_synthetic_directory()
+    test_synthetic_deterministic()
+    test_synthetic_report()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Web上传流程测试
+通过 Flask 测试客户端上传合成诊断包，验证后台分析任务的结果和case文件
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# 添加src目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent))
+
+# 导入 app 时会加载 .env，导入后恢复环境变量，避免影响其他测试
+_environ = dict(os.environ)
+import app
+os.environ.clear()
+os.environ.update(_environ)
+
+from src.report_generator import ESReportGenerator, REPORT_GENERATOR_VERSION, SECTION_GENERATORS
+from src.section_cache import SectionCache
+from src.synthetic_bundle import SyntheticBundleGenerator
+
+app.s3_uploader.is_configured = lambda: False
+
+def make_bundle(seed):
+    bundle_path = os.path.join(tempfile.mkdtemp(), 'diagnostic.zip')
+    SyntheticBundleGenerator(nodes=3, indices=20, fields=10, log_lines=200, seed=seed).generate(bundle_path)
+    return bundle_path
+
+def upload(bundle_path, language='zh'):
+    """上传诊断包并等待后台任务完成，返回任务状态"""
+    client = app.app.test_client()
+    with open(bundle_path, 'rb') as f:
+        response = client.post('/esreport/api/upload-diagnostic', content_type='multipart/form-data',
+                               data={'diagnostic_file': (f, 'diagnostic.zip'), 'language': language})
+    submitted = response.get_json()
+    if submitted.get('cached'):
+        return {'status': 'completed', 'cached': True, 'result': submitted['result']}
+    job_id = submitted['job_id']
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        job = client.get(f'/esreport/api/jobs/{job_id}').get_json()
+        if job['status'] in ('completed', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"任务 {job_id} 未完成")
+
+def wait_case_files():
+    for thread in threading.enumerate():
+        if thread.name == 'case-files':
+            thread.join()
+
+def test_case_files_with_section_cache():
+    """测试章节缓存中没有case数据时，后台写出的case文件仍然完整"""
+    bundle_path = make_bundle(seed=11)
+    app.section_cache = SectionCache(tempfile.mkdtemp(), REPORT_GENERATOR_VERSION)
+    try:
+        # 命令行 --case-files none 写入的缓存不包含case数据
+        ESReportGenerator(bundle_path, output_dir=tempfile.mkdtemp(), case_files='none',
+                          section_cache=app.section_cache).generate_report(generate_html=False)
+        job = upload(bundle_path)
+    finally:
+        app.section_cache = None
+    assert job['status'] == 'completed'
+    wait_case_files()
+    
+    case_dir = app.report_case_dir(job['result']['report_id'])
+    for section_name in SECTION_GENERATORS:
+        assert os.path.isfile(os.path.join(case_dir, f"{section_name.lower()}_case.json")), section_name
+    print("✅ case文件完整")
+
+def test_job_result_without_content():
+    """测试任务状态中不保存报告内容，查询任务时从报告存储读取"""
+    job = upload(make_bundle(seed=12))
+    assert job['status'] == 'completed'
+    wait_case_files()
+    
+    state = app.job_queue.jobs[job['job_id']]
+    assert 'report_content' not in state['result'] and 'html_content' not in state['result']
+    
+    report = app.report_store.get(job['result']['report_id'])
+    assert job['result']['report_content'] == report['markdown_content']
+    assert job['result']['html_content'] == report['html_content']
+    assert 'content_in_store' not in job['result']
+    print("✅ 任务结果从报告存储读取内容")
+
+def test_upload_html_content():
+    """测试上传结果中的HTML与 app.markdown_to_html 转换的结果一致（表格带Web页面样式）"""
+    job = upload(make_bundle(seed=14))
+    assert job['status'] == 'completed'
+    wait_case_files()
+    html_content = job['result']['html_content']
+    assert html_content == app.markdown_to_html(job['result']['report_content'])
+    assert f'<table class="{app.REPORT_TABLE_CLASS}">' in html_content
+    print("✅ 上传结果HTML一致")
+
+def test_cached_upload():
+    """测试重复上传命中报告缓存，缓存内存层不保存报告内容"""
+    bundle_path = make_bundle(seed=13)
+    first = upload(bundle_path)
+    wait_case_files()
+    second = upload(bundle_path)
+    assert second.get('cached') and second['result']['report_id'] != first['result']['report_id']
+    assert second['result']['report_content'] == first['result']['report_content']
+    assert second['result']['html_content'] == first['result']['html_content']
+    assert app.report_cache.stats()['bytes'] < len(first['result']['report_content'])
+    print("✅ 报告缓存命中")
+
+if __name__ == "__main__":
+    test_case_files_with_section_cache()
+    test_job_result_without_content()
+    test_upload_html_content()
+    test_cached_upload()